@@ -0,0 +1,254 @@
+"""Admission control for the expensive analysis and optimization endpoints.
+
+Every such request gets a cost estimate before it does any work: pairs x
+bars x evaluations, in units of ADMISSION_COST_UNIT pair-bars (at least 1,
+at most the capacity). Admission takes two checks:
+
+* Per client - a token bucket of ADMISSION_CLIENT_BURST units refilled at
+  ADMISSION_CLIENT_RATE per second, keyed by client address. The API has no
+  authentication, so headers such as X-API-Key are not trusted: a client
+  could send a new one with every request. A client over its rate gets a
+  fast 429 with Retry-After.
+* Global - at most ADMISSION_CAPACITY units in flight. Requests over it
+  wait in a FIFO queue of ADMISSION_QUEUE_SIZE for up to
+  ADMISSION_QUEUE_TIMEOUT seconds, then get a 503 with Retry-After; so do
+  requests arriving to a full queue.
+
+Background jobs (optimizations) draw on a budget of their own,
+ADMISSION_JOB_CAPACITY, so hours of optimization never queue the
+interactive endpoints. A single optimization holds its ticket until it
+finishes; a batch is rate limited as a whole when it is submitted and then
+reserves capacity for each sub-run as it is dispatched, waiting as long as
+that takes. The limits are per worker process, like the CPU they protect.
+While the request capacity is used up /health/ready reports 503 so load
+balancers send cheap traffic elsewhere; background jobs do not count.
+"""
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Tuple
+from fastapi import HTTPException, Request
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.market_data.rate_limit import TokenBucket
+import asyncio
+import math
+
+
+def pair_count(symbols: int) -> int:
+    return symbols * (symbols - 1) // 2
+
+
+def estimate_cost(pairs: int, timeframe: str, days: float, evaluations: int = 1) -> float:
+    """Cost units of `evaluations` passes over `days` of `timeframe` bars for `pairs` series"""
+    from app.engine.data import TIMEFRAME_MINUTES
+
+    # Unknown timeframes are rejected by the endpoint itself; price them like 1h
+    bars = days * 1440 / TIMEFRAME_MINUTES.get(timeframe, 60)
+    return max(1.0, pairs * bars * evaluations / settings.ADMISSION_COST_UNIT)
+
+
+def client_key(request: Request) -> str:
+    """Client address (behind a proxy, set FORWARDED_ALLOW_IPS).
+
+    Unvalidated credentials must not become keys: each made-up one would get a fresh bucket.
+    """
+    return f"ip:{request.client.host if request.client else 'unknown'}"
+
+
+class Ticket:
+    """Admitted capacity; release exactly once when the work is done (extra calls are ignored)"""
+
+    def __init__(self, controller: Optional["AdmissionController"], cost: float, waited: bool = False):
+        self.controller = controller
+        self.cost = cost
+        self.waited = waited
+        self.released = False
+
+    def release(self):
+        if not self.released:
+            self.released = True
+            if self.controller is not None:
+                self.controller._release(self.cost)
+
+
+class AdmissionController:
+    MAX_CLIENTS = 10_000  # idle client buckets are dropped beyond this
+
+    def __init__(self, capacity: float, client_rate: float, client_burst: float, queue_size: int,
+                 queue_timeout: float):
+        self.capacity = capacity
+        self.client_rate = client_rate
+        self.client_burst = client_burst
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0.0
+        self._clients: Dict[str, TokenBucket] = {}
+        self._waiters: Deque[Tuple[float, asyncio.Future]] = deque()
+        self.counts = {"admitted": 0, "waited": 0, "rate_limited": 0, "shed": 0}
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    @property
+    def saturated(self) -> bool:
+        return self.in_flight >= self.capacity or bool(self._waiters)
+
+    def _bucket(self, client: str) -> TokenBucket:
+        bucket = self._clients.get(client)
+        if bucket is None:
+            if len(self._clients) >= self.MAX_CLIENTS:
+                self._clients = {k: b for k, b in self._clients.items() if b.available < b.capacity}
+            bucket = TokenBucket(self.client_burst, period=self.client_burst / self.client_rate)
+            self._clients[client] = bucket
+        return bucket
+
+    def _shed(self, bucket: TokenBucket, cost: float, detail: str):
+        bucket.refund(cost)
+        self.counts["shed"] += 1
+        raise HTTPException(status_code=503, detail=detail,
+                            headers={"Retry-After": str(max(1, math.ceil(self.queue_timeout)))})
+
+    def charge(self, client: str, cost: float) -> float:
+        """Take `cost` from the client's bucket, or raise HTTPException 429; returns the cost charged"""
+        # Anything bigger than the limits would never fit; it runs alone instead
+        cost = min(max(cost, 1.0), self.capacity, self.client_burst)
+        wait = self._bucket(client).try_acquire(cost)
+        if wait:
+            self.counts["rate_limited"] += 1
+            raise HTTPException(status_code=429, detail=f"Rate limit exceeded for request cost {cost:.0f}",
+                                headers={"Retry-After": str(max(1, math.ceil(wait)))})
+        return cost
+
+    async def admit(self, client: str, cost: float, on_wait: Optional[Callable[[], Any]] = None) -> Ticket:
+        """A ticket for `cost` units, or HTTPException 429 (client over its rate) / 503 (over capacity).
+
+        `on_wait` runs before the request joins the queue, e.g. to hand back a database connection.
+        """
+        cost = self.charge(client, cost)
+        bucket = self._bucket(client)
+        if not self._waiters and self.in_flight + cost <= self.capacity:
+            self.in_flight += cost
+            self.counts["admitted"] += 1
+            return Ticket(self, cost)
+        if len(self._waiters) >= self.queue_size:
+            self._shed(bucket, cost, "Server saturated; retry shortly")
+
+        waiter = (cost, asyncio.get_running_loop().create_future())
+        self._waiters.append(waiter)
+        self.counts["waited"] += 1
+        if on_wait is not None:
+            on_wait()
+        try:
+            await self._wait(waiter, self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._shed(bucket, cost, f"Server saturated; no capacity within {self.queue_timeout:g}s")
+        self.counts["admitted"] += 1
+        return Ticket(self, cost, waited=True)
+
+    async def reserve(self, cost: float) -> Ticket:
+        """Capacity for background work that was admitted earlier; waits its turn however long that takes"""
+        cost = min(max(cost, 1.0), self.capacity)
+        if not self._waiters and self.in_flight + cost <= self.capacity:
+            self.in_flight += cost
+            return Ticket(self, cost)
+        waiter = (cost, asyncio.get_running_loop().create_future())
+        self._waiters.append(waiter)
+        await self._wait(waiter, None)
+        return Ticket(self, cost, waited=True)
+
+    async def _wait(self, waiter: Tuple[float, asyncio.Future], timeout: Optional[float]):
+        try:
+            await asyncio.wait_for(waiter[1], timeout)
+        except asyncio.TimeoutError:
+            self._withdraw(waiter)
+            raise
+        except asyncio.CancelledError:
+            # The caller went away; give back capacity granted at the last moment
+            if waiter[1].done() and not waiter[1].cancelled():
+                self._release(waiter[0])
+            else:
+                self._withdraw(waiter)
+            raise
+
+    def _withdraw(self, waiter: Tuple[float, asyncio.Future]):
+        if waiter in self._waiters:
+            self._waiters.remove(waiter)
+            self._grant()  # whoever waited behind it may fit now
+
+    def _release(self, cost: float):
+        self.in_flight = max(0.0, self.in_flight - cost)
+        self._grant()
+
+    def _grant(self):
+        # Strict FIFO: a large request at the head is not starved by small ones behind it
+        while self._waiters and self.in_flight + self._waiters[0][0] <= self.capacity:
+            cost, future = self._waiters.popleft()
+            if not future.done():
+                self.in_flight += cost
+                future.set_result(None)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "saturated": self.saturated,
+            "in_flight": round(self.in_flight, 2),
+            "capacity": self.capacity,
+            "queued": self.queued,
+            "clients": len(self._clients),
+            **self.counts,
+        }
+
+
+admission = AdmissionController(
+    settings.ADMISSION_CAPACITY,
+    settings.ADMISSION_CLIENT_RATE,
+    settings.ADMISSION_CLIENT_BURST,
+    settings.ADMISSION_QUEUE_SIZE,
+    settings.ADMISSION_QUEUE_TIMEOUT,
+)
+
+# Background optimizations; kept apart so they neither queue requests nor fail readiness
+jobs = AdmissionController(
+    settings.ADMISSION_JOB_CAPACITY,
+    settings.ADMISSION_CLIENT_RATE,
+    settings.ADMISSION_CLIENT_BURST,
+    settings.ADMISSION_QUEUE_SIZE,
+    settings.ADMISSION_QUEUE_TIMEOUT,
+)
+
+
+async def admit(request: Request, cost: float, db: Optional[Session] = None, background: bool = False) -> Ticket:
+    """Admit an expensive request or raise 429/503; release the ticket when its work is done.
+
+    `background` work takes its capacity from the job budget. A queued request
+    gives `db`'s connection back to the pool while it waits, so a long queue
+    cannot starve cheap endpoints of connections.
+    """
+    if not settings.ADMISSION_ENABLED:
+        return Ticket(None, cost)
+    controller = jobs if background else admission
+    ticket = await controller.admit(client_key(request), cost, on_wait=db.close if db is not None else None)
+    if ticket.waited and db is not None:
+        # Checked out on a thread, like get_db does, never on the event loop
+        await asyncio.to_thread(db.connection)
+    return ticket
+
+
+def charge_job(request: Request, cost: float):
+    """Rate limit a background job that reserves its capacity piecemeal (see `reserve_job`), or raise 429"""
+    if settings.ADMISSION_ENABLED:
+        jobs.charge(client_key(request), cost)
+
+
+async def reserve_job(cost: float) -> Ticket:
+    """Job capacity for one piece of already admitted background work, once there is room"""
+    if not settings.ADMISSION_ENABLED:
+        return Ticket(None, cost)
+    return await jobs.reserve(cost)
+
+
+async def hold(ticket: Ticket, job: Callable[..., Awaitable[Any]], *args):
+    """Run a background job, keeping the request's capacity until it finishes"""
+    try:
+        await job(*args)
+    finally:
+        ticket.release()
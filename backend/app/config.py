@@ -1,6 +1,6 @@
 import os
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import Dict, Optional
 
 class Settings(BaseSettings):
     # Database
@@ -10,23 +10,101 @@ class Settings(BaseSettings):
     PORT: int = 8003
     DEBUG: bool = True
     SECRET_KEY: str = "your-secret-key-change-this"
+    BACKGROUND_WARM_UP: bool = True  # serve /health/live while routers and services load (see app.startup)
+    SCHEMA_SETUP: str = "create"  # create missing tables at startup, "migrate" (alembic) or "none"
+
+    # Workers (gunicorn.conf.py, or `python main.py`)
+    WORKERS: int = 1  # more than one needs SHARED_STATE_BACKEND=redis
+    MAX_REQUESTS: int = 0  # recycle a worker after this many requests; 0 never does
+    MAX_REQUESTS_JITTER: int = 0
+    TIMEOUT: int = 30
+    SHARED_STATE_BACKEND: str = "memory"  # or "redis" (REDIS_URL); see app.shared_state
+    LEADER_LEASE_SECONDS: float = 15.0  # a dead leader worker is replaced within this long
+    LEADER_CALL_TIMEOUT: float = 30.0  # how long a worker waits for the leader to answer a relayed call
+
+    # Admission control for the analysis and optimization endpoints (see app.admission), per worker
+    ADMISSION_ENABLED: bool = True
+    ADMISSION_COST_UNIT: int = 100_000  # pair-bars (pairs x bars x evaluations) in one cost unit
+    ADMISSION_CAPACITY: float = 100.0  # cost units in flight; more waits in the queue
+    ADMISSION_CLIENT_RATE: float = 5.0  # cost units per second per client; more gets a 429
+    ADMISSION_CLIENT_BURST: float = 100.0
+    ADMISSION_QUEUE_SIZE: int = 16  # requests waiting for capacity; more gets a 503
+    ADMISSION_QUEUE_TIMEOUT: float = 10.0  # seconds a queued request waits before a 503
+    ADMISSION_JOB_CAPACITY: float = 100.0  # cost units of background optimizations in flight, apart from requests
+
+    # POST /api/snapshots/{table} seeds an empty table over HTTP; off by default since the API has no
+    # authentication (`python manage.py import` does the same from a shell)
+    SNAPSHOT_IMPORT_ENABLED: bool = False
+
+    # HTTP responses (see app.http_cache)
+    COMPRESSION_MIN_BYTES: int = 1000  # smaller bodies are sent as they are
     
     # Binance API
     BINANCE_API_KEY: Optional[str] = None
     BINANCE_SECRET_KEY: Optional[str] = None
     BINANCE_TESTNET: bool = True
+    BINANCE_BASE_URL: Optional[str] = None  # override, e.g. the local stub exchange
+    BINANCE_WEIGHT_LIMIT: int = 1200  # request weight per minute
+    MARKET_DATA_MAX_CONNECTIONS: int = 20
+    BINANCE_WS_URL: Optional[str] = None  # override, e.g. the local replay server
+
+    # Live market data streams
+    STREAM_SYMBOLS: str = ""  # comma-separated; empty disables live ingestion
+    STREAM_TIMEFRAME: str = "1h"
+    STREAM_TRADES: bool = False
+    STREAM_BUFFER_BARS: int = 1000
+    STREAM_FLUSH_SECONDS: float = 2.0
+    STREAM_SPREAD_METHOD: str = "static"  # static, rolling or kalman hedge ratios for live signals
+
+    # Symbol universes
+    UNIVERSE_WINDOW_BARS: int = 1000  # aligned bars kept warm per universe and timeframe
+    UNIVERSE_REFRESH_SECONDS: float = 60.0  # background refresh interval; 0 refreshes on demand only
+
+    # Bar-close scheduler (pair_correlations refresh for registered universes)
+    SCHEDULER_ENABLED: bool = True
+    SCHEDULER_MAX_CONCURRENCY: int = 1
+    SCHEDULER_SETTLE_SECONDS: float = 3.0  # wait after a bar closes before refreshing
+    SCHEDULER_JITTER_SECONDS: float = 5.0  # random extra delay, spreads jobs sharing a close time
+    SCHEDULER_PAIR_SELECTION: str = "all"  # or hierarchical / kmeans / knn for large universes
     
     # Redis
     REDIS_URL: str = "redis://localhost:6379"
     
     # Logging
     LOG_LEVEL: str = "INFO"
+    LOG_SAMPLING: Dict[str, float] = {}  # logger or event -> fraction of calls kept, e.g. {"app.pairs.live": 0.1}
+    LOG_RATE_LIMITS: Dict[str, float] = {}  # logger or event -> max events per second
+    LOG_QUEUE_SIZE: int = 10000  # events waiting for the writer; more are dropped, not blocked on
+    LOG_BATCH_SIZE: int = 256
+    DEBUG_LOG_BACKEND: Optional[str] = None  # "memory" or "redis"; defaults to SHARED_STATE_BACKEND
+    DEBUG_LOG_CAPACITY: int = 1000
     
     # Trading
     MAX_RISK_PER_TRADE: float = 0.02  # 2%
+    INITIAL_CAPITAL: float = 1000.0  # equity before realized PnL; drawdown and Sharpe are measured on it
+    CAPITAL_PHASE: Optional[str] = None  # pin micro/small/medium/full; default follows current equity
+    TRADING_ENABLED: bool = False
     MICRO_CAPITAL_MIN: float = 100.0
     MICRO_CAPITAL_MAX: float = 1000.0
-    
+    SMALL_CAPITAL_MAX: float = 10000.0
+    MEDIUM_CAPITAL_MAX: float = 100000.0
+    RISK_HORIZON_BARS: int = 24  # bars of return covariance behind position sizes and portfolio risk
+    RISK_STOP_SIGMAS: float = 2.0  # spread move (in horizon volatilities) that loses MAX_RISK_PER_TRADE
+    MIN_ORDER_NOTIONAL: float = 10.0
+
+    # Order execution
+    EXECUTION_MODE: str = "simulated"  # in-process simulated matching engine, or "exchange"
+    EXECUTION_BASE_URL: Optional[str] = None  # override, e.g. a standalone app.trading.sim_exchange
+    EXECUTION_MAX_SLIPPAGE_BPS: float = 20.0  # LIMIT IOC allowance around the reference price
+    EXECUTION_IMBALANCE_TOLERANCE: float = 0.02  # leg fill-ratio gap tolerated before chasing / unwinding
+    EXECUTION_CHASE_ATTEMPTS: int = 1
+    TRADE_WRITE_BATCH: int = 200
+    TRADE_FLUSH_SECONDS: float = 0.5
+
+    # Optimization
+    INDICATOR_CACHE_MB: int = 256
+    OPTIMIZATION_WORKERS: int = 0  # per web worker; 0 = the CPU cores divided between the WORKERS
+
     class Config:
         env_file = ".env"
         case_sensitive = True
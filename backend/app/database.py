@@ -1,7 +1,8 @@
-from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, Boolean, Text, JSON
+from sqlalchemy import create_engine, Column, Integer, BigInteger, String, Float, DateTime, Boolean, Text, JSON, UniqueConstraint, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from app.config import settings
+from app.table_versions import track_writes
 import datetime
 
 engine = create_engine(
@@ -10,6 +11,7 @@ engine = create_engine(
 )
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+track_writes(SessionLocal)  # per-table versions behind the conditional GETs (app.http_cache)
 Base = declarative_base()
 
 # Database Models
@@ -26,19 +28,56 @@ class Strategy(Base):
 
 class OptimizationRun(Base):
     __tablename__ = "optimization_runs"
+    __table_args__ = (
+        # Newest-first keyset pages, overall and per filter
+        Index("ix_optimization_runs_created_at_id", "created_at", "id"),
+        Index("ix_optimization_runs_strategy_created_at", "strategy_id", "created_at", "id"),
+        Index("ix_optimization_runs_status_created_at", "status", "created_at", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     strategy_id = Column(Integer, index=True)
-    algorithm = Column(String)  # pso, bayesian, genetic
-    status = Column(String, default="running")  # running, completed, failed
+    batch_id = Column(Integer, index=True)
+    symbol = Column(String)
+    timeframe = Column(String)
+    algorithm = Column(String)  # pso, bayesian, genetic, mopso
+    status = Column(String, default="running")  # queued, running, completed, failed
     best_params = Column(JSON)
     best_score = Column(Float)
     iterations = Column(Integer, default=0)
+    telemetry = Column(JSON)  # evaluations, timings, indicator cache usage
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    completed_at = Column(DateTime)
+
+class OptimizationBatch(Base):
+    __tablename__ = "optimization_batches"
+
+    id = Column(Integer, primary_key=True, index=True)
+    strategy_id = Column(Integer, index=True)
+    status = Column(String, default="running")  # running, completed, failed
+    total_runs = Column(Integer, default=0)
+    completed_runs = Column(Integer, default=0)
+    failed_runs = Column(Integer, default=0)
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
     completed_at = Column(DateTime)
 
+class ParetoSolution(Base):
+    __tablename__ = "pareto_solutions"
+
+    id = Column(Integer, primary_key=True, index=True)
+    optimization_id = Column(Integer, index=True)
+    rank = Column(Integer)  # position when sorted by the first objective
+    params = Column(JSON)
+    objectives = Column(JSON)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+
 class Trade(Base):
     __tablename__ = "trades"
+    __table_args__ = (
+        Index("ix_trades_executed_at_id", "executed_at", "id"),
+        Index("ix_trades_strategy_executed_at", "strategy_id", "executed_at", "id"),
+        Index("ix_trades_symbol_executed_at", "symbol", "executed_at", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     strategy_id = Column(Integer, index=True)
@@ -53,19 +92,95 @@ class Trade(Base):
 
 class PairCorrelation(Base):
     __tablename__ = "pair_correlations"
+    __table_args__ = (
+        Index("ix_pair_correlations_updated_at_id", "updated_at", "id"),
+        Index("ix_pair_correlations_timeframe_updated_at", "timeframe", "updated_at", "id"),
+        Index("ix_pair_correlations_status_updated_at", "status", "updated_at", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     pair1 = Column(String, index=True)
     pair2 = Column(String, index=True)
+    timeframe = Column(String, index=True)
     correlation = Column(Float)
     zscore = Column(Float)
     status = Column(String)  # neutral, long_pair1, long_pair2
     updated_at = Column(DateTime, default=datetime.datetime.utcnow)
 
+class PairThreshold(Base):
+    __tablename__ = "pair_thresholds"
+    __table_args__ = (
+        UniqueConstraint("pair1", "pair2", "timeframe", name="uq_pair_thresholds_pair_timeframe"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    pair1 = Column(String, nullable=False)
+    pair2 = Column(String, nullable=False)
+    timeframe = Column(String, nullable=False)
+    entry_zscore = Column(Float)
+    exit_zscore = Column(Float)
+    lookback = Column(Integer)  # bars in the rolling hedge ratio / z-score window
+    objective = Column(String)
+    score = Column(Float)
+    sharpe = Column(Float)
+    trades = Column(Integer)
+    cluster = Column(Integer)  # swarm group when tuned per cluster
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
+
+class Universe(Base):
+    __tablename__ = "universes"
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, unique=True, index=True)  # e.g. "top100-usdt"
+    description = Column(Text)
+    symbols = Column(JSON)
+    timeframes = Column(JSON)  # timeframes whose matrices are kept warm
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
+
+class Bar(Base):
+    __tablename__ = "bars"
+    __table_args__ = (
+        UniqueConstraint("symbol", "timeframe", "open_time", name="uq_bars_symbol_timeframe_open_time"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    symbol = Column(String, nullable=False)
+    timeframe = Column(String, nullable=False)
+    open_time = Column(BigInteger, nullable=False)  # epoch milliseconds
+    open = Column(Float)
+    high = Column(Float)
+    low = Column(Float)
+    close = Column(Float)
+    volume = Column(Float)
+
+class BarHistory(Base):
+    __tablename__ = "bar_history"
+    __table_args__ = (
+        UniqueConstraint("symbol", "timeframe", name="uq_bar_history_symbol_timeframe"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    symbol = Column(String, nullable=False)
+    timeframe = Column(String, nullable=False)
+    first_open_time = Column(BigInteger, nullable=False)  # earliest bar the exchange has, e.g. the listing
+
+class PerformanceMetrics(Base):
+    __tablename__ = "performance_metrics"
+
+    id = Column(Integer, primary_key=True, index=True)
+    scope = Column(String, unique=True, index=True)  # aggregator state; see app.trading.metrics
+    state = Column(JSON)
+    last_trade_id = Column(Integer, default=0)  # trades up to this id are folded into `state`
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
+
 # Dependency to get DB session
 def get_db():
     db = SessionLocal()
     try:
+        # Check the connection out here, on the threadpool: async endpoints query on the event loop,
+        # and an exhausted pool would otherwise block the loop that has to return connections to it
+        db.connection()
         yield db
     finally:
         db.close()
\ No newline at end of file
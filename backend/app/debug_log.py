@@ -0,0 +1,277 @@
+"""Fixed-capacity ring buffer for /debug log entries.
+
+Entries get a monotonically increasing sequence number and land in slot
+`seq % capacity`, overwriting the oldest entry, so appending is O(1) with
+no copying however long the service runs. Small secondary indexes map each
+component and error_type to the sequence numbers of its retained entries;
+an evicted entry is always the oldest in its index queues, so they are
+trimmed in O(1) as well and never outgrow the buffer.
+
+The in-memory buffer has no lock: it is only mutated from the event loop,
+and readers never see a half-written slot. With DEBUG_LOG_BACKEND=redis
+(the default when SHARED_STATE_BACKEND=redis) the same interface is backed
+by capped Redis lists (plus a pub/sub channel for tails), so every uvicorn
+worker reads and writes one view.
+
+Consumers can page with `after` (a sequence number) or follow new entries
+with `tail`, which /debug/logs/stream serves as server-sent events.
+"""
+from collections import deque
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional, Set
+from app.config import settings
+import asyncio
+import json
+import time
+import structlog
+
+logger = structlog.get_logger()
+
+INDEXED_FIELDS = ("component", "error_type")
+
+
+class MemoryLogBuffer:
+    """Per-process ring buffer with component / error_type indexes"""
+
+    def __init__(self, capacity: int = 1000):
+        if capacity < 1:
+            raise ValueError("capacity must be positive")
+        self.capacity = capacity
+        self._slots: List[Optional[Dict[str, Any]]] = [None] * capacity
+        self._next_seq = 1
+        self._cleared_through = 0
+        self._indexes: Dict[str, Dict[Any, Deque[int]]] = {field: {} for field in INDEXED_FIELDS}
+        self._subscribers: Set[asyncio.Queue] = set()
+        self.dropped_notifications = 0
+
+    def _oldest(self) -> int:
+        return max(self._next_seq - self.capacity, self._cleared_through + 1, 1)
+
+    def _get(self, seq: int) -> Optional[Dict[str, Any]]:
+        entry = self._slots[seq % self.capacity]
+        return entry if entry is not None and entry["seq"] == seq else None
+
+    async def append(self, entry: Dict[str, Any]) -> Dict[str, Any]:
+        seq = self._next_seq
+        self._next_seq += 1
+        slot = seq % self.capacity
+        evicted = self._slots[slot]
+        if evicted is not None:
+            for field in INDEXED_FIELDS:
+                seqs = self._indexes[field].get(evicted.get(field))
+                if seqs and seqs[0] == evicted["seq"]:
+                    seqs.popleft()
+                    if not seqs:
+                        del self._indexes[field][evicted.get(field)]
+        entry = {**entry, "seq": seq}
+        self._slots[slot] = entry
+        for field in INDEXED_FIELDS:
+            self._indexes[field].setdefault(entry.get(field), deque()).append(seq)
+        for queue in self._subscribers:
+            try:
+                queue.put_nowait(entry)
+            except asyncio.QueueFull:
+                self.dropped_notifications += 1  # slow tail; it sees the gap in `seq`
+        return entry
+
+    def _candidates(self, component: Optional[str], error_type: Optional[str]):
+        """Sequence numbers to scan newest first: the smallest matching index, or the whole buffer"""
+        filters = [(f, v) for f, v in (("component", component), ("error_type", error_type)) if v is not None]
+        if not filters:
+            return range(self._next_seq - 1, self._oldest() - 1, -1)
+        seqs = min((self._indexes[field].get(value, ()) for field, value in filters), key=len)
+        return reversed(seqs)
+
+    async def query(self, component: Optional[str] = None, error_type: Optional[str] = None,
+                    after: int = 0, limit: int = 50) -> List[Dict[str, Any]]:
+        """The newest `limit` matching entries after sequence `after`, oldest first"""
+        found = []
+        for seq in self._candidates(component, error_type):
+            if seq <= after or len(found) >= limit:
+                break
+            entry = self._get(seq)
+            if entry is None:
+                continue
+            if (component is None or entry.get("component") == component) and \
+                    (error_type is None or entry.get("error_type") == error_type):
+                found.append(entry)
+        found.reverse()
+        return found
+
+    async def count(self) -> int:
+        return self._next_seq - self._oldest()
+
+    async def clear(self) -> int:
+        cleared = await self.count()
+        self._slots = [None] * self.capacity
+        self._indexes = {field: {} for field in INDEXED_FIELDS}
+        self._cleared_through = self._next_seq - 1  # sequence numbers keep increasing for tails
+        return cleared
+
+    async def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": "memory",
+            "capacity": self.capacity,
+            "entries": await self.count(),
+            "last_seq": self._next_seq - 1,
+            "components": len(self._indexes["component"]),
+            "error_types": len(self._indexes["error_type"]),
+            "subscribers": len(self._subscribers),
+            "dropped_notifications": self.dropped_notifications,
+        }
+
+    async def tail(self, component: Optional[str] = None, error_type: Optional[str] = None,
+                   after: Optional[int] = None) -> AsyncIterator[Dict[str, Any]]:
+        """Retained entries after `after` (if given), then new matching entries as they are appended"""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.capacity)
+        self._subscribers.add(queue)
+        try:
+            last = self._next_seq - 1
+            if after is not None:
+                for entry in await self.query(component, error_type, after, self.capacity):
+                    yield entry
+            while True:
+                entry = await queue.get()
+                if entry["seq"] <= last:
+                    continue
+                if (component is None or entry.get("component") == component) and \
+                        (error_type is None or entry.get("error_type") == error_type):
+                    yield entry
+        finally:
+            self._subscribers.discard(queue)
+
+
+class RedisLogBuffer:
+    """The same ring buffer in capped Redis lists, shared by every worker"""
+
+    INDEX_TTL = 7 * 86_400  # index lists of components that stop logging expire
+
+    def __init__(self, url: str, capacity: int = 1000, key: str = "debug_logs"):
+        import redis.asyncio as redis
+
+        self.capacity = capacity
+        self.key = key
+        self.redis = redis.from_url(url, decode_responses=True)
+
+    def _list(self, field: Optional[str] = None, value: Optional[str] = None) -> str:
+        return f"{self.key}:all" if field is None else f"{self.key}:{field}:{value}"
+
+    async def _oldest(self) -> int:
+        last, cleared = await self.redis.mget(f"{self.key}:seq", f"{self.key}:cleared")
+        return max(int(last or 0) - self.capacity + 1, int(cleared or 0) + 1, 1)
+
+    async def append(self, entry: Dict[str, Any]) -> Dict[str, Any]:
+        seq = await self.redis.incr(f"{self.key}:seq")
+        entry = {**entry, "seq": seq}
+        payload = json.dumps(entry, default=str)
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.lpush(self._list(), payload)
+            pipe.ltrim(self._list(), 0, self.capacity - 1)
+            for field in INDEXED_FIELDS:
+                name = self._list(field, entry.get(field))
+                pipe.lpush(name, payload)
+                pipe.ltrim(name, 0, self.capacity - 1)
+                pipe.expire(name, self.INDEX_TTL)
+            pipe.publish(f"{self.key}:tail", payload)
+            await pipe.execute()
+        return entry
+
+    async def query(self, component: Optional[str] = None, error_type: Optional[str] = None,
+                    after: int = 0, limit: int = 50) -> List[Dict[str, Any]]:
+        if component is not None:
+            name = self._list("component", component)
+        elif error_type is not None:
+            name = self._list("error_type", error_type)
+        else:
+            name = self._list()
+        oldest = max(await self._oldest(), after + 1)
+        found = []
+        for payload in await self.redis.lrange(name, 0, self.capacity - 1):
+            entry = json.loads(payload)
+            if entry["seq"] < oldest or len(found) >= limit:
+                break
+            if error_type is None or entry.get("error_type") == error_type:
+                found.append(entry)
+        found.reverse()
+        return found
+
+    async def count(self) -> int:
+        last = int(await self.redis.get(f"{self.key}:seq") or 0)
+        return last - await self._oldest() + 1
+
+    async def clear(self) -> int:
+        cleared = await self.count()
+        last = await self.redis.get(f"{self.key}:seq")
+        await self.redis.set(f"{self.key}:cleared", last or 0)
+        names = [name async for name in self.redis.scan_iter(match=f"{self.key}:*")]
+        names = [name for name in names if name not in (f"{self.key}:seq", f"{self.key}:cleared")]
+        if names:
+            await self.redis.delete(*names)
+        return cleared
+
+    async def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": "redis",
+            "capacity": self.capacity,
+            "entries": await self.count(),
+            "last_seq": int(await self.redis.get(f"{self.key}:seq") or 0),
+        }
+
+    async def tail(self, component: Optional[str] = None, error_type: Optional[str] = None,
+                   after: Optional[int] = None) -> AsyncIterator[Dict[str, Any]]:
+        pubsub = self.redis.pubsub()
+        await pubsub.subscribe(f"{self.key}:tail")
+        try:
+            last = int(await self.redis.get(f"{self.key}:seq") or 0)
+            if after is not None:
+                for entry in await self.query(component, error_type, after, self.capacity):
+                    last = max(last, entry["seq"])
+                    yield entry
+            async for message in pubsub.listen():
+                if message["type"] != "message":
+                    continue
+                entry = json.loads(message["data"])
+                if entry["seq"] <= last:
+                    continue
+                if (component is None or entry.get("component") == component) and \
+                        (error_type is None or entry.get("error_type") == error_type):
+                    yield entry
+        finally:
+            await pubsub.unsubscribe()
+            await pubsub.close()
+
+
+def create_log_buffer():
+    backend = settings.DEBUG_LOG_BACKEND or settings.SHARED_STATE_BACKEND
+    if backend == "redis":
+        return RedisLogBuffer(settings.REDIS_URL, settings.DEBUG_LOG_CAPACITY)
+    if backend != "memory":
+        raise ValueError(f"Unknown DEBUG_LOG_BACKEND '{backend}'. Use 'memory' or 'redis'")
+    return MemoryLogBuffer(settings.DEBUG_LOG_CAPACITY)
+
+
+debug_logs = create_log_buffer()
+
+
+async def server_sent_events(entries: AsyncIterator[Dict[str, Any]], heartbeat: float = 15.0) -> AsyncIterator[str]:
+    """Format entries as SSE (the seq is the event id, for Last-Event-ID resumes), with keep-alive comments"""
+    iterator = entries.__aiter__()
+    pending = asyncio.ensure_future(iterator.__anext__())
+    try:
+        while True:
+            done, _ = await asyncio.wait({pending}, timeout=heartbeat)
+            if not done:
+                yield f": keep-alive {time.time():.0f}\n\n"
+                continue
+            try:
+                entry = pending.result()
+            except StopAsyncIteration:
+                return
+            yield f"id: {entry['seq']}\nevent: log\ndata: {json.dumps(entry, default=str)}\n\n"
+            pending = asyncio.ensure_future(iterator.__anext__())
+    finally:
+        pending.cancel()
+        try:
+            await pending
+        except (asyncio.CancelledError, StopAsyncIteration):
+            pass
+        await iterator.aclose()
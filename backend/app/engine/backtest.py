@@ -0,0 +1,94 @@
+from typing import Dict
+from app.engine.data import TIMEFRAME_MINUTES
+import numpy as np
+
+METRICS = ("sharpe", "total_return", "max_drawdown", "trades", "win_rate")
+
+# +1 when larger is better, -1 when smaller is better
+OBJECTIVE_DIRECTIONS = {
+    "sharpe": 1.0,
+    "total_return": 1.0,
+    "max_drawdown": -1.0,
+    "trades": 1.0,
+    "win_rate": 1.0,
+}
+
+
+def periods_per_year(timeframe: str) -> float:
+    """Bars per year for a timeframe (crypto trades 24/7)"""
+    minutes = TIMEFRAME_MINUTES.get(timeframe)
+    if minutes is None:
+        raise ValueError(f"Unsupported timeframe '{timeframe}'")
+    return 365.0 * 24 * 60 / minutes
+
+
+def position_returns(positions: np.ndarray, close: np.ndarray, commission: float = 0.0):
+    """Per-bar strategy returns for a (P, bars) position matrix.
+
+    A position taken on bar t earns the close-to-close return of bar t+1,
+    and every change in position pays `commission` on the traded notional.
+    Returns (held positions, returns), both shaped like `positions`.
+    """
+    positions = np.atleast_2d(positions)
+    bar_returns = np.zeros_like(close)
+    bar_returns[1:] = close[1:] / close[:-1] - 1.0
+
+    held = np.zeros_like(positions)
+    held[:, 1:] = positions[:, :-1]
+    turnover = np.abs(np.diff(positions, axis=1, prepend=0.0))
+    return held, held * bar_returns - commission * turnover
+
+
+def evaluate_returns(returns: np.ndarray, annualization: float = 365.0 * 24) -> Dict[str, np.ndarray]:
+    """Sharpe, total return and max drawdown for each row of a returns matrix"""
+    returns = np.atleast_2d(returns)
+    if not returns.shape[1]:
+        zeros = np.zeros(len(returns))
+        return {"sharpe": zeros, "total_return": zeros, "max_drawdown": zeros}
+
+    mean = returns.mean(axis=1)
+    std = returns.std(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sharpe = np.where(std > 0, mean / std * np.sqrt(annualization), 0.0)
+
+    equity = np.cumprod(1.0 + returns, axis=1)
+    peaks = np.maximum.accumulate(equity, axis=1)
+    return {
+        "sharpe": sharpe,
+        "total_return": equity[:, -1] - 1.0,
+        "max_drawdown": (1.0 - equity / peaks).max(axis=1),
+    }
+
+
+def evaluate_positions(
+    positions: np.ndarray,
+    close: np.ndarray,
+    commission: float = 0.0,
+    annualization: float = 365.0 * 24,
+) -> Dict[str, np.ndarray]:
+    """Backtest a (P, bars) position matrix against one close series in a single pass.
+
+    All metrics are returned as arrays of length P.
+    """
+    positions = np.atleast_2d(positions)
+    held, returns = position_returns(positions, close, commission)
+    metrics = evaluate_returns(returns, annualization)
+
+    # A trade starts whenever the position moves away from flat or flips side
+    opened = (positions != 0) & (positions != held)
+    trades = opened.sum(axis=1)
+
+    # Per-trade PnL: sum returns between consecutive trade starts while in the market
+    trade_id = np.zeros(positions.shape, dtype=np.int64)
+    trade_id[:, 1:] = np.cumsum(opened, axis=1)[:, :-1]
+    in_trade = held != 0
+    wins = np.zeros(len(positions))
+    for row in range(len(positions)):
+        if trades[row]:
+            pnl = np.bincount(trade_id[row][in_trade[row]], weights=returns[row][in_trade[row]],
+                              minlength=trades[row] + 1)[1:]
+            wins[row] = (pnl > 0).sum() / trades[row]
+
+    metrics["trades"] = trades.astype(np.float64)
+    metrics["win_rate"] = wins
+    return metrics
@@ -0,0 +1,83 @@
+from collections import defaultdict
+from concurrent.futures import Executor
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from app.engine.data import BarData, SharedBars, shared_bars_view
+from app.engine.pine import get_compiled_strategy
+from app.engine.runner import optimize
+import asyncio
+
+Dataset = Tuple[str, str]  # symbol, timeframe
+
+
+def optimize_shared(handle, request_data: Dict[str, Any], algorithm: str) -> Dict[str, Any]:
+    """Worker entry point: one sub-run against bars already in shared memory"""
+    with shared_bars_view(handle) as bars:
+        # Plans are cached per worker process, so a batch compiles once per worker
+        plan = get_compiled_strategy(request_data["pine_script"])
+        space = plan.parameter_space.with_overrides(request_data.get("parameters"))
+        return optimize(
+            plan, space, bars, request_data["timeframe"],
+            algorithm=algorithm,
+            iterations=request_data["iterations"],
+        )
+
+
+def group_by_dataset(runs: List[Dict[str, Any]]) -> Dict[Dataset, List[Dict[str, Any]]]:
+    groups: Dict[Dataset, List[Dict[str, Any]]] = defaultdict(list)
+    for run in runs:
+        groups[(run["symbol"], run["timeframe"])].append(run)
+    return dict(groups)
+
+
+async def run_grid(
+    executor: Executor,
+    workers: int,
+    runs: List[Dict[str, Any]],
+    request_data: Dict[str, Any],
+    load: Callable[[str, str], BarData],
+    on_result: Callable[[Dict[str, Any], Dict[str, Any]], Awaitable[None]],
+    on_error: Callable[[Dict[str, Any], Exception], Awaitable[None]],
+    on_start: Optional[Callable[[Dict[str, Any]], Awaitable[None]]] = None,
+):
+    """Run a grid of sub-runs, loading and sharing each dataset once.
+
+    At most `workers` sub-runs are in flight so the pool never queues more
+    CPU work than it has cores, and at most `workers` datasets are resident
+    in shared memory so the next datasets load while the current ones run.
+    `on_start` is awaited as each sub-run is handed to the pool.
+    """
+    loop = asyncio.get_running_loop()
+    in_flight = asyncio.Semaphore(workers)
+    resident = asyncio.Semaphore(workers)
+
+    async def run_one(handle, timeframe: str, run: Dict[str, Any]):
+        async with in_flight:
+            if on_start is not None:
+                await on_start(run)
+            try:
+                result = await loop.run_in_executor(
+                    executor, optimize_shared, handle,
+                    dict(request_data, timeframe=timeframe), run["algorithm"],
+                )
+            except Exception as e:
+                await on_error(run, e)
+                return
+        await on_result(run, result)
+
+    async def run_group(dataset: Dataset, group: List[Dict[str, Any]]):
+        async with resident:
+            symbol, timeframe = dataset
+            try:
+                bars = await asyncio.to_thread(load, symbol, timeframe)
+                if len(bars) < 2:
+                    raise ValueError(f"Not enough bars stored for {symbol} {timeframe}")
+            except Exception as e:
+                for run in group:
+                    await on_error(run, e)
+                return
+            with SharedBars(bars) as shared:
+                await asyncio.gather(*[run_one(shared.handle, timeframe, run) for run in group])
+
+    await asyncio.gather(*[
+        run_group(dataset, group) for dataset, group in group_by_dataset(runs).items()
+    ])
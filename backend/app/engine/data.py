@@ -0,0 +1,166 @@
+from sqlalchemy.orm import Session
+from app.database import Bar
+from contextlib import contextmanager
+from multiprocessing import shared_memory
+from typing import Dict, Iterator, Optional, Tuple
+import numpy as np
+
+# Bar sources that a Pine expression may reference directly
+SERIES_NAMES = ("open", "high", "low", "close", "volume", "hl2", "hlc3", "ohlc4")
+
+# Exchange kline intervals and their length in minutes
+TIMEFRAME_MINUTES = {
+    "1m": 1, "3m": 3, "5m": 5, "15m": 15, "30m": 30,
+    "1h": 60, "2h": 120, "4h": 240, "6h": 360, "8h": 480, "12h": 720,
+    "1d": 1440, "3d": 4320, "1w": 10080,
+}
+
+
+def timeframe_ms(timeframe: str) -> int:
+    if timeframe not in TIMEFRAME_MINUTES:
+        raise ValueError(f"Unsupported timeframe '{timeframe}'")
+    return TIMEFRAME_MINUTES[timeframe] * 60_000
+
+
+class BarData:
+    """OHLCV arrays for one symbol/timeframe, keyed by a stable dataset id"""
+
+    def __init__(
+        self,
+        dataset_id: str,
+        timestamps: np.ndarray,
+        open: np.ndarray,
+        high: np.ndarray,
+        low: np.ndarray,
+        close: np.ndarray,
+        volume: np.ndarray,
+    ):
+        self.dataset_id = dataset_id
+        self.timestamps = timestamps
+        self._series: Dict[str, np.ndarray] = {
+            "open": open,
+            "high": high,
+            "low": low,
+            "close": close,
+            "volume": volume,
+        }
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    @property
+    def close(self) -> np.ndarray:
+        return self._series["close"]
+
+    def view(self, start: int, stop: int) -> "BarData":
+        """Zero-copy slice of the bar range [start, stop) with its own dataset id"""
+        return BarData(
+            f"{self.dataset_id}[{start}:{stop}]",
+            self.timestamps[start:stop],
+            *(self._series[name][start:stop] for name in ("open", "high", "low", "close", "volume")),
+        )
+
+    def series(self, name: str) -> np.ndarray:
+        """Return a raw or derived price series (hl2, hlc3, ohlc4 are computed once)"""
+        if name not in self._series:
+            s = self._series
+            if name == "hl2":
+                self._series[name] = (s["high"] + s["low"]) / 2.0
+            elif name == "hlc3":
+                self._series[name] = (s["high"] + s["low"] + s["close"]) / 3.0
+            elif name == "ohlc4":
+                self._series[name] = (s["open"] + s["high"] + s["low"] + s["close"]) / 4.0
+            else:
+                raise KeyError(f"Unknown series '{name}'")
+        return self._series[name]
+
+
+def load_bars(
+    db: Session,
+    symbol: str,
+    timeframe: str,
+    start: Optional[int] = None,
+    end: Optional[int] = None,
+) -> BarData:
+    """Load stored bars for a symbol/timeframe (open times in epoch milliseconds)"""
+    query = db.query(
+        Bar.open_time, Bar.open, Bar.high, Bar.low, Bar.close, Bar.volume
+    ).filter(Bar.symbol == symbol, Bar.timeframe == timeframe)
+    if start is not None:
+        query = query.filter(Bar.open_time >= start)
+    if end is not None:
+        query = query.filter(Bar.open_time <= end)
+    rows = query.order_by(Bar.open_time).all()
+
+    if rows:
+        columns = np.array(rows, dtype=np.float64).T
+    else:
+        columns = np.empty((6, 0), dtype=np.float64)
+    timestamps = columns[0].astype(np.int64)
+    first = int(timestamps[0]) if len(timestamps) else 0
+    last = int(timestamps[-1]) if len(timestamps) else 0
+    dataset_id = f"{symbol}:{timeframe}:{first}:{last}:{len(timestamps)}"
+
+    return BarData(
+        dataset_id,
+        timestamps,
+        np.ascontiguousarray(columns[1]),
+        np.ascontiguousarray(columns[2]),
+        np.ascontiguousarray(columns[3]),
+        np.ascontiguousarray(columns[4]),
+        np.ascontiguousarray(columns[5]),
+    )
+
+
+# Shared-memory transport so worker processes can slice one copy of the bars
+
+_SHARED_ROWS = ("timestamps", "open", "high", "low", "close", "volume")
+
+
+class SharedBars:
+    """Owns a shared-memory block holding a dataset's columns as a (6, bars) matrix"""
+
+    def __init__(self, bars: BarData):
+        shape = (len(_SHARED_ROWS), len(bars))
+        self.shm = shared_memory.SharedMemory(create=True, size=max(1, int(np.prod(shape)) * 8))
+        matrix = np.ndarray(shape, dtype=np.float64, buffer=self.shm.buf)
+        matrix[0] = bars.timestamps
+        for row, name in enumerate(_SHARED_ROWS[1:], start=1):
+            matrix[row] = bars.series(name)
+        self.handle = (self.shm.name, shape, bars.dataset_id)
+
+    def close(self):
+        self.shm.close()
+        self.shm.unlink()
+
+    def __enter__(self) -> "SharedBars":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def attach_shared_bars(handle: Tuple[str, Tuple[int, int], str]) -> Tuple[shared_memory.SharedMemory, BarData]:
+    """Map a SharedBars block into this process; close the returned segment when done"""
+    name, shape, dataset_id = handle
+    # Pool workers share the parent's resource tracker, which unlinks the
+    # segment only once the owning SharedBars is closed
+    shm = shared_memory.SharedMemory(name=name)
+    matrix = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+    bars = BarData(dataset_id, matrix[0].astype(np.int64), *matrix[1:])
+    return shm, bars
+
+
+@contextmanager
+def shared_bars_view(handle: Tuple[str, Tuple[int, int], str]) -> Iterator[BarData]:
+    """Attach to shared bars for the duration of a worker task"""
+    shm, bars = attach_shared_bars(handle)
+    try:
+        yield bars
+    finally:
+        del bars
+        try:
+            shm.close()
+        except BufferError:
+            # A view is still referenced; the mapping is released once it is collected
+            pass
@@ -0,0 +1,106 @@
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Iterable, Optional, Tuple
+from app.config import settings
+from app.engine.indicators import FAMILIES, INDICATORS
+import threading
+import numpy as np
+
+# Key: (dataset id, indicator, source expression, length)
+CacheKey = Tuple[str, str, str, int]
+
+
+class IndicatorCache:
+    """Memory-bounded LRU cache of indicator series shared by all optimization runs"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Hashable, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes_used = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[np.ndarray]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: np.ndarray):
+        if value.nbytes > self.max_bytes:
+            return
+        if value.base is not None:
+            # A view (e.g. one row of a family matrix) would keep its whole base
+            # alive after eviction while bytes_used counted only the row
+            value = value.copy()
+        # Cached arrays are shared between particles and runs
+        value.flags.writeable = False
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.bytes_used -= previous.nbytes
+            self._entries[key] = value
+            self.bytes_used += value.nbytes
+            while self.bytes_used > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.bytes_used -= evicted.nbytes
+                self.evictions += 1
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], np.ndarray]) -> Tuple[np.ndarray, bool]:
+        """Return (series, hit) computing and storing the series on a miss"""
+        value = self.get(key)
+        if value is not None:
+            return value, True
+        value = compute()
+        self.put(key, value)
+        return value, False
+
+    def indicator(self, dataset_id: str, indicator: str, source_key: str,
+                  source: np.ndarray, length: int) -> Tuple[np.ndarray, bool]:
+        return self.get_or_compute(
+            (dataset_id, indicator, source_key, length),
+            lambda: INDICATORS[indicator](source, length),
+        )
+
+    def precompute_family(self, dataset_id: str, indicator: str, source_key: str,
+                          source: np.ndarray, lengths: Iterable[int]) -> int:
+        """Compute every missing length of an indicator in one batch; returns rows added"""
+        with self._lock:
+            missing = np.array([
+                n for n in lengths if (dataset_id, indicator, source_key, int(n)) not in self._entries
+            ], dtype=np.int64)
+        if not len(missing) or len(missing) * source.nbytes > self.max_bytes // 2:
+            return 0
+        matrix = FAMILIES[indicator](source, missing)
+        for length, row in zip(missing, matrix):
+            self.put((dataset_id, indicator, source_key, int(length)), row)
+        return len(missing)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes_used = 0
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "memory_bytes": self.bytes_used,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+            }
+
+
+indicator_cache = IndicatorCache(settings.INDICATOR_CACHE_MB * 1024 * 1024)
@@ -0,0 +1,155 @@
+import numpy as np
+
+# Vectorized technical indicators matching Pine Script's ta.* semantics.
+# Every function takes a 1-D float array and returns an array of the same
+# length, with NaN for the warm-up bars Pine would report as `na`. A source
+# that is itself an indicator starts with its own `na` warm-up; like Pine,
+# the warm-up of the outer indicator starts at the first valid source bar.
+
+
+def _first_valid(values: np.ndarray) -> int:
+    valid = np.flatnonzero(~np.isnan(values))
+    return int(valid[0]) if valid.size else values.size
+
+
+def _smoothed(values: np.ndarray, alpha: float, length: int) -> np.ndarray:
+    """Exponential smoothing seeded with the SMA of the first `length` valid values"""
+    out = np.full(values.shape, np.nan)
+    start = _first_valid(values)
+    if length < 1 or values.size - start < length:
+        return out
+    seed = values[start:start + length].mean()
+    out[start + length - 1] = seed
+    if values.size > start + length:
+        from scipy.signal import lfilter  # imported on first use: scipy.signal takes ~0.8s to load
+
+        # y[t] = alpha * x[t] + (1 - alpha) * y[t-1], run as an IIR filter in C
+        out[start + length:], _ = lfilter(
+            [alpha], [1.0, alpha - 1.0], values[start + length:], zi=[(1.0 - alpha) * seed]
+        )
+    return out
+
+
+def _window_sums(values: np.ndarray):
+    """Prefix sums of the values (NaN as 0) and of the NaN count, so a window holding `na` stays `na`"""
+    missing = np.isnan(values)
+    csum = np.cumsum(np.insert(np.where(missing, 0.0, values), 0, 0.0))
+    cnan = np.cumsum(np.insert(missing, 0, False))
+    return csum, cnan
+
+
+def sma(values: np.ndarray, length: int) -> np.ndarray:
+    """Simple moving average (ta.sma)"""
+    out = np.full(values.shape, np.nan)
+    if length < 1 or values.size < length:
+        return out
+    csum, cnan = _window_sums(values)
+    window = (csum[length:] - csum[:-length]) / length
+    out[length - 1:] = np.where(cnan[length:] == cnan[:-length], window, np.nan)
+    return out
+
+
+def ema(values: np.ndarray, length: int) -> np.ndarray:
+    """Exponential moving average (ta.ema)"""
+    return _smoothed(values, 2.0 / (length + 1), length)
+
+
+def rma(values: np.ndarray, length: int) -> np.ndarray:
+    """Wilder's moving average (ta.rma)"""
+    return _smoothed(values, 1.0 / length, length)
+
+
+def rsi(values: np.ndarray, length: int) -> np.ndarray:
+    """Relative strength index (ta.rsi)"""
+    out = np.full(values.shape, np.nan)
+    if length < 1 or values.size <= length:
+        return out
+    change = np.diff(values)
+    avg_gain = rma(np.maximum(change, 0.0), length)
+    avg_loss = rma(np.maximum(-change, 0.0), length)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rs = avg_gain / avg_loss
+        out[1:] = np.where(avg_loss == 0.0, 100.0, 100.0 - 100.0 / (1.0 + rs))
+    out[1:][np.isnan(avg_gain)] = np.nan
+    return out
+
+
+def shift(values: np.ndarray, periods: int = 1) -> np.ndarray:
+    """Value `periods` bars ago along the last axis (Pine's `x[1]`)"""
+    out = np.full(values.shape, np.nan)
+    if periods < values.shape[-1]:
+        out[..., periods:] = values[..., :-periods]
+    return out
+
+
+def crossover(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """True on bars where `a` crosses above `b` (ta.crossover)"""
+    a, b = np.broadcast_arrays(a, b)
+    with np.errstate(invalid="ignore"):
+        return (a > b) & (shift(a) <= shift(b))
+
+
+def crossunder(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """True on bars where `a` crosses below `b` (ta.crossunder)"""
+    a, b = np.broadcast_arrays(a, b)
+    with np.errstate(invalid="ignore"):
+        return (a < b) & (shift(a) >= shift(b))
+
+
+INDICATORS = {
+    "sma": sma,
+    "ema": ema,
+    "rma": rma,
+    "rsi": rsi,
+}
+
+
+# Family variants compute one indicator for many lengths at once and return
+# a (lengths, bars) matrix. Shared work (prefix sums, gains/losses) is done once.
+
+
+def sma_family(values: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    lengths = np.asarray(lengths, dtype=np.int64).reshape(-1, 1)
+    csum, cnan = _window_sums(values)
+    end = np.arange(1, values.size + 1)
+    start = end - lengths
+    valid = (start >= 0) & (lengths >= 1)
+    valid &= cnan[end] == cnan[np.maximum(start, 0)]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        window = (csum[end] - csum[np.maximum(start, 0)]) / lengths
+    return np.where(valid, window, np.nan)
+
+
+def ema_family(values: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    return np.stack([ema(values, int(n)) for n in lengths]) if len(lengths) else np.empty((0, values.size))
+
+
+def rma_family(values: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    return np.stack([rma(values, int(n)) for n in lengths]) if len(lengths) else np.empty((0, values.size))
+
+
+def rsi_family(values: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    out = np.full((len(lengths), values.size), np.nan)
+    if values.size < 2:
+        return out
+    change = np.diff(values)  # NaN until the source is valid; rma skips it
+    gains = np.maximum(change, 0.0)
+    losses = np.maximum(-change, 0.0)
+    for row, length in enumerate(lengths):
+        length = int(length)
+        if length < 1 or values.size <= length:
+            continue
+        avg_gain = rma(gains, length)
+        avg_loss = rma(losses, length)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            out[row, 1:] = np.where(avg_loss == 0.0, 100.0, 100.0 - 100.0 / (1.0 + avg_gain / avg_loss))
+        out[row, 1:][np.isnan(avg_gain)] = np.nan
+    return out
+
+
+FAMILIES = {
+    "sma": sma_family,
+    "ema": ema_family,
+    "rma": rma_family,
+    "rsi": rsi_family,
+}
@@ -0,0 +1,231 @@
+from typing import Optional
+import numpy as np
+
+# Population-based optimizers share an ask/tell interface so the fitness
+# function can score a whole generation in one vectorized backtest pass.
+# All of them maximize the score.
+
+
+class SwarmOptimizer:
+    """Particle swarm optimization over a box-bounded space"""
+
+    def __init__(
+        self,
+        lower: np.ndarray,
+        upper: np.ndarray,
+        population: int = 30,
+        inertia: float = 0.72,
+        cognitive: float = 1.49,
+        social: float = 1.49,
+        seed: Optional[int] = None,
+        initial: Optional[np.ndarray] = None,
+    ):
+        self.rng = np.random.default_rng(seed)
+        self.lower = lower
+        self.upper = upper
+        self.inertia = inertia
+        self.cognitive = cognitive
+        self.social = social
+        span = upper - lower
+        self.max_velocity = 0.2 * span
+        self.positions = lower + self.rng.random((population, len(lower))) * span
+        if initial is not None:
+            self.positions[0] = initial
+        self.velocities = self.rng.uniform(-1, 1, self.positions.shape) * self.max_velocity
+        self.personal_best = self.positions.copy()
+        self.personal_best_score = np.full(population, -np.inf)
+        self.best_position = self.positions[0].copy()
+        self.best_score = -np.inf
+
+    def ask(self) -> np.ndarray:
+        return self.positions
+
+    def tell(self, scores: np.ndarray):
+        improved = scores > self.personal_best_score
+        self.personal_best[improved] = self.positions[improved]
+        self.personal_best_score[improved] = scores[improved]
+        leader = int(np.argmax(self.personal_best_score))
+        if self.personal_best_score[leader] > self.best_score:
+            self.best_score = float(self.personal_best_score[leader])
+            self.best_position = self.personal_best[leader].copy()
+
+        r1 = self.rng.random(self.positions.shape)
+        r2 = self.rng.random(self.positions.shape)
+        self.velocities = (
+            self.inertia * self.velocities
+            + self.cognitive * r1 * (self.personal_best - self.positions)
+            + self.social * r2 * (self.best_position - self.positions)
+        )
+        np.clip(self.velocities, -self.max_velocity, self.max_velocity, out=self.velocities)
+        self.positions = np.clip(self.positions + self.velocities, self.lower, self.upper)
+
+
+class BatchedSwarmOptimizer:
+    """Many independent particle swarms advanced together.
+
+    Positions are (swarms, particles, dims); each swarm keeps its own global
+    best, but every update is one array operation over all swarms, so e.g. a
+    swarm per trading pair costs the same Python overhead as a single swarm.
+    """
+
+    def __init__(
+        self,
+        lower: np.ndarray,
+        upper: np.ndarray,
+        swarms: int,
+        population: int = 20,
+        inertia: float = 0.72,
+        cognitive: float = 1.49,
+        social: float = 1.49,
+        seed: Optional[int] = None,
+    ):
+        self.rng = np.random.default_rng(seed)
+        self.lower = lower
+        self.upper = upper
+        self.inertia = inertia
+        self.cognitive = cognitive
+        self.social = social
+        span = upper - lower
+        self.max_velocity = 0.2 * span
+        shape = (swarms, population, len(lower))
+        self.positions = lower + self.rng.random(shape) * span
+        self.velocities = self.rng.uniform(-1, 1, shape) * self.max_velocity
+        self.personal_best = self.positions.copy()
+        self.personal_best_score = np.full(shape[:2], -np.inf)
+        self.best_position = self.positions[:, 0].copy()
+        self.best_score = np.full(swarms, -np.inf)
+
+    def ask(self) -> np.ndarray:
+        return self.positions
+
+    def tell(self, scores: np.ndarray):
+        improved = scores > self.personal_best_score
+        self.personal_best[improved] = self.positions[improved]
+        self.personal_best_score[improved] = scores[improved]
+        leader = np.argmax(self.personal_best_score, axis=1)
+        swarm = np.arange(len(leader))
+        leader_score = self.personal_best_score[swarm, leader]
+        better = leader_score > self.best_score
+        self.best_score[better] = leader_score[better]
+        self.best_position[better] = self.personal_best[swarm, leader][better]
+
+        r1 = self.rng.random(self.positions.shape)
+        r2 = self.rng.random(self.positions.shape)
+        self.velocities = (
+            self.inertia * self.velocities
+            + self.cognitive * r1 * (self.personal_best - self.positions)
+            + self.social * r2 * (self.best_position[:, None, :] - self.positions)
+        )
+        np.clip(self.velocities, -self.max_velocity, self.max_velocity, out=self.velocities)
+        self.positions = np.clip(self.positions + self.velocities, self.lower, self.upper)
+
+
+class GeneticOptimizer:
+    """Real-coded genetic algorithm with tournament selection and elitism"""
+
+    def __init__(
+        self,
+        lower: np.ndarray,
+        upper: np.ndarray,
+        population: int = 30,
+        mutation_rate: float = 0.2,
+        elite: int = 2,
+        seed: Optional[int] = None,
+        initial: Optional[np.ndarray] = None,
+    ):
+        self.rng = np.random.default_rng(seed)
+        self.lower = lower
+        self.upper = upper
+        self.mutation_rate = mutation_rate
+        self.elite = min(elite, population)
+        self.population = lower + self.rng.random((population, len(lower))) * (upper - lower)
+        if initial is not None:
+            self.population[0] = initial
+        self.best_position = self.population[0].copy()
+        self.best_score = -np.inf
+
+    def ask(self) -> np.ndarray:
+        return self.population
+
+    def tell(self, scores: np.ndarray):
+        order = np.argsort(-scores)
+        if scores[order[0]] > self.best_score:
+            self.best_score = float(scores[order[0]])
+            self.best_position = self.population[order[0]].copy()
+
+        size, dims = self.population.shape
+        # Binary tournaments pick two parents per child
+        contenders = self.rng.integers(0, size, (2, size, 2))
+        winners = np.where(
+            scores[contenders[..., 0]] >= scores[contenders[..., 1]],
+            contenders[..., 0],
+            contenders[..., 1],
+        )
+        mix = self.rng.random((size, dims))
+        children = mix * self.population[winners[0]] + (1 - mix) * self.population[winners[1]]
+
+        mutate = self.rng.random((size, dims)) < self.mutation_rate
+        noise = self.rng.normal(0, 0.1, (size, dims)) * (self.upper - self.lower)
+        children = np.clip(children + mutate * noise, self.lower, self.upper)
+        children[:self.elite] = self.population[order[:self.elite]]
+        self.population = children
+
+
+class BayesianOptimizer:
+    """Optuna TPE sampler driven in batches so evaluation stays vectorized"""
+
+    def __init__(
+        self,
+        lower: np.ndarray,
+        upper: np.ndarray,
+        population: int = 8,
+        seed: Optional[int] = None,
+        initial: Optional[np.ndarray] = None,
+    ):
+        import optuna
+
+        optuna.logging.set_verbosity(optuna.logging.WARNING)
+        self.lower = lower
+        self.upper = upper
+        self.batch = population
+        self.study = optuna.create_study(
+            direction="maximize", sampler=optuna.samplers.TPESampler(seed=seed)
+        )
+        if initial is not None:
+            self.study.enqueue_trial({f"x{i}": float(v) for i, v in enumerate(initial)})
+        self._trials = []
+        self.best_position = lower.copy() if initial is None else initial.copy()
+        self.best_score = -np.inf
+
+    def ask(self) -> np.ndarray:
+        self._trials = [self.study.ask() for _ in range(self.batch)]
+        return np.array([
+            [
+                trial.suggest_float(f"x{i}", lo, hi) if hi > lo else lo
+                for i, (lo, hi) in enumerate(zip(self.lower, self.upper))
+            ]
+            for trial in self._trials
+        ])
+
+    def tell(self, scores: np.ndarray):
+        for trial, score in zip(self._trials, scores):
+            self.study.tell(trial, float(score) if np.isfinite(score) else -1e9)
+        leader = int(np.argmax(scores))
+        if scores[leader] > self.best_score:
+            self.best_score = float(scores[leader])
+            self.best_position = np.array([
+                self._trials[leader].params.get(f"x{i}", lo) for i, lo in enumerate(self.lower)
+            ])
+
+
+OPTIMIZERS = {
+    "pso": SwarmOptimizer,
+    "genetic": GeneticOptimizer,
+    "bayesian": BayesianOptimizer,
+}
+
+
+def create_optimizer(algorithm: str, lower: np.ndarray, upper: np.ndarray, **kwargs):
+    if algorithm not in OPTIMIZERS:
+        raise ValueError(f"Unknown algorithm '{algorithm}'. Use one of: {', '.join(OPTIMIZERS)}")
+    return OPTIMIZERS[algorithm](lower, upper, **kwargs)
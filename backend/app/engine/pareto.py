@@ -0,0 +1,157 @@
+from typing import Optional, Tuple
+import numpy as np
+
+# Multi-objective helpers. Objective matrices are (points, objectives) and
+# oriented so that larger is better in every column.
+
+
+def dominance_matrix(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """(len(a), len(b)) boolean matrix: a[i] dominates b[j]"""
+    ge = (a[:, None, :] >= b[None, :, :]).all(axis=2)
+    gt = (a[:, None, :] > b[None, :, :]).any(axis=2)
+    return ge & gt
+
+
+def non_dominated(objectives: np.ndarray) -> np.ndarray:
+    """Boolean mask of the points no other point dominates"""
+    return ~dominance_matrix(objectives, objectives).any(axis=0)
+
+
+def crowding_distance(objectives: np.ndarray) -> np.ndarray:
+    """NSGA-II crowding distance; boundary points get infinity"""
+    count, dims = objectives.shape
+    distance = np.zeros(count)
+    if count <= 2:
+        distance[:] = np.inf
+        return distance
+    order = np.argsort(objectives, axis=0)
+    ordered = np.take_along_axis(objectives, order, axis=0)
+    span = ordered[-1] - ordered[0]
+    span[span == 0] = 1.0
+    gaps = (ordered[2:] - ordered[:-2]) / span
+    for dim in range(dims):
+        distance[order[1:-1, dim]] += gaps[:, dim]
+        distance[order[[0, -1], dim]] = np.inf
+    return distance
+
+
+class ParetoArchive:
+    """Bounded archive of non-dominated solutions stored as contiguous arrays.
+
+    New candidates are first screened against the archive in one vectorized
+    comparison, so only survivors pay for the mutual-dominance pass. When the
+    archive overflows, the most crowded members are dropped.
+    """
+
+    def __init__(self, dims: int, objectives: int, capacity: int = 100):
+        self.capacity = capacity
+        self.positions = np.empty((0, dims))
+        self.objectives = np.empty((0, objectives))
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    def update(self, positions: np.ndarray, objectives: np.ndarray):
+        finite = np.isfinite(objectives).all(axis=1)
+        positions, objectives = positions[finite], objectives[finite]
+        if len(self) and len(positions):
+            beaten = dominance_matrix(self.objectives, objectives).any(axis=0)
+            positions, objectives = positions[~beaten], objectives[~beaten]
+        if not len(positions):
+            return
+
+        merged_x = np.vstack([self.positions, positions])
+        merged_f = np.vstack([self.objectives, objectives])
+        # Drop exact duplicates so one point cannot crowd out the front
+        _, unique = np.unique(merged_f, axis=0, return_index=True)
+        unique = np.sort(unique)
+        merged_x, merged_f = merged_x[unique], merged_f[unique]
+        keep = non_dominated(merged_f)
+        merged_x, merged_f = merged_x[keep], merged_f[keep]
+
+        while len(merged_f) > self.capacity:
+            crowded = int(np.argmin(crowding_distance(merged_f)))
+            merged_x = np.delete(merged_x, crowded, axis=0)
+            merged_f = np.delete(merged_f, crowded, axis=0)
+        self.positions, self.objectives = merged_x, merged_f
+
+    def select_leaders(self, count: int, rng: np.random.Generator) -> np.ndarray:
+        """Binary tournament on crowding distance, favouring sparse regions of the front"""
+        crowding = crowding_distance(self.objectives)
+        a = rng.integers(0, len(self), count)
+        b = rng.integers(0, len(self), count)
+        return self.positions[np.where(crowding[a] >= crowding[b], a, b)]
+
+
+class MultiObjectiveSwarm:
+    """MOPSO: particles follow leaders drawn from a Pareto archive"""
+
+    def __init__(
+        self,
+        lower: np.ndarray,
+        upper: np.ndarray,
+        objectives: int,
+        population: int = 40,
+        archive_size: int = 100,
+        inertia: float = 0.4,
+        cognitive: float = 1.5,
+        social: float = 1.5,
+        mutation_rate: float = 0.1,
+        seed: Optional[int] = None,
+        initial: Optional[np.ndarray] = None,
+    ):
+        self.rng = np.random.default_rng(seed)
+        self.lower = lower
+        self.upper = upper
+        self.inertia = inertia
+        self.cognitive = cognitive
+        self.social = social
+        self.mutation_rate = mutation_rate
+        span = upper - lower
+        self.max_velocity = 0.2 * span
+        self.positions = lower + self.rng.random((population, len(lower))) * span
+        if initial is not None:
+            self.positions[0] = initial
+        self.velocities = np.zeros_like(self.positions)
+        self.personal_best = self.positions.copy()
+        self.personal_best_objectives = np.full((population, objectives), -np.inf)
+        self.archive = ParetoArchive(len(lower), objectives, archive_size)
+
+    def ask(self) -> np.ndarray:
+        return self.positions
+
+    def tell(self, objectives: np.ndarray):
+        objectives = np.where(np.isfinite(objectives), objectives, -np.inf)
+        self.archive.update(self.positions, objectives)
+
+        # Replace a personal best when dominated by the new point, or on a coin
+        # flip when neither dominates the other
+        new_wins = (objectives >= self.personal_best_objectives).all(axis=1) & \
+            (objectives > self.personal_best_objectives).any(axis=1)
+        old_wins = (self.personal_best_objectives >= objectives).all(axis=1) & \
+            (self.personal_best_objectives > objectives).any(axis=1)
+        replace = new_wins | (~old_wins & (self.rng.random(len(objectives)) < 0.5))
+        self.personal_best[replace] = self.positions[replace]
+        self.personal_best_objectives[replace] = objectives[replace]
+
+        if not len(self.archive):
+            leaders = self.personal_best
+        else:
+            leaders = self.archive.select_leaders(len(self.positions), self.rng)
+        r1 = self.rng.random(self.positions.shape)
+        r2 = self.rng.random(self.positions.shape)
+        self.velocities = (
+            self.inertia * self.velocities
+            + self.cognitive * r1 * (self.personal_best - self.positions)
+            + self.social * r2 * (leaders - self.positions)
+        )
+        np.clip(self.velocities, -self.max_velocity, self.max_velocity, out=self.velocities)
+        positions = self.positions + self.velocities
+
+        # Turbulence keeps the swarm from collapsing onto one part of the front
+        mutate = self.rng.random(positions.shape) < self.mutation_rate
+        noise = self.rng.normal(0, 0.1, positions.shape) * (self.upper - self.lower)
+        self.positions = np.clip(positions + mutate * noise, self.lower, self.upper)
+
+    def front(self) -> Tuple[np.ndarray, np.ndarray]:
+        return self.archive.positions, self.archive.objectives
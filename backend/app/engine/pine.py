@@ -0,0 +1,639 @@
+"""Pine Script front end: input() extraction and compilation to NumPy plans.
+
+Only the subset needed for signal-based strategies is supported: input
+declarations, bar series, ta.rsi/sma/ema/rma, crossover/crossunder,
+arithmetic/boolean expressions, `if` blocks and strategy.entry/close.
+Anything else raises PineScriptError so the API can reject the script up
+front instead of failing halfway through an optimization run.
+"""
+from pydantic import BaseModel
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from app.engine.data import BarData, SERIES_NAMES
+from app.engine.indicators import INDICATORS, crossover, crossunder, shift
+import ast
+import hashlib
+import re
+import threading
+import numpy as np
+
+
+class PineScriptError(ValueError):
+    """Raised when a script uses syntax outside the supported subset"""
+
+
+class ParameterSpec(BaseModel):
+    name: str
+    type: str  # int, float, bool
+    default: float
+    min: float
+    max: float
+    step: Optional[float] = None
+    title: Optional[str] = None
+
+
+class ParameterSpace:
+    """Typed, bounded search space built from a script's input() declarations"""
+
+    def __init__(self, specs: List[ParameterSpec]):
+        self.specs = specs
+        self.names = [s.name for s in specs]
+        self.lower = np.array([s.min for s in specs], dtype=np.float64)
+        self.upper = np.array([s.max for s in specs], dtype=np.float64)
+
+    def __len__(self) -> int:
+        return len(self.specs)
+
+    def defaults(self) -> Dict[str, float]:
+        return {s.name: s.default for s in self.specs}
+
+    def decode(self, matrix: np.ndarray) -> Dict[str, np.ndarray]:
+        """Map a (particles, dims) matrix onto valid parameter values per column"""
+        matrix = np.atleast_2d(matrix)
+        params = {}
+        for i, spec in enumerate(self.specs):
+            column = np.clip(matrix[:, i], spec.min, spec.max)
+            if spec.step:
+                column = spec.min + np.round((column - spec.min) / spec.step) * spec.step
+            if spec.type in ("int", "bool"):
+                column = np.round(column)
+            params[spec.name] = column
+        return params
+
+    def encode(self, values: Dict[str, float]) -> np.ndarray:
+        """Inverse of decode for a single parameter set"""
+        return np.array([float(values.get(s.name, s.default)) for s in self.specs])
+
+    def to_python(self, params: Dict[str, np.ndarray], index: int = 0) -> Dict[str, Any]:
+        """Extract one row of decoded parameters as JSON-friendly values"""
+        result = {}
+        for spec in self.specs:
+            value = float(np.asarray(params[spec.name]).reshape(-1)[index])
+            if spec.type == "int":
+                result[spec.name] = int(value)
+            elif spec.type == "bool":
+                result[spec.name] = bool(value)
+            else:
+                result[spec.name] = value
+        return result
+
+    def with_overrides(self, overrides: Optional[Dict[str, Any]]) -> "ParameterSpace":
+        """Apply request overrides: a scalar pins a parameter, a dict updates min/max/step"""
+        if not overrides:
+            return self
+        specs = []
+        for spec in self.specs:
+            override = overrides.get(spec.name)
+            if override is None:
+                specs.append(spec)
+            elif isinstance(override, dict):
+                specs.append(spec.model_copy(update={
+                    k: float(v) for k, v in override.items() if k in ("min", "max", "step")
+                }))
+            else:
+                value = float(override)
+                specs.append(spec.model_copy(update={"default": value, "min": value, "max": value}))
+        unknown = set(overrides) - set(self.names)
+        if unknown:
+            raise PineScriptError(f"Unknown parameters: {', '.join(sorted(unknown))}")
+        for spec in specs:
+            if spec.min > spec.max:
+                raise PineScriptError(f"Parameter '{spec.name}' has min > max")
+        return ParameterSpace(specs)
+
+    def to_json(self) -> Dict[str, Dict[str, Any]]:
+        return {s.name: s.model_dump() for s in self.specs}
+
+
+class EvaluationContext:
+    """Per-run state: bound parameters, bar data and memoized variables"""
+
+    def __init__(self, bars: BarData, params: Dict[str, np.ndarray], cache: Optional[Any] = None):
+        self.bars = bars
+        self.cache = cache
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.params = {
+            name: np.asarray(value, dtype=np.float64).reshape(-1, 1)
+            for name, value in params.items()
+        }
+        self.size = max([v.shape[0] for v in self.params.values()] or [1])
+        self._memo: Dict[str, np.ndarray] = {}
+
+    def series(self, name: str) -> np.ndarray:
+        return self.bars.series(name).reshape(1, -1)
+
+    def memo(self, name: str, fn: Callable[["EvaluationContext"], np.ndarray]) -> np.ndarray:
+        if name not in self._memo:
+            self._memo[name] = fn(self)
+        return self._memo[name]
+
+    def compute_indicator(self, name: str, source_key: str, source: np.ndarray, length: int) -> np.ndarray:
+        if self.cache is None:
+            return INDICATORS[name](source, length)
+        values, hit = self.cache.indicator(self.bars.dataset_id, name, source_key, source, length)
+        if hit:
+            self.cache_hits += 1
+        else:
+            self.cache_misses += 1
+        return values
+
+
+class _Node:
+    """Compiled expression: `fn` evaluates it, `key` is set when it is parameter-independent"""
+
+    __slots__ = ("fn", "key")
+
+    def __init__(self, fn: Callable[[EvaluationContext], Any], key: Optional[str]):
+        self.fn = fn
+        self.key = key
+
+
+class _Order:
+    __slots__ = ("kind", "entry_id", "direction", "condition")
+
+    def __init__(self, kind: str, entry_id: Optional[str], direction: int, condition: _Node):
+        self.kind = kind  # entry, close, close_all
+        self.entry_id = entry_id
+        self.direction = direction  # 1 long, -1 short, 0 both
+        self.condition = condition
+
+
+def _ffill_state(events: np.ndarray) -> np.ndarray:
+    """Forward-fill NaN gaps along the bar axis, starting flat"""
+    valid = ~np.isnan(events)
+    index = np.where(valid, np.arange(events.shape[1]), 0)
+    np.maximum.accumulate(index, axis=1, out=index)
+    filled = np.take_along_axis(events, index, axis=1)
+    return np.nan_to_num(filled, nan=0.0)
+
+
+class CompiledStrategy:
+    """Vectorized evaluation plan for one Pine script"""
+
+    def __init__(self, script_hash: str, name: Optional[str], parameter_space: ParameterSpace,
+                 orders: List[_Order], commission: float, families: List[Tuple[str, _Node, str]]):
+        self.script_hash = script_hash
+        self.name = name
+        self.parameter_space = parameter_space
+        self.orders = orders
+        self.commission = commission
+        # (indicator, source, parameter) for indicators whose length is a bare input
+        self.families = families
+
+    def run(self, bars: BarData, params: Dict[str, Any], cache: Optional[Any] = None) -> np.ndarray:
+        """Bind parameters (scalars or arrays of length P) and return (P, bars) positions"""
+        return self.positions(EvaluationContext(bars, params, cache))
+
+    def source_values(self, source: _Node, bars: BarData) -> np.ndarray:
+        """Evaluate a parameter-independent source expression as a 1-D series"""
+        ctx = EvaluationContext(bars, self.parameter_space.defaults())
+        return np.atleast_2d(source.fn(ctx))[0]
+
+    def positions(self, ctx: EvaluationContext) -> np.ndarray:
+        """Evaluate the orders against an existing context"""
+        shape = (ctx.size, len(ctx.bars))
+        long_events = np.full(shape, np.nan)
+        short_events = np.full(shape, np.nan)
+
+        # Later statements override earlier ones on the same bar, like Pine's
+        # order of execution; an entry in one direction flattens the other
+        for order in self.orders:
+            fired = np.broadcast_to(np.nan_to_num(order.condition.fn(ctx), nan=0.0), shape).astype(bool)
+            if order.kind == "entry":
+                opened, closed = (long_events, short_events) if order.direction > 0 else (short_events, long_events)
+                opened[fired] = 1.0
+                closed[fired] = 0.0
+            else:
+                if order.direction >= 0:
+                    long_events[fired] = 0.0
+                if order.direction <= 0:
+                    short_events[fired] = 0.0
+
+        return _ffill_state(long_events) - _ffill_state(short_events)
+
+
+# Call names that only affect chart output and can be skipped
+_DISPLAY_CALLS = {
+    "plot", "plotshape", "plotchar", "plotarrow", "hline", "bgcolor", "barcolor",
+    "fill", "alertcondition", "alert", "label.new", "line.new",
+}
+_INPUT_CALLS = {
+    "input", "input.int", "input.float", "input.bool", "input.source",
+    "input.string", "input.timeframe", "input.symbol",
+}
+_SERIES_FUNCS = {name: name for name in INDICATORS}
+_SERIES_FUNCS.update({f"ta.{name}": name for name in INDICATORS})
+_CROSS_FUNCS = {
+    "crossover": crossover, "ta.crossover": crossover,
+    "crossunder": crossunder, "ta.crossunder": crossunder,
+}
+_MATH_FUNCS = {
+    "abs": np.abs, "math.abs": np.abs,
+    "max": np.maximum, "math.max": np.maximum,
+    "min": np.minimum, "math.min": np.minimum,
+    "log": np.log, "math.log": np.log,
+    "sqrt": np.sqrt, "math.sqrt": np.sqrt,
+}
+_BIN_OPS = {
+    ast.Add: np.add, ast.Sub: np.subtract, ast.Mult: np.multiply,
+    ast.Div: np.true_divide, ast.Mod: np.mod,
+}
+_CMP_OPS = {
+    ast.Gt: np.greater, ast.GtE: np.greater_equal, ast.Lt: np.less,
+    ast.LtE: np.less_equal, ast.Eq: np.equal, ast.NotEq: np.not_equal,
+}
+_ASSIGNMENT = re.compile(
+    r"^(?:var\s+|varip\s+)?(?:(?:series|simple|const)\s+)?(?:(?:int|float|bool|string)\s+)?"
+    r"([A-Za-z_]\w*)\s*=(?!=)\s*(.+)$"
+)
+
+
+def _dotted_name(node: ast.AST) -> Optional[str]:
+    if isinstance(node, ast.Name):
+        return node.id
+    if isinstance(node, ast.Attribute):
+        base = _dotted_name(node.value)
+        return f"{base}.{node.attr}" if base else None
+    return None
+
+
+def _strip_comment(line: str) -> str:
+    in_string = None
+    for i, ch in enumerate(line):
+        if in_string:
+            if ch == in_string:
+                in_string = None
+        elif ch in ("'", '"'):
+            in_string = ch
+        elif line.startswith("//", i):
+            return line[:i]
+    return line
+
+
+def _logical_lines(source: str) -> List[Tuple[int, int, str]]:
+    """Yield (line number, indent, text), joining lines with unbalanced brackets"""
+    lines = []
+    pending = None
+    for number, raw in enumerate(source.splitlines(), start=1):
+        text = _strip_comment(raw).rstrip().expandtabs(4)
+        if not text.strip():
+            continue
+        if pending is not None:
+            pending = (pending[0], pending[1], pending[2] + " " + text.strip())
+        else:
+            pending = (number, len(text) - len(text.lstrip()), text.strip())
+        body = pending[2]
+        if body.count("(") + body.count("[") <= body.count(")") + body.count("]"):
+            lines.append(pending)
+            pending = None
+    if pending is not None:
+        raise PineScriptError(f"Unbalanced brackets starting on line {pending[0]}")
+    return lines
+
+
+class _Compiler:
+    def __init__(self, source: str):
+        self.source = source
+        self.specs: List[ParameterSpec] = []
+        self.variables: Dict[str, _Node] = {}
+        self.orders: List[_Order] = []
+        self.families: List[Tuple[str, _Node, str]] = []
+        self.entry_directions: Dict[str, int] = {}
+        self.name: Optional[str] = None
+        self.commission = 0.0
+        self.line = 0
+
+    def error(self, message: str) -> PineScriptError:
+        return PineScriptError(f"Line {self.line}: {message}")
+
+    def parse_expr(self, text: str) -> ast.AST:
+        translated = re.sub(r"\btrue\b", "True", re.sub(r"\bfalse\b", "False", text))
+        try:
+            return ast.parse(translated, mode="eval").body
+        except SyntaxError:
+            raise self.error(f"unsupported expression '{text}'")
+
+    def compile(self) -> CompiledStrategy:
+        blocks: List[Tuple[int, _Node, _Node]] = []  # (indent, condition, negated condition)
+        last_if: Optional[Tuple[int, _Node]] = None
+        for number, indent, text in _logical_lines(self.source):
+            self.line = number
+            while blocks and indent <= blocks[-1][0]:
+                last_if = (blocks[-1][0], blocks[-1][2])
+                blocks.pop()
+            guard = self._and_all([b[1] for b in blocks])
+
+            if text.startswith("if ") or text.startswith("if("):
+                condition = self.compile_expr(self.parse_expr(text[2:].strip()))
+                blocks.append((indent, condition, self._negate(condition)))
+                continue
+            if text == "else":
+                if not last_if or last_if[0] != indent:
+                    raise self.error("'else' without matching 'if'")
+                blocks.append((indent, last_if[1], last_if[1]))
+                continue
+            last_if = None
+            if ":=" in text:
+                raise self.error("reassignment with ':=' is not supported")
+
+            match = _ASSIGNMENT.match(text)
+            if match:
+                if blocks:
+                    raise self.error("assignments inside 'if' blocks are not supported")
+                self.assign(match.group(1), self.parse_expr(match.group(2)))
+                continue
+
+            expr = self.parse_expr(text)
+            if not isinstance(expr, ast.Call):
+                raise self.error(f"unsupported statement '{text}'")
+            func = _dotted_name(expr.func)
+            if func in ("strategy", "indicator", "study"):
+                self.header(expr)
+            elif func in ("strategy.entry", "strategy.close", "strategy.close_all"):
+                self.order(func, expr, guard)
+            elif func not in _DISPLAY_CALLS:
+                raise self.error(f"unsupported call '{func}'")
+
+        if not self.orders:
+            raise PineScriptError("Script has no strategy.entry calls to evaluate")
+        script_hash = hash_script(self.source)
+        return CompiledStrategy(script_hash, self.name, ParameterSpace(self.specs), self.orders,
+                                self.commission, self.families)
+
+    def header(self, call: ast.Call):
+        if call.args and isinstance(call.args[0], ast.Constant):
+            self.name = str(call.args[0].value)
+        kwargs = {kw.arg: kw.value for kw in call.keywords}
+        if "title" in kwargs and isinstance(kwargs["title"], ast.Constant):
+            self.name = str(kwargs["title"].value)
+        value = kwargs.get("commission_value")
+        kind = _dotted_name(kwargs["commission_type"]) if "commission_type" in kwargs else "strategy.commission.percent"
+        if isinstance(value, ast.Constant) and kind == "strategy.commission.percent":
+            self.commission = float(value.value) / 100.0
+
+    def assign(self, name: str, expr: ast.AST):
+        if name in self.variables or name in SERIES_NAMES:
+            raise self.error(f"'{name}' is already defined")
+        if isinstance(expr, ast.Call) and _dotted_name(expr.func) in _INPUT_CALLS:
+            self.input(name, _dotted_name(expr.func), expr)
+            return
+        node = self.compile_expr(expr)
+        inner = node.fn
+        self.variables[name] = _Node(lambda ctx: ctx.memo(name, inner), node.key)
+
+    def input(self, name: str, func: str, call: ast.Call):
+        kwargs = {kw.arg: kw.value for kw in call.keywords}
+        default_node = call.args[0] if call.args else kwargs.get("defval")
+        if default_node is None:
+            raise self.error(f"input '{name}' has no default value")
+
+        if func == "input.source" or (func == "input" and not isinstance(default_node, ast.Constant)):
+            self.variables[name] = self.compile_expr(default_node)
+            return
+        if not isinstance(default_node, ast.Constant):
+            raise self.error(f"input '{name}' must have a literal default")
+        default = default_node.value
+        if isinstance(default, str) or func in ("input.string", "input.timeframe", "input.symbol"):
+            self.variables[name] = _Node(lambda ctx, v=default: v, repr(default))
+            return
+
+        def literal(key):
+            node = kwargs.get(key)
+            if node is None:
+                return None
+            if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub) and isinstance(node.operand, ast.Constant):
+                return -float(node.operand.value)
+            if isinstance(node, ast.Constant):
+                return float(node.value)
+            raise self.error(f"input '{name}' {key} must be a literal")
+
+        if isinstance(default, bool) or func == "input.bool":
+            kind, low, high = "bool", 0.0, 1.0
+        else:
+            declared = _dotted_name(kwargs["type"]) if "type" in kwargs else None
+            kind = "float" if func == "input.float" or declared == "input.float" or isinstance(default, float) else "int"
+            low, high = literal("minval"), literal("maxval")
+            default = float(default)
+            # Unbounded inputs get a search range around the default
+            if low is None:
+                low = max(1.0, np.floor(default / 2)) if kind == "int" and default >= 1 else (
+                    default / 2 if default > 0 else default - 10.0)
+            if high is None:
+                high = max(default * 2, low + 1.0) if default > 0 else low + 20.0
+        title = kwargs.get("title", call.args[1] if len(call.args) > 1 else None)
+        self.specs.append(ParameterSpec(
+            name=name,
+            type=kind,
+            default=float(default),
+            min=min(low, float(default)),
+            max=max(high, float(default)),
+            step=literal("step"),
+            title=title.value if isinstance(title, ast.Constant) else None,
+        ))
+        self.variables[name] = _Node(lambda ctx: ctx.params[name], None)
+
+    def order(self, func: str, call: ast.Call, guard: Optional[_Node]):
+        kwargs = {kw.arg: kw.value for kw in call.keywords}
+        condition = guard
+        if "when" in kwargs:
+            when = self.compile_expr(kwargs["when"])
+            condition = self._and_all([guard, when] if guard else [when])
+        if condition is None:
+            condition = _Node(lambda ctx: True, "True")
+
+        if func == "strategy.close_all":
+            self.orders.append(_Order("close_all", None, 0, condition))
+            return
+        id_node = call.args[0] if call.args else kwargs.get("id")
+        if not isinstance(id_node, ast.Constant):
+            raise self.error(f"{func} needs a literal id")
+        entry_id = str(id_node.value)
+        if func == "strategy.entry":
+            direction_node = call.args[1] if len(call.args) > 1 else kwargs.get("direction")
+            direction = {"strategy.long": 1, "strategy.short": -1}.get(_dotted_name(direction_node) if direction_node else None)
+            if direction is None:
+                raise self.error("strategy.entry direction must be strategy.long or strategy.short")
+            self.entry_directions[entry_id] = direction
+            self.orders.append(_Order("entry", entry_id, direction, condition))
+        else:
+            if entry_id not in self.entry_directions:
+                raise self.error(f"strategy.close refers to unknown entry '{entry_id}'")
+            self.orders.append(_Order("close", entry_id, self.entry_directions[entry_id], condition))
+
+    def compile_expr(self, node: ast.AST) -> _Node:
+        if isinstance(node, ast.Constant):
+            if not isinstance(node.value, (int, float, bool)):
+                raise self.error(f"unsupported literal {node.value!r}")
+            value = float(node.value)
+            return _Node(lambda ctx: value, repr(value))
+
+        if isinstance(node, ast.Name):
+            name = node.id
+            if name in self.variables:
+                return self.variables[name]
+            if name in SERIES_NAMES:
+                return _Node(lambda ctx: ctx.series(name), name)
+            if name == "na":
+                return _Node(lambda ctx: np.nan, "na")
+            raise self.error(f"undefined name '{name}'")
+
+        if isinstance(node, ast.BinOp) and type(node.op) in _BIN_OPS:
+            op = _BIN_OPS[type(node.op)]
+            return self._combine(op, [node.left, node.right], ast.unparse(node))
+
+        if isinstance(node, ast.UnaryOp):
+            operand = self.compile_expr(node.operand)
+            if isinstance(node.op, ast.USub):
+                return _Node(lambda ctx: -operand.fn(ctx), f"-({operand.key})" if operand.key else None)
+            if isinstance(node.op, ast.Not):
+                return self._negate(operand)
+
+        if isinstance(node, ast.BoolOp):
+            parts = [self.compile_expr(v) for v in node.values]
+            op = np.logical_and if isinstance(node.op, ast.And) else np.logical_or
+            return _Node(lambda ctx: op.reduce([_truthy(p.fn(ctx)) for p in parts]), None)
+
+        if isinstance(node, ast.Compare):
+            operands = [node.left] + list(node.comparators)
+            pairs = []
+            for op, left, right in zip(node.ops, operands, operands[1:]):
+                if type(op) not in _CMP_OPS:
+                    raise self.error(f"unsupported comparison in '{ast.unparse(node)}'")
+                pairs.append(self._combine(_CMP_OPS[type(op)], [left, right], None, errstate=True))
+            return self._and_all(pairs)
+
+        if isinstance(node, ast.Subscript):
+            offset = node.slice
+            if not (isinstance(offset, ast.Constant) and isinstance(offset.value, int) and offset.value >= 0):
+                raise self.error("history references need a literal non-negative offset")
+            inner = self.compile_expr(node.value)
+            periods = offset.value
+            key = f"{inner.key}[{periods}]" if inner.key else None
+
+            def fn(ctx):
+                value = np.atleast_2d(inner.fn(ctx))
+                # Parameters and literals are constant over time, so their history is themselves
+                return shift(value, periods) if periods and value.shape[1] > 1 else value
+
+            return _Node(fn, key)
+
+        if isinstance(node, ast.Call):
+            return self.compile_call(node)
+
+        raise self.error(f"unsupported expression '{ast.unparse(node)}'")
+
+    def compile_call(self, call: ast.Call) -> _Node:
+        func = _dotted_name(call.func)
+        args = list(call.args)
+        kwargs = {kw.arg: kw.value for kw in call.keywords}
+
+        if func in _SERIES_FUNCS:
+            indicator = _SERIES_FUNCS[func]
+            source = args[0] if args else kwargs.get("source")
+            length = args[1] if len(args) > 1 else kwargs.get("length")
+            if source is None or length is None:
+                raise self.error(f"{func} needs a source and a length")
+            source_node = self.compile_expr(source)
+            if source_node.key and isinstance(length, ast.Name) and length.id in {s.name for s in self.specs}:
+                self.families.append((indicator, source_node, length.id))
+            return self._indicator(indicator, source_node, self.compile_expr(length))
+
+        if func in _CROSS_FUNCS:
+            if len(args) != 2:
+                raise self.error(f"{func} takes two arguments")
+            return self._combine(_CROSS_FUNCS[func], args, None)
+
+        if func in _MATH_FUNCS:
+            return self._combine(_MATH_FUNCS[func], args, f"{func}({', '.join(ast.unparse(a) for a in args)})")
+
+        if func in ("nz",):
+            inner = self.compile_expr(args[0])
+            replacement = self.compile_expr(args[1]) if len(args) > 1 else _Node(lambda ctx: 0.0, "0.0")
+            return _Node(lambda ctx: np.where(np.isnan(inner.fn(ctx)), replacement.fn(ctx), inner.fn(ctx)), None)
+
+        raise self.error(f"unsupported function '{func}'")
+
+    def _indicator(self, indicator: str, source: _Node, length: _Node) -> _Node:
+        key = f"{indicator}({source.key}, {length.key})" if source.key and length.key else None
+
+        def evaluate(ctx: EvaluationContext) -> np.ndarray:
+            lengths = np.asarray(length.fn(ctx), dtype=np.float64)
+            if lengths.ndim == 2 and lengths.shape[1] != 1:
+                raise PineScriptError(f"{indicator} length must be constant across bars")
+            lengths = np.round(lengths.reshape(-1)).astype(np.int64)
+            values = np.atleast_2d(source.fn(ctx))
+            if values.shape[0] == 1:
+                # Same source for every particle: compute once per distinct length
+                unique, inverse = np.unique(lengths, return_inverse=True)
+                rows = [ctx.compute_indicator(indicator, source.key, values[0], int(n)) for n in unique]
+                return np.stack(rows)[inverse]
+            lengths = np.broadcast_to(lengths, (values.shape[0],))
+            return np.stack([
+                INDICATORS[indicator](values[i], int(lengths[i])) for i in range(values.shape[0])
+            ])
+
+        return _Node(evaluate, key)
+
+    def _combine(self, op: Callable, args: List[ast.AST], key: Optional[str], errstate: bool = False) -> _Node:
+        nodes = [self.compile_expr(a) for a in args]
+        if errstate:
+            def fn(ctx):
+                with np.errstate(invalid="ignore"):
+                    return op(*[n.fn(ctx) for n in nodes])
+        else:
+            def fn(ctx):
+                return op(*[n.fn(ctx) for n in nodes])
+        keyed = key if all(n.key for n in nodes) else None
+        return _Node(fn, keyed)
+
+    @staticmethod
+    def _negate(node: _Node) -> _Node:
+        return _Node(lambda ctx: ~_truthy(node.fn(ctx)), None)
+
+    @staticmethod
+    def _and_all(nodes: List[_Node]) -> Optional[_Node]:
+        nodes = [n for n in nodes if n is not None]
+        if not nodes:
+            return None
+        if len(nodes) == 1:
+            return nodes[0]
+        return _Node(lambda ctx: np.logical_and.reduce([_truthy(n.fn(ctx)) for n in nodes]), None)
+
+
+def _truthy(value: Any) -> np.ndarray:
+    value = np.asarray(value)
+    if value.dtype == bool:
+        return value
+    return np.nan_to_num(value, nan=0.0) != 0
+
+
+def hash_script(source: str) -> str:
+    """Stable hash of a script, ignoring trailing whitespace differences"""
+    normalized = "\n".join(line.rstrip() for line in source.strip().splitlines())
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+def compile_pine(source: str) -> CompiledStrategy:
+    """Parse and compile a Pine script without consulting the cache"""
+    return _Compiler(source).compile()
+
+
+# Compiled plans keyed by script hash; plans are immutable so they can be
+# shared across optimization runs and threads
+_plan_cache: Dict[str, CompiledStrategy] = {}
+_plan_cache_lock = threading.Lock()
+PLAN_CACHE_SIZE = 256
+
+
+def get_compiled_strategy(source: str) -> CompiledStrategy:
+    """Return the cached plan for a script, compiling it on first use"""
+    script_hash = hash_script(source)
+    with _plan_cache_lock:
+        plan = _plan_cache.get(script_hash)
+    if plan is None:
+        plan = compile_pine(source)
+        with _plan_cache_lock:
+            if len(_plan_cache) >= PLAN_CACHE_SIZE:
+                _plan_cache.pop(next(iter(_plan_cache)))
+            _plan_cache[script_hash] = plan
+    return plan
@@ -0,0 +1,179 @@
+from typing import Any, Dict, List, Optional
+from app.engine.backtest import OBJECTIVE_DIRECTIONS, evaluate_positions, periods_per_year
+from app.engine.data import BarData
+from app.engine.indicator_cache import IndicatorCache, indicator_cache
+from app.engine.optimizers import create_optimizer
+from app.engine.pareto import MultiObjectiveSwarm
+from app.engine.pine import CompiledStrategy, EvaluationContext, ParameterSpace
+import time
+import numpy as np
+
+
+# Upper bound on the lengths of one indicator family precomputed per run
+MAX_FAMILY_SIZE = 512
+
+
+class StrategyFitness:
+    """Scores a population of parameter vectors with one batched backtest"""
+
+    def __init__(self, plan: CompiledStrategy, space: ParameterSpace, bars: BarData,
+                 timeframe: str, objective: str = "sharpe",
+                 cache: Optional[IndicatorCache] = indicator_cache):
+        self.plan = plan
+        self.space = space
+        self.bars = bars
+        self.objective = objective
+        self.annualization = periods_per_year(timeframe)
+        self.cache = cache
+        self.evaluations = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.precomputed = self.precompute_families() if cache is not None else 0
+
+    def precompute_families(self) -> int:
+        """Fill the cache with every length the search space can ask for"""
+        added = 0
+        for indicator, source, param in self.plan.families:
+            spec = self.space.specs[self.space.names.index(param)]
+            step = max(1, int(spec.step or 1))
+            lengths = range(max(1, int(np.ceil(spec.min))), int(np.floor(spec.max)) + 1, step)
+            if 1 < len(lengths) <= MAX_FAMILY_SIZE:
+                added += self.cache.precompute_family(
+                    self.bars.dataset_id, indicator, source.key,
+                    self.plan.source_values(source, self.bars), lengths,
+                )
+        return added
+
+    def metrics(self, matrix: np.ndarray) -> Dict[str, np.ndarray]:
+        ctx = EvaluationContext(self.bars, self.space.decode(matrix), self.cache)
+        positions = self.plan.positions(ctx)
+        self.evaluations += len(positions)
+        self.cache_hits += ctx.cache_hits
+        self.cache_misses += ctx.cache_misses
+        return evaluate_positions(positions, self.bars.close, self.plan.commission, self.annualization)
+
+    def cache_telemetry(self) -> Dict[str, Any]:
+        lookups = self.cache_hits + self.cache_misses
+        telemetry = {
+            "hits": self.cache_hits,
+            "misses": self.cache_misses,
+            "hit_rate": round(self.cache_hits / lookups, 4) if lookups else 0.0,
+            "precomputed_series": self.precomputed,
+        }
+        if self.cache is not None:
+            stats = self.cache.stats()
+            telemetry.update({
+                "memory_bytes": stats["memory_bytes"],
+                "max_bytes": stats["max_bytes"],
+                "entries": stats["entries"],
+                "evictions": stats["evictions"],
+            })
+        return telemetry
+
+    def __call__(self, matrix: np.ndarray) -> np.ndarray:
+        scores = self.metrics(matrix)[self.objective]
+        return np.where(np.isfinite(scores), scores, -np.inf)
+
+
+def optimize(
+    plan: CompiledStrategy,
+    space: ParameterSpace,
+    bars: BarData,
+    timeframe: str,
+    algorithm: str = "pso",
+    iterations: int = 100,
+    population: int = 30,
+    objective: str = "sharpe",
+    seed: Optional[int] = None,
+) -> Dict[str, Any]:
+    """Run an optimizer over a compiled strategy and return the best parameters"""
+    if len(bars) < 2:
+        raise ValueError(f"Not enough bars to optimize ({len(bars)} stored for {bars.dataset_id})")
+
+    started = time.perf_counter()
+    fitness = StrategyFitness(plan, space, bars, timeframe, objective)
+    optimizer = create_optimizer(
+        algorithm, space.lower, space.upper,
+        population=population, seed=seed, initial=space.encode(space.defaults()),
+    )
+    for _ in range(iterations):
+        optimizer.tell(fitness(optimizer.ask()))
+
+    best = space.decode(optimizer.best_position)
+    return {
+        "best_params": space.to_python(best),
+        "best_score": float(optimizer.best_score),
+        "iterations": iterations,
+        "telemetry": {
+            "evaluations": fitness.evaluations,
+            "bars": len(bars),
+            "elapsed_seconds": round(time.perf_counter() - started, 4),
+            "script_hash": plan.script_hash,
+            "indicator_cache": fitness.cache_telemetry(),
+        },
+    }
+
+
+def optimize_pareto(
+    plan: CompiledStrategy,
+    space: ParameterSpace,
+    bars: BarData,
+    timeframe: str,
+    objectives: List[str],
+    iterations: int = 100,
+    population: int = 40,
+    archive_size: int = 100,
+    seed: Optional[int] = None,
+) -> Dict[str, Any]:
+    """Run MOPSO and return the Pareto front over several backtest metrics"""
+    unknown = [o for o in objectives if o not in OBJECTIVE_DIRECTIONS]
+    if unknown:
+        raise ValueError(f"Unknown objectives: {', '.join(unknown)}")
+    if len(bars) < 2:
+        raise ValueError(f"Not enough bars to optimize ({len(bars)} stored for {bars.dataset_id})")
+
+    started = time.perf_counter()
+    fitness = StrategyFitness(plan, space, bars, timeframe)
+    directions = np.array([OBJECTIVE_DIRECTIONS[o] for o in objectives])
+    swarm = MultiObjectiveSwarm(
+        space.lower, space.upper, len(objectives),
+        population=population, archive_size=archive_size, seed=seed,
+        initial=space.encode(space.defaults()),
+    )
+    for _ in range(iterations):
+        # Every objective comes out of the same batched backtest
+        metrics = fitness.metrics(swarm.ask())
+        swarm.tell(np.column_stack([metrics[o] for o in objectives]) * directions)
+
+    positions, oriented = swarm.front()
+    values = oriented * directions
+    order = np.argsort(-oriented[:, 0])
+    decoded = space.decode(positions)
+    front, seen = [], set()
+    for i in order:
+        # Distinct positions can round to the same int parameters, i.e. the same strategy
+        params = space.to_python(decoded, int(i))
+        key = tuple(params.items())
+        if key not in seen:
+            seen.add(key)
+            front.append({
+                "params": params,
+                "objectives": {o: float(values[i, j]) for j, o in enumerate(objectives)},
+            })
+    return {
+        # The front is sorted by the first objective; its leader fills best_params
+        "best_params": front[0]["params"] if front else None,
+        "best_score": front[0]["objectives"][objectives[0]] if front else None,
+        "iterations": iterations,
+        "front": front,
+        "telemetry": {
+            "mode": "multi_objective",
+            "objectives": objectives,
+            "front_size": len(front),
+            "evaluations": fitness.evaluations,
+            "bars": len(bars),
+            "elapsed_seconds": round(time.perf_counter() - started, 4),
+            "script_hash": plan.script_hash,
+            "indicator_cache": fitness.cache_telemetry(),
+        },
+    }
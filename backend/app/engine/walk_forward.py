@@ -0,0 +1,108 @@
+from concurrent.futures import Executor
+from typing import Any, Dict, List, Optional, Tuple
+from app.engine.backtest import evaluate_returns, periods_per_year, position_returns
+from app.engine.data import BarData, SharedBars, shared_bars_view
+from app.engine.pine import get_compiled_strategy
+from app.engine.runner import optimize
+import asyncio
+import time
+import numpy as np
+
+Window = Tuple[int, int, int, int]  # train start, train stop, test start, test stop
+
+
+def make_windows(total_bars: int, train_bars: int, test_bars: int,
+                 step_bars: Optional[int] = None, anchored: bool = False) -> List[Window]:
+    """Rolling (or anchored) train/test windows covering the bar history"""
+    if train_bars < 2 or test_bars < 2:
+        raise ValueError("train_bars and test_bars must be at least 2")
+    step = step_bars or test_bars
+    windows = []
+    start = 0
+    while start + train_bars + test_bars <= total_bars:
+        train_start = 0 if anchored else start
+        train_stop = start + train_bars
+        windows.append((train_start, train_stop, train_stop, train_stop + test_bars))
+        start += step
+    return windows
+
+
+def optimize_window(handle, window: Window, request_data: Dict[str, Any], seed: int) -> Dict[str, Any]:
+    """Worker entry point: optimize on the train slice, score on the test slice"""
+    with shared_bars_view(handle) as bars:
+        train_start, train_stop, test_start, test_stop = window
+        plan = get_compiled_strategy(request_data["pine_script"])
+        space = plan.parameter_space.with_overrides(request_data.get("parameters"))
+        timeframe = request_data["timeframe"]
+
+        result = optimize(
+            plan, space, bars.view(train_start, train_stop), timeframe,
+            algorithm=request_data["algorithm"],
+            iterations=request_data["iterations"],
+            seed=seed,
+        )
+
+        # Run over the train bars too so indicators enter the test window warmed up,
+        # as they would live, but score only the test bars
+        history = bars.view(train_start, test_stop)
+        positions = plan.run(history, result["best_params"])
+        _, returns = position_returns(positions, history.close, plan.commission)
+        returns = returns[:, test_start - train_start:]
+        metrics = evaluate_returns(returns, periods_per_year(timeframe))
+        del bars, history
+    return {
+        "train": [train_start, train_stop],
+        "test": [test_start, test_stop],
+        "best_params": result["best_params"],
+        "train_score": result["best_score"],
+        "test_sharpe": float(metrics["sharpe"][0]),
+        "test_return": float(metrics["total_return"][0]),
+        "test_max_drawdown": float(metrics["max_drawdown"][0]),
+        "test_returns": returns[0],
+        "telemetry": result["telemetry"],
+    }
+
+
+async def run_walk_forward(executor: Executor, bars: BarData, request_data: Dict[str, Any],
+                           windows: List[Window]) -> Dict[str, Any]:
+    """Optimize every window concurrently and aggregate the out-of-sample results"""
+    if not windows:
+        raise ValueError(f"Not enough bars ({len(bars)}) for one walk-forward window")
+
+    started = time.perf_counter()
+    loop = asyncio.get_running_loop()
+    with SharedBars(bars) as shared:
+        results = await asyncio.gather(*[
+            loop.run_in_executor(executor, optimize_window, shared.handle, window, request_data, seed)
+            for seed, window in enumerate(windows)
+        ])
+
+    # Windows can overlap when step < test size; count each test bar once
+    oos = []
+    covered_until = 0
+    for result in results:
+        test_start, test_stop = result["test"]
+        skip = max(0, covered_until - test_start)
+        oos.append(result.pop("test_returns")[skip:])
+        covered_until = max(covered_until, test_stop)
+    oos_metrics = evaluate_returns(np.concatenate(oos), periods_per_year(request_data["timeframe"]))
+
+    return {
+        # The most recent window's parameters are the ones to trade next
+        "best_params": results[-1]["best_params"],
+        "best_score": float(oos_metrics["sharpe"][0]),
+        "iterations": request_data["iterations"] * len(windows),
+        "telemetry": {
+            "mode": "walk_forward",
+            "elapsed_seconds": round(time.perf_counter() - started, 4),
+            "bars": len(bars),
+            "out_of_sample": {
+                "sharpe": float(oos_metrics["sharpe"][0]),
+                "total_return": float(oos_metrics["total_return"][0]),
+                "max_drawdown": float(oos_metrics["max_drawdown"][0]),
+                "mean_window_sharpe": float(np.mean([r["test_sharpe"] for r in results])),
+                "bars": int(sum(len(r) for r in oos)),
+            },
+            "windows": results,
+        },
+    }
@@ -0,0 +1,52 @@
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+from app.config import settings
+import multiprocessing
+import os
+import threading
+import structlog
+
+logger = structlog.get_logger()
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+# BLAS/OpenMP thread pools inside every worker would multiply with the
+# process count and oversubscribe the cores
+_THREAD_ENV_VARS = ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS", "NUMEXPR_NUM_THREADS")
+
+
+def worker_count() -> int:
+    # Each web worker has its own pool, so the cores are split between them by default
+    return settings.OPTIMIZATION_WORKERS or max(1, (os.cpu_count() or 1) // max(1, settings.WORKERS))
+
+
+def _limit_worker_threads():
+    # BLAS sizes its pools when numpy is imported, which a spawned worker does while
+    # unpickling its first task; the variables must be in the environment it inherits.
+    # The web process has imported numpy long before, so its own pools are unaffected.
+    for var in _THREAD_ENV_VARS:
+        os.environ.setdefault(var, "1")
+
+
+def get_worker_pool() -> ProcessPoolExecutor:
+    """Process pool for CPU-bound optimization work, created on first use"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _limit_worker_threads()
+            # spawn avoids forking a process that holds DB connections and threads
+            _pool = ProcessPoolExecutor(
+                max_workers=worker_count(),
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+            logger.info("Started optimization worker pool", workers=worker_count())
+        return _pool
+
+
+def shutdown_worker_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
@@ -0,0 +1,148 @@
+"""HTTP revalidation and compression for the endpoints the frontend polls.
+
+`conditional(*tables)` is a route dependency for a GET whose body depends
+only on its URL and the rows of `tables`. It tags the response with a weak
+ETag built from the table versions (app.table_versions) and a Last-Modified
+from the latest write, and answers If-None-Match / If-Modified-Since with a
+304 before the endpoint runs - no session, no connection, no query. Put it
+in the route's `dependencies=[...]`, which FastAPI resolves before the
+endpoint's own parameters (and so before get_db):
+
+    @router.get("/correlations", dependencies=[conditional("pair_correlations")])
+
+Last-Modified has one-second resolution, so it is only sent once the
+latest write is a full second old; until then clients revalidate by ETag
+alone and a second write within the same second cannot be missed.
+
+`CompressionMiddleware` compresses complete responses of at least
+COMPRESSION_MIN_BYTES with brotli (when the brotli package is installed)
+or gzip, whichever the client prefers. Streaming responses - server-sent
+events, snapshot exports - pass through untouched.
+"""
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Dict, List, Optional
+from fastapi import Depends, HTTPException, Request, Response
+from app.table_versions import table_versions
+import gzip
+import time
+import structlog
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+logger = structlog.get_logger()
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 4  # brotli's higher levels cost far more CPU for a few percent
+
+
+def _tags(header: str) -> List[str]:
+    return [tag.strip().removeprefix("W/") for tag in header.split(",") if tag.strip()]
+
+
+def not_modified(request: Request, etag: str, last_modified: Optional[str]) -> bool:
+    """RFC 9110 evaluation: If-None-Match (weak comparison) wins over If-Modified-Since"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = _tags(if_none_match)
+        return "*" in tags or etag.removeprefix("W/") in tags
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is None or last_modified is None:
+        return False
+    try:
+        return parsedate_to_datetime(last_modified) <= parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+
+
+def conditional(*tables: str):
+    """Dependency: 304 for a request whose cached copy is still current, validators on the response otherwise"""
+    async def revalidate(request: Request, response: Response):
+        try:
+            epoch, versions, modified = await table_versions.get(tables)
+        except Exception as e:
+            logger.warning("Table versions unavailable; serving uncached", tables=tables, error=str(e))
+            return
+        headers = {"ETag": f'W/"{epoch}-{"-".join(map(str, versions))}"', "Cache-Control": "no-cache"}
+        if time.time() - modified >= 1:
+            headers["Last-Modified"] = formatdate(modified, usegmt=True)
+        if not_modified(request, headers["ETag"], headers.get("Last-Modified")):
+            raise HTTPException(status_code=304, headers=headers)
+        response.headers.update(headers)
+    return Depends(revalidate)
+
+
+def _quality(accept_encoding: str) -> Dict[str, float]:
+    accepted = {}
+    for part in accept_encoding.lower().split(","):
+        coding, _, params = part.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        if coding:
+            accepted[coding] = q
+    return accepted
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """'br' or 'gzip' by the client's q-values (br on ties), or None"""
+    accepted = _quality(accept_encoding)
+    offered = [coding for coding in (("br", "gzip") if brotli is not None else ("gzip",))
+               if accepted.get(coding, accepted.get("*", 0.0)) > 0]
+    return max(offered, key=lambda coding: accepted.get(coding, accepted.get("*", 0.0)), default=None)
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+class CompressionMiddleware:
+    """Pure ASGI middleware; buffers only the first body message to decide"""
+
+    def __init__(self, app, minimum_size: int = 1000):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        request_headers = dict(scope["headers"])
+        encoding = choose_encoding(request_headers.get(b"accept-encoding", b"").decode("latin-1"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+
+        async def send_compressed(message):
+            nonlocal start
+            if message["type"] == "http.response.start":
+                start = message  # held until the first body message shows whether to compress
+                return
+            if start is None:
+                await send(message)
+                return
+            held, start = start, None
+            body = message.get("body", b"")
+            headers = list(held["headers"])
+            if (message.get("more_body", False) or len(body) < self.minimum_size
+                    or any(name.lower() == b"content-encoding" for name, _ in headers)):
+                await send(held)
+                await send(message)
+                return
+            compressed = compress(body, encoding)
+            headers = [(name, value) for name, value in headers if name.lower() != b"content-length"]
+            headers += [(b"content-encoding", encoding.encode()), (b"content-length", str(len(compressed)).encode()),
+                        (b"vary", b"Accept-Encoding")]
+            await send({**held, "headers": headers})
+            await send({**message, "body": compressed})
+
+        await self.app(scope, receive, send_compressed)
@@ -0,0 +1,357 @@
+"""Asynchronous, batched structured logging.
+
+A log call on a hot path only runs the cheap structlog processors (logger
+name and level, sampling) behind a level-filtering bound logger, then puts
+the event dict on a bounded queue - no stdlib LogRecord, caller lookup or
+rendering on the calling thread. A background writer thread drains the
+queue in batches, adds timestamps, serializes each batch with orjson
+(falling back to json) and writes it with a single write/flush.
+Third-party stdlib loggers (uvicorn, sqlalchemy) reach the same queue
+through a QueueHandler, which merges each record's message with its args
+on the calling thread, while the args still hold the values of the call.
+
+High-frequency events can be thinned per logger or per event:
+
+* LOG_SAMPLING keeps every Nth call, e.g. {"app.pairs.live": 0.1}.
+* LOG_RATE_LIMITS caps calls per second with a token bucket, e.g.
+  {"Bar processed": 5}.
+
+An event that passes after others were dropped carries the number dropped
+in `sampled_out`. When the queue is full, events are dropped and counted
+rather than blocking the caller.
+"""
+from logging.handlers import QueueHandler
+from typing import Any, BinaryIO, Dict, List, Optional, Tuple
+import atexit
+import copy
+import datetime
+import json
+import logging
+import queue
+import sys
+import threading
+import time
+import structlog
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is in requirements
+    orjson = None
+
+
+def _default(value):
+    if isinstance(value, bytes):
+        return value.decode("utf-8", "replace")
+    return str(value)
+
+
+def encode(event: Dict[str, Any]) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(event, default=_default, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(event, default=_default).encode()
+
+
+class Sampler:
+    """structlog processor that drops events by per-key sampling ratio or rate limit"""
+
+    def __init__(self, sampling: Optional[Dict[str, float]] = None,
+                 rate_limits: Optional[Dict[str, float]] = None, clock=time.monotonic):
+        self.sampling = {key: max(1, round(1 / ratio)) if ratio > 0 else None
+                         for key, ratio in (sampling or {}).items()}
+        self.rate_limits = dict(rate_limits or {})
+        self.clock = clock
+        self._counts: Dict[str, int] = {}
+        self._buckets: Dict[str, List[float]] = {}  # key -> [tokens, last refill]
+        self._dropped: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def _allow(self, key: str) -> bool:
+        if key in self.sampling:
+            every = self.sampling[key]
+            count = self._counts.get(key, 0)
+            self._counts[key] = count + 1
+            if every is None or count % every:
+                return False
+        if key in self.rate_limits:
+            rate = self.rate_limits[key]
+            now = self.clock()
+            tokens, last = self._buckets.get(key, (rate, now))
+            tokens = min(rate, tokens + (now - last) * rate)
+            if tokens < 1:
+                self._buckets[key] = [tokens, now]
+                return False
+            self._buckets[key] = [tokens - 1, now]
+        return True
+
+    def __call__(self, logger, method_name: str, event_dict: Dict[str, Any]) -> Dict[str, Any]:
+        keys = [k for k in (event_dict.get("logger"), event_dict.get("event")) if k in self.sampling
+                or k in self.rate_limits]
+        if not keys:
+            return event_dict
+        with self._lock:
+            for key in keys:
+                if not self._allow(key):
+                    self._dropped[key] = self._dropped.get(key, 0) + 1
+                    raise structlog.DropEvent
+            dropped = sum(self._dropped.pop(key, 0) for key in keys)
+        if dropped:
+            event_dict["sampled_out"] = dropped
+        return event_dict
+
+
+class LogQueue:
+    """Bounded queue of pending events that drops (and counts) rather than blocks when full"""
+
+    def __init__(self, maxsize: int = 10_000):
+        self.maxsize = maxsize
+        self.queue: queue.SimpleQueue = queue.SimpleQueue()
+        self.dropped = 0
+
+    def put(self, item):
+        if self.queue.qsize() >= self.maxsize:
+            self.dropped += 1
+        else:
+            self.queue.put(item)
+
+    def qsize(self) -> int:
+        return self.queue.qsize()
+
+
+class QueueLogger:
+    """structlog logger whose every level method enqueues the processed event dict with its time"""
+
+    def __init__(self, name: str, log_queue: LogQueue):
+        self.name = name
+        self.log_queue = log_queue
+
+    def _enqueue(self, event_dict: Dict[str, Any]):
+        self.log_queue.put((time.time(), event_dict))
+
+    debug = info = warning = warn = error = err = critical = fatal = exception = msg = _enqueue
+
+
+class QueueLoggerFactory:
+    """Names each logger after the module that first uses it, like structlog.stdlib.LoggerFactory"""
+
+    def __init__(self, log_queue: LogQueue):
+        self.log_queue = log_queue
+
+    def __call__(self, *args) -> QueueLogger:
+        if args:
+            return QueueLogger(args[0], self.log_queue)
+        frame = sys._getframe(1)
+        while frame is not None and frame.f_globals.get("__name__", "").startswith(("structlog", __name__)):
+            frame = frame.f_back
+        return QueueLogger(frame.f_globals.get("__name__", "root") if frame is not None else "root",
+                           self.log_queue)
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """QueueHandler for stdlib loggers that defers rendering the event to the writer"""
+
+    def __init__(self, log_queue: LogQueue):
+        super().__init__(log_queue)
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # As QueueHandler.prepare: args may be mutable and change before the writer gets to
+        # them, and a traceback pins the frames, so both are reduced to text here
+        record = copy.copy(record)
+        record.msg = record.message = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        self.queue.put(record)
+
+
+class _Flush:
+    """Queue marker: the writer sets `done` once everything queued before it is written"""
+
+    def __init__(self):
+        self.done = threading.Event()
+
+
+class BatchWriter:
+    """Background thread that serializes and writes queued records in batches"""
+
+    def __init__(self, log_queue: LogQueue, stream: Optional[BinaryIO] = None, batch_size: int = 256):
+        self.queue = log_queue.queue
+        self.stream = stream
+        self.batch_size = batch_size
+        self._thread: Optional[threading.Thread] = None
+        self._stop = object()
+        self.records = 0
+        self.batches = 0
+
+    @staticmethod
+    def render(item) -> Dict[str, Any]:
+        """Event dict of a queued (time, event dict) pair or stdlib LogRecord"""
+        if isinstance(item, tuple):
+            created, event = item
+        else:
+            created = item.created
+            event = {"event": item.getMessage(), "logger": item.name, "level": item.levelname.lower()}
+            if item.exc_text:
+                event["exception"] = item.exc_text
+        if "timestamp" not in event:
+            event["timestamp"] = datetime.datetime.fromtimestamp(
+                created, tz=datetime.timezone.utc).isoformat().replace("+00:00", "Z")
+        return event
+
+    def _encode_batch(self, items: List[Any]) -> bytes:
+        lines = []
+        for item in items:
+            try:
+                lines.append(encode(self.render(item)))
+            except Exception as e:
+                lines.append(encode({"event": "Unserializable log event", "error": str(e)}))
+        return b"\n".join(lines) + b"\n"
+
+    def _run(self):
+        stream = self.stream or sys.stdout.buffer
+        while True:
+            batch, flushes, stopping = [], [], False
+            record = self.queue.get()
+            while True:
+                if record is self._stop:
+                    stopping = True
+                elif isinstance(record, _Flush):
+                    flushes.append(record)
+                else:
+                    batch.append(record)
+                # A marker ends the batch so the records before it are written now
+                if stopping or flushes or len(batch) >= self.batch_size:
+                    break
+                try:
+                    record = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+            if batch:
+                try:
+                    stream.write(self._encode_batch(batch))
+                    stream.flush()
+                except Exception:
+                    pass  # never let a broken stream take the writer down
+                self.records += len(batch)
+                self.batches += 1
+            for flush in flushes:
+                flush.done.set()
+            if stopping:
+                return
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+            self._thread.start()
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Wait until everything queued so far is written; False if that took longer than `timeout`"""
+        if self._thread is None or not self._thread.is_alive():
+            return False
+        marker = _Flush()
+        self.queue.put(marker)
+        return marker.done.wait(timeout)
+
+    def stop(self, timeout: float = 5.0):
+        """Write everything queued so far, then stop"""
+        if self._thread is not None:
+            self.queue.put(self._stop)
+            self._thread.join(timeout)
+            if not self._thread.is_alive():
+                self._thread = None  # a writer still busy past the timeout is not replaced by start()
+
+
+def _snapshot(value: Any) -> Any:
+    """Copy of a mutable container value, so later changes by the caller cannot reach the writer"""
+    if isinstance(value, dict):
+        return {key: _snapshot(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return type(value)(_snapshot(item) for item in value)
+    # Not imported here, main loads this module before anything heavy; without numpy there are no arrays
+    numpy = sys.modules.get("numpy")
+    if numpy is not None and isinstance(value, numpy.ndarray):
+        return value.copy()
+    return value
+
+
+def _to_queue(logger, method_name: str, event_dict: Dict[str, Any]) -> Tuple[Tuple[Any, ...], Dict[str, Any]]:
+    """Hand a snapshot of the event dict to the QueueLogger unrendered"""
+    # As NonBlockingQueueHandler.prepare for stdlib records: the writer serializes it later, on its own thread
+    return ({key: _snapshot(value) for key, value in event_dict.items()},), {}
+
+
+def processors(sampler: Optional[Sampler] = None) -> List[Any]:
+    """The caller-side processors: everything expensive happens in the writer"""
+    chain = [
+        structlog.stdlib.add_logger_name,
+        structlog.stdlib.add_log_level,
+    ]
+    if sampler is not None:
+        chain.append(sampler)
+    chain += [
+        structlog.processors.StackInfoRenderer(),
+        structlog.processors.format_exc_info,
+        _to_queue,  # bytes values are decoded by the writer's encoder
+    ]
+    return chain
+
+
+class LogPipeline:
+    def __init__(self, log_queue: LogQueue, writer: BatchWriter, sampler: Sampler):
+        self.log_queue = log_queue
+        self.writer = writer
+        self.sampler = sampler
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queued": self.log_queue.qsize(),
+            "written": self.writer.records,
+            "batches": self.writer.batches,
+            "dropped_queue_full": self.log_queue.dropped,
+            "sampled_out": dict(self.sampler._dropped),
+        }
+
+    def flush(self):
+        """Write out everything queued so far; the writer keeps running afterwards"""
+        self.writer.flush()
+
+
+_pipeline: Optional[LogPipeline] = None
+
+
+def configure_logging(level: str = "INFO", sampling: Optional[Dict[str, float]] = None,
+                      rate_limits: Optional[Dict[str, float]] = None, queue_size: int = 10_000,
+                      batch_size: int = 256, stream: Optional[BinaryIO] = None) -> LogPipeline:
+    """Route structlog and stdlib logging through the queue and start the writer (idempotent)"""
+    global _pipeline
+    if _pipeline is not None:
+        return _pipeline
+    log_queue = LogQueue(queue_size)
+    writer = BatchWriter(log_queue, stream, batch_size)
+    sampler = Sampler(sampling, rate_limits)
+    root = logging.getLogger()
+    root.handlers = [NonBlockingQueueHandler(log_queue)]
+    root.setLevel(level.upper())
+    structlog.configure(
+        processors=processors(sampler),
+        context_class=dict,
+        logger_factory=QueueLoggerFactory(log_queue),
+        wrapper_class=structlog.make_filtering_bound_logger(logging.getLevelName(level.upper())),
+        cache_logger_on_first_use=True,
+    )
+    writer.start()
+    atexit.register(writer.stop)
+    _pipeline = LogPipeline(log_queue, writer, sampler)
+    return _pipeline
+
+
+def get_log_pipeline() -> Optional[LogPipeline]:
+    return _pipeline
+
+
+def flush_logging():
+    if _pipeline is not None:
+        _pipeline.flush()
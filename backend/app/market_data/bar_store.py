@@ -0,0 +1,146 @@
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from app.database import Bar, BarHistory, SessionLocal
+from typing import Callable, Iterable, List, Mapping, Optional, Sequence, Tuple
+import threading
+
+# (open_time ms, open, high, low, close, volume)
+BarRow = Tuple[int, float, float, float, float, float]
+
+_COLUMNS = ("open", "high", "low", "close", "volume")
+
+
+def _upsert_statement(db: Session):
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        return None
+    statement = insert(Bar.__table__)
+    return statement.on_conflict_do_update(
+        index_elements=["symbol", "timeframe", "open_time"],
+        set_={column: getattr(statement.excluded, column) for column in _COLUMNS},
+    )
+
+
+class BarStore:
+    """Bulk writer/reader for the bars table"""
+
+    def __init__(self, session_factory: Callable[[], Session] = SessionLocal):
+        self.session_factory = session_factory
+        # SQLite allows a single writer; serializing here beats retrying on "database is locked"
+        self._write_lock = threading.Lock()
+
+    def upsert(self, symbol: str, timeframe: str, rows: Sequence[BarRow]) -> int:
+        """Insert or overwrite bars in one executemany; returns the number of rows written"""
+        return self.upsert_many(timeframe, {symbol: rows})
+
+    def upsert_many(self, timeframe: str, rows_by_symbol: Mapping[str, Sequence[BarRow]]) -> int:
+        """Write bars for several symbols in a single transaction"""
+        values = [
+            {
+                "symbol": symbol,
+                "timeframe": timeframe,
+                "open_time": int(row[0]),
+                "open": float(row[1]),
+                "high": float(row[2]),
+                "low": float(row[3]),
+                "close": float(row[4]),
+                "volume": float(row[5]),
+            }
+            for symbol, rows in rows_by_symbol.items()
+            for row in rows
+        ]
+        if not values:
+            return 0
+        with self._write_lock:
+            db = self.session_factory()
+            try:
+                statement = _upsert_statement(db)
+                if statement is not None:
+                    db.execute(statement, values)
+                else:
+                    for bar in values:
+                        existing = db.query(Bar).filter(
+                            Bar.symbol == bar["symbol"],
+                            Bar.timeframe == timeframe,
+                            Bar.open_time == bar["open_time"],
+                        ).first()
+                        if existing:
+                            for column in _COLUMNS:
+                                setattr(existing, column, bar[column])
+                        else:
+                            db.add(Bar(**bar))
+                db.commit()
+                return len(values)
+            finally:
+                db.close()
+
+    def coverage(self, symbol: str, timeframe: str) -> Tuple[Optional[int], Optional[int], int]:
+        """(first open time, last open time, bar count) currently stored"""
+        db = self.session_factory()
+        try:
+            first, last, count = db.query(
+                func.min(Bar.open_time), func.max(Bar.open_time), func.count(Bar.id)
+            ).filter(Bar.symbol == symbol, Bar.timeframe == timeframe).one()
+            return first, last, count
+        finally:
+            db.close()
+
+    def history_start(self, symbol: str, timeframe: str) -> Optional[int]:
+        """Open time of the earliest bar the exchange has, once a backfill has found it"""
+        db = self.session_factory()
+        try:
+            return db.query(BarHistory.first_open_time).filter(
+                BarHistory.symbol == symbol, BarHistory.timeframe == timeframe
+            ).scalar()
+        finally:
+            db.close()
+
+    def record_history_start(self, symbol: str, timeframe: str, open_time: int):
+        with self._write_lock:
+            db = self.session_factory()
+            try:
+                row = db.query(BarHistory).filter(
+                    BarHistory.symbol == symbol, BarHistory.timeframe == timeframe
+                ).first()
+                if row is None:
+                    db.add(BarHistory(symbol=symbol, timeframe=timeframe, first_open_time=int(open_time)))
+                else:
+                    row.first_open_time = int(open_time)
+                db.commit()
+            finally:
+                db.close()
+
+    def closes(self, symbols: Iterable[str], timeframe: str, start: int, end: int) -> List[Tuple[str, int, float]]:
+        """(symbol, open time, close) rows for several symbols in one query"""
+        db = self.session_factory()
+        try:
+            return db.query(Bar.symbol, Bar.open_time, Bar.close).filter(
+                Bar.symbol.in_(list(symbols)),
+                Bar.timeframe == timeframe,
+                Bar.open_time >= start,
+                Bar.open_time <= end,
+            ).order_by(Bar.open_time).all()
+        finally:
+            db.close()
+
+    def bars(self, symbols: Iterable[str], timeframe: str, start: int, end: int) -> List[tuple]:
+        """(symbol, open time, open, high, low, close, volume) rows ordered by time, then symbol"""
+        db = self.session_factory()
+        try:
+            return db.query(
+                Bar.symbol, Bar.open_time, Bar.open, Bar.high, Bar.low, Bar.close, Bar.volume
+            ).filter(
+                Bar.symbol.in_(list(symbols)),
+                Bar.timeframe == timeframe,
+                Bar.open_time >= start,
+                Bar.open_time <= end,
+            ).order_by(Bar.open_time, Bar.symbol).all()
+        finally:
+            db.close()
+
+
+bar_store = BarStore()
@@ -0,0 +1,220 @@
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from app.config import settings
+from app.engine.data import timeframe_ms
+from app.market_data.bar_store import BarRow, BarStore, bar_store
+from app.market_data.rate_limit import TokenBucket, kline_weight
+import asyncio
+import time
+import httpx
+import structlog
+
+logger = structlog.get_logger()
+
+MAINNET_URL = "https://api.binance.com"
+TESTNET_URL = "https://testnet.binance.vision"
+KLINE_PAGE_LIMIT = 1000
+
+
+class MarketDataError(Exception):
+    """Raised when the exchange cannot serve a request after retries"""
+
+
+def default_base_url() -> str:
+    if settings.BINANCE_BASE_URL:
+        return settings.BINANCE_BASE_URL
+    return TESTNET_URL if settings.BINANCE_TESTNET else MAINNET_URL
+
+
+def parse_kline(raw: List[Any]) -> BarRow:
+    return (int(raw[0]), float(raw[1]), float(raw[2]), float(raw[3]), float(raw[4]), float(raw[5]))
+
+
+class MarketDataClient:
+    """Async Binance REST client with a pooled session and weight-aware scheduling"""
+
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        weight_limit: Optional[int] = None,
+        max_connections: Optional[int] = None,
+        max_retries: int = 3,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        connections = max_connections or settings.MARKET_DATA_MAX_CONNECTIONS
+        headers = {"X-MBX-APIKEY": settings.BINANCE_API_KEY} if settings.BINANCE_API_KEY else {}
+        # One keep-alive pool shared by every request avoids a TLS handshake per page
+        self._http = httpx.AsyncClient(
+            base_url=base_url or default_base_url(),
+            headers=headers,
+            timeout=httpx.Timeout(10.0),
+            limits=httpx.Limits(max_connections=connections, max_keepalive_connections=connections),
+            transport=transport,
+        )
+        self.bucket = TokenBucket(weight_limit or settings.BINANCE_WEIGHT_LIMIT)
+        self.max_retries = max_retries
+        self.requests = 0
+        self.retries = 0
+        self.throttled = 0
+
+    async def close(self):
+        await self._http.aclose()
+
+    async def __aenter__(self) -> "MarketDataClient":
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def get(self, path: str, params: Optional[Dict[str, Any]] = None, weight: int = 1) -> Any:
+        for attempt in range(self.max_retries + 1):
+            await self.bucket.acquire(weight)
+            try:
+                response = await self._http.get(path, params=params)
+            except httpx.TransportError as e:
+                error = f"{type(e).__name__}: {e}"
+            else:
+                self.requests += 1
+                used = response.headers.get("X-MBX-USED-WEIGHT-1M")
+                if used is not None:
+                    self.bucket.sync_used_weight(float(used))
+                if response.status_code in (418, 429):
+                    # Rate limited (418 = IP ban); the exchange says when to come back
+                    self.throttled += 1
+                    self.bucket.block_for(float(response.headers.get("Retry-After", 1)))
+                    error = f"HTTP {response.status_code}"
+                elif response.status_code >= 500:
+                    error = f"HTTP {response.status_code}"
+                else:
+                    if response.status_code >= 400:
+                        raise MarketDataError(f"{path} failed with HTTP {response.status_code}: {response.text}")
+                    return response.json()
+            self.retries += 1
+            await asyncio.sleep(min(0.25 * 2 ** attempt, 5.0))
+        raise MarketDataError(f"{path} failed after {self.max_retries + 1} attempts ({error})")
+
+    async def klines(self, symbol: str, timeframe: str, start: Optional[int] = None,
+                     end: Optional[int] = None, limit: int = KLINE_PAGE_LIMIT) -> List[BarRow]:
+        """One page of closed klines"""
+        params: Dict[str, Any] = {"symbol": symbol, "interval": timeframe, "limit": limit}
+        if start is not None:
+            params["startTime"] = start
+        if end is not None:
+            params["endTime"] = end
+        raw = await self.get("/api/v3/klines", params, weight=kline_weight(limit))
+        now = int(time.time() * 1000)
+        # Drop the bar that is still forming
+        return [parse_kline(k) for k in raw if int(k[6]) < now]
+
+    async def fetch_range(self, symbol: str, timeframe: str, start: int, end: int,
+                          concurrency: int = 4) -> List[BarRow]:
+        """All klines in [start, end], fetching pages concurrently"""
+        pages = await self._fetch_pages(symbol, timeframe, start, end, asyncio.Semaphore(concurrency))
+        merged = {row[0]: row for page in pages for row in page}
+        return [merged[t] for t in sorted(merged)]
+
+    async def _fetch_pages(self, symbol: str, timeframe: str, start: int, end: int,
+                           semaphore: asyncio.Semaphore, on_page=None) -> List[List[BarRow]]:
+        # Page boundaries are known up front, so pages need not wait on each other
+        span = KLINE_PAGE_LIMIT * timeframe_ms(timeframe)
+
+        async def fetch(page_start: int) -> List[BarRow]:
+            async with semaphore:
+                rows = await self.klines(symbol, timeframe, page_start, min(page_start + span - 1, end))
+            if on_page is not None and rows:
+                await on_page(symbol, rows)
+            return rows
+
+        return await asyncio.gather(*[fetch(s) for s in range(start, end + 1, span)])
+
+    async def backfill(self, symbols: Iterable[str], timeframe: str, start: int, end: int,
+                       store: BarStore = bar_store, concurrency: int = 8) -> Dict[str, int]:
+        """Fetch many symbols concurrently, writing each page to the bar store as it lands"""
+        semaphore = asyncio.Semaphore(concurrency)
+        written: Dict[str, int] = {}
+
+        async def write(symbol: str, rows: List[BarRow]):
+            count = await asyncio.to_thread(store.upsert, symbol, timeframe, rows)
+            written[symbol] = written.get(symbol, 0) + count
+
+        started = time.perf_counter()
+        symbols = list(dict.fromkeys(symbols))
+        await asyncio.gather(*[
+            self._fetch_pages(symbol, timeframe, start, end, semaphore, on_page=write) for symbol in symbols
+        ])
+        logger.info(
+            "Backfill completed",
+            symbols=len(symbols),
+            timeframe=timeframe,
+            bars=sum(written.values()),
+            elapsed_seconds=round(time.perf_counter() - started, 3),
+            **self.stats()
+        )
+        return written
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "retries": self.retries,
+            "throttled": self.throttled,
+            "rate_limit_wait_seconds": round(self.bucket.waited_seconds, 3),
+        }
+
+
+async def ensure_history(client: MarketDataClient, symbols: Iterable[str], timeframe: str,
+                         start: int, end: int, store: BarStore = bar_store) -> Dict[str, int]:
+    """Backfill the head and tail of [start, end] that stored bars do not cover yet.
+
+    History before a symbol's earliest bar on the exchange (its listing) counts
+    as covered once a backfill has found it, so a symbol listed after `start`
+    is not fetched again on every call.
+    """
+    interval = timeframe_ms(timeframe)
+    ranges: Dict[Tuple[int, int], List[str]] = {}
+    heads: Dict[str, int] = {}
+    for symbol in dict.fromkeys(symbols):
+        first, last, _ = await asyncio.to_thread(store.coverage, symbol, timeframe)
+        listed = await asyncio.to_thread(store.history_start, symbol, timeframe)
+        head_start = max(start, listed) if listed is not None else start
+        if first is None:
+            ranges.setdefault((head_start, end), []).append(symbol)
+            heads[symbol] = head_start
+            continue
+        if first > head_start + interval:
+            ranges.setdefault((head_start, first - interval), []).append(symbol)
+            heads[symbol] = head_start
+        if last < end - 2 * interval:
+            ranges.setdefault((last + interval, end), []).append(symbol)
+    if not ranges:
+        return {}
+
+    written: Dict[str, int] = {}
+    for counts in await asyncio.gather(*[
+        client.backfill(missing, timeframe, range_start, range_end, store)
+        for (range_start, range_end), missing in ranges.items()
+    ]):
+        for symbol, count in counts.items():
+            written[symbol] = written.get(symbol, 0) + count
+    for symbol, head_start in heads.items():
+        first, _, _ = await asyncio.to_thread(store.coverage, symbol, timeframe)
+        if first is not None and first > head_start + interval:
+            # The exchange has nothing earlier: this is where the symbol's history starts
+            await asyncio.to_thread(store.record_history_start, symbol, timeframe, first)
+    return written
+
+
+_client: Optional[MarketDataClient] = None
+
+
+def get_market_data_client() -> MarketDataClient:
+    """Process-wide client so every caller shares one connection pool and weight budget"""
+    global _client
+    if _client is None:
+        _client = MarketDataClient()
+    return _client
+
+
+async def close_market_data_client():
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
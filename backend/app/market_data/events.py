@@ -0,0 +1,54 @@
+from typing import List, NamedTuple
+import asyncio
+
+
+class BarClose(NamedTuple):
+    """A kline that has closed on the exchange (or in a replay)"""
+    symbol: str
+    timeframe: str
+    open_time: int
+    open: float
+    high: float
+    low: float
+    close: float
+    volume: float
+
+
+class EventBus:
+    """Fan-out of bar-close events to any number of asyncio queue subscribers.
+
+    Publishing never blocks the ingestion loop: a subscriber whose queue is
+    full loses the event and the drop is counted.
+    """
+
+    def __init__(self):
+        self._subscribers: List[asyncio.Queue] = []
+        self.published = 0
+        self.dropped = 0
+
+    def subscribe(self, maxsize: int = 10_000) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(maxsize)
+        self._subscribers.append(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        if queue in self._subscribers:
+            self._subscribers.remove(queue)
+
+    def publish(self, event: BarClose):
+        self.published += 1
+        for queue in self._subscribers:
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                self.dropped += 1
+
+    def stats(self) -> dict:
+        return {
+            "subscribers": len(self._subscribers),
+            "published": self.published,
+            "dropped": self.dropped,
+        }
+
+
+bar_events = EventBus()
@@ -0,0 +1,83 @@
+from typing import Optional
+import asyncio
+import time
+
+
+class TokenBucket:
+    """Async token bucket sized in exchange request weight.
+
+    Binance meters REST usage as request weight per rolling minute and
+    reports what it has counted in the X-MBX-USED-WEIGHT-1M header. The
+    bucket refills continuously at capacity/period, and `sync_used_weight`
+    pulls the local estimate towards the server's count so several clients
+    sharing one API key do not overrun the limit together.
+    """
+
+    def __init__(self, capacity: float, period: float = 60.0):
+        self.capacity = capacity
+        self.rate = capacity / period
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.waited_seconds = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, weight: float = 1.0):
+        if weight > self.capacity:
+            raise ValueError(f"Request weight {weight} exceeds bucket capacity {self.capacity}")
+        # The lock makes waiters queue in FIFO order instead of racing for refills
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                delay = max(self.blocked_until - now, 0.0)
+                if not delay and self.tokens >= weight:
+                    self.tokens -= weight
+                    return
+                delay = delay or (weight - self.tokens) / self.rate
+                self.waited_seconds += delay
+                await asyncio.sleep(delay)
+
+    def try_acquire(self, weight: float = 1.0) -> float:
+        """Take `weight` without waiting: 0.0 when taken, otherwise the seconds until it would be"""
+        now = time.monotonic()
+        self._refill(now)
+        delay = max(self.blocked_until - now, 0.0)
+        if not delay and self.tokens >= weight and not self._lock.locked():
+            self.tokens -= weight
+            return 0.0
+        return max(delay, (weight - self.tokens) / self.rate, 1e-3)
+
+    def refund(self, weight: float):
+        """Give back tokens taken for work that never ran"""
+        self.tokens = min(self.capacity, self.tokens + weight)
+
+    def sync_used_weight(self, used: float):
+        """Lower the available tokens if the server has counted more usage than we have"""
+        self._refill(time.monotonic())
+        self.tokens = min(self.tokens, max(self.capacity - used, 0.0))
+
+    def block_for(self, seconds: float):
+        """Pause all acquisitions, e.g. after a 429 with Retry-After"""
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+    @property
+    def available(self) -> float:
+        self._refill(time.monotonic())
+        return self.tokens
+
+
+def kline_weight(limit: Optional[int]) -> int:
+    """Binance spot request weight for GET /api/v3/klines"""
+    limit = limit or 500
+    if limit < 100:
+        return 1
+    if limit < 500:
+        return 2
+    if limit <= 1000:
+        return 5
+    return 10
@@ -0,0 +1,118 @@
+"""Local WebSocket server that speaks the Binance combined-stream protocol.
+
+Emits closed klines (and trades) built from the stub exchange's synthetic
+prices, one bar every `bar_seconds` of wall time, so the ingestion pipeline
+can run without the network. Because both servers derive bars from the same
+deterministic series, gaps left by dropped connections can be backfilled
+from the REST stub:
+
+    python -m app.market_data.stub_exchange --port 8900
+    python -m app.market_data.replay_server --port 8901 --bar-seconds 0.5 --drop-every 200
+    BINANCE_BASE_URL=http://localhost:8900 BINANCE_WS_URL=ws://localhost:8901 \\
+        STREAM_SYMBOLS=BTCUSDT,ETHUSDT STREAM_TIMEFRAME=1m uvicorn main:app
+"""
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlsplit
+from app.engine.data import timeframe_ms
+from app.market_data.stub_exchange import DEFAULT_SYMBOLS, synthetic_klines
+import argparse
+import asyncio
+import json
+import time
+import websockets
+
+
+class ReplayExchange:
+    """Serves bar `index` once `index + 1` bar periods have elapsed since startup"""
+
+    def __init__(
+        self,
+        symbols: Optional[List[str]] = None,
+        timeframe: str = "1m",
+        start: Optional[int] = None,
+        bar_seconds: float = 1.0,
+        drop_every: Optional[int] = None,
+    ):
+        self.symbols = symbols or DEFAULT_SYMBOLS
+        self.timeframe = timeframe
+        self.step = timeframe_ms(timeframe)
+        if start is None:
+            start = int(time.time() * 1000) - 30 * 86_400_000
+        self.start = start // self.step * self.step
+        self.bar_seconds = bar_seconds
+        self.drop_every = drop_every
+        self.started = time.monotonic()
+        self.connections = 0
+        self.messages = 0
+
+    def current_index(self) -> int:
+        return int((time.monotonic() - self.started) / self.bar_seconds)
+
+    def _subscriptions(self, path: str) -> Dict[str, str]:
+        streams = parse_qs(urlsplit(path).query).get("streams", [""])[0]
+        subscribed = {}
+        for stream in filter(None, streams.split("/")):
+            symbol, _, kind = stream.partition("@")
+            if symbol.upper() in self.symbols and kind in (f"kline_{self.timeframe}", "trade"):
+                subscribed[stream] = symbol.upper()
+        return subscribed
+
+    def _message(self, stream: str, symbol: str, kline: list) -> str:
+        now = int(time.time() * 1000)
+        if stream.endswith("@trade"):
+            data = {"e": "trade", "E": now, "s": symbol, "t": self.messages, "p": kline[4],
+                    "q": "1.0", "T": kline[6]}
+        else:
+            data = {"e": "kline", "E": now, "s": symbol, "k": {
+                "t": kline[0], "T": kline[6], "s": symbol, "i": self.timeframe,
+                "o": kline[1], "h": kline[2], "l": kline[3], "c": kline[4], "v": kline[5],
+                "n": kline[8], "x": True,
+            }}
+        return json.dumps({"stream": stream, "data": data})
+
+    async def handler(self, websocket):
+        subscribed = self._subscriptions(websocket.path)
+        self.connections += 1
+        index = self.current_index()
+        sent = 0
+        while True:
+            # Bars close on the replay clock, like a live exchange
+            wait = self.started + (index + 1) * self.bar_seconds - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            open_time = self.start + index * self.step
+            for stream, symbol in subscribed.items():
+                kline = synthetic_klines(symbol, self.timeframe, open_time, open_time, 1)[0]
+                try:
+                    await websocket.send(self._message(stream, symbol, kline))
+                except websockets.ConnectionClosed:
+                    return
+                self.messages += 1
+                sent += 1
+                if self.drop_every and sent >= self.drop_every:
+                    await websocket.close()
+                    return
+            index += 1
+
+    def serve(self, host: str = "127.0.0.1", port: int = 8901):
+        """websockets server context; port 0 picks a free port"""
+        self.started = time.monotonic()
+        return websockets.serve(self.handler, host, port)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the local kline replay server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8901)
+    parser.add_argument("--timeframe", default="1m")
+    parser.add_argument("--bar-seconds", type=float, default=1.0, help="wall time per bar")
+    parser.add_argument("--drop-every", type=int, default=None, help="close connections after N messages")
+    args = parser.parse_args()
+
+    async def main():
+        exchange = ReplayExchange(timeframe=args.timeframe, bar_seconds=args.bar_seconds,
+                                  drop_every=args.drop_every)
+        async with exchange.serve(args.host, args.port):
+            await asyncio.Future()
+
+    asyncio.run(main())
@@ -0,0 +1,45 @@
+from typing import Optional
+from app.market_data.bar_store import BarRow
+import numpy as np
+
+
+class BarRingBuffer:
+    """Fixed-capacity window of the most recent closed bars for one stream.
+
+    Rows are (open_time, open, high, low, close, volume) in a preallocated
+    float64 array, so appends never allocate and the window stays contiguous
+    for vectorized reads. Open times in epoch ms fit exactly in a float64.
+    """
+
+    def __init__(self, capacity: int):
+        if capacity < 1:
+            raise ValueError("Ring buffer capacity must be positive")
+        self.capacity = capacity
+        self._data = np.zeros((capacity, 6))
+        self._next = 0
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def last_open_time(self) -> Optional[int]:
+        if not self._size:
+            return None
+        return int(self._data[(self._next - 1) % self.capacity, 0])
+
+    def append(self, row: BarRow):
+        self._data[self._next] = row
+        self._next = (self._next + 1) % self.capacity
+        self._size = min(self._size + 1, self.capacity)
+
+    def array(self, n: Optional[int] = None) -> np.ndarray:
+        """The last n bars (default all) as a chronological (n, 6) copy"""
+        n = self._size if n is None else min(n, self._size)
+        start = (self._next - n) % self.capacity
+        if start + n <= self.capacity:
+            return self._data[start:start + n].copy()
+        return np.concatenate((self._data[start:], self._data[:self._next]))
+
+    def closes(self, n: Optional[int] = None) -> np.ndarray:
+        return self.array(n)[:, 4]
@@ -0,0 +1,251 @@
+"""Live kline ingestion from exchange WebSocket streams.
+
+One connection carries the combined kline (and optionally trade) streams for
+a group of symbols. Closed bars go into per-symbol ring buffers, are
+published on the bar-close event bus, and are flushed to the bar store in
+bulk on a timer. A bar that arrives more than one interval after the
+previous one (typically after a reconnect) triggers a REST backfill of the
+gap before it is ingested, so consumers always see a contiguous series.
+"""
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from app.config import settings
+from app.engine.data import timeframe_ms
+from app.market_data.bar_store import BarRow, BarStore, bar_store
+from app.market_data.client import MarketDataClient, MarketDataError, get_market_data_client
+from app.market_data.events import BarClose, EventBus, bar_events
+from app.market_data.ring_buffer import BarRingBuffer
+import asyncio
+import json
+import time
+import structlog
+import websockets
+
+logger = structlog.get_logger()
+
+MAINNET_WS_URL = "wss://stream.binance.com:9443"
+TESTNET_WS_URL = "wss://testnet.binance.vision"
+# Binance allows 1024 streams per connection; smaller groups keep reconnects cheap
+STREAMS_PER_CONNECTION = 200
+
+
+def default_ws_url() -> str:
+    if settings.BINANCE_WS_URL:
+        return settings.BINANCE_WS_URL
+    return TESTNET_WS_URL if settings.BINANCE_TESTNET else MAINNET_WS_URL
+
+
+class StreamMetrics:
+    """Message count and exchange-event-to-receipt lag for one stream"""
+
+    def __init__(self):
+        self.messages = 0
+        self.last_event_time: Optional[int] = None
+        self.lag_ms = 0.0
+        self.lag_ms_avg = 0.0
+        self.lag_ms_max = 0.0
+
+    def record(self, event_time: int, received: float):
+        lag = max(received - event_time, 0.0)
+        self.messages += 1
+        self.last_event_time = event_time
+        self.lag_ms = lag
+        # Exponentially weighted so a single stall does not dominate forever
+        self.lag_ms_avg = lag if self.messages == 1 else 0.9 * self.lag_ms_avg + 0.1 * lag
+        self.lag_ms_max = max(self.lag_ms_max, lag)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "messages": self.messages,
+            "last_event_time": self.last_event_time,
+            "lag_ms": round(self.lag_ms, 1),
+            "lag_ms_avg": round(self.lag_ms_avg, 1),
+            "lag_ms_max": round(self.lag_ms_max, 1),
+        }
+
+
+class KlineStreamService:
+    """Subscribes to kline streams for a symbol universe and feeds the bar pipeline"""
+
+    def __init__(
+        self,
+        symbols: Iterable[str],
+        timeframe: str,
+        ws_url: Optional[str] = None,
+        client: Optional[MarketDataClient] = None,
+        store: BarStore = bar_store,
+        bus: EventBus = bar_events,
+        include_trades: bool = False,
+        buffer_bars: int = 1000,
+        flush_seconds: float = 2.0,
+        warmup_bars: int = 0,
+    ):
+        self.symbols = [s.upper() for s in dict.fromkeys(symbols)]
+        self.timeframe = timeframe
+        self.interval = timeframe_ms(timeframe)
+        self.ws_url = (ws_url or default_ws_url()).rstrip("/")
+        self.client = client
+        self.store = store
+        self.bus = bus
+        self.include_trades = include_trades
+        self.flush_seconds = flush_seconds
+        self.warmup_bars = min(warmup_bars, buffer_bars)
+        self.buffers = {symbol: BarRingBuffer(buffer_bars) for symbol in self.symbols}
+        self.last_trade: Dict[str, Tuple[float, int]] = {}
+        self.metrics: Dict[str, StreamMetrics] = {}
+        self.reconnects = 0
+        self.bars_received = 0
+        self.bars_backfilled = 0
+        self.bars_flushed = 0
+        self.gaps_unfilled = 0
+        self.messages_failed = 0
+        self._pending: Dict[str, List[BarRow]] = {}
+        self._stopping = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+
+    def stream_names(self) -> List[str]:
+        names = []
+        for symbol in self.symbols:
+            names.append(f"{symbol.lower()}@kline_{self.timeframe}")
+            if self.include_trades:
+                names.append(f"{symbol.lower()}@trade")
+        return names
+
+    def connection_urls(self) -> List[str]:
+        names = self.stream_names()
+        return [
+            f"{self.ws_url}/stream?streams=" + "/".join(names[i:i + STREAMS_PER_CONNECTION])
+            for i in range(0, len(names), STREAMS_PER_CONNECTION)
+        ]
+
+    async def start(self):
+        self._stopping.clear()
+        self._tasks = [asyncio.create_task(self._consume(url)) for url in self.connection_urls()]
+        self._tasks.append(asyncio.create_task(self._flush_loop()))
+        logger.info("Kline ingestion started", symbols=len(self.symbols), timeframe=self.timeframe,
+                    connections=len(self._tasks) - 1)
+
+    async def stop(self):
+        self._stopping.set()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        await self.flush()
+        logger.info("Kline ingestion stopped", **self.stats(streams=False))
+
+    async def _consume(self, url: str):
+        backoff = 0.5
+        while not self._stopping.is_set():
+            try:
+                async with websockets.connect(url, ping_interval=20, ping_timeout=20, max_size=2 ** 22) as ws:
+                    logger.info("Market data stream connected", url=url[:120])
+                    async for message in ws:
+                        backoff = 0.5
+                        try:
+                            await self.handle_message(message)
+                        except Exception as e:
+                            # A malformed frame, a failing subscriber or backfill must not end the stream
+                            self.messages_failed += 1
+                            logger.error("Market data message failed", error=f"{type(e).__name__}: {e}",
+                                         message=str(message)[:200])
+            except (websockets.WebSocketException, OSError, asyncio.TimeoutError) as e:
+                logger.warning("Market data stream disconnected", error=f"{type(e).__name__}: {e}")
+            except Exception as e:
+                logger.error("Market data stream failed", url=url[:120], error=f"{type(e).__name__}: {e}")
+            if self._stopping.is_set():
+                break
+            self.reconnects += 1
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 30.0)
+
+    async def handle_message(self, message):
+        received = time.time() * 1000
+        payload = json.loads(message)
+        data = payload.get("data", payload)
+        stream = payload.get("stream") or f"{data.get('s', '').lower()}@{data.get('e')}"
+        metrics = self.metrics.get(stream)
+        if metrics is None:
+            metrics = self.metrics[stream] = StreamMetrics()
+        metrics.record(int(data.get("E", received)), received)
+
+        if data.get("e") == "kline":
+            kline = data["k"]
+            if not kline["x"]:
+                return  # the bar is still forming
+            row = (int(kline["t"]), float(kline["o"]), float(kline["h"]), float(kline["l"]),
+                   float(kline["c"]), float(kline["v"]))
+            await self._on_closed_bar(data["s"], row)
+        elif data.get("e") == "trade":
+            self.last_trade[data["s"]] = (float(data["p"]), int(data["T"]))
+
+    async def _on_closed_bar(self, symbol: str, row: BarRow):
+        buffer = self.buffers.get(symbol)
+        if buffer is None:
+            return
+        last = buffer.last_open_time
+        if last is not None and row[0] <= last:
+            return  # replayed after a reconnect
+        if last is None and self.warmup_bars:
+            await self._backfill(symbol, row[0] - self.warmup_bars * self.interval, row[0] - self.interval)
+        elif last is not None and row[0] > last + self.interval:
+            await self._backfill(symbol, last + self.interval, row[0] - self.interval)
+        self._ingest(symbol, row)
+
+    async def _backfill(self, symbol: str, start: int, end: int):
+        client = self.client or get_market_data_client()
+        try:
+            rows = await client.fetch_range(symbol, self.timeframe, start, end)
+        except MarketDataError as e:
+            self.gaps_unfilled += 1
+            logger.warning("Stream gap backfill failed", symbol=symbol, start=start, end=end, error=str(e))
+            return
+        last = self.buffers[symbol].last_open_time
+        for row in rows:
+            if last is None or row[0] > last:
+                self._ingest(symbol, row)
+                self.bars_backfilled += 1
+        logger.info("Stream gap backfilled", symbol=symbol, bars=len(rows), start=start, end=end)
+
+    def _ingest(self, symbol: str, row: BarRow):
+        self.buffers[symbol].append(row)
+        self._pending.setdefault(symbol, []).append(row)
+        self.bars_received += 1
+        self.bus.publish(BarClose(symbol, self.timeframe, *row))
+
+    async def flush(self) -> int:
+        """Write buffered bars to the store in one transaction"""
+        if not self._pending:
+            return 0
+        pending, self._pending = self._pending, {}
+        try:
+            count = await asyncio.to_thread(self.store.upsert_many, self.timeframe, pending)
+        except Exception as e:
+            # Keep the bars for the next attempt rather than losing them
+            for symbol, rows in pending.items():
+                self._pending[symbol] = rows + self._pending.get(symbol, [])
+            logger.error("Bar flush failed", error=str(e))
+            return 0
+        self.bars_flushed += count
+        return count
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_seconds)
+            await self.flush()
+
+    def stats(self, streams: bool = True) -> Dict[str, Any]:
+        stats = {
+            "symbols": len(self.symbols),
+            "timeframe": self.timeframe,
+            "reconnects": self.reconnects,
+            "bars_received": self.bars_received,
+            "bars_backfilled": self.bars_backfilled,
+            "bars_flushed": self.bars_flushed,
+            "bars_pending": sum(len(rows) for rows in self._pending.values()),
+            "gaps_unfilled": self.gaps_unfilled,
+            "messages_failed": self.messages_failed,
+            "events": self.bus.stats(),
+        }
+        if streams:
+            stats["streams"] = {name: metrics.to_dict() for name, metrics in self.metrics.items()}
+        return stats
@@ -0,0 +1,160 @@
+"""Local stand-in for the Binance REST market-data API.
+
+Serves deterministic synthetic klines and enforces a per-minute request
+weight budget with the same headers and 429/Retry-After behaviour as the
+real exchange, so throughput and rate limiting can be exercised offline:
+
+    python -m app.market_data.stub_exchange --port 8900
+    BINANCE_BASE_URL=http://localhost:8900 uvicorn main:app
+
+Tests can skip the socket entirely with httpx.ASGITransport(app=create_stub_exchange()).
+"""
+from fastapi import FastAPI, Query
+from fastapi.responses import JSONResponse
+from typing import Dict, List, Optional
+from app.engine.data import TIMEFRAME_MINUTES, timeframe_ms
+from app.market_data.rate_limit import kline_weight
+import argparse
+import asyncio
+import time
+import zlib
+import numpy as np
+
+DEFAULT_SYMBOLS = ["BTCUSDT", "ETHUSDT", "BNBUSDT", "SOLUSDT", "XRPUSDT", "ADAUSDT", "DOGEUSDT", "AVAXUSDT"]
+
+
+def _uniform(seed: int, index: np.ndarray) -> np.ndarray:
+    """Stateless hash of (seed, bar index) to [0, 1), so any range is reproducible"""
+    x = index.astype(np.uint64) * np.uint64(0x9E3779B97F4A7C15) + np.uint64(seed)
+    x ^= x >> np.uint64(30)
+    x *= np.uint64(0xBF58476D1CE4E5B9)
+    x ^= x >> np.uint64(27)
+    x *= np.uint64(0x94D049BB133111EB)
+    x ^= x >> np.uint64(31)
+    return (x >> np.uint64(11)).astype(np.float64) / float(1 << 53)
+
+
+def synthetic_klines(symbol: str, interval: str, start: int, end: int, limit: int) -> List[list]:
+    """Klines whose log prices share a market factor plus a symbol-specific cycle"""
+    step = timeframe_ms(interval)
+    first = -(-start // step) * step
+    times = np.arange(first, end + 1, step, dtype=np.int64)[:limit]
+    if not len(times):
+        return []
+    seed = zlib.crc32(symbol.encode())
+    k = times // 60_000  # minute index keeps prices consistent across intervals
+    phase = (seed % 1000) / 1000 * 2 * np.pi
+    beta = 0.8 + (seed % 400) / 1000
+    market = 0.20 * np.sin(2 * np.pi * k / 43_200) + 0.08 * np.sin(2 * np.pi * k / 9_000 + 1.3)
+    own = 0.05 * np.sin(2 * np.pi * k / (5_000 + seed % 3_000) + phase)
+    noise = (_uniform(seed, k) - 0.5) * 0.0005 * np.sqrt(TIMEFRAME_MINUTES[interval])
+    base = 10 ** (1 + seed % 4)
+    close = base * np.exp(beta * market + own + noise)
+    open_ = base * np.exp(beta * market + own + (_uniform(seed + 1, k) - 0.5) * 0.004)
+    high = np.maximum(open_, close) * (1 + _uniform(seed + 2, k) * 0.003)
+    low = np.minimum(open_, close) * (1 - _uniform(seed + 3, k) * 0.003)
+    volume = 100 + _uniform(seed + 4, k) * 1000
+    return [
+        [int(t), f"{o:.8f}", f"{h:.8f}", f"{l:.8f}", f"{c:.8f}", f"{v:.4f}", int(t + step - 1),
+         f"{v * c:.4f}", 100, f"{v / 2:.4f}", f"{v * c / 2:.4f}", "0"]
+        for t, o, h, l, c, v in zip(times, open_, high, low, close, volume)
+    ]
+
+
+class WeightMeter:
+    """Fixed one-minute window of used weight, like X-MBX-USED-WEIGHT-1M"""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.window = 0
+        self.used = 0
+        self.requests = 0
+        self.rejected = 0
+
+    def charge(self, weight: int) -> Optional[float]:
+        """Record a request; returns seconds to wait if it exceeds the budget"""
+        now = time.time()
+        window = int(now // 60)
+        if window != self.window:
+            self.window, self.used = window, 0
+        self.requests += 1
+        if self.used + weight > self.limit:
+            self.rejected += 1
+            return (window + 1) * 60 - now
+        self.used += weight
+        return None
+
+
+def create_stub_exchange(weight_limit: int = 1200, latency: float = 0.0,
+                         symbols: Optional[List[str]] = None, listings: Optional[Dict[str, int]] = None) -> FastAPI:
+    """`listings` maps symbols to their listing time (ms); they have no klines before it"""
+    app = FastAPI(title="Stub exchange")
+    meter = WeightMeter(weight_limit)
+    listed = symbols or DEFAULT_SYMBOLS
+
+    async def respond(weight: int, body) -> JSONResponse:
+        if latency:
+            await asyncio.sleep(latency)
+        retry_after = meter.charge(weight)
+        headers = {"X-MBX-USED-WEIGHT-1M": str(meter.used)}
+        if retry_after is not None:
+            headers["Retry-After"] = str(max(1, int(np.ceil(retry_after))))
+            return JSONResponse({"code": -1003, "msg": "Too many requests"}, status_code=429, headers=headers)
+        return JSONResponse(body, headers=headers)
+
+    @app.get("/api/v3/ping")
+    async def ping():
+        return await respond(1, {})
+
+    @app.get("/api/v3/time")
+    async def server_time():
+        return await respond(1, {"serverTime": int(time.time() * 1000)})
+
+    @app.get("/api/v3/exchangeInfo")
+    async def exchange_info():
+        return await respond(20, {
+            "timezone": "UTC",
+            "rateLimits": [{"rateLimitType": "REQUEST_WEIGHT", "interval": "MINUTE", "intervalNum": 1,
+                            "limit": weight_limit}],
+            "symbols": [{"symbol": s, "status": "TRADING", "quoteAsset": "USDT"} for s in listed],
+        })
+
+    @app.get("/api/v3/klines")
+    async def klines(
+        symbol: str,
+        interval: str,
+        startTime: Optional[int] = None,
+        endTime: Optional[int] = None,
+        limit: int = Query(500, ge=1, le=1000),
+    ):
+        if symbol not in listed or interval not in TIMEFRAME_MINUTES:
+            return JSONResponse({"code": -1121, "msg": "Invalid symbol."}, status_code=400)
+        step = timeframe_ms(interval)
+        now = int(time.time() * 1000)
+        end = min(endTime, now) if endTime is not None else now
+        start = startTime if startTime is not None else end - (limit - 1) * step
+        start = max(start, (listings or {}).get(symbol, start))
+        return await respond(kline_weight(limit), synthetic_klines(symbol, interval, start, end, limit))
+
+    @app.get("/stub/stats")
+    async def stats():
+        return {
+            "requests": meter.requests,
+            "rejected": meter.rejected,
+            "used_weight": meter.used,
+            "weight_limit": meter.limit,
+        }
+
+    return app
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Run the local stub exchange")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--weight-limit", type=int, default=1200)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    args = parser.parse_args()
+    uvicorn.run(create_stub_exchange(args.weight_limit, args.latency), host=args.host, port=args.port)
@@ -0,0 +1,68 @@
+"""Keyset (cursor) pagination for history listings.
+
+Listings are ordered newest first by (timestamp, id). A page ends with an
+opaque cursor encoding the last row's key, and the next page continues
+strictly after it with a row-value comparison, so each page is a range scan
+of a (filter..., timestamp, id) index instead of an OFFSET over a sort of
+the whole table. Rows inserted while paging never shift or repeat a page.
+
+Listings that predate paging keep their bare-list body and advertise the
+next page in headers instead (`link_next_page`); newer ones return
+{"items", "next_cursor"}.
+"""
+from typing import Any, List, Optional, Tuple
+from fastapi import Request, Response
+from sqlalchemy import tuple_
+import base64
+import datetime
+import json
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+def encode_cursor(timestamp: datetime.datetime, row_id: int) -> str:
+    raw = json.dumps([timestamp.isoformat(), row_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime.datetime, int]:
+    """Inverse of encode_cursor; raises ValueError for anything it did not produce"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        timestamp, row_id = json.loads(raw)
+        return datetime.datetime.fromisoformat(timestamp), int(row_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def check_page(cursor: Optional[str], limit: int) -> Optional[Tuple[datetime.datetime, int]]:
+    """Validate listing parameters; returns the decoded cursor"""
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+    return decode_cursor(cursor) if cursor else None
+
+
+def paginate(query, time_column, id_column, after: Optional[Tuple[datetime.datetime, int]], limit: int,
+             since: Optional[datetime.datetime] = None,
+             until: Optional[datetime.datetime] = None) -> Tuple[List[Any], Optional[str]]:
+    """One page of `query` newest first, after the `after` key; returns (rows, next_cursor)"""
+    if since is not None:
+        query = query.filter(time_column >= since)
+    if until is not None:
+        query = query.filter(time_column < until)
+    if after is not None:
+        query = query.filter(tuple_(time_column, id_column) < tuple_(*after))
+    rows = query.order_by(time_column.desc(), id_column.desc()).limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(getattr(last, time_column.key), getattr(last, id_column.key))
+
+
+def link_next_page(request: Request, response: Response, next_cursor: Optional[str]):
+    """Next page as a Link (rel="next") URL and an X-Next-Cursor header; nothing on the last page"""
+    if next_cursor is not None:
+        response.headers["Link"] = f'<{request.url.include_query_params(cursor=next_cursor)}>; rel="next"'
+        response.headers["X-Next-Cursor"] = next_cursor
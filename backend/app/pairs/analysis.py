@@ -0,0 +1,103 @@
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+from app.pairs.backtest import all_pairs, latest_spread
+from app.pairs.kalman import kalman_spread
+import numpy as np
+
+# Hedge ratio / spread models: full-window OLS, trailing-window OLS, Kalman filter
+SPREAD_METHODS = ("static", "rolling", "kalman")
+
+
+def align_closes(rows: Sequence[Tuple[str, int, float]], symbols: List[str],
+                 initial: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """Pivot (symbol, open time, close) rows into a (bars, symbols) price matrix.
+
+    Bars missing for a symbol are forward-filled, starting from `initial`
+    (the closes just before the first row) when given; leading bars before
+    every symbol has a price are dropped.
+    """
+    column = {symbol: i for i, symbol in enumerate(symbols)}
+    times = np.array(sorted({row[1] for row in rows}), dtype=np.int64)
+    prices = np.full((len(times), len(symbols)), np.nan)
+    if not len(times):
+        return times, prices
+    index = np.searchsorted(times, [row[1] for row in rows])
+    cols = [column[row[0]] for row in rows]
+    prices[index, cols] = [row[2] for row in rows]
+    if initial is not None:
+        prices[0] = np.where(np.isnan(prices[0]), initial, prices[0])
+
+    valid = ~np.isnan(prices)
+    fill = np.where(valid, np.arange(len(times))[:, None], 0)
+    np.maximum.accumulate(fill, axis=0, out=fill)
+    prices = np.take_along_axis(prices, fill, axis=0)
+    complete = ~np.isnan(prices).any(axis=1)
+    first = int(np.argmax(complete)) if complete.any() else len(times)
+    return times[first:], prices[first:]
+
+
+def pair_statistics(prices: np.ndarray) -> Dict[str, np.ndarray]:
+    """Correlation, hedge ratio and latest spread z-score for every symbol pair at once.
+
+    With log prices p, the spread of pair (i, j) is p_i - beta_ij * p_j where
+    beta_ij is the OLS slope of p_i on p_j. Its mean and variance follow from
+    the covariance matrix, so all N x N pairs come out of a few matrix ops.
+    Returned arrays are (symbols, symbols); only i != j entries are meaningful.
+    """
+    log_prices = np.log(prices)
+    returns = np.diff(log_prices, axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        correlation = np.corrcoef(returns, rowvar=False)
+        cov = np.cov(log_prices, rowvar=False)
+        variance = np.diag(cov)
+        beta = cov / variance[None, :]
+        spread_var = variance[:, None] - cov ** 2 / variance[None, :]
+        mean = log_prices.mean(axis=0)
+        latest = log_prices[-1]
+        spread = (latest[:, None] - mean[:, None]) - beta * (latest[None, :] - mean[None, :])
+        zscore = spread / np.sqrt(np.maximum(spread_var, 0.0))
+    return {
+        "correlation": np.nan_to_num(correlation),
+        "hedge_ratio": np.nan_to_num(beta),
+        "zscore": np.nan_to_num(zscore, posinf=0.0, neginf=0.0),
+    }
+
+
+def spread_statistics(prices: np.ndarray, method: str = "static", lookback: int = 100,
+                      pairs: Optional[Tuple[np.ndarray, np.ndarray]] = None) -> Dict[str, np.ndarray]:
+    """pair_statistics with the hedge ratio and latest z-score taken from `method`.
+
+    "static" fits one OLS hedge ratio over the whole window, "rolling" over
+    the trailing `lookback` bars (as the backtester does) and "kalman" lets
+    it drift bar by bar. Only the (left, right) entries of `pairs` (default:
+    every i < j) are replaced.
+    """
+    if method not in SPREAD_METHODS:
+        raise ValueError(f"Unknown spread method '{method}'. Use one of: {', '.join(SPREAD_METHODS)}")
+    stats = pair_statistics(prices)
+    if method == "static":
+        return stats
+    left, right = pairs if pairs is not None else all_pairs(prices.shape[1])
+    if not len(left):
+        return stats
+    if method == "rolling":
+        spread = latest_spread(prices, left, right, lookback)
+    else:
+        history = kalman_spread(np.log(prices.T), left, right)
+        spread = {key: np.nan_to_num(values[:, -1]) for key, values in history.items()}
+    for key in ("hedge_ratio", "zscore"):
+        stats[key][left, right] = spread[key]
+    return stats
+
+
+def classify_signals(zscore: np.ndarray, threshold: Union[float, np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+    """Signal and strength labels for an array of spread z-scores.
+
+    A spread above +threshold means the first leg is rich, so the second is
+    bought ("long_pair2"); below -threshold the first leg is bought. Strength
+    is "strong" beyond 1.5x the threshold, "medium" beyond it, else "weak".
+    """
+    zscore = np.asarray(zscore, dtype=np.float64)
+    signal = np.select([zscore > threshold, zscore < -threshold], ["long_pair2", "long_pair1"], "neutral")
+    magnitude = np.abs(zscore)
+    strength = np.select([magnitude > threshold * 1.5, magnitude > threshold], ["strong", "medium"], "weak")
+    return signal, strength
@@ -0,0 +1,282 @@
+"""Vectorized z-score pairs backtester.
+
+Every column of the simulation is one (pair, parameter set) combination, so
+a whole universe of pairs - or a whole swarm of candidate thresholds per
+pair - is evaluated as (columns, bars) array operations:
+
+* rolling OLS hedge ratio and spread z-score from windowed sums of log
+  prices (each column may use its own lookback),
+* position state from entry/exit/stop bands with forward-filled events,
+* spread returns with the hedge ratio fixed at entry, fees and slippage
+  charged on every change in position.
+
+Columns are processed in chunks to bound memory on large universes.
+"""
+from typing import Dict, List, Optional, Tuple, Union
+from app.engine.backtest import evaluate_returns
+import numpy as np
+
+ArrayLike = Union[float, int, np.ndarray]
+
+# Elements per (columns, bars) work array; ~8 MB each
+_CHUNK_ELEMENTS = 1_000_000
+
+
+def all_pairs(n: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Indices (left, right) of every unordered symbol pair"""
+    return np.triu_indices(n, 1)
+
+
+def _ffill(events: np.ndarray) -> np.ndarray:
+    """Carry the last non-NaN value forward along each row; leading NaNs become 0"""
+    valid = ~np.isnan(events)
+    index = np.where(valid, np.arange(events.shape[1]), 0)
+    np.maximum.accumulate(index, axis=1, out=index)
+    filled = np.take_along_axis(events, index, axis=1)
+    return np.nan_to_num(filled, nan=0.0)
+
+
+def _cumulative(values: np.ndarray) -> np.ndarray:
+    """(rows, T + 1) running sums with a leading zero column"""
+    out = np.zeros((values.shape[0], values.shape[1] + 1))
+    np.cumsum(values, axis=1, out=out[:, 1:])
+    return out
+
+
+def _window_sums(cumulative: np.ndarray, lookback: np.ndarray) -> np.ndarray:
+    """Trailing sums over `lookback` bars (inclusive) from (C, T + 1) cumulative sums.
+
+    Bars before the first full window hold garbage and must be masked by the caller.
+    """
+    bars = cumulative.shape[1] - 1
+    if (lookback == lookback[0]).all():
+        # Common case: one lookback for the whole chunk, so plain slices suffice
+        n = int(lookback[0])
+        sums = np.zeros((len(cumulative), bars))
+        sums[:, n - 1:] = cumulative[:, n:] - cumulative[:, :bars + 1 - n]
+        return sums
+    start = np.maximum(np.arange(1, bars + 1)[None, :] - lookback[:, None], 0)
+    return cumulative[:, 1:] - np.take_along_axis(cumulative, start, axis=1)
+
+
+class SymbolMoments:
+    """Per-symbol cumulative sums and windowed mean/variance of log prices.
+
+    Means and variances depend only on the symbol and lookback, so a universe
+    backtest computes them once per lookback instead of once per pair.
+    """
+
+    def __init__(self, log_prices: np.ndarray):
+        self.log_prices = log_prices
+        self.c1 = _cumulative(log_prices)
+        self.c2 = _cumulative(log_prices ** 2)
+        self._cache: Dict[int, Tuple[np.ndarray, np.ndarray]] = {}
+
+    def window(self, lookback: int) -> Tuple[np.ndarray, np.ndarray]:
+        if lookback not in self._cache:
+            n = np.full(1, lookback)
+            mean = _window_sums(self.c1, n) / lookback
+            var = (_window_sums(self.c2, n) - mean * mean * lookback) / (lookback - 1)
+            self._cache[lookback] = (mean, var)
+        return self._cache[lookback]
+
+    def gather(self, rows: np.ndarray, lookback: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """(C, T) mean and variance for symbol rows[c] over lookback[c] bars"""
+        if (lookback == lookback[0]).all():
+            mean, var = self.window(int(lookback[0]))
+            return mean[rows], var[rows]
+        n = lookback[:, None].astype(np.float64)
+        mean = _window_sums(self.c1[rows], lookback) / n
+        var = (_window_sums(self.c2[rows], lookback) - mean * mean * n) / (n - 1)
+        return mean, var
+
+
+def rolling_spread(log_prices: np.ndarray, left: np.ndarray, right: np.ndarray, lookback: np.ndarray,
+                   moments: Optional[SymbolMoments] = None) -> Dict[str, np.ndarray]:
+    """Rolling OLS hedge ratio and spread z-score of log_prices[left] on log_prices[right].
+
+    `log_prices` is (symbols, T); the result is (C, T) for C = len(left).
+    Statistics at bar t use bars t - lookback + 1 .. t, so a z-score never
+    looks ahead. Bars without a full window (or with a degenerate spread)
+    get NaN.
+    """
+    lookback = np.asarray(lookback, dtype=np.int64)
+    moments = moments or SymbolMoments(log_prices)
+    mx, vx = moments.gather(left, lookback)
+    my, vy = moments.gather(right, lookback)
+    x, y = log_prices[left], log_prices[right]
+    n = lookback[:, None].astype(np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cov = (_window_sums(_cumulative(x * y), lookback) - mx * my * n) / (n - 1)
+        beta = cov / vy
+        spread_var = vx - cov * beta
+        zscore = ((x - mx) - beta * (y - my)) / np.sqrt(spread_var)
+    ok = (np.arange(x.shape[1])[None, :] >= lookback[:, None] - 1) & (vy > 0) & (spread_var > 1e-14)
+    return {
+        "hedge_ratio": np.where(ok, beta, np.nan),
+        "zscore": np.where(ok, zscore, np.nan),
+    }
+
+
+def positions_from_zscore(zscore: np.ndarray, entry: np.ndarray, exit: np.ndarray,
+                          stop: Optional[np.ndarray] = None) -> np.ndarray:
+    """Spread position (+1 long, -1 short, 0 flat) after each bar's close.
+
+    Flat enters long below -entry and short above +entry; a long closes once
+    z >= -exit and a short once z <= exit; |z| >= stop forces flat until the
+    spread re-enters the (entry, stop) band. All thresholds are (C, 1).
+    """
+    events = np.full(zscore.shape, np.nan)
+    if stop is None:
+        stop = np.full_like(entry, np.inf)
+    magnitude = np.abs(zscore)
+    events[(zscore < -entry) & (magnitude < stop)] = 1.0
+    events[(zscore > entry) & (magnitude < stop)] = -1.0
+    events[(magnitude <= exit) | (magnitude >= stop) | np.isnan(zscore)] = 0.0
+    state = _ffill(events)
+
+    # A held side also closes when z passes through the far exit band without
+    # landing inside it; marking those bars flat and refilling once is enough,
+    # because the fill only changes after the first such bar of each holding.
+    undecided = np.isnan(events)
+    events[undecided & (state > 0) & (zscore > exit)] = 0.0
+    events[undecided & (state < 0) & (zscore < -exit)] = 0.0
+    return _ffill(events)
+
+
+def _as_column(value: ArrayLike, columns: int) -> np.ndarray:
+    return np.broadcast_to(np.asarray(value, dtype=np.float64), (columns,)).reshape(columns, 1)
+
+
+def _backtest_chunk(log_prices, moments, returns, left, right, lookback, entry, exit, stop, cost, annualization):
+    spread = rolling_spread(log_prices, left, right, lookback, moments)
+    positions = positions_from_zscore(spread["zscore"], entry, exit, stop)
+
+    held = np.zeros_like(positions)
+    held[:, 1:] = positions[:, :-1]
+    changed = positions != held
+    # The hedge ratio is fixed when a position is opened, not rebalanced every bar
+    beta_at_entry = _ffill(np.where(changed & (positions != 0), np.nan_to_num(spread["hedge_ratio"]), np.nan))
+    beta = np.zeros_like(beta_at_entry)
+    beta[:, 1:] = beta_at_entry[:, :-1]
+
+    turnover = np.abs(positions - held)
+    gross = held * (returns[left] - beta * returns[right]) / (1.0 + np.abs(beta))
+    pnl = gross - cost * turnover
+
+    metrics = evaluate_returns(pnl, annualization)
+    opened = changed & (positions != 0)
+    trades = opened.sum(axis=1)
+    # Per-trade PnL for every column at once: offset trade ids by column
+    trade_id = np.zeros(positions.shape, dtype=np.int64)
+    trade_id[:, 1:] = np.cumsum(opened, axis=1)[:, :-1]
+    width = positions.shape[1] + 1
+    in_trade = held != 0
+    ids = (trade_id + np.arange(len(positions))[:, None] * width)[in_trade]
+    trade_pnl = np.bincount(ids, weights=pnl[in_trade], minlength=len(positions) * width).reshape(-1, width)
+    wins = (trade_pnl[:, 1:] > 0).sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        metrics["win_rate"] = np.where(trades > 0, wins / trades, 0.0)
+    metrics["trades"] = trades.astype(np.float64)
+    metrics["exposure"] = in_trade.mean(axis=1)
+    last = np.nan_to_num(spread["zscore"][:, -1])
+    metrics["zscore"] = last
+    metrics["hedge_ratio"] = np.nan_to_num(spread["hedge_ratio"][:, -1])
+    metrics["position"] = positions[:, -1]
+    return metrics
+
+
+def _log_prices(prices: np.ndarray) -> np.ndarray:
+    """(symbols, bars) log prices relative to the first bar; small magnitudes keep windowed sums exact"""
+    log_prices = np.log(prices.T)
+    return log_prices - log_prices[:, :1]
+
+
+def latest_spread(prices: np.ndarray, left: np.ndarray, right: np.ndarray,
+                  lookback: ArrayLike) -> Dict[str, np.ndarray]:
+    """Rolling hedge ratio and z-score at the last bar, exactly as the backtester computes them"""
+    left = np.asarray(left, dtype=np.int64)
+    lookback = np.broadcast_to(np.asarray(lookback, dtype=np.int64), left.shape)
+    spread = rolling_spread(_log_prices(prices[-int(lookback.max()):]), left, right, lookback)
+    return {key: np.nan_to_num(values[:, -1]) for key, values in spread.items()}
+
+
+def backtest_pairs(
+    prices: np.ndarray,
+    left: np.ndarray,
+    right: np.ndarray,
+    lookback: ArrayLike = 100,
+    entry: ArrayLike = 2.0,
+    exit: ArrayLike = 0.5,
+    stop: Optional[ArrayLike] = None,
+    fee: float = 0.001,
+    slippage: float = 0.0005,
+    annualization: float = 365.0 * 6,
+) -> Dict[str, np.ndarray]:
+    """Backtest z-score mean reversion for every column (left[c], right[c]).
+
+    `prices` is a (bars, symbols) close matrix. Lookback and thresholds are
+    scalars or per-column arrays; `fee` and `slippage` are fractions of the
+    traded notional per unit of position change. Returns per-column metric
+    arrays: sharpe, total_return, max_drawdown, trades, win_rate, exposure,
+    plus the final zscore, hedge_ratio and position.
+    """
+    left = np.asarray(left, dtype=np.int64)
+    right = np.asarray(right, dtype=np.int64)
+    columns = len(left)
+    bars = len(prices)
+    log_prices = _log_prices(prices)
+    returns = np.zeros_like(log_prices)
+    returns[:, 1:] = prices.T[:, 1:] / prices.T[:, :-1] - 1.0
+
+    lookback = np.broadcast_to(np.asarray(lookback, dtype=np.int64), (columns,))
+    if columns and (lookback.min() < 3 or lookback.max() > bars):
+        raise ValueError(f"Lookback must be between 3 and the number of bars ({bars})")
+    entry = _as_column(entry, columns)
+    exit = _as_column(exit, columns)
+    stop = None if stop is None else _as_column(stop, columns)
+    cost = fee + slippage
+    moments = SymbolMoments(log_prices)
+
+    chunk = max(1, _CHUNK_ELEMENTS // max(bars, 1))
+    parts = []
+    order = np.argsort(lookback, kind="stable")
+    for part in _chunk_indices(lookback[order], chunk):
+        index = order[part]
+        parts.append(_backtest_chunk(
+            log_prices, moments, returns, left[index], right[index], lookback[index], entry[index],
+            exit[index], None if stop is None else stop[index], cost, annualization,
+        ))
+    if not parts:
+        return {}
+    metrics = {}
+    for key in parts[0]:
+        values = np.empty(columns)
+        values[order] = np.concatenate([p[key] for p in parts])
+        metrics[key] = values
+    return metrics
+
+
+def _chunk_indices(sorted_lookback: np.ndarray, chunk: int) -> List[slice]:
+    """Split columns sorted by lookback into chunks of at most `chunk`.
+
+    Large groups sharing one lookback get chunks of their own (fast slicing
+    path in _window_sums); small groups are packed together.
+    """
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(sorted_lookback)) + 1, [len(sorted_lookback)]))
+    slices = []
+    packed = None
+    for a, b in zip(starts[:-1], starts[1:]):
+        if b - a >= max(chunk // 4, 2):
+            if packed is not None:
+                slices.append(slice(packed, a))
+                packed = None
+            slices.extend(slice(s, min(s + chunk, b)) for s in range(a, b, chunk))
+        elif packed is None:
+            packed = a
+        elif b - packed > chunk:
+            slices.append(slice(packed, a))
+            packed = a
+    if packed is not None:
+        slices.append(slice(packed, len(sorted_lookback)))
+    return slices
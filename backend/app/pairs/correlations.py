@@ -0,0 +1,85 @@
+"""Signal evaluation and pair_correlations persistence shared by /analyze and the refresh scheduler"""
+from typing import Any, Callable, Dict, List, Optional
+from sqlalchemy.orm import Session
+from app.database import PairCorrelation
+from app.pairs.analysis import classify_signals, spread_statistics
+from app.pairs.backtest import latest_spread
+from app.pairs.selection import select_pairs
+from app.pairs.tuning import load_thresholds
+import datetime
+import numpy as np
+
+
+def apply_tuned_thresholds(db: Session, symbols: List[str], prices: np.ndarray, timeframe: str,
+                           zscores: np.ndarray, hedge_ratios: np.ndarray, thresholds: np.ndarray) -> np.ndarray:
+    """Overwrite entries of tuned pairs in place; returns the (symbols, symbols) mask of tuned pairs.
+
+    Tuned pairs use the rolling z-score their thresholds were optimized on.
+    """
+    tuned = np.zeros(zscores.shape, dtype=bool)
+    index = {symbol: i for i, symbol in enumerate(symbols)}
+    saved = [
+        (index[key[0]], index[key[1]], row)
+        for key, row in load_thresholds(db, timeframe).items()
+        if key[0] in index and key[1] in index and index[key[0]] < index[key[1]]
+        and row.lookback < len(prices)
+    ]
+    if saved:
+        left = np.array([item[0] for item in saved])
+        right = np.array([item[1] for item in saved])
+        spread = latest_spread(prices, left, right, np.array([item[2].lookback for item in saved]))
+        zscores[left, right] = spread["zscore"]
+        hedge_ratios[left, right] = spread["hedge_ratio"]
+        thresholds[left, right] = [item[2].entry_zscore for item in saved]
+        tuned[left, right] = True
+    return tuned
+
+
+def store_correlations(db: Session, symbols: List[str], timeframe: str, left: np.ndarray, right: np.ndarray,
+                       correlation: np.ndarray, zscore: np.ndarray, signal: np.ndarray) -> int:
+    """Upsert one pair_correlations row per (left[k], right[k]) in a single commit; values are per pair"""
+    existing = {
+        (row.pair1, row.pair2): row
+        for row in db.query(PairCorrelation).filter(
+            PairCorrelation.timeframe == timeframe,
+            PairCorrelation.pair1.in_(symbols),
+            PairCorrelation.pair2.in_(symbols)
+        ).all()
+    }
+    now = datetime.datetime.utcnow()
+    for k, (i, j) in enumerate(zip(left.tolist(), right.tolist())):
+        pair1, pair2 = symbols[i], symbols[j]
+        row = existing.get((pair1, pair2))
+        if row is None:
+            row = PairCorrelation(pair1=pair1, pair2=pair2, timeframe=timeframe)
+            db.add(row)
+        row.correlation = float(correlation[k])
+        row.zscore = float(zscore[k])
+        row.status = str(signal[k])
+        row.updated_at = now
+    db.commit()
+    return len(left)
+
+
+def refresh_correlations(session_factory: Callable[[], Session], symbols: List[str], timeframe: str,
+                         prices: np.ndarray, zscore_threshold: float = 2.0, pair_selection: str = "all",
+                         statistics: Optional[Dict[str, np.ndarray]] = None) -> Dict[str, Any]:
+    """Recompute signals for every (selected) pair of `symbols` and store them; blocking, run in a thread"""
+    left, right = select_pairs(prices, pair_selection)
+    stats = statistics or spread_statistics(prices, pairs=(left, right))
+    zscores = stats["zscore"].copy()
+    hedge_ratios = stats["hedge_ratio"].copy()
+    thresholds = np.full(zscores.shape, zscore_threshold)
+    db = session_factory()
+    try:
+        tuned = apply_tuned_thresholds(db, symbols, prices, timeframe, zscores, hedge_ratios, thresholds)
+        signals, _ = classify_signals(zscores[left, right], thresholds[left, right])
+        stored = store_correlations(db, symbols, timeframe, left, right, stats["correlation"][left, right],
+                                    zscores[left, right], signals)
+    finally:
+        db.close()
+    return {
+        "pairs": stored,
+        "signals": int((signals != "neutral").sum()),
+        "tuned_pairs": int(tuned[left, right].sum()),
+    }
@@ -0,0 +1,194 @@
+from typing import Any, Callable, Dict, Iterable, List, Optional
+from app.market_data.events import BarClose
+from app.pairs.analysis import SPREAD_METHODS, classify_signals, pair_statistics
+from app.pairs.backtest import latest_spread
+from app.pairs.kalman import KalmanHedge
+import asyncio
+import inspect
+import time
+import numpy as np
+
+
+class PairsSnapshot:
+    """Statistics and signals for every pair as of one closed bar.
+
+    Values stay as arrays over the upper-triangle pairs; rows are only built
+    when a caller asks for them, which keeps the per-bar cost vectorized.
+    """
+
+    def __init__(self, open_time: int, timeframe: str, symbols: List[str], pairs: tuple,
+                 stats: Dict[str, np.ndarray], signal: np.ndarray, strength: np.ndarray, changed: np.ndarray):
+        self.open_time = open_time
+        self.timeframe = timeframe
+        self.symbols = symbols
+        self.pairs = pairs
+        self.correlation = stats["correlation"][pairs]
+        self.zscore = stats["zscore"][pairs]
+        self.hedge_ratio = stats["hedge_ratio"][pairs]
+        self.signal = signal
+        self.strength = strength
+        self.changed = changed
+
+    def _row(self, k: int) -> Dict[str, Any]:
+        return {
+            "pair1": self.symbols[self.pairs[0][k]],
+            "pair2": self.symbols[self.pairs[1][k]],
+            "correlation": round(float(self.correlation[k]), 4),
+            "zscore": round(float(self.zscore[k]), 4),
+            "hedge_ratio": round(float(self.hedge_ratio[k]), 6),
+            "signal": str(self.signal[k]),
+            "strength": str(self.strength[k]),
+        }
+
+    def records(self) -> List[Dict[str, Any]]:
+        return [self._row(k) for k in range(len(self.zscore))]
+
+    def changes(self) -> List[Dict[str, Any]]:
+        """Pairs whose signal differs from the previous bar"""
+        return [self._row(k) for k in self.changed]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"open_time": self.open_time, "timeframe": self.timeframe, "pairs": self.records()}
+
+
+class PairsSignalEngine:
+    """Incremental pairs analysis driven by bar-close events.
+
+    Closes are collected per bar open time until every symbol has reported.
+    Completing a bar also completes any older bars still waiting, with
+    missing symbols carrying their last close, so per-symbol backfills that
+    arrive out of order across symbols still produce an ordered series. Each
+    completed bar is appended to a rolling price window and the same
+    statistics and signal rules as /api/pairs-trading/analyze are applied to
+    it. With spread_method="kalman" the hedge ratios come from a Kalman
+    filter advanced once per completed bar, independent of the window.
+    Live ingestion and historical replay both feed this class.
+    """
+
+    def __init__(self, symbols: Iterable[str], timeframe: str, window: int = 500,
+                 zscore_threshold: float = 2.0, min_bars: int = 30, spread_method: str = "static",
+                 spread_lookback: int = 100):
+        self.symbols = list(dict.fromkeys(symbols))
+        if len(self.symbols) < 2:
+            raise ValueError("Pairs analysis needs at least two symbols")
+        if spread_method not in SPREAD_METHODS:
+            raise ValueError(f"Unknown spread method '{spread_method}'. Use one of: {', '.join(SPREAD_METHODS)}")
+        self.timeframe = timeframe
+        self.window = window
+        self.zscore_threshold = zscore_threshold
+        self.min_bars = max(3, min(min_bars, window))
+        self.spread_method = spread_method
+        self.spread_lookback = spread_lookback
+        n = len(self.symbols)
+        self._column = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self._prices = np.zeros((window, n))
+        self._next = 0
+        self._size = 0
+        self._pending: Dict[int, np.ndarray] = {}
+        self._filled: Dict[int, int] = {}
+        self._last_close = np.full(n, np.nan)
+        self._last_time: Optional[int] = None
+        self._pairs = np.triu_indices(n, 1)
+        self._signal = np.full(len(self._pairs[0]), "neutral")
+        self._kalman = KalmanHedge(len(self._pairs[0])) if spread_method == "kalman" else None
+        self._kalman_latest: Optional[Dict[str, np.ndarray]] = None
+        self.latest: Optional[PairsSnapshot] = None
+        self.bars = 0
+        self.evaluations = 0
+        self.evaluation_seconds = 0.0
+
+    def on_bar(self, event: BarClose) -> Optional[PairsSnapshot]:
+        """Consume one bar close; returns the latest snapshot if it completed any bars"""
+        i = self._column.get(event.symbol)
+        if i is None or event.timeframe != self.timeframe:
+            return None
+        if self._last_time is not None and event.open_time <= self._last_time:
+            return None
+        self.bars += 1
+        row = self._pending.get(event.open_time)
+        if row is None:
+            row = self._pending[event.open_time] = np.full(len(self.symbols), np.nan)
+            self._filled[event.open_time] = 0
+        if np.isnan(row[i]):
+            self._filled[event.open_time] += 1
+        row[i] = event.close
+        if self._filled[event.open_time] == len(self.symbols):
+            return self._complete_through(event.open_time)
+        if len(self._pending) > self.window:
+            # A symbol has stopped reporting; stop waiting for its oldest bar
+            return self._complete_through(min(self._pending))
+        return None
+
+    def _complete_through(self, open_time: int) -> Optional[PairsSnapshot]:
+        snapshot = None
+        for t in sorted(t for t in self._pending if t <= open_time):
+            del self._filled[t]
+            snapshot = self._complete_row(t, self._pending.pop(t)) or snapshot
+        return snapshot
+
+    def _complete_row(self, open_time: int, row: np.ndarray) -> Optional[PairsSnapshot]:
+        row = np.where(np.isnan(row), self._last_close, row)
+        self._last_close = row
+        self._last_time = open_time
+        if np.isnan(row).any():
+            return None  # some symbol has not traded yet
+        self._prices[self._next] = row
+        self._next = (self._next + 1) % self.window
+        self._size = min(self._size + 1, self.window)
+        if self._kalman is not None:
+            log_row = np.log(row)
+            self._kalman_latest = self._kalman.update(log_row[self._pairs[0]], log_row[self._pairs[1]])
+        if self._size < self.min_bars:
+            return None
+        return self._evaluate(open_time)
+
+    def prices(self) -> np.ndarray:
+        """The rolling (bars, symbols) close window in chronological order"""
+        if self._size < self.window:
+            return self._prices[:self._size]
+        return np.concatenate((self._prices[self._next:], self._prices[:self._next]))
+
+    def _evaluate(self, open_time: int) -> PairsSnapshot:
+        started = time.perf_counter()
+        prices = self.prices()
+        stats = pair_statistics(prices)
+        spread = None
+        if self.spread_method == "rolling":
+            spread = latest_spread(prices, self._pairs[0], self._pairs[1], min(self.spread_lookback, len(prices)))
+        elif self.spread_method == "kalman":
+            spread = self._kalman_latest
+        if spread is not None:
+            for key in ("hedge_ratio", "zscore"):
+                stats[key][self._pairs] = np.nan_to_num(spread[key])
+        signal, strength = classify_signals(stats["zscore"][self._pairs], self.zscore_threshold)
+        changed = np.flatnonzero(signal != self._signal)
+        self._signal = signal
+        snapshot = PairsSnapshot(open_time, self.timeframe, self.symbols, self._pairs, stats, signal,
+                                 strength, changed)
+        self.latest = snapshot
+        self.evaluations += 1
+        self.evaluation_seconds += time.perf_counter() - started
+        return snapshot
+
+    async def run(self, queue: asyncio.Queue, on_snapshot: Optional[Callable[[PairsSnapshot], Any]] = None):
+        """Consume bar-close events from an event bus subscription until cancelled"""
+        while True:
+            event = await queue.get()
+            snapshot = self.on_bar(event)
+            if snapshot is not None and on_snapshot is not None:
+                result = on_snapshot(snapshot)
+                if inspect.isawaitable(result):
+                    await result
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "symbols": len(self.symbols),
+            "pairs": len(self._signal),
+            "spread_method": self.spread_method,
+            "window": self._size,
+            "bars": self.bars,
+            "evaluations": self.evaluations,
+            "avg_evaluation_ms": round(1000 * self.evaluation_seconds / self.evaluations, 3)
+            if self.evaluations else None,
+            "latest_open_time": self.latest.open_time if self.latest else None,
+        }
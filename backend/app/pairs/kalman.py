@@ -0,0 +1,127 @@
+"""Kalman-filter hedge ratio and spread z-score, batched across pairs.
+
+Each pair (x, y) of log prices follows x_t = beta_t * y_t + alpha_t + e_t,
+with (beta, alpha) a random walk. The filter state of every tracked pair
+lives in one contiguous (fields, pairs) array, so a bar update is a fixed
+number of vectorized operations regardless of how many pairs are tracked.
+
+The spread z-score is the one-step-ahead innovation divided by its
+predicted standard deviation. The observation variance is estimated
+online (a mean of squared innovations net of the state uncertainty,
+switching to an EWMA once `observation_span` bars are in), so
+z-scores are on a comparable scale across pairs without per-pair tuning.
+
+KalmanHedge.update is the incremental (per-bar) mode used by the live
+engine; kalman_spread runs the same update over a stored history.
+"""
+from typing import Dict, Optional
+import numpy as np
+
+# Rows of the state block
+_BETA, _ALPHA, _P00, _P01, _P11, _R, _X0, _Y0, _COUNT = range(9)
+_FIELDS = 9
+
+
+class KalmanHedge:
+    """Filter state for `pairs` pairs, advanced one bar at a time.
+
+    `delta` sets how fast the hedge ratio may drift (the state noise is
+    delta / (1 - delta) per bar); `observation_span` is the EWMA span of the
+    observation variance estimate; the first `warmup` bars of a pair return
+    NaN z-scores while the filter settles.
+    """
+
+    def __init__(self, pairs: int, delta: float = 1e-6, observation_span: int = 100,
+                 warmup: int = 30, initial_variance: float = 1.0):
+        if not 0 < delta < 1:
+            raise ValueError("delta must be between 0 and 1")
+        self.pairs = pairs
+        self.state_noise = delta / (1.0 - delta)
+        self.alpha = 2.0 / (observation_span + 1.0)
+        self.warmup = warmup
+        self.initial_variance = initial_variance
+        self.state = np.zeros((_FIELDS, pairs))
+        self.reset()
+
+    def reset(self, index: Optional[np.ndarray] = None):
+        """Forget the history of all pairs, or of the pairs at `index`"""
+        columns = slice(None) if index is None else index
+        self.state[:, columns] = 0.0
+        self.state[_BETA, columns] = 1.0
+        self.state[_P00, columns] = self.initial_variance
+        self.state[_P11, columns] = self.initial_variance
+
+    @property
+    def hedge_ratio(self) -> np.ndarray:
+        return self.state[_BETA]
+
+    @property
+    def bars(self) -> np.ndarray:
+        return self.state[_COUNT]
+
+    def update(self, x: np.ndarray, y: np.ndarray) -> Dict[str, np.ndarray]:
+        """Feed one bar of log prices for every pair; returns the hedge ratio and z-score after it"""
+        s = self.state
+        first = s[_COUNT] == 0
+        if first.any():
+            # Prices are taken relative to each pair's first bar to keep the intercept small
+            s[_X0, first] = x[first]
+            s[_Y0, first] = y[first]
+        x = x - s[_X0]
+        y = y - s[_Y0]
+
+        # Predict: random-walk state, so only the covariance grows
+        s[_P00] += self.state_noise
+        s[_P11] += self.state_noise
+
+        # Innovation and its variance under the predicted state
+        error = x - (s[_BETA] * y + s[_ALPHA])
+        a0 = s[_P00] * y + s[_P01]
+        a1 = s[_P01] * y + s[_P11]
+        state_var = a0 * y + a1
+        variance = state_var + s[_R]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            zscore = error / np.sqrt(variance)
+            gain0 = a0 / variance
+            gain1 = a1 / variance
+        ok = variance > 1e-14
+        gain0 = np.where(ok, gain0, 0.0)
+        gain1 = np.where(ok, gain1, 0.0)
+
+        # Correct
+        s[_BETA] += gain0 * error
+        s[_ALPHA] += gain1 * error
+        s[_P00] -= gain0 * a0
+        s[_P01] -= gain0 * a1
+        s[_P11] -= gain1 * a1
+        # Plain running mean until the EWMA span is reached, so early estimates are unbiased
+        weight = np.maximum(self.alpha, 1.0 / (s[_COUNT] + 1.0))
+        s[_R] += weight * (np.maximum(error * error - state_var, 0.0) - s[_R])
+        s[_COUNT] += 1
+
+        ready = ok & (s[_COUNT] > self.warmup)
+        return {
+            "hedge_ratio": s[_BETA].copy(),
+            "zscore": np.where(ready, zscore, np.nan),
+        }
+
+
+def kalman_spread(log_prices: np.ndarray, left: np.ndarray, right: np.ndarray,
+                  filter: Optional[KalmanHedge] = None, **kwargs) -> Dict[str, np.ndarray]:
+    """Kalman hedge ratio and z-score of log_prices[left] on log_prices[right] over a whole history.
+
+    Same (symbols, T) input and (C, T) output layout as rolling_spread. A
+    fresh filter is created from `kwargs` unless one is passed in, in which
+    case it continues from its current state.
+    """
+    left = np.asarray(left, dtype=np.int64)
+    right = np.asarray(right, dtype=np.int64)
+    filter = filter or KalmanHedge(len(left), **kwargs)
+    x, y = log_prices[left], log_prices[right]
+    hedge_ratio = np.empty(x.shape)
+    zscore = np.empty(x.shape)
+    for t in range(x.shape[1]):
+        step = filter.update(x[:, t], y[:, t])
+        hedge_ratio[:, t] = step["hedge_ratio"]
+        zscore[:, t] = step["zscore"]
+    return {"hedge_ratio": hedge_ratio, "zscore": zscore}
@@ -0,0 +1,71 @@
+from typing import Any, Dict, List, Optional
+from app.config import settings
+from app.market_data.events import bar_events
+from app.market_data.stream import KlineStreamService
+from app.pairs.engine import PairsSignalEngine
+import asyncio
+import structlog
+
+logger = structlog.get_logger()
+
+
+class LivePipeline:
+    """Stream ingestion feeding a pairs signal engine through the bar-close bus"""
+
+    def __init__(self, symbols: List[str], timeframe: str, window: int = 1000,
+                 zscore_threshold: float = 2.0, spread_method: str = "static", **stream_kwargs):
+        self.service = KlineStreamService(symbols, timeframe, bus=bar_events, **stream_kwargs)
+        self.engine = PairsSignalEngine(self.service.symbols, timeframe, window=window,
+                                        zscore_threshold=zscore_threshold, spread_method=spread_method)
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        self._queue = bar_events.subscribe()
+        self._task = asyncio.create_task(self.engine.run(self._queue))
+        await self.service.start()
+
+    async def stop(self):
+        await self.service.stop()
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        if self._queue is not None:
+            bar_events.unsubscribe(self._queue)
+
+    def status(self) -> Dict[str, Any]:
+        return {"ingestion": self.service.stats(), "engine": self.engine.stats()}
+
+
+_pipeline: Optional[LivePipeline] = None
+
+
+def get_live_pipeline() -> Optional[LivePipeline]:
+    return _pipeline
+
+
+async def start_live_pipeline() -> Optional[LivePipeline]:
+    """Start live ingestion for STREAM_SYMBOLS; a no-op when none are configured"""
+    global _pipeline
+    symbols = [s.strip().upper() for s in settings.STREAM_SYMBOLS.split(",") if s.strip()]
+    if _pipeline is not None or len(symbols) < 2:
+        return _pipeline
+    _pipeline = LivePipeline(
+        symbols,
+        settings.STREAM_TIMEFRAME,
+        window=settings.STREAM_BUFFER_BARS,
+        spread_method=settings.STREAM_SPREAD_METHOD,
+        include_trades=settings.STREAM_TRADES,
+        buffer_bars=settings.STREAM_BUFFER_BARS,
+        flush_seconds=settings.STREAM_FLUSH_SECONDS,
+        warmup_bars=settings.STREAM_BUFFER_BARS,
+    )
+    await _pipeline.start()
+    return _pipeline
+
+
+async def stop_live_pipeline():
+    global _pipeline
+    if _pipeline is not None:
+        await _pipeline.stop()
+        _pipeline = None
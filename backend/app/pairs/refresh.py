@@ -0,0 +1,111 @@
+"""Scheduled pair_correlations refresh for registered universes.
+
+One BarCloseScheduler job per timeframe in use. After each bar close the
+job brings every universe registered at that timeframe up to date
+(fetching the just-closed bar when the store does not have it yet) and
+re-evaluates its pair signals into pair_correlations, which is what
+/correlations and /opportunities read.
+"""
+from typing import Any, Dict, Optional
+from app.config import settings
+from app.database import SessionLocal
+from app.market_data.client import MarketDataError
+from app.pairs.correlations import refresh_correlations
+from app.pairs.universe import UniverseCache, universe_cache
+from app.scheduler import BarCloseScheduler
+import asyncio
+import structlog
+
+logger = structlog.get_logger()
+
+JOB_PREFIX = "pair-correlations:"
+
+
+class CorrelationRefresher:
+    """Keeps one scheduler job per registered timeframe and runs the refresh"""
+
+    def __init__(self, scheduler: BarCloseScheduler, cache: UniverseCache = universe_cache,
+                 session_factory=SessionLocal, zscore_threshold: float = 2.0, pair_selection: str = "all"):
+        self.scheduler = scheduler
+        self.cache = cache
+        self.session_factory = session_factory
+        self.zscore_threshold = zscore_threshold
+        self.pair_selection = pair_selection
+        self.last_results: Dict[str, Dict[str, Any]] = {}
+
+    async def sync(self):
+        """Add jobs for newly registered timeframes and drop those no universe uses any more"""
+        registered = await asyncio.to_thread(self.cache.registered)
+        wanted = {JOB_PREFIX + tf for _, _, timeframes in registered for tf in timeframes}
+        current = {name for name in self.scheduler.jobs() if name.startswith(JOB_PREFIX)}
+        for name in current - wanted:
+            await self.scheduler.remove_job(name)
+        for name in sorted(wanted - current):
+            timeframe = name[len(JOB_PREFIX):]
+            self.scheduler.add_job(name, timeframe, self._job(timeframe))
+
+    def _job(self, timeframe: str):
+        async def run(close: int):
+            await self.refresh_timeframe(timeframe, close)
+        return run
+
+    async def refresh_timeframe(self, timeframe: str, close: Optional[int] = None) -> int:
+        """Refresh every universe registered at `timeframe`; returns how many were refreshed"""
+        refreshed = 0
+        for universe_id, symbols, timeframes in await asyncio.to_thread(self.cache.registered):
+            if timeframe not in timeframes:
+                continue
+            key = f"{universe_id}:{timeframe}"
+            try:
+                through = close - self.cache.matrix(universe_id, symbols, timeframe).step if close else None
+                snapshot = await self.cache.warm(universe_id, symbols, timeframe, through=through)
+                if snapshot.statistics is None:
+                    continue
+                result = await asyncio.to_thread(
+                    refresh_correlations, self.session_factory, symbols, timeframe, snapshot.prices,
+                    self.zscore_threshold, self.pair_selection,
+                    snapshot.statistics if self.pair_selection == "all" else None
+                )
+            except MarketDataError as e:
+                logger.warning("Correlation refresh skipped", universe_id=universe_id,
+                               timeframe=timeframe, error=str(e))
+                continue
+            self.last_results[key] = {
+                **result,
+                "close": close,
+                "last_open_time": int(snapshot.times[-1]),
+            }
+            refreshed += 1
+            logger.info("Pair correlations refreshed", universe_id=universe_id, timeframe=timeframe, **result)
+        return refreshed
+
+    async def run_now(self, timeframe: str) -> bool:
+        """Trigger a timeframe's job immediately; False if it is already running"""
+        return await self.scheduler.run_now(JOB_PREFIX + timeframe)
+
+    def job_stats(self, timeframe: str) -> Dict[str, Any]:
+        return self.scheduler.stats()["jobs"][JOB_PREFIX + timeframe]
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.scheduler.stats(), "universes": self.last_results}
+
+
+correlation_refresher = CorrelationRefresher(
+    BarCloseScheduler(
+        max_concurrency=settings.SCHEDULER_MAX_CONCURRENCY,
+        settle_seconds=settings.SCHEDULER_SETTLE_SECONDS,
+        jitter_seconds=settings.SCHEDULER_JITTER_SECONDS,
+    ),
+    pair_selection=settings.SCHEDULER_PAIR_SELECTION,
+)
+
+
+async def start_correlation_refresh():
+    """Schedule refreshes for registered universes; a no-op when SCHEDULER_ENABLED is off"""
+    if settings.SCHEDULER_ENABLED:
+        await correlation_refresher.sync()
+        correlation_refresher.scheduler.start()
+
+
+async def stop_correlation_refresh():
+    await correlation_refresher.scheduler.stop()
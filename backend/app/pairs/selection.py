@@ -0,0 +1,109 @@
+"""Candidate pair selection for large symbol universes.
+
+Exhaustive pair analysis grows with N^2. These helpers pick a subset of
+pairs worth analyzing from the return correlation structure:
+
+* "hierarchical" - average-linkage clustering on correlation distance,
+  keeping only pairs inside a cluster,
+* "kmeans" - k-means on standardized return series (Euclidean distance
+  between them is a monotone function of correlation), same rule,
+* "knn" - every symbol paired with its k most correlated neighbours.
+
+Returns are standardized to zero mean and unit norm per symbol, so a dot
+product between two rows is their correlation.
+"""
+from typing import Optional, Tuple
+import numpy as np
+
+SELECTION_METHODS = ("all", "hierarchical", "kmeans", "knn")
+
+
+def standardized_returns(prices: np.ndarray) -> np.ndarray:
+    """(symbols, bars - 1) log returns scaled to zero mean and unit norm per symbol"""
+    returns = np.diff(np.log(prices), axis=0).T
+    returns = returns - returns.mean(axis=1, keepdims=True)
+    norm = np.linalg.norm(returns, axis=1, keepdims=True)
+    return np.divide(returns, norm, out=np.zeros_like(returns), where=norm > 0)
+
+
+def default_clusters(symbols: int) -> int:
+    """Cluster count giving clusters of roughly sqrt(2N) symbols"""
+    return max(1, int(round(np.sqrt(symbols / 2))))
+
+
+def cluster_symbols(prices: np.ndarray, method: str = "hierarchical", clusters: Optional[int] = None,
+                    seed: int = 0) -> np.ndarray:
+    """Cluster label per symbol from return correlation"""
+    returns = standardized_returns(prices)
+    symbols = len(returns)
+    clusters = min(clusters or default_clusters(symbols), symbols)
+    if clusters <= 1:
+        return np.zeros(symbols, dtype=np.int64)
+    if method == "hierarchical":
+        from scipy.cluster.hierarchy import fcluster, linkage
+
+        # Correlation distance sqrt(2 (1 - rho)) is the Euclidean distance between unit-norm rows
+        tree = linkage(returns, method="average", metric="euclidean")
+        return fcluster(tree, t=clusters, criterion="maxclust").astype(np.int64) - 1
+    if method == "kmeans":
+        from sklearn.cluster import KMeans
+
+        return KMeans(n_clusters=clusters, n_init=4, random_state=seed).fit_predict(returns).astype(np.int64)
+    raise ValueError(f"Unknown clustering method '{method}'. Use 'hierarchical' or 'kmeans'")
+
+
+def pairs_within_clusters(labels: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """(left, right) with left < right for every pair of symbols sharing a label"""
+    order = np.argsort(labels, kind="stable")
+    boundaries = np.flatnonzero(np.diff(labels[order])) + 1
+    left, right = [], []
+    for members in np.split(order, boundaries):
+        members = np.sort(members)
+        i, j = np.triu_indices(len(members), 1)
+        left.append(members[i])
+        right.append(members[j])
+    return np.concatenate(left), np.concatenate(right)
+
+
+def nearest_neighbor_pairs(prices: np.ndarray, neighbors: int = 10) -> Tuple[np.ndarray, np.ndarray]:
+    """Each symbol paired with its `neighbors` most correlated symbols (deduplicated, left < right)"""
+    from sklearn.neighbors import NearestNeighbors
+
+    returns = standardized_returns(prices)
+    neighbors = min(neighbors, len(returns) - 1)
+    if neighbors < 1:
+        return np.array([], dtype=np.int64), np.array([], dtype=np.int64)
+    index = NearestNeighbors(n_neighbors=neighbors + 1).fit(returns)
+    nearest = index.kneighbors(returns, return_distance=False)
+    source = np.repeat(np.arange(len(returns)), neighbors + 1)
+    target = nearest.ravel()
+    keep = source != target
+    left = np.minimum(source[keep], target[keep])
+    right = np.maximum(source[keep], target[keep])
+    keys = np.unique(left * len(returns) + right)
+    return keys // len(returns), keys % len(returns)
+
+
+def select_pairs(prices: np.ndarray, method: str = "all", clusters: Optional[int] = None,
+                 neighbors: int = 10, seed: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+    """Candidate (left, right) symbol index pairs, ordered by left then right"""
+    if method not in SELECTION_METHODS:
+        raise ValueError(f"Unknown pair selection '{method}'. Use one of: {', '.join(SELECTION_METHODS)}")
+    symbols = prices.shape[1]
+    if method == "all":
+        return np.triu_indices(symbols, 1)
+    if method == "knn":
+        return nearest_neighbor_pairs(prices, neighbors)
+    left, right = pairs_within_clusters(cluster_symbols(prices, method, clusters, seed))
+    order = np.lexsort((right, left))
+    return left[order], right[order]
+
+
+def pair_recall(left: np.ndarray, right: np.ndarray, reference_left: np.ndarray,
+                reference_right: np.ndarray) -> float:
+    """Share of the reference pairs (e.g. found by exhaustive search) that are among the candidates"""
+    if not len(reference_left):
+        return 1.0
+    width = int(max(np.max(right, initial=0), np.max(reference_right))) + 1
+    found = np.isin(np.asarray(reference_left) * width + reference_right, np.asarray(left) * width + right)
+    return float(found.mean())
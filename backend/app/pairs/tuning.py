@@ -0,0 +1,138 @@
+"""Z-score threshold tuning per pair (or per cluster of pairs).
+
+Every pair gets a swarm over (entry z, exit z, lookback). Pairs tuned per
+cluster share one swarm and are scored by their mean objective. At each
+iteration the particles of all swarms are expanded into backtest columns -
+one per (pair, particle) - and scored in a single backtest_pairs call.
+"""
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy.orm import Session
+from app.database import PairThreshold
+from app.engine.backtest import OBJECTIVE_DIRECTIONS
+from app.engine.optimizers import BatchedSwarmOptimizer
+from app.pairs.backtest import backtest_pairs
+import time
+import numpy as np
+
+# Lookbacks are snapped to this many bars so columns share windowed sums
+LOOKBACK_STEP = 5
+# Exit is searched as a fraction of entry so every particle has exit < entry
+MAX_EXIT_FRACTION = 0.9
+
+
+def cluster_pairs(correlation: np.ndarray, clusters: int) -> np.ndarray:
+    """Group pairs into `clusters` buckets of similar return correlation"""
+    clusters = max(1, min(clusters, len(correlation)))
+    edges = np.quantile(correlation, np.linspace(0, 1, clusters + 1)[1:-1])
+    groups = np.searchsorted(edges, correlation, side="right")
+    # Renumber so empty buckets (ties) leave no gaps
+    return np.unique(groups, return_inverse=True)[1]
+
+
+def decode(positions: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(entry, exit, lookback) arrays from swarm positions [..., 3]"""
+    entry = positions[..., 0]
+    exit = entry * positions[..., 1]
+    lookback = (np.round(positions[..., 2] / LOOKBACK_STEP) * LOOKBACK_STEP).astype(np.int64)
+    return entry, exit, lookback
+
+
+def tune_pairs(
+    prices: np.ndarray,
+    left: np.ndarray,
+    right: np.ndarray,
+    groups: Optional[np.ndarray] = None,
+    iterations: int = 30,
+    particles: int = 20,
+    objective: str = "sharpe",
+    min_trades: int = 3,
+    entry_range: Tuple[float, float] = (1.0, 3.5),
+    lookback_range: Tuple[int, int] = (20, 300),
+    fee: float = 0.001,
+    slippage: float = 0.0005,
+    annualization: float = 365.0 * 6,
+    seed: Optional[int] = None,
+) -> Dict[str, Any]:
+    """Swarm-optimize entry/exit/lookback for each pair or group of pairs.
+
+    Returns per-pair arrays (entry, exit, lookback, score, group) plus the
+    backtest metrics of the tuned parameters.
+    """
+    if objective not in OBJECTIVE_DIRECTIONS:
+        raise ValueError(f"Unknown objective '{objective}'. Use one of: {', '.join(OBJECTIVE_DIRECTIONS)}")
+    left = np.asarray(left, dtype=np.int64)
+    right = np.asarray(right, dtype=np.int64)
+    groups = np.arange(len(left)) if groups is None else np.asarray(groups, dtype=np.int64)
+    swarms = int(groups.max()) + 1 if len(groups) else 0
+    # Leave at least half the history for trading after the first full window
+    longest = min(lookback_range[1], len(prices) // 2)
+    shortest = min(lookback_range[0], longest)
+    if shortest < 3:
+        raise ValueError(f"Not enough bars ({len(prices)}) to tune lookbacks")
+    lower = np.array([entry_range[0], 0.0, shortest], dtype=np.float64)
+    upper = np.array([entry_range[1], MAX_EXIT_FRACTION, longest], dtype=np.float64)
+    swarm = BatchedSwarmOptimizer(lower, upper, swarms=swarms, population=particles, seed=seed)
+    direction = OBJECTIVE_DIRECTIONS[objective]
+    members = np.bincount(groups, minlength=swarms)[:, None]
+    costs = dict(fee=fee, slippage=slippage, annualization=annualization)
+
+    started = time.perf_counter()
+    for _ in range(iterations):
+        entry, exit, lookback = decode(swarm.ask()[groups])  # (pairs, particles)
+        metrics = backtest_pairs(
+            prices, np.repeat(left, particles), np.repeat(right, particles),
+            lookback.ravel(), entry.ravel(), exit.ravel(), **costs
+        )
+        score = direction * metrics[objective]
+        # Too few trades make any statistic meaningless; rank those by trade count
+        score = np.where(metrics["trades"] >= min_trades, score, -1e6 + metrics["trades"])
+        group_score = np.zeros((swarms, particles))
+        np.add.at(group_score, groups, score.reshape(len(left), particles))
+        swarm.tell(group_score / members)
+    elapsed = time.perf_counter() - started
+
+    entry, exit, lookback = decode(swarm.best_position[groups])
+    best = backtest_pairs(prices, left, right, lookback, entry, exit, **costs)
+    return {
+        "entry": entry,
+        "exit": exit,
+        "lookback": lookback,
+        "score": swarm.best_score[groups],
+        "group": groups,
+        "metrics": best,
+        "evaluations": iterations * len(left) * particles,
+        "elapsed_seconds": elapsed,
+    }
+
+
+def save_thresholds(db: Session, symbols: List[str], left: np.ndarray, right: np.ndarray, timeframe: str,
+                    result: Dict[str, Any], objective: str, per_cluster: bool = False) -> int:
+    """Upsert tuned thresholds; returns the number of pairs written"""
+    existing = {
+        (row.pair1, row.pair2): row
+        for row in db.query(PairThreshold).filter(PairThreshold.timeframe == timeframe).all()
+    }
+    for k in range(len(left)):
+        key = (symbols[left[k]], symbols[right[k]])
+        row = existing.get(key)
+        if row is None:
+            row = PairThreshold(pair1=key[0], pair2=key[1], timeframe=timeframe)
+            db.add(row)
+        row.entry_zscore = round(float(result["entry"][k]), 4)
+        row.exit_zscore = round(float(result["exit"][k]), 4)
+        row.lookback = int(result["lookback"][k])
+        row.objective = objective
+        row.score = float(result["score"][k])
+        row.sharpe = float(result["metrics"]["sharpe"][k])
+        row.trades = int(result["metrics"]["trades"][k])
+        row.cluster = int(result["group"][k]) if per_cluster else None
+    db.commit()
+    return len(left)
+
+
+def load_thresholds(db: Session, timeframe: Optional[str] = None) -> Dict[Tuple[str, str], PairThreshold]:
+    """Tuned thresholds keyed by (pair1, pair2); without a timeframe the most recent wins"""
+    query = db.query(PairThreshold)
+    if timeframe is not None:
+        query = query.filter(PairThreshold.timeframe == timeframe)
+    return {(row.pair1, row.pair2): row for row in query.order_by(PairThreshold.updated_at).all()}
@@ -0,0 +1,225 @@
+"""Warm price matrices for registered symbol universes.
+
+A universe (see the `universes` table) names a symbol list and the
+timeframes to keep warm. For each (universe, timeframe) a UniverseMatrix
+holds the last `window_bars` aligned, gap-filled closes together with
+their log returns and the pair statistics of /analyze. Refreshes only read
+bars newer than the last one held, and publish a new immutable
+UniverseSnapshot, so readers never see a half-updated matrix.
+
+UniverseCache owns the matrices and a background task that keeps every
+registered universe current.
+"""
+from typing import Any, Dict, List, Optional, Tuple
+from app.config import settings
+from app.database import SessionLocal, Universe
+from app.engine.data import timeframe_ms
+from app.market_data.bar_store import BarStore, bar_store
+from app.market_data.client import MarketDataError, ensure_history, get_market_data_client
+from app.pairs.analysis import align_closes, pair_statistics
+import asyncio
+import threading
+import time
+import numpy as np
+import structlog
+
+logger = structlog.get_logger()
+
+
+class UniverseSnapshot:
+    """Immutable aligned closes, log returns and pair statistics as of one refresh"""
+
+    def __init__(self, symbols: List[str], timeframe: str, times: np.ndarray, prices: np.ndarray,
+                 version: int):
+        self.symbols = symbols
+        self.timeframe = timeframe
+        self.times = times
+        self.prices = prices
+        self.log_returns = np.diff(np.log(prices), axis=0)
+        self.statistics = pair_statistics(prices) if len(prices) >= 3 else None
+        self.version = version
+        self.refreshed_at = time.time()
+        for array in (self.times, self.prices, self.log_returns):
+            array.flags.writeable = False
+
+    def covers(self, start: int) -> bool:
+        return len(self.times) > 0 and self.times[0] <= start + timeframe_ms(self.timeframe)
+
+    def since(self, start: int) -> np.ndarray:
+        """Closes from `start` on"""
+        return self.prices[np.searchsorted(self.times, start):]
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "timeframe": self.timeframe,
+            "symbols": len(self.symbols),
+            "bars": len(self.times),
+            "first_open_time": int(self.times[0]) if len(self.times) else None,
+            "last_open_time": int(self.times[-1]) if len(self.times) else None,
+            "version": self.version,
+            "age_seconds": round(time.time() - self.refreshed_at, 1),
+        }
+
+
+class UniverseMatrix:
+    """Incrementally maintained aligned closes for one universe at one timeframe"""
+
+    def __init__(self, symbols: List[str], timeframe: str, window_bars: int, store: BarStore = bar_store):
+        self.symbols = list(symbols)
+        self.timeframe = timeframe
+        self.step = timeframe_ms(timeframe)
+        self.window_bars = window_bars
+        self.store = store
+        self.snapshot: Optional[UniverseSnapshot] = None
+        self.refreshes = 0
+        self.refresh_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def refresh(self, end: Optional[int] = None) -> int:
+        """Pull bars newer than the last one held; returns how many bar rows were (re)read"""
+        end = end if end is not None else int(time.time() * 1000)
+        with self._lock:
+            started = time.perf_counter()
+            current = self.snapshot
+            if current is None or not len(current.times):
+                since, initial = end - self.window_bars * self.step, None
+                times = np.empty(0, dtype=np.int64)
+                prices = np.empty((0, len(self.symbols)))
+            else:
+                # Re-read the last bar too: it may have been written while still open
+                since, initial = int(current.times[-1]), current.prices[-2] if len(current.times) > 1 else None
+                times, prices = current.times[:-1], current.prices[:-1]
+            rows = self.store.closes(self.symbols, self.timeframe, since, end)
+            new_times, new_prices = align_closes(rows, self.symbols, initial=initial)
+            if current is not None and not len(new_times):
+                return 0
+            times = np.concatenate((times, new_times))[-self.window_bars:]
+            prices = np.concatenate((prices, new_prices))[-self.window_bars:]
+            self.snapshot = UniverseSnapshot(self.symbols, self.timeframe, times, prices,
+                                             current.version + 1 if current else 1)
+            self.refreshes += 1
+            self.refresh_seconds += time.perf_counter() - started
+            return len(new_times)
+
+
+class UniverseCache:
+    """Matrices for every (universe, timeframe) in use, refreshed in the background"""
+
+    def __init__(self, window_bars: int = 1000, refresh_seconds: float = 60.0, store: BarStore = bar_store,
+                 session_factory=SessionLocal):
+        self.window_bars = window_bars
+        self.refresh_interval = refresh_seconds
+        self.store = store
+        self.session_factory = session_factory
+        self._matrices: Dict[Tuple[int, str], UniverseMatrix] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.errors = 0
+
+    def matrix(self, universe_id: int, symbols: List[str], timeframe: str) -> UniverseMatrix:
+        """The matrix for a universe, rebuilt from scratch if its symbol list changed"""
+        key = (universe_id, timeframe)
+        matrix = self._matrices.get(key)
+        if matrix is None or matrix.symbols != list(symbols):
+            matrix = self._matrices[key] = UniverseMatrix(symbols, timeframe, self.window_bars, self.store)
+        return matrix
+
+    def drop(self, universe_id: int):
+        for key in [key for key in self._matrices if key[0] == universe_id]:
+            del self._matrices[key]
+
+    async def warm(self, universe_id: int, symbols: List[str], timeframe: str, backfill: bool = True,
+                   through: Optional[int] = None) -> UniverseSnapshot:
+        """Backfill missing history, then bring the matrix up to date.
+
+        With `through` (a bar open time) the bars up to it are fetched from
+        the exchange if the store does not have them yet.
+        """
+        matrix = self.matrix(universe_id, symbols, timeframe)
+        end = int(time.time() * 1000)
+        if backfill:
+            start = end - self.window_bars * matrix.step
+            await ensure_history(get_market_data_client(), symbols, timeframe, start, end, self.store)
+        await asyncio.to_thread(matrix.refresh, end)
+        last = matrix.snapshot.times[-1] if len(matrix.snapshot.times) else None
+        if backfill and through is not None and last is not None and last < through:
+            await get_market_data_client().backfill(symbols, timeframe, int(last), through, self.store)
+            await asyncio.to_thread(matrix.refresh, end)
+        return matrix.snapshot
+
+    async def prices(self, universe_id: int, symbols: List[str], timeframe: str,
+                     start: int) -> Optional[np.ndarray]:
+        """Warm closes since `start`, or None when the window does not reach back that far"""
+        matrix = self.matrix(universe_id, symbols, timeframe)
+        snapshot = matrix.snapshot
+        if snapshot is None or time.time() - snapshot.refreshed_at > self.refresh_interval:
+            snapshot = await self.warm(universe_id, symbols, timeframe)
+        if not snapshot.covers(start):
+            return None
+        return snapshot.since(start)
+
+    def registered(self) -> List[Tuple[int, List[str], List[str]]]:
+        """(id, symbols, timeframes) of every registered universe"""
+        db = self.session_factory()
+        try:
+            return [(u.id, list(u.symbols or []), list(u.timeframes or [])) for u in db.query(Universe).all()]
+        finally:
+            db.close()
+
+    async def refresh_all(self) -> int:
+        """Refresh every registered universe at each of its timeframes; returns matrices refreshed"""
+        refreshed = 0
+        for universe_id, symbols, timeframes in await asyncio.to_thread(self.registered):
+            for timeframe in timeframes:
+                try:
+                    await self.warm(universe_id, symbols, timeframe)
+                    refreshed += 1
+                except (MarketDataError, ValueError) as e:
+                    self.errors += 1
+                    logger.warning("Universe refresh failed", universe_id=universe_id,
+                                   timeframe=timeframe, error=str(e))
+        return refreshed
+
+    async def _run(self):
+        while True:
+            try:
+                await self.refresh_all()
+            except Exception as e:
+                self.errors += 1
+                logger.error("Universe refresh loop failed", error=str(e))
+            await asyncio.sleep(self.refresh_interval)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def stats(self, universe_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        return [
+            {
+                "universe_id": key[0],
+                **(matrix.snapshot.summary() if matrix.snapshot else {"timeframe": key[1], "bars": 0}),
+                "refreshes": matrix.refreshes,
+                "avg_refresh_ms": round(1000 * matrix.refresh_seconds / matrix.refreshes, 2)
+                if matrix.refreshes else None,
+            }
+            for key, matrix in self._matrices.items()
+            if universe_id is None or key[0] == universe_id
+        ]
+
+
+universe_cache = UniverseCache(settings.UNIVERSE_WINDOW_BARS, settings.UNIVERSE_REFRESH_SECONDS)
+
+
+async def start_universe_refresh():
+    """Keep registered universes warm; a no-op when UNIVERSE_REFRESH_SECONDS is 0"""
+    if settings.UNIVERSE_REFRESH_SECONDS > 0:
+        universe_cache.start()
+
+
+async def stop_universe_refresh():
+    await universe_cache.stop()
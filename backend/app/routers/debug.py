@@ -1,8 +1,11 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Header
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from app.database import get_db
+from app.debug_log import debug_logs, server_sent_events
+from app.log_pipeline import get_log_pipeline
 from pydantic import BaseModel
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 import structlog
 import json
 import time
@@ -11,9 +14,6 @@ import os
 router = APIRouter()
 logger = structlog.get_logger()
 
-# In-memory storage for debug logs (in production, use Redis or database)
-debug_logs = []
-
 class DebugAnalysisRequest(BaseModel):
     component: str
     error_type: str
@@ -139,11 +139,7 @@ async def analyze_component(request: DebugAnalysisRequest):
         "context": request.additional_context,
         "analysis_requested": True
     }
-    debug_logs.append(debug_entry)
-    
-    # Keep only last 1000 debug entries
-    if len(debug_logs) > 1000:
-        debug_logs[:] = debug_logs[-1000:]
+    await debug_logs.append(debug_entry)
     
     logger.info(
         "Debug analysis requested",
@@ -169,20 +165,48 @@ async def analyze_component(request: DebugAnalysisRequest):
     return analysis_results
 
 @router.get("/logs")
-async def get_debug_logs(limit: int = 50):
-    """Get recent debug logs"""
+async def get_debug_logs(limit: int = 50, component: Optional[str] = None, error_type: Optional[str] = None,
+                         after: int = 0):
+    """Get recent debug logs, optionally for one component / error type or after a sequence number"""
+    if limit < 1:
+        raise HTTPException(status_code=400, detail="limit must be positive")
+    logs = await debug_logs.query(component, error_type, after, limit)
     return {
-        "logs": debug_logs[-limit:] if debug_logs else [],
-        "total_logs": len(debug_logs),
+        "logs": logs,
+        "total_logs": await debug_logs.count(),
+        "last_seq": logs[-1]["seq"] if logs else after,
         "timestamp": time.time()
     }
 
+@router.get("/logs/stream")
+async def stream_debug_logs(component: Optional[str] = None, error_type: Optional[str] = None,
+                            after: Optional[int] = None, last_event_id: Optional[str] = Header(None)):
+    """Follow new debug logs as server-sent events; reconnects resume from Last-Event-ID"""
+    if after is None and last_event_id and last_event_id.isdigit():
+        after = int(last_event_id)
+    return StreamingResponse(
+        server_sent_events(debug_logs.tail(component, error_type, after)),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/logs/stats")
+async def get_debug_log_stats():
+    """Ring buffer occupancy and index sizes"""
+    return await debug_logs.stats()
+
+@router.get("/logging")
+async def get_logging_stats():
+    """Log pipeline queue depth, batches written and events dropped by sampling or a full queue"""
+    pipeline = get_log_pipeline()
+    if pipeline is None:
+        raise HTTPException(status_code=404, detail="Log pipeline is not configured")
+    return pipeline.stats()
+
 @router.delete("/logs")
 async def clear_debug_logs():
     """Clear debug logs"""
-    global debug_logs
-    log_count = len(debug_logs)
-    debug_logs.clear()
+    log_count = await debug_logs.clear()
     
     logger.info("Debug logs cleared", previous_count=log_count)
     
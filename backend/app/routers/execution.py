@@ -0,0 +1,63 @@
+from fastapi import APIRouter, HTTPException
+from app.trading.execution import PairOrder, get_executor
+from app.trading.risk import CAPITAL_PHASES
+from app.shared_state import call_leader, leader_handler
+from pydantic import BaseModel
+from typing import Any, Dict, Optional
+import structlog
+import time
+
+router = APIRouter()
+logger = structlog.get_logger()
+
+class PairOrderRequest(BaseModel):
+    pair1: str
+    pair2: str
+    quantity1: float  # signed base quantity: positive buys, negative sells
+    quantity2: float
+    price1: Optional[float] = None  # reference prices for slippage-protected LIMIT IOC legs
+    price2: Optional[float] = None
+    strategy_id: Optional[int] = None
+    capital_phase: Optional[str] = None
+
+def _executor():
+    executor = get_executor()
+    if executor is None:
+        raise HTTPException(status_code=503, detail="Execution engine is not running")
+    return executor
+
+@router.post("/pairs")
+async def execute_pair(request: PairOrderRequest):
+    """Submit both legs of a pair trade concurrently and report fills"""
+    signal_at = time.perf_counter()
+    if request.pair1 == request.pair2:
+        raise HTTPException(status_code=400, detail="pair1 and pair2 must differ")
+    if request.quantity1 == 0 or request.quantity2 == 0:
+        raise HTTPException(status_code=400, detail="Both legs need a non-zero quantity")
+    if request.capital_phase is not None and request.capital_phase not in CAPITAL_PHASES:
+        raise HTTPException(status_code=400, detail=f"capital_phase must be one of: {', '.join(CAPITAL_PHASES)}")
+    # The executor lives on the leader worker; the signal age crosses processes as wall-clock time
+    return await call_leader("execution.pairs", order=request.model_dump(),
+                             signal_age=time.perf_counter() - signal_at, sent_at=time.time())
+
+@router.get("/stats")
+async def get_execution_stats():
+    """Signal-to-submit latency, leg skew, round trips, outcomes and trade writer state"""
+    return await call_leader("execution.stats")
+
+@leader_handler("execution.pairs")
+async def _execute_pair(order: Dict[str, Any], signal_age: float, sent_at: float):
+    signal_at = time.perf_counter() - signal_age - max(0.0, time.time() - sent_at)
+    executor = _executor()
+    try:
+        return await executor.execute(PairOrder(
+            order["pair1"], order["pair2"], order["quantity1"], order["quantity2"],
+            order["price1"], order["price2"], signal_at, order["strategy_id"], order["capital_phase"]
+        ))
+    except Exception as e:
+        logger.error("Pair execution failed", pair1=order["pair1"], pair2=order["pair2"], error=str(e))
+        raise HTTPException(status_code=500, detail=str(e))
+
+@leader_handler("execution.stats")
+async def _execution_stats():
+    return _executor().stats()
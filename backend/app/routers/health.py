@@ -1,14 +1,23 @@
-from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy.orm import Session
-from app.database import get_db
+from fastapi import APIRouter, HTTPException
+from app import startup
 import structlog
 import time
-import psutil
 import os
 
 router = APIRouter()
 logger = structlog.get_logger()
 
+def _ping_database():
+    # SQLAlchemy and the models load on the first probe, keeping them off the liveness import path
+    from sqlalchemy import text
+    from app.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        db.execute(text("SELECT 1"))
+    finally:
+        db.close()
+
 @router.get("/")
 async def health_check():
     """Basic health check endpoint"""
@@ -19,11 +28,14 @@ async def health_check():
     }
 
 @router.get("/detailed")
-async def detailed_health_check(db: Session = Depends(get_db)):
+async def detailed_health_check():
     """Detailed health check with system metrics"""
+    import psutil
+    from app.admission import admission, jobs
+
     try:
         # Test database connection
-        db.execute("SELECT 1")
+        _ping_database()
         db_status = "connected"
     except Exception as e:
         logger.error("Database health check failed", error=str(e))
@@ -39,6 +51,9 @@ async def detailed_health_check(db: Session = Depends(get_db)):
         "timestamp": time.time(),
         "version": "1.0.0",
         "database": db_status,
+        "startup": startup.state.to_dict(),
+        "admission": admission.to_dict(),
+        "jobs": jobs.to_dict(),
         "system": {
             "cpu_percent": cpu_percent,
             "memory_percent": memory.percent,
@@ -57,10 +72,21 @@ async def liveness_probe():
     return {"status": "alive"}
 
 @router.get("/ready")
-async def readiness_probe(db: Session = Depends(get_db)):
-    """Kubernetes/Docker readiness probe"""
+async def readiness_probe():
+    """Kubernetes/Docker readiness probe: warm-up finished, spare capacity and the database answers"""
+    if not startup.state.ready:
+        detail = f"Warm-up failed: {startup.state.error}" if startup.state.error else "Warming up"
+        raise HTTPException(status_code=503, detail=detail)
+    from app.admission import admission
+
+    if admission.saturated:
+        raise HTTPException(
+            status_code=503,
+            detail=f"Saturated: {admission.in_flight:g} of {admission.capacity:g} cost units in flight, "
+                   f"{admission.queued} queued"
+        )
     try:
-        db.execute("SELECT 1")
-        return {"status": "ready"}
+        _ping_database()
+        return {"status": "ready", "startup": startup.state.to_dict(), "admission": admission.to_dict()}
     except Exception:
         raise HTTPException(status_code=503, detail="Database not ready")
\ No newline at end of file
@@ -0,0 +1,65 @@
+from fastapi import APIRouter, HTTPException
+from app.config import settings
+from app.trading.metrics import SCOPES, metrics_aggregator
+from app.trading.risk import capital_phase, phase_limits
+from app.shared_state import call_leader, leader_handler
+import structlog
+import asyncio
+
+router = APIRouter()
+logger = structlog.get_logger()
+
+@router.get("/metrics")
+async def get_metrics(scope: str = "all"):
+    """Performance totals over all, paper or live trades, maintained as trades are written"""
+    if scope not in SCOPES:
+        raise HTTPException(status_code=400, detail=f"scope must be one of: {', '.join(SCOPES)}")
+    return await call_leader("metrics.metrics", scope=scope)
+
+@router.get("/metrics/positions")
+async def get_positions(book: str = "paper"):
+    """Open positions and average entry prices of the paper or live book"""
+    if book not in ("paper", "live"):
+        raise HTTPException(status_code=400, detail="book must be 'paper' or 'live'")
+    return {"book": book, "positions": await call_leader("metrics.positions", book=book)}
+
+@router.get("/config/trading-status")
+async def get_trading_status():
+    """Trading configuration and the capital phase of the current equity"""
+    try:
+        equity = await call_leader("metrics.equity")
+        phase = settings.CAPITAL_PHASE or capital_phase(equity)
+        return {
+            "trading_enabled": settings.TRADING_ENABLED,
+            "binance_testnet": settings.BINANCE_TESTNET,
+            "execution_mode": settings.EXECUTION_MODE,
+            "initial_capital": settings.INITIAL_CAPITAL,
+            "current_equity": equity,
+            "capital_phase": phase,
+            "capital_phase_pinned": settings.CAPITAL_PHASE is not None,
+            "max_risk_per_trade": settings.MAX_RISK_PER_TRADE,
+            "limits": phase_limits(phase).to_dict(),
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Error getting trading status", error=str(e))
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# The aggregator is fed by the execution engine's trade writer, so it lives on the leader worker
+@leader_handler("metrics.metrics")
+async def _metrics(scope: str):
+    return metrics_aggregator.metrics(scope)
+
+@leader_handler("metrics.positions")
+async def _positions(book: str):
+    return metrics_aggregator.positions(book)
+
+@leader_handler("metrics.equity")
+async def _equity():
+    return metrics_aggregator.totals["all"].equity
+
+@leader_handler("metrics.rebuild")
+async def _rebuild():
+    return await asyncio.to_thread(metrics_aggregator.rebuild)
@@ -1,15 +1,32 @@
-from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks
+from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks, Request, Response
 from sqlalchemy.orm import Session
-from app.database import get_db, Strategy, OptimizationRun
+from app.admission import admit, charge_job, estimate_cost, hold, reserve_job
+from app.database import get_db, SessionLocal, Strategy, OptimizationRun, OptimizationBatch, ParetoSolution, Universe
+from app.engine.backtest import OBJECTIVE_DIRECTIONS, periods_per_year
+from app.engine.batch import run_grid
+from app.engine.data import load_bars
+from app.engine.optimizers import OPTIMIZERS
+from app.engine.pine import PineScriptError, get_compiled_strategy
+from app.engine.runner import optimize, optimize_pareto
+from app.engine.walk_forward import make_windows, run_walk_forward
+from app.engine.workers import get_worker_pool, worker_count
+from app.http_cache import conditional
+from app.pagination import DEFAULT_PAGE_SIZE, check_page, link_next_page, paginate
 from pydantic import BaseModel
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 import structlog
-import uuid
+import datetime
 import asyncio
 
 router = APIRouter()
 logger = structlog.get_logger()
 
+class WalkForwardSettings(BaseModel):
+    train_bars: int = 2000
+    test_bars: int = 500
+    step_bars: Optional[int] = None  # defaults to test_bars (non-overlapping test windows)
+    anchored: bool = False  # grow the train window from the first bar instead of rolling it
+
 class OptimizationRequest(BaseModel):
     name: str
     pine_script: str
@@ -18,6 +35,25 @@ class OptimizationRequest(BaseModel):
     algorithm: str = "bayesian"  # bayesian, pso, genetic
     iterations: int = 100
     parameters: Optional[Dict[str, Any]] = None
+    mode: str = "single"  # single, walk_forward, multi_objective
+    walk_forward: WalkForwardSettings = WalkForwardSettings()
+    objectives: List[str] = ["sharpe", "max_drawdown", "trades"]  # multi_objective only
+
+class BatchOptimizationRequest(BaseModel):
+    name: str
+    pine_script: str
+    symbols: List[str] = []
+    universe_id: Optional[int] = None  # optimize every symbol of a registered universe
+    timeframes: List[str] = ["1h"]
+    algorithms: List[str] = ["pso"]  # bayesian, pso, genetic
+    iterations: int = 100
+    parameters: Optional[Dict[str, Any]] = None
+
+class BatchOptimizationResponse(BaseModel):
+    batch_id: str
+    status: str
+    total_runs: int
+    message: str
 
 class OptimizationResponse(BaseModel):
     optimization_id: str
@@ -27,15 +63,45 @@ class OptimizationResponse(BaseModel):
 @router.post("/start", response_model=OptimizationResponse)
 async def start_optimization(
     request: OptimizationRequest,
+    http_request: Request,
     background_tasks: BackgroundTasks,
     db: Session = Depends(get_db)
 ):
     """Start Pine Script strategy optimization"""
+    if request.mode not in ("single", "walk_forward", "multi_objective"):
+        raise HTTPException(status_code=400, detail=f"Unknown mode '{request.mode}'")
+    if request.mode == "multi_objective":
+        # Multi-objective runs always use MOPSO
+        unknown = [o for o in request.objectives if o not in OBJECTIVE_DIRECTIONS]
+        if unknown or len(request.objectives) < 2:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Need at least two objectives from: {', '.join(OBJECTIVE_DIRECTIONS)}"
+            )
+    elif request.algorithm not in OPTIMIZERS:
+        raise HTTPException(status_code=400, detail=f"Unknown algorithm '{request.algorithm}'")
+    try:
+        periods_per_year(request.timeframe)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # Compile up front (cached by script hash) so unsupported scripts are
+    # rejected before any records are created
+    try:
+        plan = get_compiled_strategy(request.pine_script)
+        parameter_space = plan.parameter_space.with_overrides(request.parameters)
+    except PineScriptError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid Pine Script: {e}")
+
+    # Every iteration backtests the stored history; a year of bars is the usual depth
+    cost = estimate_cost(1, request.timeframe, 365, evaluations=request.iterations)
+    ticket = await admit(http_request, cost, db, background=True)
     try:
         # Create strategy record
         strategy = Strategy(
             name=request.name,
             pine_script=request.pine_script,
+            parameters=parameter_space.to_json(),
             status="optimizing"
         )
         db.add(strategy)
@@ -45,18 +111,22 @@ async def start_optimization(
         # Create optimization run record
         optimization_run = OptimizationRun(
             strategy_id=strategy.id,
-            algorithm=request.algorithm,
+            symbol=request.symbol,
+            timeframe=request.timeframe,
+            algorithm="mopso" if request.mode == "multi_objective" else request.algorithm,
             status="running"
         )
         db.add(optimization_run)
         db.commit()
         db.refresh(optimization_run)
         
-        # Start background optimization task
+        # Start background optimization task; it keeps the admitted capacity until it finishes
         background_tasks.add_task(
+            hold,
+            ticket,
             run_optimization,
             optimization_run.id,
-            request.dict()
+            request.model_dump()
         )
         
         logger.info(
@@ -73,9 +143,148 @@ async def start_optimization(
         )
         
     except Exception as e:
+        ticket.release()
         logger.error("Failed to start optimization", error=str(e))
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/batch", response_model=BatchOptimizationResponse)
+async def start_batch_optimization(
+    request: BatchOptimizationRequest,
+    http_request: Request,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db)
+):
+    """Optimize one strategy across a grid of symbols, timeframes and algorithms"""
+    unknown = [a for a in request.algorithms if a not in OPTIMIZERS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown algorithms: {', '.join(unknown)}")
+    try:
+        for timeframe in request.timeframes:
+            periods_per_year(timeframe)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if request.universe_id is not None:
+        universe = db.query(Universe).filter(Universe.id == request.universe_id).first()
+        if universe is None:
+            raise HTTPException(status_code=404, detail="Universe not found")
+        request.symbols = list(universe.symbols)
+    if not request.symbols or not request.timeframes or not request.algorithms:
+        raise HTTPException(status_code=400, detail="symbols, timeframes and algorithms must not be empty")
+
+    try:
+        plan = get_compiled_strategy(request.pine_script)
+        parameter_space = plan.parameter_space.with_overrides(request.parameters)
+    except PineScriptError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid Pine Script: {e}")
+
+    # The client pays for the whole grid now; job capacity is reserved per sub-run as it is dispatched
+    runs_per_timeframe = len(set(request.symbols)) * len(set(request.algorithms))
+    charge_job(http_request, sum(estimate_cost(runs_per_timeframe, timeframe, 365, evaluations=request.iterations)
+                                 for timeframe in set(request.timeframes)))
+    try:
+        # One strategy row for the whole grid
+        strategy = Strategy(
+            name=request.name,
+            pine_script=request.pine_script,
+            parameters=parameter_space.to_json(),
+            status="optimizing"
+        )
+        db.add(strategy)
+        db.commit()
+        db.refresh(strategy)
+
+        grid = [
+            (symbol, timeframe, algorithm)
+            for symbol in dict.fromkeys(request.symbols)
+            for timeframe in dict.fromkeys(request.timeframes)
+            for algorithm in dict.fromkeys(request.algorithms)
+        ]
+        batch = OptimizationBatch(strategy_id=strategy.id, total_runs=len(grid))
+        db.add(batch)
+        db.commit()
+        db.refresh(batch)
+
+        runs = [
+            OptimizationRun(
+                strategy_id=strategy.id,
+                batch_id=batch.id,
+                symbol=symbol,
+                timeframe=timeframe,
+                algorithm=algorithm,
+                status="queued"
+            )
+            for symbol, timeframe, algorithm in grid
+        ]
+        db.add_all(runs)
+        db.commit()
+
+        background_tasks.add_task(
+            run_batch_optimization,
+            batch.id,
+            [
+                {"id": run.id, "symbol": run.symbol, "timeframe": run.timeframe, "algorithm": run.algorithm}
+                for run in runs
+            ],
+            request.model_dump()
+        )
+
+        logger.info(
+            "Started batch optimization",
+            batch_id=batch.id,
+            strategy_name=request.name,
+            total_runs=len(grid)
+        )
+
+        return BatchOptimizationResponse(
+            batch_id=str(batch.id),
+            status="started",
+            total_runs=len(grid),
+            message=f"Batch of {len(grid)} optimizations started for strategy '{request.name}'"
+        )
+
+    except Exception as e:
+        logger.error("Failed to start batch optimization", error=str(e))
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/batch/{batch_id}")
+async def get_batch_status(batch_id: int, db: Session = Depends(get_db)):
+    """Get aggregate progress and per-run results of a batch"""
+    batch = db.query(OptimizationBatch).filter(OptimizationBatch.id == batch_id).first()
+
+    if not batch:
+        raise HTTPException(status_code=404, detail="Batch not found")
+
+    runs = db.query(OptimizationRun).filter(
+        OptimizationRun.batch_id == batch_id
+    ).order_by(OptimizationRun.id).all()
+
+    finished = batch.completed_runs + batch.failed_runs
+    return {
+        "batch_id": batch_id,
+        "strategy_id": batch.strategy_id,
+        "status": batch.status,
+        "total_runs": batch.total_runs,
+        "completed_runs": batch.completed_runs,
+        "failed_runs": batch.failed_runs,
+        "queued_runs": sum(1 for run in runs if run.status == "queued"),
+        "running_runs": sum(1 for run in runs if run.status == "running"),
+        "progress": round(finished / batch.total_runs, 4) if batch.total_runs else 1.0,
+        "runs": [
+            {
+                "optimization_id": run.id,
+                "symbol": run.symbol,
+                "timeframe": run.timeframe,
+                "algorithm": run.algorithm,
+                "status": run.status,
+                "best_score": run.best_score,
+                "best_params": run.best_params
+            }
+            for run in runs
+        ],
+        "created_at": batch.created_at,
+        "completed_at": batch.completed_at
+    }
+
 @router.get("/{optimization_id}/status")
 async def get_optimization_status(optimization_id: int, db: Session = Depends(get_db)):
     """Get optimization status and results"""
@@ -89,25 +298,76 @@ async def get_optimization_status(optimization_id: int, db: Session = Depends(ge
     return {
         "optimization_id": optimization_id,
         "status": optimization_run.status,
+        "batch_id": optimization_run.batch_id,
+        "symbol": optimization_run.symbol,
+        "timeframe": optimization_run.timeframe,
         "algorithm": optimization_run.algorithm,
         "iterations": optimization_run.iterations,
         "best_score": optimization_run.best_score,
         "best_params": optimization_run.best_params,
+        "telemetry": optimization_run.telemetry,
         "created_at": optimization_run.created_at,
         "completed_at": optimization_run.completed_at
     }
 
-@router.get("/")
-async def list_optimizations(db: Session = Depends(get_db)):
-    """List all optimization runs"""
-    optimizations = db.query(OptimizationRun).order_by(
-        OptimizationRun.created_at.desc()
-    ).limit(50).all()
+@router.get("/{optimization_id}/pareto")
+async def get_pareto_front(optimization_id: int, db: Session = Depends(get_db)):
+    """Get the Pareto front of a multi-objective optimization"""
+    optimization_run = db.query(OptimizationRun).filter(
+        OptimizationRun.id == optimization_id
+    ).first()
+
+    if not optimization_run:
+        raise HTTPException(status_code=404, detail="Optimization not found")
+
+    solutions = db.query(ParetoSolution).filter(
+        ParetoSolution.optimization_id == optimization_id
+    ).order_by(ParetoSolution.rank).all()
+
+    return {
+        "optimization_id": optimization_id,
+        "status": optimization_run.status,
+        "objectives": (optimization_run.telemetry or {}).get("objectives"),
+        "front": [
+            {
+                "rank": solution.rank,
+                "params": solution.params,
+                "objectives": solution.objectives
+            }
+            for solution in solutions
+        ]
+    }
+
+@router.get("/", dependencies=[conditional("optimization_runs")])
+async def list_optimizations(request: Request, response: Response, strategy_id: Optional[int] = None,
+                             status: Optional[str] = None, symbol: Optional[str] = None,
+                             since: Optional[datetime.datetime] = None, until: Optional[datetime.datetime] = None,
+                             cursor: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE,
+                             db: Session = Depends(get_db)):
+    """List optimization runs newest first; the next page is in the Link / X-Next-Cursor headers"""
+    try:
+        after = check_page(cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    query = db.query(OptimizationRun)
+    if strategy_id is not None:
+        query = query.filter(OptimizationRun.strategy_id == strategy_id)
+    if status is not None:
+        query = query.filter(OptimizationRun.status == status)
+    if symbol is not None:
+        query = query.filter(OptimizationRun.symbol == symbol)
+    optimizations, next_cursor = paginate(
+        query, OptimizationRun.created_at, OptimizationRun.id, after, limit, since, until
+    )
+    link_next_page(request, response, next_cursor)
     
     return [
         {
             "optimization_id": opt.id,
             "strategy_id": opt.strategy_id,
+            "batch_id": opt.batch_id,
+            "symbol": opt.symbol,
+            "timeframe": opt.timeframe,
             "algorithm": opt.algorithm,
             "status": opt.status,
             "best_score": opt.best_score,
@@ -118,36 +378,158 @@ async def list_optimizations(db: Session = Depends(get_db)):
 
 async def run_optimization(optimization_id: int, request_data: dict):
     """Background task to run optimization"""
-    # TODO: Implement actual optimization algorithms
-    # This is a placeholder that simulates optimization
-    
     logger.info("Starting optimization background task", optimization_id=optimization_id)
-    
+
+    db = SessionLocal()
     try:
-        # Simulate optimization process
-        await asyncio.sleep(5)  # Simulate work
-        
-        # Update optimization with mock results
-        # In real implementation, this would run PSO/Bayesian/Genetic algorithms
-        best_params = {
-            "rsi_period": 14,
-            "rsi_oversold": 30,
-            "rsi_overbought": 70,
-            "stop_loss": 0.02,
-            "take_profit": 0.04
-        }
-        best_score = 1.85  # Mock Sharpe ratio
-        
-        # TODO: Update database with real results
+        optimization_run = db.query(OptimizationRun).filter(
+            OptimizationRun.id == optimization_id
+        ).first()
+
+        plan = get_compiled_strategy(request_data["pine_script"])
+        parameter_space = plan.parameter_space.with_overrides(request_data.get("parameters"))
+        bars = load_bars(db, request_data["symbol"], request_data["timeframe"])
+
+        if request_data["mode"] == "walk_forward":
+            wf = request_data["walk_forward"]
+            windows = make_windows(
+                len(bars), wf["train_bars"], wf["test_bars"], wf["step_bars"], wf["anchored"]
+            )
+            # Windows are independent, so they run in parallel on the worker pool
+            result = await run_walk_forward(get_worker_pool(), bars, request_data, windows)
+        elif request_data["mode"] == "multi_objective":
+            result = await asyncio.to_thread(
+                optimize_pareto,
+                plan,
+                parameter_space,
+                bars,
+                request_data["timeframe"],
+                request_data["objectives"],
+                iterations=request_data["iterations"],
+            )
+            db.add_all([
+                ParetoSolution(
+                    optimization_id=optimization_id,
+                    rank=rank,
+                    params=point["params"],
+                    objectives=point["objectives"]
+                )
+                for rank, point in enumerate(result["front"])
+            ])
+        else:
+            # The backtests are CPU-bound, keep them off the event loop
+            result = await asyncio.to_thread(
+                optimize,
+                plan,
+                parameter_space,
+                bars,
+                request_data["timeframe"],
+                algorithm=request_data["algorithm"],
+                iterations=request_data["iterations"],
+            )
+
+        optimization_run.status = "completed"
+        optimization_run.best_params = result["best_params"]
+        optimization_run.best_score = result["best_score"]
+        optimization_run.iterations = result["iterations"]
+        optimization_run.telemetry = result["telemetry"]
+        optimization_run.completed_at = datetime.datetime.utcnow()
+        db.commit()
+
         logger.info(
             "Optimization completed",
             optimization_id=optimization_id,
-            best_score=best_score
+            best_score=result["best_score"],
+            telemetry=result["telemetry"]
         )
-        
+
     except Exception as e:
         logger.error(
             "Optimization failed",
             optimization_id=optimization_id,
             error=str(e)
-        )
\ No newline at end of file
+        )
+        db.rollback()
+        db.query(OptimizationRun).filter(OptimizationRun.id == optimization_id).update({
+            "status": "failed",
+            "completed_at": datetime.datetime.utcnow()
+        })
+        db.commit()
+    finally:
+        db.close()
+
+async def run_batch_optimization(batch_id: int, runs: List[Dict[str, Any]], request_data: dict):
+    """Background task to run every sub-run of a batch on the worker pool"""
+    logger.info("Starting batch optimization background task", batch_id=batch_id, total_runs=len(runs))
+
+    db = SessionLocal()
+
+    def load(symbol: str, timeframe: str):
+        # Runs in a worker thread, so it gets its own session
+        session = SessionLocal()
+        try:
+            return load_bars(session, symbol, timeframe)
+        finally:
+            session.close()
+
+    tickets = {}
+
+    def finish(run_id: int, values: dict, counter: str):
+        ticket = tickets.pop(run_id, None)
+        if ticket is not None:
+            ticket.release()
+        db.query(OptimizationRun).filter(OptimizationRun.id == run_id).update(values)
+        db.query(OptimizationBatch).filter(OptimizationBatch.id == batch_id).update({
+            counter: getattr(OptimizationBatch, counter) + 1
+        })
+        db.commit()
+
+    async def on_result(run: Dict[str, Any], result: Dict[str, Any]):
+        finish(run["id"], {
+            "status": "completed",
+            "best_params": result["best_params"],
+            "best_score": result["best_score"],
+            "iterations": result["iterations"],
+            "telemetry": result["telemetry"],
+            "completed_at": datetime.datetime.utcnow()
+        }, "completed_runs")
+
+    async def on_error(run: Dict[str, Any], error: Exception):
+        logger.error("Batch sub-run failed", batch_id=batch_id, optimization_id=run["id"], error=str(error))
+        finish(run["id"], {"status": "failed", "completed_at": datetime.datetime.utcnow()}, "failed_runs")
+
+    async def on_start(run: Dict[str, Any]):
+        # Sub-runs stay queued until the pool has a worker and the job budget has room for them
+        tickets[run["id"]] = await reserve_job(
+            estimate_cost(1, run["timeframe"], 365, evaluations=request_data["iterations"])
+        )
+        db.query(OptimizationRun).filter(OptimizationRun.id == run["id"]).update({"status": "running"})
+        db.commit()
+
+    try:
+        await run_grid(get_worker_pool(), worker_count(), runs, request_data, load, on_result, on_error, on_start)
+
+        batch = db.query(OptimizationBatch).filter(OptimizationBatch.id == batch_id).first()
+        batch.status = "failed" if batch.failed_runs == batch.total_runs else "completed"
+        batch.completed_at = datetime.datetime.utcnow()
+        db.commit()
+
+        logger.info(
+            "Batch optimization completed",
+            batch_id=batch_id,
+            completed_runs=batch.completed_runs,
+            failed_runs=batch.failed_runs
+        )
+
+    except Exception as e:
+        logger.error("Batch optimization failed", batch_id=batch_id, error=str(e))
+        db.rollback()
+        db.query(OptimizationBatch).filter(OptimizationBatch.id == batch_id).update({
+            "status": "failed",
+            "completed_at": datetime.datetime.utcnow()
+        })
+        db.commit()
+    finally:
+        for ticket in tickets.values():
+            ticket.release()
+        db.close()
@@ -1,105 +1,225 @@
-from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks
+from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks, Request, Response
+from sqlalchemy import func, or_
 from sqlalchemy.orm import Session
-from app.database import get_db, PairCorrelation
+from app.admission import admit, estimate_cost, pair_count
+from app.database import get_db, PairCorrelation, PairThreshold, Universe
+from app.market_data.bar_store import bar_store
+from app.market_data.client import MarketDataError, ensure_history, get_market_data_client
+from app.engine.backtest import OBJECTIVE_DIRECTIONS, periods_per_year
+from app.http_cache import conditional
+from app.pagination import check_page, link_next_page, paginate
+from app.pairs.analysis import SPREAD_METHODS, align_closes, classify_signals, pair_statistics, spread_statistics
+from app.pairs.backtest import all_pairs, backtest_pairs
+from app.pairs.correlations import apply_tuned_thresholds, store_correlations
+from app.pairs.live import get_live_pipeline
+from app.pairs.refresh import correlation_refresher
+from app.pairs.replay import HistoricalReplay
+from app.pairs.selection import SELECTION_METHODS, select_pairs
+from app.pairs.tuning import cluster_pairs, save_thresholds, tune_pairs
+from app.pairs.universe import universe_cache
+from app.shared_state import call_leader, leader_handler
 from pydantic import BaseModel
 from typing import List, Optional
 import structlog
+import asyncio
+import datetime
+import time
 import numpy as np
 
 router = APIRouter()
 logger = structlog.get_logger()
 
 class PairsAnalysisRequest(BaseModel):
-    pairs: List[str]
+    pairs: List[str] = []
+    universe_id: Optional[int] = None  # analyze a registered universe instead of `pairs`
     timeframe: str = "4h"
     lookback_days: int = 30
     zscore_threshold: float = 2.0
+    use_tuned_thresholds: bool = True  # per-pair thresholds from /optimize-thresholds; ignored for "kalman"
+    spread_method: str = "static"  # "static" OLS, "rolling" OLS over spread_lookback bars, or "kalman"
+    spread_lookback: int = 100
+    pair_selection: str = "all"  # "all", or prune with "hierarchical"/"kmeans" clusters or "knn" neighbours
+    clusters: Optional[int] = None  # default ~sqrt(symbols / 2)
+    neighbors: int = 10
 
 class PairAnalysis(BaseModel):
     pair1: str
     pair2: str
     correlation: float
     zscore: float
+    hedge_ratio: float
     signal: str  # "long_pair1", "long_pair2", "neutral"
     strength: str  # "strong", "medium", "weak"
+    entry_zscore: float
+    tuned: bool = False
 
 class PairsAnalysisResponse(BaseModel):
     analysis: List[PairAnalysis]
     summary: dict
 
+class PairsBacktestRequest(BaseModel):
+    pairs: List[str] = []  # every combination of these symbols is backtested
+    universe_id: Optional[int] = None
+    timeframe: str = "4h"
+    lookback_days: int = 90
+    lookback: int = 100  # bars in the rolling hedge ratio / z-score window
+    entry_zscore: float = 2.0
+    exit_zscore: float = 0.5
+    stop_zscore: Optional[float] = None
+    fee: float = 0.001  # per unit of traded notional
+    slippage: float = 0.0005
+    top: int = 50
+    pair_selection: str = "all"  # see PairsAnalysisRequest
+    clusters: Optional[int] = None
+    neighbors: int = 10
+
+class PairBacktestResult(BaseModel):
+    pair1: str
+    pair2: str
+    sharpe: float
+    total_return: float
+    max_drawdown: float
+    trades: int
+    win_rate: float
+    exposure: float
+    zscore: float
+    hedge_ratio: float
+    signal: str  # current position: "long_pair1", "long_pair2", "neutral"
+
+class PairsBacktestResponse(BaseModel):
+    results: List[PairBacktestResult]
+    summary: dict
+
+class ThresholdOptimizationRequest(BaseModel):
+    pairs: List[str] = []  # every combination of these symbols is tuned
+    universe_id: Optional[int] = None
+    timeframe: str = "4h"
+    lookback_days: int = 180
+    scope: str = "pair"  # "pair" (one swarm per pair) or "cluster" (pairs share a swarm)
+    clusters: int = 4
+    iterations: int = 30
+    particles: int = 20
+    objective: str = "sharpe"
+    min_trades: int = 3
+    entry_min: float = 1.0
+    entry_max: float = 3.5
+    lookback_min: int = 20
+    lookback_max: int = 300
+    fee: float = 0.001
+    slippage: float = 0.0005
+    seed: Optional[int] = None
+
+class ReplayRequest(BaseModel):
+    pairs: List[str] = []
+    universe_id: Optional[int] = None
+    timeframe: str = "4h"
+    start: Optional[int] = None  # epoch ms; defaults to end - lookback_days
+    end: Optional[int] = None  # epoch ms; defaults to now
+    lookback_days: int = 90
+    speed: Optional[float] = None  # real time multiplier; None replays as fast as possible
+    window: int = 500
+    zscore_threshold: float = 2.0
+    spread_method: str = "static"  # "static", "rolling" or "kalman" (updated incrementally per bar)
+    spread_lookback: int = 100
+    max_signals: int = 1000
+
+def resolve_symbols(db: Session, pairs: List[str], universe_id: Optional[int]) -> List[str]:
+    """The request's symbols, or those of a registered universe"""
+    if universe_id is not None:
+        universe = db.query(Universe).filter(Universe.id == universe_id).first()
+        if universe is None:
+            raise HTTPException(status_code=404, detail="Universe not found")
+        return list(universe.symbols)
+    if len(pairs) < 2:
+        raise HTTPException(status_code=400, detail="At least two pairs are required")
+    if len(set(pairs)) != len(pairs):
+        raise HTTPException(status_code=400, detail="pairs must not contain duplicates")
+    return list(pairs)
+
+async def load_prices(symbols: List[str], universe_id: Optional[int], timeframe: str,
+                      lookback_days: int) -> np.ndarray:
+    """Aligned closes over the lookback; a universe's warm matrix is used when it covers the window"""
+    end = int(time.time() * 1000)
+    start = end - lookback_days * 86_400_000
+    try:
+        if universe_id is not None:
+            prices = await universe_cache.prices(universe_id, symbols, timeframe, start)
+            if prices is not None:
+                return prices
+        # Backfill from the exchange when the stored history does not cover the window
+        await ensure_history(get_market_data_client(), symbols, timeframe, start, end)
+    except MarketDataError as e:
+        raise HTTPException(status_code=502, detail=f"Market data unavailable: {e}")
+    rows = await asyncio.to_thread(bar_store.closes, symbols, timeframe, start, end)
+    return align_closes(rows, symbols)[1]
+
 @router.post("/analyze", response_model=PairsAnalysisResponse)
 async def analyze_pairs(
     request: PairsAnalysisRequest,
+    http_request: Request,
     db: Session = Depends(get_db)
 ):
     """Analyze cryptocurrency pairs for statistical arbitrage opportunities"""
+    if request.spread_method not in SPREAD_METHODS:
+        raise HTTPException(status_code=400, detail=f"spread_method must be one of: {', '.join(SPREAD_METHODS)}")
+    if request.spread_lookback < 3:
+        raise HTTPException(status_code=400, detail="spread_lookback must be at least 3")
+    if request.pair_selection not in SELECTION_METHODS:
+        raise HTTPException(status_code=400, detail=f"pair_selection must be one of: {', '.join(SELECTION_METHODS)}")
+    symbols = resolve_symbols(db, request.pairs, request.universe_id)
+    cost = estimate_cost(pair_count(len(symbols)), request.timeframe, request.lookback_days)
+    ticket = await admit(http_request, cost, db)
     try:
         logger.info(
             "Starting pairs analysis",
-            pairs=request.pairs,
+            pairs=symbols,
+            universe_id=request.universe_id,
             timeframe=request.timeframe,
-            lookback_days=request.lookback_days
+            lookback_days=request.lookback_days,
+            spread_method=request.spread_method
         )
         
         analysis_results = []
-        
-        # Generate all possible pair combinations
-        for i, pair1 in enumerate(request.pairs):
-            for j, pair2 in enumerate(request.pairs):
-                if i < j:  # Avoid duplicates
-                    # Mock analysis - in real implementation, fetch historical data
-                    # and calculate actual correlations and z-scores
-                    correlation = np.random.uniform(0.3, 0.95)
-                    zscore = np.random.uniform(-3.0, 3.0)
-                    
-                    # Determine signal based on z-score threshold
-                    if zscore > request.zscore_threshold:
-                        signal = "long_pair2"  # pair1 is overvalued relative to pair2
-                    elif zscore < -request.zscore_threshold:
-                        signal = "long_pair1"  # pair2 is overvalued relative to pair1
-                    else:
-                        signal = "neutral"
-                    
-                    # Determine signal strength
-                    abs_zscore = abs(zscore)
-                    if abs_zscore > request.zscore_threshold * 1.5:
-                        strength = "strong"
-                    elif abs_zscore > request.zscore_threshold:
-                        strength = "medium"
-                    else:
-                        strength = "weak"
-                    
-                    pair_analysis = PairAnalysis(
-                        pair1=pair1,
-                        pair2=pair2,
-                        correlation=round(correlation, 4),
-                        zscore=round(zscore, 4),
-                        signal=signal,
-                        strength=strength
-                    )
-                    analysis_results.append(pair_analysis)
-                    
-                    # Update database with correlation data
-                    existing_pair = db.query(PairCorrelation).filter(
-                        PairCorrelation.pair1 == pair1,
-                        PairCorrelation.pair2 == pair2
-                    ).first()
-                    
-                    if existing_pair:
-                        existing_pair.correlation = correlation
-                        existing_pair.zscore = zscore
-                        existing_pair.status = signal
-                    else:
-                        new_pair = PairCorrelation(
-                            pair1=pair1,
-                            pair2=pair2,
-                            correlation=correlation,
-                            zscore=zscore,
-                            status=signal
-                        )
-                        db.add(new_pair)
-                    
-                    db.commit()
+
+        prices = await load_prices(symbols, request.universe_id, request.timeframe, request.lookback_days)
+        if len(prices) < 3:
+            raise HTTPException(status_code=422, detail="Not enough overlapping price history for these pairs")
+        if request.spread_method == "rolling" and len(prices) < request.spread_lookback:
+            raise HTTPException(
+                status_code=422,
+                detail=f"Only {len(prices)} overlapping bars; need spread_lookback ({request.spread_lookback})"
+            )
+        candidates = await asyncio.to_thread(
+            select_pairs, prices, request.pair_selection, request.clusters, request.neighbors
+        )
+        stats = await asyncio.to_thread(
+            spread_statistics, prices, request.spread_method, request.spread_lookback, candidates
+        )
+        zscores = stats["zscore"].copy()
+        hedge_ratios = stats["hedge_ratio"].copy()
+        thresholds = np.full(zscores.shape, request.zscore_threshold)
+        tuned = np.zeros(zscores.shape, dtype=bool)
+        if request.use_tuned_thresholds and request.spread_method != "kalman":
+            tuned = apply_tuned_thresholds(db, symbols, prices, request.timeframe, zscores, hedge_ratios, thresholds)
+        signals, strengths = classify_signals(zscores, thresholds)
+
+        for i, j in zip(candidates[0].tolist(), candidates[1].tolist()):
+            analysis_results.append(PairAnalysis(
+                pair1=symbols[i],
+                pair2=symbols[j],
+                correlation=round(float(stats["correlation"][i, j]), 4),
+                zscore=round(float(zscores[i, j]), 4),
+                hedge_ratio=round(float(hedge_ratios[i, j]), 6),
+                signal=str(signals[i, j]),
+                strength=str(strengths[i, j]),
+                entry_zscore=round(float(thresholds[i, j]), 4),
+                tuned=bool(tuned[i, j])
+            ))
+        # Update database with correlation data
+        store_correlations(
+            db, symbols, request.timeframe, candidates[0], candidates[1],
+            stats["correlation"][candidates], zscores[candidates], signals[candidates]
+        )
         
         # Generate summary statistics
         strong_signals = [p for p in analysis_results if p.strength == "strong" and p.signal != "neutral"]
@@ -109,9 +229,14 @@ async def analyze_pairs(
             "total_pairs": len(analysis_results),
             "strong_signals": len(strong_signals),
             "medium_signals": len(medium_signals),
-            "avg_correlation": round(np.mean([p.correlation for p in analysis_results]), 4),
-            "max_abs_zscore": round(max([abs(p.zscore) for p in analysis_results]), 4),
-            "arbitrage_opportunities": len([p for p in analysis_results if abs(p.zscore) > request.zscore_threshold])
+            "avg_correlation": round(float(np.mean([p.correlation for p in analysis_results])), 4)
+            if analysis_results else 0.0,
+            "max_abs_zscore": round(max([abs(p.zscore) for p in analysis_results], default=0.0), 4),
+            "arbitrage_opportunities": len([p for p in analysis_results if p.signal != "neutral"]),
+            "tuned_pairs": int(tuned[candidates].sum()),
+            "spread_method": request.spread_method,
+            "pair_selection": request.pair_selection,
+            "pairs_pruned": len(symbols) * (len(symbols) - 1) // 2 - len(analysis_results)
         }
         
         logger.info("Pairs analysis completed", summary=summary)
@@ -121,21 +246,253 @@ async def analyze_pairs(
             summary=summary
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error("Pairs analysis failed", error=str(e))
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        ticket.release()
+
+@router.post("/backtest", response_model=PairsBacktestResponse)
+async def backtest_pairs_endpoint(request: PairsBacktestRequest, http_request: Request,
+                                  db: Session = Depends(get_db)):
+    """Backtest z-score mean reversion on every pair and rank them by Sharpe"""
+    if request.exit_zscore < 0 or request.entry_zscore <= request.exit_zscore:
+        raise HTTPException(status_code=400, detail="entry_zscore must be greater than exit_zscore >= 0")
+    if request.stop_zscore is not None and request.stop_zscore <= request.entry_zscore:
+        raise HTTPException(status_code=400, detail="stop_zscore must be greater than entry_zscore")
+    if request.pair_selection not in SELECTION_METHODS:
+        raise HTTPException(status_code=400, detail=f"pair_selection must be one of: {', '.join(SELECTION_METHODS)}")
+    try:
+        annualization = periods_per_year(request.timeframe)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    symbols = resolve_symbols(db, request.pairs, request.universe_id)
+    cost = estimate_cost(pair_count(len(symbols)), request.timeframe, request.lookback_days)
+    ticket = await admit(http_request, cost, db)
+    try:
+        prices = await load_prices(symbols, request.universe_id, request.timeframe, request.lookback_days)
+        if len(prices) <= request.lookback:
+            raise HTTPException(
+                status_code=422,
+                detail=f"Only {len(prices)} overlapping bars; need more than lookback ({request.lookback})"
+            )
+
+        started = time.perf_counter()
+        left, right = select_pairs(prices, request.pair_selection, request.clusters, request.neighbors)
+        if not len(left):
+            raise HTTPException(status_code=422, detail="Pair selection left no pairs to backtest")
+        metrics = await asyncio.to_thread(
+            backtest_pairs, prices, left, right,
+            lookback=request.lookback,
+            entry=request.entry_zscore,
+            exit=request.exit_zscore,
+            stop=request.stop_zscore,
+            fee=request.fee,
+            slippage=request.slippage,
+            annualization=annualization,
+        )
+        elapsed = time.perf_counter() - started
+
+        ranked = np.argsort(-metrics["sharpe"], kind="stable")
+        signal_names = {1.0: "long_pair1", -1.0: "long_pair2", 0.0: "neutral"}
+        results = [
+            PairBacktestResult(
+                pair1=symbols[left[k]],
+                pair2=symbols[right[k]],
+                sharpe=round(float(metrics["sharpe"][k]), 4),
+                total_return=round(float(metrics["total_return"][k]), 6),
+                max_drawdown=round(float(metrics["max_drawdown"][k]), 6),
+                trades=int(metrics["trades"][k]),
+                win_rate=round(float(metrics["win_rate"][k]), 4),
+                exposure=round(float(metrics["exposure"][k]), 4),
+                zscore=round(float(metrics["zscore"][k]), 4),
+                hedge_ratio=round(float(metrics["hedge_ratio"][k]), 6),
+                signal=signal_names[float(metrics["position"][k])],
+            )
+            for k in ranked[:request.top]
+        ]
+        summary = {
+            "pairs_tested": len(left),
+            "pairs_pruned": len(symbols) * (len(symbols) - 1) // 2 - len(left),
+            "bars": len(prices),
+            "profitable_pairs": int((metrics["total_return"] > 0).sum()),
+            "avg_sharpe": round(float(metrics["sharpe"].mean()), 4),
+            "elapsed_ms": round(elapsed * 1000, 1),
+        }
+        logger.info("Pairs backtest completed", **summary)
+        return PairsBacktestResponse(results=results, summary=summary)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Pairs backtest failed", error=str(e))
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        ticket.release()
 
-@router.get("/correlations")
-async def get_correlations(db: Session = Depends(get_db)):
-    """Get current pair correlations from database"""
-    correlations = db.query(PairCorrelation).order_by(
-        PairCorrelation.updated_at.desc()
-    ).limit(100).all()
+@router.post("/optimize-thresholds")
+async def optimize_thresholds(
+    request: ThresholdOptimizationRequest,
+    http_request: Request,
+    db: Session = Depends(get_db)
+):
+    """Swarm-optimize entry/exit z-scores and lookback per pair or per cluster and store them"""
+    if request.scope not in ("pair", "cluster"):
+        raise HTTPException(status_code=400, detail="scope must be 'pair' or 'cluster'")
+    if request.objective not in OBJECTIVE_DIRECTIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown objective '{request.objective}'. Use one of: {', '.join(OBJECTIVE_DIRECTIONS)}"
+        )
+    if not 0 < request.entry_min < request.entry_max or not 3 <= request.lookback_min <= request.lookback_max:
+        raise HTTPException(status_code=400, detail="Invalid entry or lookback range")
+    try:
+        annualization = periods_per_year(request.timeframe)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    symbols = resolve_symbols(db, request.pairs, request.universe_id)
+    # Every particle backtests its pair once per iteration
+    cost = estimate_cost(pair_count(len(symbols)), request.timeframe, request.lookback_days,
+                         evaluations=request.iterations * request.particles)
+    ticket = await admit(http_request, cost, db)
+    try:
+        prices = await load_prices(symbols, request.universe_id, request.timeframe, request.lookback_days)
+        if len(prices) < 2 * request.lookback_min:
+            raise HTTPException(
+                status_code=422,
+                detail=f"Only {len(prices)} overlapping bars; need at least {2 * request.lookback_min}"
+            )
+
+        left, right = all_pairs(len(symbols))
+        groups = None
+        if request.scope == "cluster":
+            correlation = pair_statistics(prices)["correlation"][left, right]
+            groups = cluster_pairs(correlation, request.clusters)
+        result = await asyncio.to_thread(
+            tune_pairs, prices, left, right,
+            groups=groups,
+            iterations=request.iterations,
+            particles=request.particles,
+            objective=request.objective,
+            min_trades=request.min_trades,
+            entry_range=(request.entry_min, request.entry_max),
+            lookback_range=(request.lookback_min, request.lookback_max),
+            fee=request.fee,
+            slippage=request.slippage,
+            annualization=annualization,
+            seed=request.seed,
+        )
+        save_thresholds(
+            db, symbols, left, right, request.timeframe, result,
+            request.objective, per_cluster=groups is not None
+        )
+
+        metrics = result["metrics"]
+        results = [
+            {
+                "pair1": symbols[left[k]],
+                "pair2": symbols[right[k]],
+                "entry_zscore": round(float(result["entry"][k]), 4),
+                "exit_zscore": round(float(result["exit"][k]), 4),
+                "lookback": int(result["lookback"][k]),
+                "cluster": int(result["group"][k]) if groups is not None else None,
+                "score": round(float(result["score"][k]), 4),
+                "sharpe": round(float(metrics["sharpe"][k]), 4),
+                "total_return": round(float(metrics["total_return"][k]), 6),
+                "trades": int(metrics["trades"][k]),
+            }
+            for k in np.argsort(-metrics["sharpe"], kind="stable")
+        ]
+        elapsed = result["elapsed_seconds"]
+        summary = {
+            "pairs": len(left),
+            "swarms": int(result["group"].max()) + 1,
+            "bars": len(prices),
+            "evaluations": result["evaluations"],
+            "evaluations_per_second": round(result["evaluations"] / elapsed, 1) if elapsed > 0 else None,
+            "elapsed_ms": round(elapsed * 1000, 1),
+        }
+        logger.info("Threshold optimization completed", scope=request.scope, **summary)
+        return {"results": results, "summary": summary}
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Threshold optimization failed", error=str(e))
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        ticket.release()
+
+@router.post("/replay")
+async def replay_pairs(request: ReplayRequest, http_request: Request, db: Session = Depends(get_db)):
+    """Replay stored bars through the live pairs engine and return the signals it produced"""
+    symbols = resolve_symbols(db, request.pairs, request.universe_id)
+    if request.speed is not None and request.speed <= 0:
+        raise HTTPException(status_code=400, detail="speed must be positive")
+    if request.spread_method not in SPREAD_METHODS:
+        raise HTTPException(status_code=400, detail=f"spread_method must be one of: {', '.join(SPREAD_METHODS)}")
+    end = request.end or int(time.time() * 1000)
+    start = request.start or end - request.lookback_days * 86_400_000
+    cost = estimate_cost(pair_count(len(symbols)), request.timeframe, (end - start) / 86_400_000)
+    ticket = await admit(http_request, cost, db)
+    try:
+        try:
+            await ensure_history(get_market_data_client(), symbols, request.timeframe, start, end)
+        except MarketDataError as e:
+            raise HTTPException(status_code=502, detail=f"Market data unavailable: {e}")
+
+        replay = HistoricalReplay(
+            symbols,
+            request.timeframe,
+            start,
+            end,
+            speed=request.speed,
+            window=request.window,
+            zscore_threshold=request.zscore_threshold,
+            spread_method=request.spread_method,
+            spread_lookback=request.spread_lookback,
+        )
+        report = await replay.run()
+        logger.info("Pairs replay completed", **{k: v for k, v in report.items() if k != "engine"})
+        return {**report, "signals": replay.signals[:request.max_signals]}
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Pairs replay failed", error=str(e))
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        ticket.release()
+
+@router.get("/correlations", dependencies=[conditional("pair_correlations")])
+async def get_correlations(request: Request, response: Response, timeframe: Optional[str] = None,
+                           status: Optional[str] = None, symbol: Optional[str] = None,
+                           since: Optional[datetime.datetime] = None, until: Optional[datetime.datetime] = None,
+                           cursor: Optional[str] = None, limit: int = 100, db: Session = Depends(get_db)):
+    """Get pair correlations newest first; the next page is in the Link / X-Next-Cursor headers"""
+    try:
+        after = check_page(cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    query = db.query(PairCorrelation)
+    if timeframe is not None:
+        query = query.filter(PairCorrelation.timeframe == timeframe)
+    if status is not None:
+        query = query.filter(PairCorrelation.status == status)
+    if symbol is not None:
+        query = query.filter(or_(PairCorrelation.pair1 == symbol, PairCorrelation.pair2 == symbol))
+    correlations, next_cursor = paginate(
+        query, PairCorrelation.updated_at, PairCorrelation.id, after, limit, since, until
+    )
+    link_next_page(request, response, next_cursor)
     
     return [
         {
             "pair1": corr.pair1,
             "pair2": corr.pair2,
+            "timeframe": corr.timeframe,
             "correlation": corr.correlation,
             "zscore": corr.zscore,
             "signal": corr.status,
@@ -144,29 +501,106 @@ async def get_correlations(db: Session = Depends(get_db)):
         for corr in correlations
     ]
 
-@router.get("/opportunities")
+@router.get("/thresholds")
+async def get_thresholds(timeframe: Optional[str] = None, db: Session = Depends(get_db)):
+    """Get the tuned per-pair thresholds"""
+    query = db.query(PairThreshold)
+    if timeframe is not None:
+        query = query.filter(PairThreshold.timeframe == timeframe)
+    return [
+        {
+            "pair1": row.pair1,
+            "pair2": row.pair2,
+            "timeframe": row.timeframe,
+            "entry_zscore": row.entry_zscore,
+            "exit_zscore": row.exit_zscore,
+            "lookback": row.lookback,
+            "cluster": row.cluster,
+            "objective": row.objective,
+            "score": row.score,
+            "sharpe": row.sharpe,
+            "trades": row.trades,
+            "updated_at": row.updated_at
+        }
+        for row in query.order_by(PairThreshold.pair1, PairThreshold.pair2, PairThreshold.timeframe).all()
+    ]
+
+@router.get("/opportunities", dependencies=[conditional("pair_correlations", "pair_thresholds")])
 async def get_arbitrage_opportunities(
     min_zscore: float = 2.0,
     min_correlation: float = 0.5,
+    timeframe: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
-    """Get current arbitrage opportunities based on z-score and correlation thresholds"""
-    opportunities = db.query(PairCorrelation).filter(
+    """Get current arbitrage opportunities; tuned pairs use their own entry z-score instead of min_zscore"""
+    # Each pair's entry threshold is applied in SQL, so the limit counts qualifying pairs only
+    entry = func.coalesce(PairThreshold.entry_zscore, min_zscore)
+    query = db.query(PairCorrelation, entry, PairThreshold.id).outerjoin(
+        PairThreshold,
+        (PairThreshold.pair1 == PairCorrelation.pair1)
+        & (PairThreshold.pair2 == PairCorrelation.pair2)
+        & (PairThreshold.timeframe == PairCorrelation.timeframe)
+    ).filter(
         PairCorrelation.correlation >= min_correlation,
-        PairCorrelation.zscore.abs() >= min_zscore
-    ).order_by(
-        PairCorrelation.zscore.abs().desc()
+        func.abs(PairCorrelation.zscore) >= entry
+    )
+    if timeframe is not None:
+        query = query.filter(PairCorrelation.timeframe == timeframe)
+    candidates = query.order_by(
+        func.abs(PairCorrelation.zscore).desc()
     ).limit(20).all()
-    
+
     return [
         {
             "pair1": opp.pair1,
             "pair2": opp.pair2,
+            "timeframe": opp.timeframe,
             "correlation": opp.correlation,
             "zscore": opp.zscore,
             "signal": opp.status,
-            "strength": "strong" if abs(opp.zscore) > min_zscore * 1.5 else "medium",
+            "strength": "strong" if abs(opp.zscore) > entry_zscore * 1.5 else "medium",
+            "entry_zscore": entry_zscore,
+            "tuned": threshold_id is not None,
             "updated_at": opp.updated_at
         }
-        for opp in opportunities
-    ]
\ No newline at end of file
+        for opp, entry_zscore, threshold_id in candidates
+    ]
+
+@router.get("/live")
+async def get_live_signals():
+    """Get the latest signals and ingestion metrics from the live stream pipeline"""
+    return await call_leader("pairs.live")
+
+@router.get("/scheduler")
+async def get_scheduler_status():
+    """Bar-close refresh jobs with their run counts, durations and lag"""
+    return await call_leader("pairs.scheduler")
+
+@router.post("/scheduler/{timeframe}/run")
+async def run_scheduled_refresh(timeframe: str):
+    """Refresh pair correlations for a timeframe's universes now"""
+    return await call_leader("pairs.scheduler.run", timeframe=timeframe)
+
+# The stream pipeline and the bar-close scheduler run on the leader worker only
+@leader_handler("pairs.live")
+async def _live_signals():
+    pipeline = get_live_pipeline()
+    if pipeline is None:
+        raise HTTPException(status_code=404, detail="Live ingestion is not running (set STREAM_SYMBOLS)")
+    latest = pipeline.engine.latest
+    return {
+        **pipeline.status(),
+        "latest": latest.to_dict() if latest else None,
+    }
+
+@leader_handler("pairs.scheduler")
+async def _scheduler_status():
+    return correlation_refresher.stats()
+
+@leader_handler("pairs.scheduler.run")
+async def _run_scheduled_refresh(timeframe: str):
+    try:
+        started = await correlation_refresher.run_now(timeframe)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"No universe is registered at timeframe '{timeframe}'")
+    return {"timeframe": timeframe, "started": started, **correlation_refresher.job_stats(timeframe)}
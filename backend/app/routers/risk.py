@@ -0,0 +1,100 @@
+from fastapi import APIRouter, HTTPException, Depends
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.database import get_db, PairCorrelation
+from app.pairs.analysis import pair_statistics
+from app.routers.pairs_trading import load_prices, resolve_symbols
+from app.trading.risk import (
+    CAPITAL_PHASES, RiskEngine, RiskModel, book_notional, candidates_from_signals, net_quantities,
+    order_quantities, phase_limits
+)
+from pydantic import BaseModel
+from typing import List, Optional
+import structlog
+import asyncio
+
+router = APIRouter()
+logger = structlog.get_logger()
+
+class PairSignal(BaseModel):
+    pair1: str
+    pair2: str
+    signal: str  # "long_pair1" or "long_pair2"
+    zscore: Optional[float] = None  # larger |zscore| is sized first
+    hedge_ratio: Optional[float] = None  # default: static OLS hedge ratio over the lookback
+
+class RiskRequest(BaseModel):
+    equity: float
+    capital_phase: Optional[str] = None  # default: the phase of `equity`
+    signals: Optional[List[PairSignal]] = None  # default: current signals in pair_correlations
+    universe_id: Optional[int] = None  # model the universe's symbols (and use its warm matrix)
+    timeframe: str = "1h"
+    lookback_days: int = 30
+    is_live: Optional[bool] = None  # book from live trades, paper trades, or both (None)
+    open_pairs: int = 0  # pair positions already open, counted against the phase's max_pairs
+
+@router.get("/phases")
+async def get_capital_phases():
+    """Capital phase bands and their risk limits"""
+    return {phase: phase_limits(phase).to_dict() for phase in CAPITAL_PHASES}
+
+@router.post("/evaluate")
+async def evaluate_signals(request: RiskRequest, db: Session = Depends(get_db)):
+    """Size a batch of pair signals and check them against the current book and capital phase limits"""
+    if request.capital_phase is not None and request.capital_phase not in CAPITAL_PHASES:
+        raise HTTPException(status_code=400, detail=f"capital_phase must be one of: {', '.join(CAPITAL_PHASES)}")
+    if request.equity <= 0:
+        raise HTTPException(status_code=400, detail="equity must be positive")
+    try:
+        if request.signals is not None:
+            signals = [signal.model_dump() for signal in request.signals]
+        else:
+            rows = db.query(PairCorrelation).filter(
+                PairCorrelation.status != "neutral",
+                PairCorrelation.timeframe == request.timeframe
+            ).all()
+            signals = [
+                {"pair1": row.pair1, "pair2": row.pair2, "signal": row.status, "zscore": row.zscore,
+                 "hedge_ratio": None}
+                for row in rows
+            ]
+        quantities = await asyncio.to_thread(net_quantities, db, request.is_live)
+        if request.universe_id is not None:
+            symbols = resolve_symbols(db, [], request.universe_id)
+        else:
+            traded = {s for signal in signals for s in (signal["pair1"], signal["pair2"])}
+            symbols = sorted(traded | set(quantities))
+            if len(symbols) < 2:
+                raise HTTPException(status_code=400, detail="No signals or open positions to evaluate")
+
+        prices = await load_prices(symbols, request.universe_id, request.timeframe, request.lookback_days)
+        if len(prices) < 3:
+            raise HTTPException(status_code=422, detail="Not enough overlapping price history for these symbols")
+        model = RiskModel.from_prices(symbols, prices, settings.RISK_HORIZON_BARS)
+        missing = [
+            signal for signal in signals
+            if signal["hedge_ratio"] is None and signal["pair1"] in model.index and signal["pair2"] in model.index
+        ]
+        if missing:
+            hedge_ratios = pair_statistics(prices)["hedge_ratio"]
+            for signal in missing:
+                signal["hedge_ratio"] = float(hedge_ratios[model.index[signal["pair1"]], model.index[signal["pair2"]]])
+        try:
+            candidates = candidates_from_signals(model, signals)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        book, unmodelled = book_notional(model, quantities)
+
+        engine = RiskEngine(model, settings.RISK_STOP_SIGMAS, settings.MIN_ORDER_NOTIONAL)
+        result = engine.evaluate(candidates, book, request.equity, request.capital_phase, request.open_pairs)
+        for decision in result["decisions"]:
+            decision["quantity"] = order_quantities(model, decision)
+        logger.info("Risk evaluated", candidates=len(signals), accepted=result["accepted"],
+                    phase=result["capital_phase"], evaluation_ms=round(result["evaluation_ms"], 3))
+        return {**result, "unmodelled_positions": unmodelled}
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Risk evaluation failed", error=str(e))
+        raise HTTPException(status_code=500, detail=str(e))
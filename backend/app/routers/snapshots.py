@@ -0,0 +1,75 @@
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from app.config import settings
+from app.database import SessionLocal
+from app.snapshots import DEFAULT_BATCH_SIZE, FORMATS, TABLES, import_table, require_pyarrow, stream_export
+from typing import Optional
+import structlog
+import asyncio
+import datetime
+import tempfile
+import time
+
+router = APIRouter()
+logger = structlog.get_logger()
+
+def _check(table: str, format: str, batch_size: int):
+    if table not in TABLES:
+        raise HTTPException(status_code=404, detail=f"Unknown table '{table}'. Use one of: {', '.join(TABLES)}")
+    if format not in FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of: {', '.join(FORMATS)}")
+    if batch_size < 1:
+        raise HTTPException(status_code=400, detail="batch_size must be positive")
+    try:
+        require_pyarrow()
+    except RuntimeError as e:
+        raise HTTPException(status_code=501, detail=str(e))
+
+@router.get("/{table}")
+async def export_snapshot(table: str, format: str = "parquet", batch_size: int = DEFAULT_BATCH_SIZE,
+                          since: Optional[datetime.datetime] = None, until: Optional[datetime.datetime] = None):
+    """Stream a table as Parquet or an Arrow IPC stream, one server-side cursor batch at a time"""
+    _check(table, format, batch_size)
+    media_type, suffix = FORMATS[format]
+    filename = f"{table}-{datetime.datetime.utcnow():%Y%m%dT%H%M%S}{suffix}"
+    # A sync iterator, so Starlette encodes each batch on its threadpool instead of the event loop
+    return StreamingResponse(
+        stream_export(SessionLocal, TABLES[table], format, batch_size, since, until),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+@router.post("/{table}")
+async def import_snapshot(table: str, request: Request, format: str = "parquet",
+                          batch_size: int = DEFAULT_BATCH_SIZE):
+    """Seed an empty table from a snapshot sent as the raw request body (needs SNAPSHOT_IMPORT_ENABLED).
+
+    Existing rows are never replaced over HTTP; `python manage.py import --replace` does that.
+    """
+    if not settings.SNAPSHOT_IMPORT_ENABLED:
+        raise HTTPException(status_code=403, detail="Snapshot import over HTTP is disabled; "
+                                                    "use `python manage.py import` or set SNAPSHOT_IMPORT_ENABLED")
+    _check(table, format, batch_size)
+    # Spool the upload to disk (Parquet needs a seekable file) without holding it in memory
+    with tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024) as spool:
+        async for chunk in request.stream():
+            spool.write(chunk)
+        spool.seek(0)
+        started = time.perf_counter()
+        db = SessionLocal()
+        try:
+            rows = await asyncio.to_thread(import_table, db, TABLES[table], spool, format, batch_size)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except Exception as e:
+            logger.error("Snapshot import failed", table=table, error=str(e))
+            raise HTTPException(status_code=500, detail=str(e))
+        finally:
+            db.close()
+    elapsed = time.perf_counter() - started
+    if table == "trades":
+        from app.shared_state import call_leader
+
+        await call_leader("metrics.rebuild")
+    logger.info("Snapshot imported", table=table, rows=rows, seconds=elapsed)
+    return {"table": table, "rows": rows, "seconds": elapsed, "rows_per_second": rows / elapsed if elapsed else None}
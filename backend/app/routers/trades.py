@@ -0,0 +1,56 @@
+from fastapi import APIRouter, HTTPException, Depends
+from sqlalchemy.orm import Session
+from app.database import get_db, Trade
+from app.pagination import DEFAULT_PAGE_SIZE, check_page, paginate
+from typing import Optional
+import structlog
+import datetime
+
+router = APIRouter()
+logger = structlog.get_logger()
+
+@router.get("")
+async def list_trades(strategy_id: Optional[int] = None, symbol: Optional[str] = None,
+                      side: Optional[str] = None, is_live: Optional[bool] = None,
+                      since: Optional[datetime.datetime] = None, until: Optional[datetime.datetime] = None,
+                      cursor: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE,
+                      db: Session = Depends(get_db)):
+    """List executed trades newest first; pass `next_cursor` back as `cursor` for the next page"""
+    if side is not None and side not in ("buy", "sell"):
+        raise HTTPException(status_code=400, detail="side must be 'buy' or 'sell'")
+    try:
+        after = check_page(cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        query = db.query(Trade)
+        if strategy_id is not None:
+            query = query.filter(Trade.strategy_id == strategy_id)
+        if symbol is not None:
+            query = query.filter(Trade.symbol == symbol)
+        if side is not None:
+            query = query.filter(Trade.side == side)
+        if is_live is not None:
+            query = query.filter(Trade.is_live == is_live)
+        trades, next_cursor = paginate(query, Trade.executed_at, Trade.id, after, limit, since, until)
+        return {
+            "items": [
+                {
+                    "id": trade.id,
+                    "strategy_id": trade.strategy_id,
+                    "symbol": trade.symbol,
+                    "side": trade.side,
+                    "quantity": trade.quantity,
+                    "price": trade.price,
+                    "pnl": trade.pnl,
+                    "capital_phase": trade.capital_phase,
+                    "is_live": trade.is_live,
+                    "executed_at": trade.executed_at
+                }
+                for trade in trades
+            ],
+            "next_cursor": next_cursor
+        }
+    except Exception as e:
+        logger.error("Error listing trades", error=str(e))
+        raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,167 @@
+from fastapi import APIRouter, HTTPException, Depends
+from sqlalchemy.orm import Session
+from app.database import get_db, Universe
+from app.engine.data import timeframe_ms
+from app.market_data.client import MarketDataError
+from app.pairs.refresh import correlation_refresher
+from app.pairs.universe import universe_cache
+from app.shared_state import call_leader, leader_handler
+from pydantic import BaseModel
+from typing import List, Optional
+import structlog
+import numpy as np
+
+router = APIRouter()
+logger = structlog.get_logger()
+
+class UniverseRequest(BaseModel):
+    name: str
+    symbols: List[str]
+    timeframes: List[str] = ["1h"]  # matrices kept warm in the background
+    description: Optional[str] = None
+
+class UniverseUpdate(BaseModel):
+    symbols: Optional[List[str]] = None
+    timeframes: Optional[List[str]] = None
+    description: Optional[str] = None
+
+def _clean_symbols(symbols: List[str]) -> List[str]:
+    cleaned = list(dict.fromkeys(s.strip().upper() for s in symbols if s.strip()))
+    if len(cleaned) < 2:
+        raise HTTPException(status_code=400, detail="A universe needs at least two symbols")
+    return cleaned
+
+def _check_timeframes(timeframes: List[str]) -> List[str]:
+    try:
+        for timeframe in timeframes:
+            timeframe_ms(timeframe)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return list(dict.fromkeys(timeframes))
+
+def _to_dict(universe: Universe):
+    return {
+        "id": universe.id,
+        "name": universe.name,
+        "description": universe.description,
+        "symbols": universe.symbols,
+        "timeframes": universe.timeframes,
+        "created_at": universe.created_at,
+        "updated_at": universe.updated_at,
+        "matrices": universe_cache.stats(universe.id),
+    }
+
+def get_universe(db: Session, universe_id: int) -> Universe:
+    """Registered universe or 404"""
+    universe = db.query(Universe).filter(Universe.id == universe_id).first()
+    if universe is None:
+        raise HTTPException(status_code=404, detail="Universe not found")
+    return universe
+
+@router.post("/")
+async def create_universe(request: UniverseRequest, db: Session = Depends(get_db)):
+    """Register a named symbol universe"""
+    symbols = _clean_symbols(request.symbols)
+    timeframes = _check_timeframes(request.timeframes)
+    if db.query(Universe).filter(Universe.name == request.name).first():
+        raise HTTPException(status_code=409, detail=f"Universe '{request.name}' already exists")
+    universe = Universe(
+        name=request.name,
+        description=request.description,
+        symbols=symbols,
+        timeframes=timeframes
+    )
+    db.add(universe)
+    db.commit()
+    db.refresh(universe)
+    logger.info("Universe registered", universe_id=universe.id, name=universe.name, symbols=len(symbols))
+    await call_leader("universes.changed")
+    return _to_dict(universe)
+
+@router.get("/")
+async def list_universes(db: Session = Depends(get_db)):
+    """List registered universes"""
+    return [_to_dict(u) for u in db.query(Universe).order_by(Universe.name).all()]
+
+@router.get("/{universe_id}")
+async def get_universe_details(universe_id: int, db: Session = Depends(get_db)):
+    """Get a universe with the state of its warm matrices"""
+    return _to_dict(get_universe(db, universe_id))
+
+@router.put("/{universe_id}")
+async def update_universe(universe_id: int, request: UniverseUpdate, db: Session = Depends(get_db)):
+    """Change a universe's symbols, timeframes or description"""
+    universe = get_universe(db, universe_id)
+    if request.symbols is not None:
+        universe.symbols = _clean_symbols(request.symbols)
+        universe_cache.drop(universe_id)
+    if request.timeframes is not None:
+        universe.timeframes = _check_timeframes(request.timeframes)
+    if request.description is not None:
+        universe.description = request.description
+    db.commit()
+    db.refresh(universe)
+    await call_leader("universes.changed", universe_id=universe_id if request.symbols is not None else None)
+    return _to_dict(universe)
+
+@router.delete("/{universe_id}")
+async def delete_universe(universe_id: int, db: Session = Depends(get_db)):
+    """Remove a universe and its warm matrices"""
+    universe = get_universe(db, universe_id)
+    db.delete(universe)
+    db.commit()
+    universe_cache.drop(universe_id)
+    await call_leader("universes.changed", universe_id=universe_id)
+    return {"message": "Universe deleted successfully"}
+
+@router.post("/{universe_id}/refresh")
+async def refresh_universe(universe_id: int, timeframe: Optional[str] = None, db: Session = Depends(get_db)):
+    """Backfill and refresh a universe's matrices now"""
+    universe = get_universe(db, universe_id)
+    timeframes = _check_timeframes([timeframe]) if timeframe else list(universe.timeframes or [])
+    try:
+        snapshots = [
+            await universe_cache.warm(universe.id, list(universe.symbols), tf)
+            for tf in timeframes
+        ]
+    except MarketDataError as e:
+        raise HTTPException(status_code=502, detail=f"Market data unavailable: {e}")
+    return [snapshot.summary() for snapshot in snapshots]
+
+@router.get("/{universe_id}/statistics")
+async def get_universe_statistics(universe_id: int, timeframe: str = "1h", top: int = 20,
+                                  db: Session = Depends(get_db)):
+    """Most correlated pairs of a universe from its warm matrix"""
+    universe = get_universe(db, universe_id)
+    _check_timeframes([timeframe])
+    try:
+        snapshot = universe_cache.matrix(universe.id, list(universe.symbols), timeframe).snapshot
+        if snapshot is None:
+            snapshot = await universe_cache.warm(universe.id, list(universe.symbols), timeframe)
+    except MarketDataError as e:
+        raise HTTPException(status_code=502, detail=f"Market data unavailable: {e}")
+    if snapshot.statistics is None:
+        raise HTTPException(status_code=422, detail="Not enough overlapping price history for this universe")
+    left, right = np.triu_indices(len(snapshot.symbols), 1)
+    correlation = snapshot.statistics["correlation"][left, right]
+    ranked = np.argsort(-correlation, kind="stable")[:top]
+    return {
+        **snapshot.summary(),
+        "pairs": [
+            {
+                "pair1": snapshot.symbols[left[k]],
+                "pair2": snapshot.symbols[right[k]],
+                "correlation": round(float(correlation[k]), 4),
+                "zscore": round(float(snapshot.statistics["zscore"][left[k], right[k]]), 4),
+                "hedge_ratio": round(float(snapshot.statistics["hedge_ratio"][left[k], right[k]]), 6),
+            }
+            for k in ranked
+        ],
+    }
+
+@leader_handler("universes.changed")
+async def _universes_changed(universe_id: Optional[int] = None):
+    """Drop the leader's stale matrices and bring its bar-close jobs in line with the registered universes"""
+    if universe_id is not None:
+        universe_cache.drop(universe_id)
+    await correlation_refresher.sync()
@@ -0,0 +1,197 @@
+"""In-process scheduler for work that follows bar closes.
+
+Each job is bound to a timeframe and runs shortly after every bar of that
+timeframe closes:
+
+* a settle delay plus random jitter spreads jobs that share a close time
+  (every 4h close is also a 1h close) and gives ingestion time to write the
+  bar,
+* a job never overlaps itself - a trigger that arrives while it is still
+  running is skipped and counted,
+* when closes are missed (a run overran, the process was suspended, or the
+  scheduler just started) the job runs once for the latest close instead
+  of replaying every missed one,
+* a semaphore caps how many jobs run at once so refresh work cannot crowd
+  out request handling.
+
+Durations and lag (job start minus bar close) are recorded per job.
+"""
+from typing import Any, Awaitable, Callable, Dict, Optional
+from app.engine.data import timeframe_ms
+import asyncio
+import random
+import time
+import structlog
+
+logger = structlog.get_logger()
+
+JobFunc = Callable[[int], Awaitable[Any]]  # receives the close time (ms) of the bar it runs for
+
+
+class JobMetrics:
+    def __init__(self):
+        self.runs = 0
+        self.failures = 0
+        self.missed = 0
+        self.skipped = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.last_seconds: Optional[float] = None
+        self.total_lag = 0.0
+        self.max_lag = 0.0
+        self.last_lag: Optional[float] = None
+        self.last_close: Optional[int] = None
+        self.last_error: Optional[str] = None
+
+    def record(self, seconds: float, lag: float):
+        self.runs += 1
+        self.total_seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+        self.last_seconds = seconds
+        self.total_lag += lag
+        self.max_lag = max(self.max_lag, lag)
+        self.last_lag = lag
+
+    def to_dict(self) -> Dict[str, Any]:
+        def ms(value):
+            return round(value * 1000, 1) if value is not None else None
+
+        return {
+            "runs": self.runs,
+            "failures": self.failures,
+            "missed": self.missed,
+            "skipped": self.skipped,
+            "last_duration_ms": ms(self.last_seconds),
+            "avg_duration_ms": ms(self.total_seconds / self.runs) if self.runs else None,
+            "max_duration_ms": ms(self.max_seconds),
+            "last_lag_ms": ms(self.last_lag),
+            "avg_lag_ms": ms(self.total_lag / self.runs) if self.runs else None,
+            "max_lag_ms": ms(self.max_lag),
+            "last_close": self.last_close,
+            "last_error": self.last_error,
+        }
+
+
+class ScheduledJob:
+    def __init__(self, name: str, timeframe: str, func: JobFunc):
+        self.name = name
+        self.timeframe = timeframe
+        self.step = timeframe_ms(timeframe)
+        self.func = func
+        self.metrics = JobMetrics()
+        self.running = False
+        self.next_run_at: Optional[float] = None
+        self.task: Optional[asyncio.Task] = None
+
+
+class BarCloseScheduler:
+    """Runs registered jobs after each close of their timeframe"""
+
+    def __init__(self, max_concurrency: int = 1, settle_seconds: float = 3.0, jitter_seconds: float = 5.0,
+                 clock: Callable[[], float] = time.time, sleep: Callable[[float], Awaitable[None]] = asyncio.sleep,
+                 seed: Optional[int] = None):
+        self.settle_seconds = settle_seconds
+        self.jitter_seconds = jitter_seconds
+        self.clock = clock
+        self.sleep = sleep
+        self.rng = random.Random(seed)
+        self.max_concurrency = max_concurrency
+        self._slots = asyncio.Semaphore(max_concurrency)
+        self._jobs: Dict[str, ScheduledJob] = {}
+        self._started = False
+
+    def add_job(self, name: str, timeframe: str, func: JobFunc) -> ScheduledJob:
+        if name in self._jobs:
+            raise ValueError(f"Job '{name}' is already scheduled")
+        job = self._jobs[name] = ScheduledJob(name, timeframe, func)
+        if self._started:
+            job.task = asyncio.create_task(self._loop(job))
+        return job
+
+    async def remove_job(self, name: str):
+        job = self._jobs.pop(name, None)
+        if job is not None and job.task is not None:
+            job.task.cancel()
+            await asyncio.gather(job.task, return_exceptions=True)
+
+    def jobs(self):
+        return list(self._jobs)
+
+    def start(self):
+        self._started = True
+        # Bind the semaphore to the running loop
+        self._slots = asyncio.Semaphore(self.max_concurrency)
+        for job in self._jobs.values():
+            if job.task is None:
+                job.task = asyncio.create_task(self._loop(job))
+
+    async def stop(self):
+        self._started = False
+        tasks = [job.task for job in self._jobs.values() if job.task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for job in self._jobs.values():
+            job.task = None
+
+    async def run_now(self, name: str, close: Optional[int] = None) -> bool:
+        """Run a job immediately for `close` (default: the latest close); False if it was already running"""
+        job = self._jobs[name]
+        latest = int(self.clock() * 1000) // job.step * job.step
+        return await self._execute(job, close if close is not None else latest)
+
+    async def _execute(self, job: ScheduledJob, close: int) -> bool:
+        if job.running:
+            job.metrics.skipped += 1
+            return False
+        job.running = True
+        try:
+            async with self._slots:
+                started = self.clock()
+                lag = started - close / 1000
+                try:
+                    await job.func(close)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    job.metrics.failures += 1
+                    job.metrics.last_error = str(e)
+                    logger.error("Scheduled job failed", job=job.name, close=close, error=str(e))
+                job.metrics.record(self.clock() - started, lag)
+                job.metrics.last_close = close
+        finally:
+            job.running = False
+        return True
+
+    async def _loop(self, job: ScheduledJob):
+        while True:
+            latest = int(self.clock() * 1000) // job.step * job.step
+            last = job.metrics.last_close
+            if last is None or last + job.step <= latest:
+                # Starting up, or closes went by while a run overran: catch up once on the latest
+                if last is not None:
+                    job.metrics.missed += (latest - last) // job.step - 1
+                close = latest
+            else:
+                close = last + job.step
+                job.next_run_at = close / 1000 + self.settle_seconds + self.rng.uniform(0, self.jitter_seconds)
+                await self.sleep(max(0.0, job.next_run_at - self.clock()))
+            job.next_run_at = None
+            if not await self._execute(job, close):
+                # A manual run was in progress; let it count for this close
+                job.metrics.last_close = max(job.metrics.last_close or close, close)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self._started,
+            "max_concurrency": self.max_concurrency,
+            "jobs": {
+                name: {
+                    "timeframe": job.timeframe,
+                    "running": job.running,
+                    "next_run_at": job.next_run_at,
+                    **job.metrics.to_dict(),
+                }
+                for name, job in self._jobs.items()
+            },
+        }
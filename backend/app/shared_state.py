@@ -0,0 +1,341 @@
+"""State shared between uvicorn/gunicorn workers.
+
+With WORKERS > 1 every worker is a separate process, so anything kept in
+module globals is per worker. This module gives that state one home with
+two backends, picked by SHARED_STATE_BACKEND:
+
+* "memory" - plain dicts, for a single process (the default).
+* "redis" - the server at REDIS_URL, for any number of workers.
+
+Both offer keys with an optional TTL, counters, leases and leader calls.
+
+Components that must exist exactly once - the live stream pipeline, the
+universe and correlation refreshers, the execution engine and the
+performance metrics built from its trades - run on the *leader*: the
+worker holding the "leader" lease. The lease is renewed every third of
+LEADER_LEASE_SECONDS; when the leader dies, another worker takes it over
+and starts those services. With the memory backend the only process is
+always the leader.
+
+Endpoints served by a leader component register a handler with
+`leader_handler` and invoke it with `call_leader`. On the leader that is
+a plain await. On any other worker the call goes through a Redis list and
+the leader pushes the reply back, so every endpoint works whichever
+worker the request lands on. An HTTPException raised by the handler
+reaches the caller with its status code.
+"""
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from fastapi import HTTPException
+from app.config import settings
+import asyncio
+import json
+import os
+import socket
+import time
+import uuid
+import structlog
+
+logger = structlog.get_logger()
+
+BACKENDS = ("memory", "redis")
+CALLS = "leader:calls"
+
+
+class MemorySharedState:
+    """Single-process backend: dicts with expiry times"""
+
+    backend = "memory"
+
+    def __init__(self):
+        self._values: Dict[str, Any] = {}
+        self._expires: Dict[str, float] = {}
+
+    def _live(self, key: str) -> bool:
+        expires = self._expires.get(key)
+        if expires is not None and expires <= time.monotonic():
+            self._values.pop(key, None)
+            self._expires.pop(key, None)
+        return key in self._values
+
+    async def get(self, key: str, default: Any = None) -> Any:
+        return self._values[key] if self._live(key) else default
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        self._values[key] = json.loads(json.dumps(value, default=str))  # same copy semantics as Redis
+        if ttl is None:
+            self._expires.pop(key, None)
+        else:
+            self._expires[key] = time.monotonic() + ttl
+
+    async def delete(self, key: str):
+        self._values.pop(key, None)
+        self._expires.pop(key, None)
+
+    async def incr(self, key: str, amount: int = 1) -> int:
+        value = (self._values[key] if self._live(key) else 0) + amount
+        self._values[key] = value
+        return value
+
+    async def acquire(self, name: str, owner: str, ttl: float) -> bool:
+        """Take or renew the lease `name` for `owner`; False while someone else holds it"""
+        holder = await self.get(f"lease:{name}")
+        if holder not in (None, owner):
+            return False
+        await self.set(f"lease:{name}", owner, ttl)
+        return True
+
+    async def release(self, name: str, owner: str):
+        if await self.get(f"lease:{name}") == owner:
+            await self.delete(f"lease:{name}")
+
+    async def call(self, channel: str, message: Dict[str, Any], timeout: float) -> Dict[str, Any]:
+        raise RuntimeError("The memory backend has no other workers to call")
+
+    async def next_call(self, channel: str, timeout: float) -> Optional[Dict[str, Any]]:
+        await asyncio.sleep(timeout)
+        return None
+
+    async def reply(self, message: Dict[str, Any], result: Dict[str, Any]):
+        pass
+
+    async def close(self):
+        pass
+
+
+class RedisSharedState:
+    """Backend shared by every worker connected to the same Redis"""
+
+    backend = "redis"
+    REPLY_TTL = 60
+
+    # Renew only our own lease; a lease that expired and was taken by another worker stays theirs
+    _ACQUIRE = """
+    local holder = redis.call('GET', KEYS[1])
+    if holder == false or holder == ARGV[1] then
+        redis.call('SET', KEYS[1], ARGV[1], 'PX', ARGV[2])
+        return 1
+    end
+    return 0
+    """
+    _RELEASE = """
+    if redis.call('GET', KEYS[1]) == ARGV[1] then
+        return redis.call('DEL', KEYS[1])
+    end
+    return 0
+    """
+
+    def __init__(self, url: str, prefix: str = "pso"):
+        import redis.asyncio as redis
+
+        self.prefix = prefix
+        self.redis = redis.from_url(url, decode_responses=True)
+        self._acquire = self.redis.register_script(self._ACQUIRE)
+        self._release = self.redis.register_script(self._RELEASE)
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}:{key}"
+
+    async def get(self, key: str, default: Any = None) -> Any:
+        value = await self.redis.get(self._key(key))
+        return default if value is None else json.loads(value)
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        await self.redis.set(self._key(key), json.dumps(value, default=str),
+                             px=int(ttl * 1000) if ttl is not None else None)
+
+    async def delete(self, key: str):
+        await self.redis.delete(self._key(key))
+
+    async def incr(self, key: str, amount: int = 1) -> int:
+        return await self.redis.incrby(self._key(key), amount)
+
+    async def acquire(self, name: str, owner: str, ttl: float) -> bool:
+        return bool(await self._acquire(keys=[self._key(f"lease:{name}")], args=[owner, int(ttl * 1000)]))
+
+    async def release(self, name: str, owner: str):
+        await self._release(keys=[self._key(f"lease:{name}")], args=[owner])
+
+    async def call(self, channel: str, message: Dict[str, Any], timeout: float) -> Dict[str, Any]:
+        """Queue `message` for whoever serves `channel` and wait for the reply"""
+        message = {**message, "id": uuid.uuid4().hex, "deadline": time.time() + timeout}
+        reply_key = self._key(f"reply:{message['id']}")
+        await self.redis.rpush(self._key(channel), json.dumps(message, default=str))
+        reply = await self.redis.blpop(reply_key, timeout=timeout)
+        if reply is None:
+            raise TimeoutError(f"No reply on '{channel}' within {timeout:g}s")
+        return json.loads(reply[1])
+
+    async def next_call(self, channel: str, timeout: float) -> Optional[Dict[str, Any]]:
+        item = await self.redis.blpop(self._key(channel), timeout=timeout)
+        return None if item is None else json.loads(item[1])
+
+    async def reply(self, message: Dict[str, Any], result: Dict[str, Any]):
+        reply_key = self._key(f"reply:{message['id']}")
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.rpush(reply_key, json.dumps(result, default=str))
+            pipe.expire(reply_key, self.REPLY_TTL)
+            await pipe.execute()
+
+    async def close(self):
+        await self.redis.aclose()
+
+
+def create_shared_state(backend: Optional[str] = None):
+    backend = backend or settings.SHARED_STATE_BACKEND
+    if backend == "redis":
+        return RedisSharedState(settings.REDIS_URL)
+    if backend != "memory":
+        raise ValueError(f"Unknown SHARED_STATE_BACKEND '{backend}'. Use one of: {', '.join(BACKENDS)}")
+    return MemorySharedState()
+
+
+def check_workers(workers: int, backend: Optional[str] = None):
+    """Refuse a multi-worker launch whose state would silently split between processes"""
+    backend = backend or settings.SHARED_STATE_BACKEND
+    if workers > 1 and backend == "memory":
+        raise ValueError(f"WORKERS={workers} needs SHARED_STATE_BACKEND=redis (and REDIS_URL); "
+                         "the memory backend only works within one process")
+
+
+_handlers: Dict[str, Callable[..., Awaitable[Any]]] = {}
+
+
+def leader_handler(name: str):
+    """Register an async function as the leader-side handler for call_leader(name, ...)"""
+    def register(handler):
+        _handlers[name] = handler
+        return handler
+    return register
+
+
+class Leadership:
+    """Holds (or keeps trying for) the leader lease and serves leader calls while holding it"""
+
+    def __init__(self, state, name: str = "leader", ttl: float = 15.0):
+        self.state = state
+        self.name = name
+        self.ttl = ttl
+        self.owner = ""
+        self.is_leader = False
+        self.elected_at: Optional[float] = None
+        self.calls_served = 0
+        self._on_elected: Optional[Callable[[], Awaitable[Any]]] = None
+        self._on_lost: Optional[Callable[[], Awaitable[Any]]] = None
+        self._tasks: List[asyncio.Task] = []
+        self._running = False
+
+    async def _transition(self, leader: bool):
+        if leader == self.is_leader:
+            return
+        self.is_leader = leader
+        if leader:
+            self.elected_at = time.time()
+            logger.info("Elected leader worker", owner=self.owner)
+            if self._on_elected is not None:
+                await self._on_elected()
+        else:
+            self.elected_at = None
+            logger.warning("Lost leadership", owner=self.owner)
+            if self._on_lost is not None:
+                await self._on_lost()
+
+    async def campaign(self) -> bool:
+        """One attempt to take or renew the lease"""
+        try:
+            held = await self.state.acquire(self.name, self.owner, self.ttl)
+        except Exception as e:
+            logger.error("Leader lease check failed", error=str(e))
+            held = False
+        await self._transition(held)
+        return held
+
+    async def _renew(self):
+        while self._running:
+            await asyncio.sleep(self.ttl / 3)
+            await self.campaign()
+
+    async def _serve(self):
+        while self._running:
+            if not self.is_leader:
+                await asyncio.sleep(0.1)
+                continue
+            try:
+                message = await self.state.next_call(CALLS, timeout=1)
+            except Exception as e:
+                logger.error("Reading leader calls failed", error=str(e))
+                await asyncio.sleep(1)
+                continue
+            if message is not None:
+                asyncio.create_task(self._answer(message))
+
+    async def _answer(self, message: Dict[str, Any]):
+        if message.get("deadline", float("inf")) < time.time():
+            return  # the caller has given up
+        try:
+            result = {"result": await _handlers[message["name"]](**message.get("kwargs", {}))}
+        except HTTPException as e:
+            result = {"status": e.status_code, "detail": e.detail}
+        except KeyError:
+            result = {"status": 500, "detail": f"No leader handler '{message['name']}'"}
+        except Exception as e:
+            result = {"status": 500, "detail": str(e)}
+        self.calls_served += 1
+        await self.state.reply(message, result)
+
+    async def start(self, on_elected: Callable[[], Awaitable[Any]], on_lost: Callable[[], Awaitable[Any]]):
+        """Campaign once now (so a lone worker starts its services before it reports ready), then keep at it"""
+        self._on_elected, self._on_lost = on_elected, on_lost
+        # Named at start, not import, so forked workers never share an identity
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._running = True
+        await self.campaign()
+        if self.state.backend != "memory":
+            self._tasks = [asyncio.create_task(self._renew()), asyncio.create_task(self._serve())]
+
+    async def stop(self):
+        self._running = False
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+        if self.is_leader:
+            logger.info("Handing over leadership", owner=self.owner)
+            self.is_leader, self.elected_at = False, None
+            if self._on_lost is not None:
+                await self._on_lost()
+        try:
+            await self.state.release(self.name, self.owner)
+        except Exception as e:
+            logger.error("Releasing the leader lease failed", error=str(e))
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "backend": self.state.backend,
+            "worker": self.owner,
+            "is_leader": self.is_leader,
+            "elected_at": self.elected_at,
+            "calls_served": self.calls_served,
+        }
+
+
+shared_state = create_shared_state()
+leadership = Leadership(shared_state, ttl=settings.LEADER_LEASE_SECONDS)
+
+
+async def call_leader(name: str, **kwargs) -> Any:
+    """Run a registered leader handler here if this worker leads, otherwise on the leader"""
+    if leadership.is_leader:
+        return await _handlers[name](**kwargs)
+    if shared_state.backend == "memory":
+        raise HTTPException(status_code=503, detail="Background services are not running yet")
+    try:
+        reply = await shared_state.call(CALLS, {"name": name, "kwargs": kwargs}, settings.LEADER_CALL_TIMEOUT)
+    except TimeoutError:
+        raise HTTPException(status_code=503, detail="No leader worker answered; retry shortly")
+    if "status" in reply:
+        raise HTTPException(status_code=reply["status"], detail=reply["detail"])
+    return reply["result"]
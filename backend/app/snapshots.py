@@ -0,0 +1,212 @@
+"""Columnar snapshots of trade, correlation and optimization history.
+
+Tables are exported as Parquet or Arrow IPC streams one record batch at a
+time: rows come from a server-side cursor (`yield_per`, which streams on
+PostgreSQL and SQLite alike), each batch is converted column-wise to Arrow
+and written out (one Parquet row group per batch) before the next is read,
+so memory stays at one batch whatever the table size.
+
+Imports read a snapshot back batch by batch and bulk insert each batch
+with its original ids, which keeps cursors, trade ids and the metrics
+aggregator's watermark meaningful on the seeded instance.
+
+pyarrow is an optional dependency, imported on first use.
+"""
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional
+from sqlalchemy import BigInteger, Boolean, DateTime, Float, Integer, JSON, func, insert, select, text
+from sqlalchemy.orm import Session
+from app.database import OptimizationRun, PairCorrelation, Trade
+import datetime
+import json
+
+TABLES = {
+    "trades": Trade,
+    "correlations": PairCorrelation,
+    "optimization_runs": OptimizationRun,
+}
+FORMATS = {
+    "parquet": ("application/vnd.apache.parquet", ".parquet"),
+    "arrow": ("application/vnd.apache.arrow.stream", ".arrows"),
+}
+DEFAULT_BATCH_SIZE = 10_000
+
+
+def require_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError:
+        raise RuntimeError("pyarrow is not installed; install it to export or import snapshots")
+    return pyarrow
+
+
+def _arrow_type(pa, column):
+    kind = column.type
+    if isinstance(kind, (Integer, BigInteger)):
+        return pa.int64()
+    if isinstance(kind, Float):
+        return pa.float64()
+    if isinstance(kind, Boolean):
+        return pa.bool_()
+    if isinstance(kind, DateTime):
+        return pa.timestamp("us")
+    return pa.string()  # String, Text, and JSON (serialized)
+
+
+def arrow_schema(model):
+    pa = require_pyarrow()
+    return pa.schema([
+        pa.field(column.name, _arrow_type(pa, column), nullable=not column.primary_key,
+                 metadata={"json": "true"} if isinstance(column.type, JSON) else None)
+        for column in model.__table__.columns
+    ])
+
+
+def _record_batch(pa, schema, json_columns, rows) -> Any:
+    columns = list(zip(*rows))
+    arrays = []
+    for index, field in enumerate(schema):
+        values = columns[index]
+        if field.name in json_columns:
+            values = [None if value is None else json.dumps(value) for value in values]
+        arrays.append(pa.array(values, type=field.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def _time_column(model):
+    return {Trade: Trade.executed_at, PairCorrelation: PairCorrelation.updated_at,
+            OptimizationRun: OptimizationRun.created_at}[model]
+
+
+def iter_batches(db: Session, model, batch_size: int = DEFAULT_BATCH_SIZE,
+                 since: Optional[datetime.datetime] = None,
+                 until: Optional[datetime.datetime] = None) -> Iterator[Any]:
+    """Arrow record batches of `model`'s rows in id order, read through a server-side cursor"""
+    pa = require_pyarrow()
+    table = model.__table__
+    schema = arrow_schema(model)
+    json_columns = {column.name for column in table.columns if isinstance(column.type, JSON)}
+    statement = select(*table.columns).order_by(table.c.id)
+    time_column = _time_column(model)
+    if since is not None:
+        statement = statement.where(time_column >= since)
+    if until is not None:
+        statement = statement.where(time_column < until)
+    result = db.execute(statement.execution_options(yield_per=batch_size))
+    for rows in result.partitions():
+        yield _record_batch(pa, schema, json_columns, rows)
+
+
+class _ChunkSink:
+    """Write-only file object that hands written bytes back to a streaming response"""
+
+    def __init__(self):
+        self.chunks: List[bytes] = []
+        self.closed = False
+
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data, self.chunks = b"".join(self.chunks), []
+        return data
+
+
+def _open_writer(pa, sink, schema, fmt: str):
+    if fmt == "parquet":
+        return pa.parquet.ParquetWriter(sink, schema, compression="zstd")
+    if fmt == "arrow":
+        return pa.ipc.new_stream(sink, schema)
+    raise ValueError(f"Unknown format '{fmt}'. Use one of: {', '.join(FORMATS)}")
+
+
+def stream_export(session_factory, model, fmt: str, batch_size: int = DEFAULT_BATCH_SIZE,
+                  since: Optional[datetime.datetime] = None,
+                  until: Optional[datetime.datetime] = None) -> Iterator[bytes]:
+    """Encoded snapshot bytes, produced one record batch at a time (for a streaming HTTP response)"""
+    pa = require_pyarrow()
+    sink = _ChunkSink()
+    writer = _open_writer(pa, pa.PythonFile(sink, mode="w"), arrow_schema(model), fmt)
+    db = session_factory()
+    try:
+        for batch in iter_batches(db, model, batch_size, since, until):
+            writer.write_batch(batch)
+            yield sink.drain()
+        writer.close()
+        yield sink.drain()
+    finally:
+        db.close()
+
+
+def export_table(db: Session, model, path_or_file, fmt: str, batch_size: int = DEFAULT_BATCH_SIZE,
+                 since: Optional[datetime.datetime] = None,
+                 until: Optional[datetime.datetime] = None) -> int:
+    """Write a snapshot of `model` to a path or binary file; returns the number of rows"""
+    pa = require_pyarrow()
+    rows = 0
+    writer = _open_writer(pa, path_or_file, arrow_schema(model), fmt)
+    try:
+        for batch in iter_batches(db, model, batch_size, since, until):
+            writer.write_batch(batch)
+            rows += batch.num_rows
+    finally:
+        writer.close()
+    return rows
+
+
+def _read_batches(pa, source, fmt: str, batch_size: int) -> Iterator[Any]:
+    if fmt == "parquet":
+        yield from pa.parquet.ParquetFile(source).iter_batches(batch_size=batch_size)
+    elif fmt == "arrow":
+        yield from pa.ipc.open_stream(source)
+    else:
+        raise ValueError(f"Unknown format '{fmt}'. Use one of: {', '.join(FORMATS)}")
+
+
+def _bump_sequence(db: Session, model):
+    """Move a PostgreSQL id sequence past imported ids (SQLite needs nothing)"""
+    if db.bind.dialect.name == "postgresql":
+        table = model.__tablename__
+        db.execute(text(f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+                        f"COALESCE((SELECT MAX(id) FROM {table}), 1))"))
+
+
+def import_table(db: Session, model, source: BinaryIO, fmt: str, batch_size: int = DEFAULT_BATCH_SIZE,
+                 replace: bool = False) -> int:
+    """Bulk insert a snapshot into `model`'s table, committing per batch; returns the number of rows
+
+    The table must be empty unless `replace` is set, which deletes its rows first.
+    """
+    pa = require_pyarrow()
+    table = model.__table__
+    json_columns = {column.name for column in table.columns if isinstance(column.type, JSON)}
+    if replace:
+        db.query(model).delete()
+        db.commit()
+    elif db.query(func.count(table.c.id)).scalar():
+        raise ValueError(f"Table '{model.__tablename__}' is not empty; import with replace to overwrite it")
+    known = set(table.columns.keys())
+    rows = 0
+    for batch in _read_batches(pa, source, fmt, batch_size):
+        records: List[Dict[str, Any]] = batch.to_pylist()
+        for record in records:
+            for name in list(record):
+                if name not in known:
+                    del record[name]
+                elif name in json_columns and record[name] is not None:
+                    record[name] = json.loads(record[name])
+        if records:
+            db.execute(insert(table), records)
+            db.commit()
+            rows += len(records)
+    _bump_sequence(db, model)
+    db.commit()
+    return rows
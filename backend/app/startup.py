@@ -0,0 +1,198 @@
+"""Application warm-up, run after the server is already accepting connections.
+
+Importing main only loads FastAPI, the settings, the logging pipeline and the
+health router, so /health/live answers as soon as uvicorn binds. Everything
+heavy - the API routers and the numpy/httpx/websockets stacks behind them,
+schema setup and the background services - happens in `warm_up`, which the
+startup event runs as a task (or awaits, with BACKGROUND_WARM_UP=false).
+/health/ready reports 503 until it has finished, and the API routes are
+only mounted once their services are running. Until then a placeholder
+route under each API prefix answers 503 with Retry-After, so clients can
+tell "not yet" from a wrong URL.
+
+The background services are leader-only (see app.shared_state): with
+several workers exactly one runs them, and another starts them when that
+worker goes away.
+
+Schema setup follows SCHEMA_SETUP: "create" (create missing tables, the old
+import-time behaviour), "migrate" (alembic upgrade head) or "none" when the
+deploy runs `python manage.py migrate` itself.
+"""
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from fastapi.responses import JSONResponse
+from app.config import settings
+from app.shared_state import leadership
+import asyncio
+import importlib
+import os
+import sys
+import time
+import structlog
+
+logger = structlog.get_logger()
+
+# module, prefix, tag
+ROUTERS: List[Tuple[str, str, str]] = [
+    ("app.routers.optimization", "/api/optimization", "optimization"),
+    ("app.routers.pairs_trading", "/api/pairs-trading", "pairs-trading"),
+    ("app.routers.universes", "/api/universes", "universes"),
+    ("app.routers.risk", "/api/risk", "risk"),
+    ("app.routers.execution", "/api/execution", "execution"),
+    ("app.routers.metrics", "/api", "metrics"),
+    ("app.routers.trades", "/api/trades", "trades"),
+    ("app.routers.snapshots", "/api/snapshots", "snapshots"),
+    ("app.routers.debug", "/debug", "debug"),
+]
+
+# module, start, stop - started in this order on the leader worker and stopped in reverse
+SERVICES: List[Tuple[str, str, Optional[str]]] = [
+    ("app.pairs.live", "start_live_pipeline", "stop_live_pipeline"),
+    ("app.pairs.universe", "start_universe_refresh", "stop_universe_refresh"),
+    ("app.pairs.refresh", "start_correlation_refresh", "stop_correlation_refresh"),
+    ("app.trading.metrics", "start_metrics", None),
+    ("app.trading.execution", "start_executor", "stop_executor"),
+]
+
+SCHEMA_MODES = ("create", "migrate", "none")
+
+UNAVAILABLE_ROUTE = "api_unavailable"
+RETRY_AFTER_SECONDS = 5
+
+
+class StartupState:
+    def __init__(self):
+        self.started_at = time.time()
+        self.ready = False
+        self.mounted = False
+        self.error: Optional[str] = None
+        self.timings: Dict[str, float] = {}
+        self.task: Optional[asyncio.Task] = None
+        self._stops: List[Callable[[], Awaitable[Any]]] = []
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "error": self.error,
+            "seconds_since_start": time.time() - self.started_at,
+            "timings": {step: round(seconds, 4) for step, seconds in self.timings.items()},
+            "leadership": leadership.status(),
+        }
+
+
+state = StartupState()
+
+
+def setup_schema(mode: Optional[str] = None):
+    mode = mode or settings.SCHEMA_SETUP
+    if mode not in SCHEMA_MODES:
+        raise ValueError(f"Unknown SCHEMA_SETUP '{mode}'. Use one of: {', '.join(SCHEMA_MODES)}")
+    if mode == "create":
+        from app.database import Base, engine
+
+        Base.metadata.create_all(bind=engine)
+    elif mode == "migrate":
+        from alembic import command
+        from alembic.config import Config
+
+        backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        config = Config(os.path.join(backend_dir, "alembic.ini"))
+        config.set_main_option("script_location", os.path.join(backend_dir, "migrations"))
+        config.attributes["configure_logger"] = False  # keep the queued logging pipeline
+        command.upgrade(config, "head")
+
+
+def import_routers() -> List[Tuple[Any, str, str]]:
+    return [(importlib.import_module(module).router, prefix, tag) for module, prefix, tag in ROUTERS]
+
+
+async def _unavailable():
+    if state.error is not None:
+        return JSONResponse({"detail": f"API unavailable: warm-up failed: {state.error}"}, status_code=503)
+    return JSONResponse({"detail": "API is warming up"}, status_code=503,
+                        headers={"Retry-After": str(RETRY_AFTER_SECONDS)})
+
+
+def hold_api_routes(app):
+    """503 for everything under the API prefixes until `mount_routers` replaces the placeholders"""
+    for prefix in dict.fromkeys("/" + prefix.split("/")[1] for _, prefix, _ in ROUTERS):
+        app.add_api_route(f"{prefix}/{{path:path}}", _unavailable, name=UNAVAILABLE_ROUTE, include_in_schema=False,
+                          methods=["GET", "HEAD", "POST", "PUT", "PATCH", "DELETE"])
+
+
+def mount_routers(app, routers: List[Tuple[Any, str, str]]):
+    # The placeholders match every path under their prefix, so they go before the real routes arrive
+    app.router.routes[:] = [
+        route for route in app.router.routes if getattr(route, "name", None) != UNAVAILABLE_ROUTE
+    ]
+    for router, prefix, tag in routers:
+        app.include_router(router, prefix=prefix, tags=[tag])
+    app.openapi_schema = None  # /openapi.json may have been cached without the API routes
+
+
+async def _timed(step: str, work: Awaitable[Any]) -> Any:
+    started = time.perf_counter()
+    try:
+        return await work
+    finally:
+        state.timings[step] = time.perf_counter() - started
+
+
+async def start_services():
+    for module, start, stop in SERVICES:
+        service = await asyncio.to_thread(importlib.import_module, module)
+        await _timed(start, getattr(service, start)())
+        if stop is not None:
+            state._stops.append(getattr(service, stop))
+
+
+async def stop_services():
+    """Stop whatever got started, newest first"""
+    while state._stops:
+        await state._stops.pop()()
+
+
+async def warm_up(app):
+    """Set up the schema, import the routers, run for leader, then mount the API"""
+    state.error = None
+    try:
+        await _timed("schema", asyncio.to_thread(setup_schema))
+        # Module imports run on a thread so the event loop keeps answering health checks
+        routers = await _timed("import_routers", asyncio.to_thread(import_routers))
+        # The routers registered their leader handlers on import
+        await leadership.start(on_elected=start_services, on_lost=stop_services)
+        if not state.mounted:
+            mount_routers(app, routers)
+            state.mounted = True
+        state.ready = True
+        logger.info("Warm-up complete", seconds=time.time() - state.started_at, timings=state.timings)
+    except Exception as e:
+        state.error = str(e)
+        logger.error("Warm-up failed", error=str(e))
+        if not settings.BACKGROUND_WARM_UP:
+            raise
+
+
+async def start(app):
+    if settings.BACKGROUND_WARM_UP:
+        state.task = asyncio.create_task(warm_up(app))
+    else:
+        await warm_up(app)
+
+
+async def stop():
+    """Stop whatever warm-up got as far as starting and hand leadership on"""
+    if state.task is not None and not state.task.done():
+        state.task.cancel()
+        try:
+            await state.task
+        except asyncio.CancelledError:
+            pass
+    state.ready = False
+    workers = sys.modules.get("app.engine.workers")
+    if workers is not None:
+        workers.shutdown_worker_pool()
+    await leadership.stop()
+    await stop_services()
+    client = sys.modules.get("app.market_data.client")
+    if client is not None:
+        await client.close_market_data_client()
@@ -0,0 +1,139 @@
+"""Per-table write versions, so read endpoints can be revalidated without a query.
+
+Every committed transaction of a SessionLocal session that inserted, updated
+or deleted rows bumps the version of each table it wrote, and records when.
+`track_writes` installs the session hooks: ORM flushes, bulk `query.update()`
+/ `.delete()` and `session.execute(insert(...))` are all seen. Writes made
+outside SessionLocal, or with raw SQL text, are not.
+
+Like app.shared_state there are two backends, picked by SHARED_STATE_BACKEND:
+process-local counters, or Redis keys shared by every worker (a write on the
+leader must invalidate what the other workers hand out). `epoch` identifies
+one generation of counters - the process, or the Redis keyspace - so a tag
+from before a restart or a flush never matches again.
+
+Bumps happen after the commit. A request that reads the versions before a
+commit and the rows after it sends newer rows under the older tag; the next
+poll then sees a changed tag and gets the rows again, never the reverse.
+"""
+from typing import Iterable, List, Optional, Sequence, Tuple
+from app.config import settings
+import threading
+import time
+import uuid
+import structlog
+
+logger = structlog.get_logger()
+
+WRITTEN = "written_tables"
+
+
+class MemoryTableVersions:
+    backend = "memory"
+
+    def __init__(self):
+        self.epoch = uuid.uuid4().hex[:8]
+        self.started = time.time()
+        self._versions = {}
+        self._modified = {}
+        self._lock = threading.Lock()  # commits happen on the event loop and on worker threads
+
+    def bump(self, tables: Iterable[str]):
+        now = time.time()
+        with self._lock:
+            for table in tables:
+                self._versions[table] = self._versions.get(table, 0) + 1
+                self._modified[table] = now
+
+    async def get(self, tables: Sequence[str]) -> Tuple[str, List[int], float]:
+        """(epoch, version per table, time of the latest write or of the epoch)"""
+        versions = [self._versions.get(table, 0) for table in tables]
+        modified = max([self._modified.get(table, self.started) for table in tables], default=self.started)
+        return self.epoch, versions, modified
+
+    async def close(self):
+        pass
+
+
+class RedisTableVersions:
+    backend = "redis"
+
+    def __init__(self, url: str, prefix: str = "pso"):
+        import redis
+        import redis.asyncio
+
+        self.prefix = prefix
+        # Bumps run inside synchronous commit hooks; reads run on the event loop
+        self.sync_redis = redis.from_url(url, decode_responses=True)
+        self.redis = redis.asyncio.from_url(url, decode_responses=True)
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}:version:{key}"
+
+    def bump(self, tables: Iterable[str]):
+        now = time.time()
+        try:
+            with self.sync_redis.pipeline(transaction=False) as pipe:
+                for table in tables:
+                    pipe.incr(self._key(table))
+                    pipe.set(self._key(f"{table}:at"), now)
+                pipe.execute()
+        except Exception as e:
+            # Readers keep serving the old tag until the next successful bump
+            logger.error("Bumping table versions failed", tables=sorted(tables), error=str(e))
+
+    async def get(self, tables: Sequence[str]) -> Tuple[str, List[int], float]:
+        keys = [self._key("epoch"), *(self._key(t) for t in tables), *(self._key(f"{t}:at") for t in tables)]
+        values = await self.redis.mget(keys)
+        epoch = values[0]
+        if epoch is None:
+            # First reader after Redis started empty; every worker agrees on whichever epoch wins
+            await self.redis.set(self._key("epoch"), f"{uuid.uuid4().hex[:8]}:{time.time()}", nx=True)
+            return await self.get(tables)
+        epoch_id, started = epoch.split(":", 1)
+        versions = [int(value or 0) for value in values[1:len(tables) + 1]]
+        modified = max([float(value) for value in values[len(tables) + 1:] if value is not None],
+                       default=float(started))
+        return epoch_id, versions, modified
+
+    async def close(self):
+        await self.redis.aclose()
+        self.sync_redis.close()
+
+
+def create_table_versions(backend: Optional[str] = None):
+    backend = backend or settings.SHARED_STATE_BACKEND
+    if backend == "redis":
+        return RedisTableVersions(settings.REDIS_URL)
+    return MemoryTableVersions()
+
+
+table_versions = create_table_versions()
+
+
+def track_writes(session_factory, versions=None):
+    """Bump `versions` (default: table_versions) for the tables each committed session transaction wrote"""
+    from sqlalchemy import event
+
+    def written(session):
+        return session.info.setdefault(WRITTEN, set())
+
+    @event.listens_for(session_factory, "after_flush")
+    def flushed(session, flush_context):
+        for instance in (*session.new, *session.dirty, *session.deleted):
+            written(session).add(type(instance).__mapper__.local_table.name)
+
+    @event.listens_for(session_factory, "do_orm_execute")
+    def executed(state):
+        if state.is_insert or state.is_update or state.is_delete:
+            written(state.session).add(state.statement.table.name)
+
+    @event.listens_for(session_factory, "after_commit")
+    def committed(session):
+        tables = session.info.pop(WRITTEN, None)
+        if tables:
+            (versions or table_versions).bump(tables)
+
+    @event.listens_for(session_factory, "after_rollback")
+    def rolled_back(session):
+        session.info.pop(WRITTEN, None)
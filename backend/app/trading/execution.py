@@ -0,0 +1,542 @@
+"""Paired order execution.
+
+A pair signal is only captured if both legs fill close together, so the
+executor
+
+* sends both legs concurrently over one persistent keep-alive session
+  (warmed at start so the first signal pays no connection setup),
+* protects each leg with a LIMIT IOC order at the reference price plus a
+  slippage allowance, or sends MARKET orders without a reference, with
+  quantities and prices rounded to the symbol's LOT_SIZE / PRICE_FILTER,
+* looks an order up by its client order id when the request went out but
+  no response came back, and neither chases nor unwinds while a leg's fill
+  is still unknown,
+* when the legs fill unevenly, chases the lagging leg with market orders
+  up to the leading leg's fill ratio, and unwinds the leading leg's excess
+  if that still leaves them apart,
+* hands the resulting Trade rows to a TradeWriter that inserts them in
+  batches from a background task, off the order path, folding each batch
+  into the performance metrics in the same transaction.
+
+Signal-to-submit latency (signal timestamp to both legs on the wire), leg
+skew and order round trips are recorded for /api/execution/stats.
+"""
+from collections import deque
+from decimal import ROUND_CEILING, ROUND_FLOOR, Decimal
+from typing import Any, Deque, Dict, List, NamedTuple, Optional, Sequence, Tuple
+from urllib.parse import urlencode
+from sqlalchemy import insert
+from app.config import settings
+from app.database import SessionLocal, Trade
+import asyncio
+import datetime
+import hashlib
+import hmac
+import time
+import uuid
+import httpx
+import numpy as np
+import structlog
+
+logger = structlog.get_logger()
+
+
+class LegFill(NamedTuple):
+    symbol: str
+    side: str  # BUY or SELL
+    requested: float
+    filled: float
+    avg_price: Optional[float]
+    status: str  # exchange order status, REJECTED, or UNKNOWN when the outcome could not be learned
+    sent_at: float  # perf_counter timestamps
+    acked_at: float
+    error: Optional[str] = None
+    client_order_id: Optional[str] = None
+
+
+class SymbolFilters(NamedTuple):
+    step_size: Decimal  # LOT_SIZE
+    min_qty: Decimal
+    tick_size: Decimal  # PRICE_FILTER
+
+
+def _to_step(value: float, step: Decimal, rounding: str) -> Decimal:
+    if step <= 0:
+        return Decimal(repr(float(value)))
+    return (Decimal(repr(float(value))) / step).to_integral_value(rounding) * step
+
+
+def _format(value: Decimal) -> str:
+    return f"{value.normalize():f}"
+
+
+# Request errors that guarantee the order never reached the exchange
+_NOT_SENT = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+NO_SUCH_ORDER = -2013
+
+
+def _error_code(response: httpx.Response) -> Optional[int]:
+    try:
+        return response.json().get("code")
+    except ValueError:
+        return None
+
+
+class OrderGateway:
+    """Signed order submission over a persistent HTTP session"""
+
+    def __init__(self, base_url: str, api_key: Optional[str] = None, secret_key: Optional[str] = None,
+                 transport: Optional[httpx.AsyncBaseTransport] = None, max_connections: int = 4,
+                 lookup_attempts: int = 3, lookup_retry_seconds: float = 0.2):
+        headers = {"X-MBX-APIKEY": api_key} if api_key else {}
+        self.secret_key = secret_key
+        self.lookup_attempts = lookup_attempts
+        self.lookup_retry_seconds = lookup_retry_seconds
+        self._http = httpx.AsyncClient(
+            base_url=base_url,
+            headers=headers,
+            timeout=httpx.Timeout(5.0),
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            transport=transport,
+        )
+        self._filters: Dict[str, SymbolFilters] = {}
+
+    async def warm(self, symbols: Sequence[str] = ()):
+        """Open the keep-alive connections and load trading filters before the first order needs them"""
+        await asyncio.gather(*[self._http.get("/api/v3/ping") for _ in range(2)],
+                             *[self.filters(symbol) for symbol in symbols], return_exceptions=True)
+
+    async def filters(self, symbol: str) -> Optional[SymbolFilters]:
+        """LOT_SIZE and PRICE_FILTER from exchangeInfo, loaded once per symbol; None if unavailable"""
+        if symbol not in self._filters:
+            try:
+                response = await self._http.get("/api/v3/exchangeInfo", params={"symbol": symbol})
+                response.raise_for_status()
+                found = {f["filterType"]: f for f in response.json()["symbols"][0]["filters"]}
+                self._filters[symbol] = SymbolFilters(
+                    Decimal(found["LOT_SIZE"]["stepSize"]).normalize(),
+                    Decimal(found["LOT_SIZE"]["minQty"]),
+                    Decimal(found["PRICE_FILTER"]["tickSize"]).normalize(),
+                )
+            except (httpx.HTTPError, KeyError, IndexError, ValueError) as e:
+                # Not cached: the next order retries, and this one goes out unrounded
+                logger.warning("Symbol filters unavailable", symbol=symbol, error=f"{type(e).__name__}: {e}")
+                return None
+        return self._filters[symbol]
+
+    async def close(self):
+        await self._http.aclose()
+
+    def _signed(self, params: Dict[str, Any]) -> str:
+        if self.secret_key is None:
+            return urlencode(params)
+        params = {**params, "timestamp": int(time.time() * 1000)}
+        query = urlencode(params)
+        signature = hmac.new(self.secret_key.encode(), query.encode(), hashlib.sha256).hexdigest()
+        return f"{query}&signature={signature}"
+
+    async def submit(self, symbol: str, side: str, quantity: float, price: Optional[float] = None) -> LegFill:
+        """One IOC order (LIMIT when `price` is given, else MARKET).
+
+        Never raises: refused orders come back as REJECTED, and an order whose
+        response was lost is looked up by its client order id - UNKNOWN if
+        even that fails.
+        """
+        client_order_id = f"pso-{uuid.uuid4().hex[:24]}"
+        filters = await self.filters(symbol)
+        if filters is not None:
+            # Never more than asked for; a buy limit rounds down and a sell limit up, inside the allowance
+            rounded = _to_step(quantity, filters.step_size, ROUND_FLOOR)
+            if rounded <= 0 or rounded < filters.min_qty:
+                now = time.perf_counter()
+                return LegFill(symbol, side, quantity, 0.0, None, "REJECTED", now, now,
+                               f"Quantity {quantity} is below LOT_SIZE", client_order_id)
+            quantity_text = _format(rounded)
+            price_text = None if price is None else _format(
+                _to_step(price, filters.tick_size, ROUND_FLOOR if side == "BUY" else ROUND_CEILING))
+        else:
+            quantity_text = f"{quantity:.8f}"
+            price_text = None if price is None else f"{price:.8f}"
+        quantity = float(quantity_text)
+        params: Dict[str, Any] = {"symbol": symbol, "side": side, "quantity": quantity_text,
+                                  "newClientOrderId": client_order_id, "newOrderRespType": "FULL"}
+        if price_text is not None:
+            params.update(type="LIMIT", timeInForce="IOC", price=price_text)
+        else:
+            params["type"] = "MARKET"
+        query = self._signed(params)
+        sent_at = time.perf_counter()
+        try:
+            response = await self._http.post(f"/api/v3/order?{query}")
+        except _NOT_SENT as e:
+            return LegFill(symbol, side, quantity, 0.0, None, "REJECTED", sent_at, time.perf_counter(),
+                           f"{type(e).__name__}: {e}", client_order_id)
+        except httpx.TransportError as e:
+            # The order may have executed; only the exchange knows
+            logger.warning("Order response lost; looking the order up", symbol=symbol,
+                           client_order_id=client_order_id, error=f"{type(e).__name__}: {e}")
+            return await self.lookup(symbol, side, quantity, client_order_id, sent_at, f"{type(e).__name__}: {e}")
+        acked_at = time.perf_counter()
+        if response.status_code >= 500:
+            # Binance: a 5xx means the execution status is unknown
+            return await self.lookup(symbol, side, quantity, client_order_id, sent_at,
+                                     f"HTTP {response.status_code}: {response.text}")
+        if response.status_code >= 400:
+            return LegFill(symbol, side, quantity, 0.0, None, "REJECTED", sent_at, acked_at,
+                           f"HTTP {response.status_code}: {response.text}", client_order_id)
+        return self._fill(symbol, side, quantity, response.json(), sent_at, acked_at, client_order_id)
+
+    async def lookup(self, symbol: str, side: str, quantity: float, client_order_id: str, sent_at: float,
+                     error: str) -> LegFill:
+        """Query an order by client order id; UNKNOWN when the exchange cannot be asked"""
+        params = {"symbol": symbol, "origClientOrderId": client_order_id}
+        for attempt in range(self.lookup_attempts):
+            if attempt:
+                await asyncio.sleep(self.lookup_retry_seconds * attempt)
+            try:
+                response = await self._http.get(f"/api/v3/order?{self._signed(params)}")
+            except httpx.TransportError as e:
+                error = f"{error}; lookup: {type(e).__name__}: {e}"
+            else:
+                if response.status_code < 400:
+                    return self._fill(symbol, side, quantity, response.json(), sent_at, time.perf_counter(),
+                                      client_order_id, error)
+                if response.status_code == 400 and _error_code(response) == NO_SUCH_ORDER:
+                    # The order never reached the matching engine
+                    return LegFill(symbol, side, quantity, 0.0, None, "REJECTED", sent_at, time.perf_counter(),
+                                   error, client_order_id)
+                error = f"{error}; lookup: HTTP {response.status_code}: {response.text}"
+        return LegFill(symbol, side, quantity, 0.0, None, "UNKNOWN", sent_at, time.perf_counter(), error,
+                       client_order_id)
+
+    @staticmethod
+    def _fill(symbol: str, side: str, quantity: float, body: Dict[str, Any], sent_at: float, acked_at: float,
+              client_order_id: str, error: Optional[str] = None) -> LegFill:
+        filled = float(body["executedQty"])
+        quote = float(body["cummulativeQuoteQty"])
+        return LegFill(symbol, side, quantity, filled, quote / filled if filled > 0 else None, body["status"],
+                       sent_at, acked_at, error, client_order_id)
+
+
+class LatencyStats:
+    """Recent samples of one latency, in milliseconds"""
+
+    def __init__(self, size: int = 2048):
+        self.samples: Deque[float] = deque(maxlen=size)
+        self.count = 0
+
+    def record(self, seconds: float):
+        self.samples.append(seconds * 1000)
+        self.count += 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        if not self.samples:
+            return {"count": 0}
+        values = np.fromiter(self.samples, dtype=float)
+        p50, p95, p99 = np.percentile(values, [50, 95, 99])
+        return {
+            "count": self.count,
+            "p50_ms": round(float(p50), 3),
+            "p95_ms": round(float(p95), 3),
+            "p99_ms": round(float(p99), 3),
+            "max_ms": round(float(values.max()), 3),
+        }
+
+
+class TradeWriter:
+    """Buffers Trade rows and inserts them in batches from a background task"""
+
+    def __init__(self, session_factory=SessionLocal, batch_size: int = 200, flush_seconds: float = 0.5,
+                 metrics=None):
+        self.session_factory = session_factory
+        self.metrics = metrics  # MetricsAggregator folding each batch in the insert's transaction
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self._pending: List[Dict[str, Any]] = []
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self.rows_written = 0
+        self.batches = 0
+        self.failures = 0
+
+    def submit(self, rows: List[Dict[str, Any]]):
+        """Queue rows without blocking; a full batch wakes the writer early"""
+        self._pending.extend(rows)
+        if len(self._pending) >= self.batch_size:
+            self._wake.set()
+
+    def _write(self, rows: List[Dict[str, Any]]):
+        db = self.session_factory()
+        try:
+            if self.metrics is not None:
+                self.metrics.insert_trades(db, rows)
+                return
+            db.execute(insert(Trade), rows)
+            db.commit()
+        finally:
+            db.close()
+
+    async def flush(self) -> int:
+        if not self._pending:
+            return 0
+        pending, self._pending = self._pending, []
+        try:
+            await asyncio.to_thread(self._write, pending)
+        except Exception as e:
+            # Keep the rows for the next attempt rather than losing fills
+            self._pending = pending + self._pending
+            self.failures += 1
+            logger.error("Trade flush failed", rows=len(pending), error=str(e))
+            return 0
+        self.rows_written += len(pending)
+        self.batches += 1
+        return len(pending)
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.flush_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            await self.flush()
+
+    def start(self):
+        if self._task is None:
+            self._wake = asyncio.Event()
+            self._stopping = False
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            # Let the loop finish its current write rather than cancelling it mid-flush
+            self._stopping = True
+            self._wake.set()
+            await self._task
+            self._task = None
+        await self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "rows_pending": len(self._pending),
+            "rows_written": self.rows_written,
+            "batches": self.batches,
+            "avg_batch": round(self.rows_written / self.batches, 1) if self.batches else None,
+            "failures": self.failures,
+        }
+
+
+class PairOrder(NamedTuple):
+    pair1: str
+    pair2: str
+    quantity1: float  # signed: positive buys, negative sells
+    quantity2: float
+    price1: Optional[float] = None  # reference prices for LIMIT IOC protection; None sends MARKET
+    price2: Optional[float] = None
+    signal_at: Optional[float] = None  # perf_counter when the signal was produced; default: on receipt
+    strategy_id: Optional[int] = None
+    capital_phase: Optional[str] = None
+
+
+def _unknown(fills: List[List[LegFill]]) -> bool:
+    return any(fill.status == "UNKNOWN" for leg in fills for fill in leg)
+
+
+def _ratio(fills: List[LegFill], requested: float) -> float:
+    """Net filled share of a leg; unwind fills (opposite side to the first order) count negative"""
+    side = fills[0].side
+    net = sum(f.filled if f.side == side else -f.filled for f in fills)
+    return net / requested if requested > 0 else 1.0
+
+
+class PairExecutor:
+    def __init__(self, gateway: OrderGateway, writer: TradeWriter, max_slippage_bps: float = 20.0,
+                 imbalance_tolerance: float = 0.02, chase_attempts: int = 1, is_live: bool = False):
+        self.gateway = gateway
+        self.writer = writer
+        self.max_slippage_bps = max_slippage_bps
+        self.imbalance_tolerance = imbalance_tolerance
+        self.chase_attempts = chase_attempts
+        self.is_live = is_live
+        self.signal_to_submit = LatencyStats()
+        self.leg_skew = LatencyStats()
+        self.round_trip = LatencyStats()
+        self.execution = LatencyStats()
+        self.outcomes: Dict[str, int] = {}
+
+    def _limit(self, quantity: float, price: Optional[float]) -> Optional[float]:
+        if price is None:
+            return None
+        allowance = self.max_slippage_bps / 10_000
+        return price * (1 + allowance) if quantity > 0 else price * (1 - allowance)
+
+    def _submit(self, symbol: str, quantity: float, price: Optional[float] = None):
+        return self.gateway.submit(symbol, "BUY" if quantity > 0 else "SELL", abs(quantity), price)
+
+    async def execute(self, order: PairOrder) -> Dict[str, Any]:
+        signal_at = order.signal_at if order.signal_at is not None else time.perf_counter()
+        legs: List[Tuple[str, float, Optional[float]]] = [
+            (order.pair1, order.quantity1, order.price1),
+            (order.pair2, order.quantity2, order.price2),
+        ]
+        first = await asyncio.gather(*[
+            self._submit(symbol, quantity, self._limit(quantity, price)) for symbol, quantity, price in legs
+        ])
+        self.signal_to_submit.record(max(fill.sent_at for fill in first) - signal_at)
+        self.leg_skew.record(abs(first[0].sent_at - first[1].sent_at))
+        for fill in first:
+            self.round_trip.record(fill.acked_at - fill.sent_at)
+
+        fills: List[List[LegFill]] = [[first[0]], [first[1]]]
+        requested = [abs(order.quantity1), abs(order.quantity2)]
+        status = await self._rebalance(legs, fills, requested)
+        ratios = [_ratio(fills[k], requested[k]) for k in range(2)]
+        if status is None:
+            if max(ratios) == 0:
+                status = "rejected"
+            elif min(ratios) >= 1 - self.imbalance_tolerance:
+                status = "filled"
+            else:
+                status = "partial"
+
+        trades = [self._trade_row(fill, order) for leg in fills for fill in leg if fill.filled > 0]
+        self.writer.submit(trades)
+        elapsed = time.perf_counter() - signal_at
+        self.execution.record(elapsed)
+        self.outcomes[status] = self.outcomes.get(status, 0) + 1
+        if status not in ("filled", "partial"):
+            logger.warning("Pair execution incomplete", pair1=order.pair1, pair2=order.pair2, status=status,
+                           errors=[f.error for leg in fills for f in leg if f.error])
+        return {
+            "status": status,
+            "pair1": order.pair1,
+            "pair2": order.pair2,
+            "fill_ratio": {order.pair1: ratios[0], order.pair2: ratios[1]},
+            "legs": [self._leg_dict(fill) for leg in fills for fill in leg],
+            "signal_to_submit_ms": (max(fill.sent_at for fill in first) - signal_at) * 1000,
+            "leg_skew_ms": abs(first[0].sent_at - first[1].sent_at) * 1000,
+            "execution_ms": elapsed * 1000,
+        }
+
+    async def _rebalance(self, legs, fills: List[List[LegFill]], requested: List[float]) -> Optional[str]:
+        """Chase the lagging leg, then unwind the leading leg's excess; returns a status if it had to unwind"""
+        for _ in range(self.chase_attempts):
+            if _unknown(fills):
+                return "unknown"
+            ratios = [_ratio(fills[k], requested[k]) for k in range(2)]
+            lead = int(ratios[1] > ratios[0])
+            lag = 1 - lead
+            if ratios[lead] - ratios[lag] <= self.imbalance_tolerance:
+                return None
+            if ratios[lag] == 0 and fills[lag][-1].status == "REJECTED":
+                break  # the exchange refuses this leg; chasing will not help
+            symbol, quantity, _ = legs[lag]
+            shortfall = (ratios[lead] - ratios[lag]) * requested[lag]
+            fills[lag].append(await self._submit(symbol, np.sign(quantity) * shortfall))
+
+        if _unknown(fills):
+            # Rebalancing on a guessed fill could open the exposure it means to close
+            return "unknown"
+        ratios = [_ratio(fills[k], requested[k]) for k in range(2)]
+        lead = int(ratios[1] > ratios[0])
+        lag = 1 - lead
+        if ratios[lead] - ratios[lag] <= self.imbalance_tolerance:
+            return None
+        symbol, quantity, _ = legs[lead]
+        excess = (ratios[lead] - ratios[lag]) * requested[lead]
+        unwind = await self._submit(symbol, -np.sign(quantity) * excess)
+        fills[lead].append(unwind)
+        if unwind.filled < excess * (1 - 1e-9):
+            return "imbalanced"
+        return "unwound" if ratios[lag] == 0 else "partial"
+
+    def _trade_row(self, fill: LegFill, order: PairOrder) -> Dict[str, Any]:
+        return {
+            "strategy_id": order.strategy_id,
+            "symbol": fill.symbol,
+            "side": fill.side.lower(),
+            "quantity": fill.filled,
+            "price": fill.avg_price,
+            "capital_phase": order.capital_phase,
+            "is_live": self.is_live,
+            "executed_at": datetime.datetime.utcnow(),
+        }
+
+    @staticmethod
+    def _leg_dict(fill: LegFill) -> Dict[str, Any]:
+        return {
+            "symbol": fill.symbol,
+            "side": fill.side,
+            "requested": fill.requested,
+            "filled": fill.filled,
+            "avg_price": fill.avg_price,
+            "status": fill.status,
+            "client_order_id": fill.client_order_id,
+            "round_trip_ms": (fill.acked_at - fill.sent_at) * 1000,
+            "error": fill.error,
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "outcomes": self.outcomes,
+            "signal_to_submit": self.signal_to_submit.to_dict(),
+            "leg_skew": self.leg_skew.to_dict(),
+            "round_trip": self.round_trip.to_dict(),
+            "execution": self.execution.to_dict(),
+            "trade_writer": self.writer.stats(),
+        }
+
+
+_executor: Optional[PairExecutor] = None
+
+
+def create_executor() -> PairExecutor:
+    """Executor for EXECUTION_MODE: the in-process simulated matching engine, or the exchange"""
+    from app.market_data.client import default_base_url
+    from app.trading.metrics import metrics_aggregator
+
+    if settings.EXECUTION_MODE == "exchange":
+        gateway = OrderGateway(settings.EXECUTION_BASE_URL or default_base_url(),
+                               settings.BINANCE_API_KEY, settings.BINANCE_SECRET_KEY)
+        is_live = not settings.BINANCE_TESTNET and settings.EXECUTION_BASE_URL is None
+    elif settings.EXECUTION_BASE_URL:
+        gateway = OrderGateway(settings.EXECUTION_BASE_URL)
+        is_live = False
+    else:
+        from app.trading.sim_exchange import create_sim_exchange
+
+        gateway = OrderGateway("http://sim", transport=httpx.ASGITransport(app=create_sim_exchange()))
+        is_live = False
+    return PairExecutor(
+        gateway,
+        TradeWriter(batch_size=settings.TRADE_WRITE_BATCH, flush_seconds=settings.TRADE_FLUSH_SECONDS,
+                    metrics=metrics_aggregator),
+        max_slippage_bps=settings.EXECUTION_MAX_SLIPPAGE_BPS,
+        imbalance_tolerance=settings.EXECUTION_IMBALANCE_TOLERANCE,
+        chase_attempts=settings.EXECUTION_CHASE_ATTEMPTS,
+        is_live=is_live,
+    )
+
+
+def get_executor() -> Optional[PairExecutor]:
+    return _executor
+
+
+async def start_executor():
+    global _executor
+    if settings.EXECUTION_MODE not in ("simulated", "exchange"):
+        raise ValueError(f"Unknown EXECUTION_MODE '{settings.EXECUTION_MODE}'. Use 'simulated' or 'exchange'")
+    if _executor is None:
+        _executor = create_executor()
+        _executor.writer.start()
+        await _executor.gateway.warm([s.strip().upper() for s in settings.STREAM_SYMBOLS.split(",") if s.strip()])
+        logger.info("Execution engine started", mode=settings.EXECUTION_MODE, live=_executor.is_live)
+
+
+async def stop_executor():
+    global _executor
+    if _executor is not None:
+        await _executor.writer.stop()
+        await _executor.gateway.close()
+        _executor = None
@@ -0,0 +1,296 @@
+"""Incrementally maintained PnL and performance metrics.
+
+Every batch of Trade rows the TradeWriter inserts is folded into running
+totals - trade counts, gross profit and loss, equity and its peak, and a
+Welford mean/variance of per-trade returns - so /api/metrics answers in
+O(1) without scanning the trades table.
+
+Realized PnL is derived with average-cost accounting per symbol, one book
+for paper and one for live trading. Rows arriving without a `pnl` get the
+realized PnL of the position they reduce (None when they only open or add
+to one), which is stored with the row. Totals are kept for "all", "paper"
+and "live".
+
+The aggregate state, including the books, is saved in the
+performance_metrics table in the same transaction as the trades it
+covers. At startup it is loaded and caught up with any later trades.
+`python manage.py rebuild-metrics` recomputes it from the full history in
+id-ordered chunks.
+"""
+from typing import Any, Dict, Iterable, List, Optional
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.database import PerformanceMetrics, SessionLocal, Trade
+import asyncio
+import datetime
+import math
+import threading
+import structlog
+
+logger = structlog.get_logger()
+
+SCOPES = ("all", "paper", "live")
+STATE_SCOPE = "trades"
+_TRADE_COLUMNS = (Trade.id, Trade.symbol, Trade.side, Trade.quantity, Trade.price, Trade.pnl, Trade.is_live,
+                  Trade.executed_at)
+
+
+class PerformanceTotals:
+    """Running totals over realized trades of one scope"""
+
+    FIELDS = ("trades", "closed", "wins", "losses", "gross_profit", "gross_loss", "pnl", "peak_equity",
+              "max_drawdown", "returns", "mean_return", "m2_return", "first_at", "last_at")
+
+    def __init__(self, initial_capital: float):
+        self.initial_capital = initial_capital
+        self.trades = 0
+        self.closed = 0
+        self.wins = 0
+        self.losses = 0
+        self.gross_profit = 0.0
+        self.gross_loss = 0.0
+        self.pnl = 0.0
+        self.peak_equity = initial_capital
+        self.max_drawdown = 0.0
+        self.returns = 0
+        self.mean_return = 0.0
+        self.m2_return = 0.0
+        self.first_at: Optional[str] = None
+        self.last_at: Optional[str] = None
+
+    @property
+    def equity(self) -> float:
+        return self.initial_capital + self.pnl
+
+    def add(self, pnl: Optional[float], executed_at: Optional[str]):
+        self.trades += 1
+        if executed_at is not None:
+            self.first_at = self.first_at or executed_at
+            self.last_at = executed_at
+        if pnl is None:
+            return
+        before = self.equity
+        self.closed += 1
+        if pnl > 0:
+            self.wins += 1
+            self.gross_profit += pnl
+        elif pnl < 0:
+            self.losses += 1
+            self.gross_loss -= pnl
+        self.pnl += pnl
+        self.peak_equity = max(self.peak_equity, self.equity)
+        if self.peak_equity > 0:
+            self.max_drawdown = max(self.max_drawdown, (self.peak_equity - self.equity) / self.peak_equity)
+        if before > 0:
+            # Welford's update of the per-trade return mean and squared deviations
+            value = pnl / before
+            self.returns += 1
+            delta = value - self.mean_return
+            self.mean_return += delta / self.returns
+            self.m2_return += delta * (value - self.mean_return)
+
+    def sharpe_ratio(self) -> Optional[float]:
+        """Per-trade Sharpe, annualized by the observed trade frequency when it spans at least a day"""
+        if self.returns < 2:
+            return None
+        std = math.sqrt(self.m2_return / (self.returns - 1))
+        if std == 0:
+            return None
+        sharpe = self.mean_return / std
+        if self.first_at and self.last_at:
+            span = (datetime.datetime.fromisoformat(self.last_at)
+                    - datetime.datetime.fromisoformat(self.first_at)).total_seconds()
+            if span >= 86_400:
+                sharpe *= math.sqrt(self.returns / (span / (365 * 86_400)))
+        return sharpe
+
+    def to_dict(self) -> Dict[str, Any]:
+        drawdown = (self.peak_equity - self.equity) / self.peak_equity if self.peak_equity > 0 else 0.0
+        return {
+            "total_trades": self.trades,
+            "closed_trades": self.closed,
+            "wins": self.wins,
+            "losses": self.losses,
+            "win_rate": self.wins / self.closed if self.closed else 0.0,
+            "profit_factor": self.gross_profit / self.gross_loss if self.gross_loss > 0 else None,
+            "gross_profit": self.gross_profit,
+            "gross_loss": self.gross_loss,
+            "current_pnl": self.pnl,
+            "initial_capital": self.initial_capital,
+            "equity": self.equity,
+            "peak_equity": self.peak_equity,
+            "current_drawdown": drawdown,
+            "max_drawdown": self.max_drawdown,
+            "sharpe_ratio": self.sharpe_ratio(),
+            "avg_trade_return": self.mean_return if self.returns else None,
+            "first_trade_at": self.first_at,
+            "last_trade_at": self.last_at,
+        }
+
+    def state(self) -> Dict[str, Any]:
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+    @classmethod
+    def from_state(cls, initial_capital: float, state: Dict[str, Any]) -> "PerformanceTotals":
+        totals = cls(initial_capital)
+        for field in cls.FIELDS:
+            if field in state:
+                setattr(totals, field, state[field])
+        return totals
+
+
+def _timestamp(value) -> Optional[str]:
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+    return value
+
+
+class MetricsAggregator:
+    """Performance totals and average-cost books, advanced one batch of trades at a time"""
+
+    def __init__(self, session_factory=SessionLocal, initial_capital: float = 1000.0):
+        self.session_factory = session_factory
+        self.initial_capital = initial_capital
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.totals = {scope: PerformanceTotals(self.initial_capital) for scope in SCOPES}
+        self.books: Dict[str, Dict[str, List[float]]] = {"paper": {}, "live": {}}  # symbol -> [qty, avg price]
+        self.last_trade_id = 0
+
+    def realize(self, row: Dict[str, Any]) -> Optional[float]:
+        """Apply a fill to its book; returns the PnL it realizes (None if it only opens or adds)"""
+        if row.get("quantity") is None or row.get("price") is None:
+            return None
+        book = self.books["live" if row.get("is_live") else "paper"]
+        quantity, price = float(row["quantity"]), float(row["price"])
+        signed = quantity if row["side"] == "buy" else -quantity
+        held, average = book.get(row["symbol"], (0.0, 0.0))
+        if held == 0 or (held > 0) == (signed > 0):
+            total = held + signed
+            book[row["symbol"]] = [total, (abs(held) * average + quantity * price) / abs(total)]
+            return None
+        closing = min(quantity, abs(held))
+        pnl = closing * (price - average) * (1.0 if held > 0 else -1.0)
+        total = held + signed
+        if abs(total) < 1e-12:
+            book.pop(row["symbol"], None)
+        else:
+            # A reversal opens the remainder at this fill's price
+            book[row["symbol"]] = [total, average if (total > 0) == (held > 0) else price]
+        return pnl
+
+    def fold(self, rows: Iterable[Dict[str, Any]]):
+        """Realize and add rows (in execution order) to the totals; fills in missing `pnl` on the dicts"""
+        for row in rows:
+            realized = self.realize(row)
+            if row.get("pnl") is None:
+                row["pnl"] = realized
+            executed_at = _timestamp(row.get("executed_at"))
+            self.totals["all"].add(row["pnl"], executed_at)
+            self.totals["live" if row.get("is_live") else "paper"].add(row["pnl"], executed_at)
+            if row.get("id"):
+                self.last_trade_id = max(self.last_trade_id, row["id"])
+
+    def state(self) -> Dict[str, Any]:
+        return {
+            "totals": {scope: totals.state() for scope, totals in self.totals.items()},
+            "books": {name: {symbol: list(position) for symbol, position in book.items()}
+                      for name, book in self.books.items()},
+        }
+
+    def load_state(self, state: Dict[str, Any], last_trade_id: int):
+        self.reset()
+        for scope, values in state.get("totals", {}).items():
+            self.totals[scope] = PerformanceTotals.from_state(self.initial_capital, values)
+        for name, book in state.get("books", {}).items():
+            self.books[name] = {symbol: list(position) for symbol, position in book.items()}
+        self.last_trade_id = last_trade_id
+
+    def save(self, db: Session):
+        """Stage the current state in `db`; committed with the caller's transaction"""
+        row = db.query(PerformanceMetrics).filter(PerformanceMetrics.scope == STATE_SCOPE).first()
+        if row is None:
+            row = PerformanceMetrics(scope=STATE_SCOPE)
+            db.add(row)
+        row.state = self.state()
+        row.last_trade_id = self.last_trade_id
+
+    def insert_trades(self, db: Session, rows: List[Dict[str, Any]]):
+        """Insert trade rows and fold them in, in one transaction; the state is restored if it fails"""
+        with self.lock:
+            checkpoint = (self.state(), self.last_trade_id)
+            try:
+                # Trades other writers committed since the last call come first, in id order
+                self._scan(db, 5000)
+                self.fold(rows)
+                # The watermark follows this call's own ids; max(Trade.id) could take in rows
+                # another writer inserts meanwhile, which would then never be folded
+                inserted = db.execute(insert(Trade).returning(Trade.id, sort_by_parameter_order=True), rows)
+                ids = inserted.scalars().all()
+                self.last_trade_id = max([self.last_trade_id, *ids])
+                self.save(db)
+                db.commit()
+            except Exception:
+                db.rollback()
+                self.load_state(*checkpoint)
+                raise
+
+    def _scan(self, db: Session, chunk_size: int) -> int:
+        """Fold trades after last_trade_id in id-ordered chunks; returns how many were read"""
+        scanned = 0
+        while True:
+            chunk = db.query(*_TRADE_COLUMNS).filter(Trade.id > self.last_trade_id) \
+                .order_by(Trade.id).limit(chunk_size).all()
+            if not chunk:
+                return scanned
+            self.fold([row._asdict() for row in chunk])
+            scanned += len(chunk)
+
+    def load(self, chunk_size: int = 5000) -> int:
+        """Load the saved state and fold in trades written since; returns how many were caught up"""
+        db = self.session_factory()
+        try:
+            with self.lock:
+                saved = db.query(PerformanceMetrics).filter(PerformanceMetrics.scope == STATE_SCOPE).first()
+                if saved is not None:
+                    self.load_state(saved.state or {}, saved.last_trade_id or 0)
+                else:
+                    self.reset()
+                caught_up = self._scan(db, chunk_size)
+                if caught_up:
+                    self.save(db)
+                    db.commit()
+            return caught_up
+        finally:
+            db.close()
+
+    def rebuild(self, chunk_size: int = 5000) -> int:
+        """Recompute the state from the whole trades table; returns how many trades were read"""
+        db = self.session_factory()
+        try:
+            with self.lock:
+                self.reset()
+                scanned = self._scan(db, chunk_size)
+                self.save(db)
+                db.commit()
+            return scanned
+        finally:
+            db.close()
+
+    def metrics(self, scope: str = "all") -> Dict[str, Any]:
+        return {"scope": scope, **self.totals[scope].to_dict(), "last_trade_id": self.last_trade_id}
+
+    def positions(self, book: str) -> Dict[str, Dict[str, float]]:
+        return {symbol: {"quantity": qty, "avg_price": avg} for symbol, (qty, avg) in self.books[book].items()}
+
+
+metrics_aggregator = MetricsAggregator(initial_capital=settings.INITIAL_CAPITAL)
+
+
+async def start_metrics():
+    """Load the saved metrics and catch up with trades written since, before the executor adds more"""
+    caught_up = await asyncio.to_thread(metrics_aggregator.load)
+    logger.info("Performance metrics loaded", last_trade_id=metrics_aggregator.last_trade_id, caught_up=caught_up)
@@ -0,0 +1,200 @@
+"""Local simulated matching engine for order execution.
+
+Serves POST /api/v3/order with Binance's request parameters and FULL
+response shape, order lookup by client order id and the LOT_SIZE /
+PRICE_FILTER part of exchangeInfo, so the execution engine runs the same
+code against it as against the exchange:
+
+    python -m app.trading.sim_exchange --port 8901
+    EXECUTION_BASE_URL=http://localhost:8901 uvicorn main:app
+
+Each symbol has a static ladder of price levels around a mid price (the
+stub exchange's synthetic close unless fixed prices are given). Market
+orders walk the ladder; LIMIT IOC orders stop at their limit price and
+expire the rest, so thin `liquidity` produces partial fills. Per-symbol
+latency and rejections exercise leg skew and unwinds. Quantities and
+prices off the step and tick sizes are refused like the exchange does.
+"""
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from typing import Any, Dict, List, Optional, Set, Union
+from app.market_data.stub_exchange import synthetic_klines
+import argparse
+import asyncio
+import itertools
+import math
+import time
+
+
+class MatchingEngine:
+    """Fills orders against a replenishing ladder of levels per symbol"""
+
+    def __init__(self, prices: Optional[Dict[str, float]] = None, levels: int = 50,
+                 level_notional: float = 5_000.0, spread_bps: float = 2.0, tick_bps: float = 2.0,
+                 liquidity: Optional[Dict[str, float]] = None, fee_rate: float = 0.001,
+                 step_size: float = 1e-8, tick_size: float = 1e-8):
+        self.prices = dict(prices or {})
+        self.levels = levels
+        self.level_notional = level_notional
+        self.spread_bps = spread_bps
+        self.tick_bps = tick_bps
+        self.liquidity = dict(liquidity or {})  # multiplier of level_notional per symbol
+        self.fee_rate = fee_rate
+        self.step_size = step_size
+        self.tick_size = tick_size
+        self.by_client_id: Dict[str, Dict[str, Any]] = {}
+        self._order_ids = itertools.count(1)
+        self.orders = 0
+        self.filled = 0
+        self.partial = 0
+        self.expired = 0
+
+    def mid(self, symbol: str) -> float:
+        if symbol in self.prices:
+            return self.prices[symbol]
+        now = int(time.time() * 1000)
+        klines = synthetic_klines(symbol, "1m", now - 120_000, now, 2)
+        return float(klines[-1][4])
+
+    def ladder(self, symbol: str, side: str) -> List[List[float]]:
+        """[price, quantity] levels an order on `side` would take, best first"""
+        mid = self.mid(symbol)
+        sign = 1.0 if side == "BUY" else -1.0
+        notional = self.level_notional * self.liquidity.get(symbol, 1.0)
+        ladder = []
+        for k in range(self.levels):
+            price = mid * (1 + sign * (self.spread_bps / 2 + k * self.tick_bps) / 10_000)
+            # Resting quantities are whole lots, so fills are too
+            ladder.append([price, math.floor(notional / price / self.step_size) * self.step_size])
+        return ladder
+
+    def filters(self) -> List[Dict[str, str]]:
+        return [
+            {"filterType": "PRICE_FILTER", "minPrice": f"{self.tick_size:.8f}", "maxPrice": "1000000.00000000",
+             "tickSize": f"{self.tick_size:.8f}"},
+            {"filterType": "LOT_SIZE", "minQty": f"{self.step_size:.8f}", "maxQty": "9000000.00000000",
+             "stepSize": f"{self.step_size:.8f}"},
+        ]
+
+    def filter_failure(self, quantity: float, price: Optional[float]) -> Optional[str]:
+        def off_step(value: float, step: float) -> bool:
+            return abs(value / step - round(value / step)) > 1e-6
+
+        if off_step(quantity, self.step_size):
+            return "LOT_SIZE"
+        if price is not None and off_step(price, self.tick_size):
+            return "PRICE_FILTER"
+        return None
+
+    def match(self, symbol: str, side: str, quantity: float, order_type: str = "MARKET",
+              price: Optional[float] = None, client_order_id: Optional[str] = None) -> Dict[str, Any]:
+        fills = []
+        remaining = quantity
+        for level_price, level_quantity in self.ladder(symbol, side):
+            if remaining <= 0:
+                break
+            if order_type == "LIMIT" and (level_price > price if side == "BUY" else level_price < price):
+                break
+            take = min(remaining, level_quantity)
+            remaining -= take
+            fills.append({
+                "price": f"{level_price:.8f}",
+                "qty": f"{take:.8f}",
+                "commission": f"{take * level_price * self.fee_rate:.8f}",
+                "commissionAsset": "USDT",
+            })
+        executed = quantity - remaining
+        quote = sum(float(f["price"]) * float(f["qty"]) for f in fills)
+        status = "FILLED" if remaining <= quantity * 1e-12 else ("EXPIRED" if executed == 0 else "PARTIALLY_FILLED")
+        self.orders += 1
+        self.filled += status == "FILLED"
+        self.partial += status == "PARTIALLY_FILLED"
+        self.expired += status == "EXPIRED"
+        order = {
+            "symbol": symbol,
+            "orderId": next(self._order_ids),
+            "clientOrderId": client_order_id or f"sim-{self.orders}",
+            "transactTime": int(time.time() * 1000),
+            "price": f"{price or 0:.8f}",
+            "origQty": f"{quantity:.8f}",
+            "executedQty": f"{executed:.8f}",
+            "cummulativeQuoteQty": f"{quote:.8f}",
+            "status": status,
+            "timeInForce": "IOC" if order_type == "LIMIT" else "GTC",
+            "type": order_type,
+            "side": side,
+            "fills": fills,
+        }
+        self.by_client_id[order["clientOrderId"]] = order
+        return order
+
+
+def create_sim_exchange(engine: Optional[MatchingEngine] = None, latency: Union[float, Dict[str, float]] = 0.0,
+                        reject: Optional[Set[str]] = None) -> FastAPI:
+    app = FastAPI(title="Simulated matching engine")
+    engine = engine or MatchingEngine()
+    rejected = set(reject or ())
+
+    @app.get("/api/v3/ping")
+    async def ping():
+        return {}
+
+    @app.post("/api/v3/order")
+    async def place_order(request: Request):
+        params = request.query_params
+        symbol = params.get("symbol", "")
+        delay = latency.get(symbol, 0.0) if isinstance(latency, dict) else latency
+        if delay:
+            await asyncio.sleep(delay)
+        if symbol in rejected:
+            return JSONResponse({"code": -2010, "msg": "Account has insufficient balance for requested action."},
+                                status_code=400)
+        try:
+            side = params["side"]
+            order_type = params.get("type", "MARKET")
+            quantity = float(params["quantity"])
+            price = float(params["price"]) if "price" in params else None
+        except (KeyError, ValueError):
+            return JSONResponse({"code": -1102, "msg": "Mandatory parameter was not sent or was malformed."},
+                                status_code=400)
+        if side not in ("BUY", "SELL") or quantity <= 0 or (order_type == "LIMIT" and price is None):
+            return JSONResponse({"code": -1102, "msg": "Invalid order parameters."}, status_code=400)
+        failure = engine.filter_failure(quantity, price)
+        if failure is not None:
+            return JSONResponse({"code": -1013, "msg": f"Filter failure: {failure}"}, status_code=400)
+        return engine.match(symbol, side, quantity, order_type, price, params.get("newClientOrderId"))
+
+    @app.get("/api/v3/order")
+    async def query_order(request: Request):
+        order = engine.by_client_id.get(request.query_params.get("origClientOrderId", ""))
+        if order is None:
+            return JSONResponse({"code": -2013, "msg": "Order does not exist."}, status_code=400)
+        return {key: value for key, value in order.items() if key not in ("fills", "transactTime")}
+
+    @app.get("/api/v3/exchangeInfo")
+    async def exchange_info(symbol: str):
+        return {"symbols": [{"symbol": symbol, "status": "TRADING", "filters": engine.filters()}]}
+
+    @app.get("/sim/stats")
+    async def stats():
+        return {
+            "orders": engine.orders,
+            "filled": engine.filled,
+            "partially_filled": engine.partial,
+            "expired": engine.expired,
+        }
+
+    return app
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Run the simulated matching engine")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8901)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every order")
+    parser.add_argument("--level-notional", type=float, default=5_000.0, help="quote liquidity per price level")
+    args = parser.parse_args()
+    uvicorn.run(create_sim_exchange(MatchingEngine(level_notional=args.level_notional), args.latency),
+                host=args.host, port=args.port)
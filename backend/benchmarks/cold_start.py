@@ -0,0 +1,110 @@
+"""Cold start: `python -X importtime` profile of `import main`, and seconds until the probes answer.
+
+    cd backend && python benchmarks/cold_start.py --top 15 --serve --max-live-seconds 1
+
+The import report lists the slowest top-level imports (cumulative time, as
+-X importtime reports it) and the slowest single modules (self time). With
+--serve, uvicorn is started on a scratch SQLite database and /health/live
+and /health/ready are polled from the moment the process is spawned.
+--max-live-seconds makes the run fail when liveness takes longer, so the
+budget can be tracked in CI.
+"""
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def environment(workdir):
+    env = dict(os.environ, DEBUG="false", PYTHONPATH=BACKEND_DIR, LOG_LEVEL="WARNING",
+               DATABASE_URL=f"sqlite:///{os.path.join(workdir, 'cold_start.db')}")
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    return env
+
+
+def import_profile(env):
+    """(total microseconds, [(cumulative, self, depth, module)]) of one `import main`"""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"], cwd=BACKEND_DIR,
+                            env=env, capture_output=True, text=True, check=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        own, cumulative, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((int(cumulative), int(own), depth, name.strip()))
+    total = next(cumulative for cumulative, _, _, name in reversed(rows) if name == "main")
+    return total, rows
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def time_to_probes(env, timeout):
+    port = free_port()
+    started = time.perf_counter()
+    server = subprocess.Popen([sys.executable, "-m", "uvicorn", "main:app", "--port", str(port)], cwd=BACKEND_DIR,
+                              env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    answered = {}
+    try:
+        while len(answered) < 2 and time.perf_counter() - started < timeout:
+            for probe in ("live", "ready"):
+                if probe in answered:
+                    continue
+                try:
+                    with urllib.request.urlopen(f"http://127.0.0.1:{port}/health/{probe}", timeout=1):
+                        answered[probe] = time.perf_counter() - started
+                except (urllib.error.URLError, ConnectionError):
+                    pass
+            time.sleep(0.005)
+    finally:
+        server.terminate()
+        server.wait(10)
+    return answered
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--runs", type=int, default=3, help="import profiles taken; the fastest is reported")
+    parser.add_argument("--serve", action="store_true", help="also time /health/live and /health/ready")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--max-live-seconds", type=float, help="exit non-zero when liveness is slower")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        env = environment(workdir)
+        total, rows = min((import_profile(env) for _ in range(args.runs)), key=lambda profile: profile[0])
+        print(f"import main: {total / 1e6:.3f}s (fastest of {args.runs})\n")
+        print(f"slowest imports under main (cumulative)")
+        for cumulative, _, _, name in sorted((r for r in rows if r[2] == 1), reverse=True)[:args.top]:
+            print(f"  {cumulative / 1e3:8.1f} ms  {name}")
+        print(f"\nslowest single modules (self)")
+        for own, name in sorted(((r[1], r[3]) for r in rows), reverse=True)[:args.top]:
+            print(f"  {own / 1e3:8.1f} ms  {name}")
+
+        if args.serve:
+            answered = time_to_probes(env, args.timeout)
+            print()
+            for probe in ("live", "ready"):
+                seconds = answered.get(probe)
+                print(f"/health/{probe:<5} " + (f"{seconds:6.3f}s after spawn" if seconds is not None
+                                                  else f"no answer within {args.timeout:.0f}s"))
+            if args.max_live_seconds is not None:
+                live = answered.get("live")
+                if live is None or live > args.max_live_seconds:
+                    sys.exit(f"liveness over budget ({args.max_live_seconds}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Signal-to-submit latency and round trips of paired order execution against the simulated matching engine.
+
+    cd backend && python benchmarks/execution_latency.py --orders 500
+
+Runs the matching engine as a real HTTP server on localhost and executes
+pair orders through a persistent keep-alive session, then through a fresh
+connection per order for comparison. Trade rows go to a temporary database.
+"""
+import argparse
+import asyncio
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import uvicorn
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.trading.execution import OrderGateway, PairExecutor, PairOrder, TradeWriter
+from app.trading.sim_exchange import MatchingEngine, create_sim_exchange
+
+
+def serve(port: int) -> uvicorn.Server:
+    config = uvicorn.Config(create_sim_exchange(MatchingEngine(prices={"AAAUSDT": 100.0, "BBBUSDT": 20.0})),
+                            host="127.0.0.1", port=port, log_level="error")
+    server = uvicorn.Server(config)
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+async def run(url: str, session_factory, orders: int, persistent: bool):
+    writer = TradeWriter(session_factory)
+    writer.start()
+    executor = PairExecutor(OrderGateway(url), writer)
+    if persistent:
+        await executor.gateway.warm()
+    started = time.perf_counter()
+    for _ in range(orders):
+        if not persistent:
+            await executor.gateway.close()
+            executor.gateway = OrderGateway(url)
+        await executor.execute(PairOrder("AAAUSDT", "BBBUSDT", 1.0, -5.0, 100.0, 20.0))
+    elapsed = time.perf_counter() - started
+    await writer.stop()
+    await executor.gateway.close()
+    return executor.stats(), elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, default=500)
+    args = parser.parse_args()
+
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    server = serve(port)
+    url = f"http://127.0.0.1:{port}"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'trades.db')}")
+        Base.metadata.create_all(bind=engine)
+        session_factory = sessionmaker(bind=engine)
+        for persistent in (True, False):
+            stats, elapsed = asyncio.run(run(url, session_factory, args.orders, persistent))
+            label = "keep-alive session " if persistent else "connection per order"
+            submit, rtt, skew = stats["signal_to_submit"], stats["round_trip"], stats["leg_skew"]
+            print(f"{label}: {args.orders / elapsed:,.0f} pairs/s, signal-to-submit p50 {submit['p50_ms']} ms "
+                  f"p99 {submit['p99_ms']} ms, leg skew p50 {skew['p50_ms']} ms, "
+                  f"round trip p50 {rtt['p50_ms']} ms p99 {rtt['p99_ms']} ms")
+        writer = stats["trade_writer"]
+        print(f"trade writer: {writer['rows_written']} rows in {writer['batches']} batches")
+        engine.dispose()
+    server.should_exit = True
+
+
+if __name__ == "__main__":
+    main()
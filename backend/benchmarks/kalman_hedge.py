@@ -0,0 +1,55 @@
+"""Throughput of the batched Kalman hedge ratio filter, in batch and per-bar mode.
+
+    cd backend && python benchmarks/kalman_hedge.py --symbols 200 --bars 1000
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from app.pairs.backtest import all_pairs, rolling_spread
+from app.pairs.kalman import KalmanHedge, kalman_spread
+from benchmarks.pairs_backtest_universe import synthetic_universe
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--symbols", type=int, default=200)
+    parser.add_argument("--bars", type=int, default=1000)
+    parser.add_argument("--lookback", type=int, default=100)
+    args = parser.parse_args()
+
+    log_prices = np.log(synthetic_universe(args.bars, args.symbols).T)
+    left, right = all_pairs(args.symbols)
+    pair_bars = len(left) * args.bars
+
+    started = time.perf_counter()
+    kalman_spread(log_prices, left, right)
+    elapsed = time.perf_counter() - started
+    print(f"kalman batch:   {len(left)} pairs x {args.bars} bars in {elapsed:.2f}s "
+          f"({pair_bars / elapsed / 1e6:.1f}M pair-bars/s)")
+
+    started = time.perf_counter()
+    rolling_spread(log_prices, left, right, np.full(len(left), args.lookback))
+    elapsed = time.perf_counter() - started
+    print(f"rolling OLS:    {len(left)} pairs x {args.bars} bars in {elapsed:.2f}s "
+          f"({pair_bars / elapsed / 1e6:.1f}M pair-bars/s)")
+
+    hedge = KalmanHedge(len(left))
+    x, y = log_prices[left], log_prices[right]
+    timings = []
+    for t in range(args.bars):
+        started = time.perf_counter()
+        hedge.update(x[:, t], y[:, t])
+        timings.append(time.perf_counter() - started)
+    timings = np.array(timings) * 1000
+    print(f"kalman per bar: {len(left)} pairs, median {np.median(timings):.2f} ms, "
+          f"p99 {np.percentile(timings, 99):.2f} ms per update")
+
+
+if __name__ == "__main__":
+    main()
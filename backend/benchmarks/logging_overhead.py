@@ -0,0 +1,114 @@
+"""Caller-side cost of a structured log call: synchronous JSON rendering vs the queued, batched pipeline.
+
+    cd backend && python benchmarks/logging_overhead.py --events 100000 --threads 1 4
+
+"sync" is the previous configuration: structlog renders JSON on the calling
+thread and a stdlib StreamHandler writes each line. "queued" is
+app.log_pipeline: the call enqueues the event dict and the writer thread
+serializes and writes batches. "sampled" adds a 1-in-10 sampling rule for
+the event. Output goes to a temporary file in every case; the drain column
+is the time until the writer has written everything.
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import structlog
+
+from app.log_pipeline import BatchWriter, LogQueue, QueueLogger, Sampler, processors
+
+FIELDS = {"pair1": "BTCUSDT", "pair2": "ETHUSDT", "zscore": 2.1345, "correlation": 0.87, "status": "long_pair1"}
+
+
+def sync_logger(name, path):
+    stdlib_logger = logging.getLogger(name)
+    handler = logging.StreamHandler(open(path, "w"))
+    stdlib_logger.handlers = [handler]
+    stdlib_logger.setLevel(logging.INFO)
+    stdlib_logger.propagate = False
+    chain = [
+        structlog.stdlib.filter_by_level,
+        structlog.stdlib.add_logger_name,
+        structlog.stdlib.add_log_level,
+        structlog.stdlib.PositionalArgumentsFormatter(),
+        structlog.processors.TimeStamper(fmt="iso"),
+        structlog.processors.StackInfoRenderer(),
+        structlog.processors.format_exc_info,
+        structlog.processors.UnicodeDecoder(),
+        structlog.processors.JSONRenderer(),
+    ]
+    logger = structlog.wrap_logger(stdlib_logger, processors=chain, wrapper_class=structlog.stdlib.BoundLogger,
+                                   cache_logger_on_first_use=True)
+    return logger, lambda: handler.stream.close()
+
+
+def queued_logger(name, path, sampler=None):
+    log_queue = LogQueue(maxsize=1_000_000)
+    stream = open(path, "wb")
+    writer = BatchWriter(log_queue, stream, batch_size=256)
+    writer.start()
+    logger = structlog.wrap_logger(QueueLogger(name, log_queue), processors=processors(sampler),
+                                   wrapper_class=structlog.make_filtering_bound_logger(logging.INFO),
+                                   cache_logger_on_first_use=True)
+
+    def finish():
+        writer.stop(timeout=60)
+        stream.close()
+    return logger, finish
+
+
+def run(make, events, threads):
+    logger, finish = make()
+    per_thread = events // threads
+    barrier = threading.Barrier(threads + 1)
+    elapsed = []
+
+    def work():
+        barrier.wait()
+        started = time.perf_counter()
+        for i in range(per_thread):
+            logger.info("Pair signal evaluated", i=i, **FIELDS)
+        elapsed.append(time.perf_counter() - started)
+
+    workers = [threading.Thread(target=work) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    started = time.perf_counter()
+    barrier.wait()
+    for worker in workers:
+        worker.join()
+    callers_done = time.perf_counter()
+    finish()
+    drained = time.perf_counter()
+    per_call_us = sum(elapsed) / (per_thread * threads) * 1e6
+    return per_call_us, callers_done - started, drained - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=100_000)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 4])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        for threads in args.threads:
+            variants = {
+                "sync": lambda: sync_logger("bench.sync", os.path.join(workdir, "sync.log")),
+                "queued": lambda: queued_logger("bench.queued", os.path.join(workdir, "queued.log")),
+                "sampled": lambda: queued_logger("bench.sampled", os.path.join(workdir, "sampled.log"),
+                                                 Sampler(sampling={"Pair signal evaluated": 0.1})),
+            }
+            for label, make in variants.items():
+                per_call, callers, drained = run(make, args.events, threads)
+                print(f"{threads} thread(s) {label:<8} {per_call:7.2f} us/call on the caller   "
+                      f"callers done {callers:6.2f}s   drained {drained:6.2f}s")
+
+
+if __name__ == "__main__":
+    main()
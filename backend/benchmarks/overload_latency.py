@@ -0,0 +1,202 @@
+"""Tail latency of cheap endpoints while expensive pairs analyses flood the server.
+
+    cd backend && python benchmarks/overload_latency.py --symbols 40 --flood 32 --duration 20
+
+Seeds a scratch SQLite database with synthetic 1h bars for --symbols symbols
+and some pair correlations, then runs uvicorn twice: with admission control
+off and on (app.admission). Each run measures /health/live and the
+correlations endpoint alone, then again while --flood clients keep posting
+/api/pairs-trading/analyze over every symbol. They all connect from
+127.0.0.1, so the per-client rate is lifted to keep it from hiding the
+global limits. The flood columns
+count its responses: 200 (served), 429 (client rate), 503 (shed); "ready
+503" is the share of /health/ready probes that reported saturation.
+"""
+import argparse
+import asyncio
+import datetime
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+import httpx
+import numpy as np
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base, PairCorrelation
+from app.engine.data import timeframe_ms
+from app.market_data.bar_store import BarStore
+from app.market_data.client import parse_kline
+from app.market_data.stub_exchange import synthetic_klines
+
+PROBES = {
+    "health": "/health/live",
+    "correlations": "/api/pairs-trading/correlations?limit=50",
+}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def seed(url, symbols, timeframe, days):
+    engine = create_engine(url)
+    Base.metadata.create_all(bind=engine)
+    store = BarStore(sessionmaker(bind=engine))
+    step = timeframe_ms(timeframe)
+    end = int(time.time() * 1000) // step * step
+    start = end - days * 86_400_000
+    for symbol in symbols:
+        for page in range(start, end + 1, 1000 * step):
+            klines = synthetic_klines(symbol, timeframe, page, min(page + 999 * step, end), 1000)
+            store.upsert(symbol, timeframe, [parse_kline(k) for k in klines])
+    rng = np.random.default_rng(0)
+    with engine.begin() as conn:
+        conn.execute(insert(PairCorrelation), [
+            {"pair1": f"X{i}USDT", "pair2": f"Y{i}USDT", "timeframe": "4h",
+             "correlation": float(rng.uniform(0.3, 1.0)), "zscore": float(rng.normal(0, 1.5)),
+             "status": "neutral", "updated_at": datetime.datetime(2024, 1, 1) + datetime.timedelta(minutes=i)}
+            for i in range(2000)
+        ])
+    engine.dispose()
+
+
+def start_server(env, timeout=60):
+    port = free_port()
+    env = dict(env, PORT=str(port))
+    server = subprocess.Popen([sys.executable, "-m", "uvicorn", "main:app", "--port", str(port)], cwd=BACKEND_DIR,
+                              env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + timeout
+    while True:
+        if time.time() > deadline or server.poll() is not None:
+            server.terminate()
+            raise RuntimeError("server did not become ready")
+        try:
+            if httpx.get(f"{url}/health/ready", timeout=2).status_code == 200:
+                return server, url
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.05)
+
+
+async def probe(client, path, stop, interval=0.02):
+    latencies = []
+    while not stop.is_set():
+        started = time.perf_counter()
+        try:
+            await client.get(path)
+            latencies.append(time.perf_counter() - started)
+        except httpx.HTTPError:
+            latencies.append(float("inf"))
+        await asyncio.sleep(interval)
+    return latencies
+
+
+async def readiness(client, stop, interval=0.1):
+    codes = []
+    while not stop.is_set():
+        try:
+            codes.append((await client.get("/health/ready")).status_code)
+        except httpx.HTTPError:
+            codes.append(0)
+        await asyncio.sleep(interval)
+    return codes
+
+
+async def flood(url, body, stop, counts):
+    async with httpx.AsyncClient(base_url=url, timeout=120) as client:
+        while not stop.is_set():
+            try:
+                response = await client.post("/api/pairs-trading/analyze", json=body)
+                counts[response.status_code] = counts.get(response.status_code, 0) + 1
+                if response.status_code != 200:
+                    # A well-behaved client backs off as told, a bit sooner to keep the pressure on
+                    retry_after = float(response.headers.get("Retry-After", 1))
+                    await asyncio.sleep(min(retry_after, 1.0))
+            except httpx.HTTPError:
+                counts["error"] = counts.get("error", 0) + 1
+
+
+async def measure(url, duration, flood_clients, body):
+    stop = asyncio.Event()
+    counts = {}
+    async with httpx.AsyncClient(base_url=url, timeout=60) as client:
+        probes = [asyncio.create_task(probe(client, path, stop)) for path in PROBES.values()]
+        ready = asyncio.create_task(readiness(client, stop))
+        floods = [asyncio.create_task(flood(url, body, stop, counts)) for _ in range(flood_clients)]
+        await asyncio.sleep(duration)
+        stop.set()
+        results = [await task for task in probes]
+        codes = await ready
+        await asyncio.gather(*floods)
+    return dict(zip(PROBES, results)), codes, counts
+
+
+def report(label, latencies, codes, counts):
+    for name, values in latencies.items():
+        values = np.array(values) * 1000
+        p50, p99 = np.percentile(values, [50, 99])
+        print(f"{label:<22} {name:<13} n {len(values):5d}  p50 {p50:8.1f} ms  p99 {p99:8.1f} ms  "
+              f"max {values.max():8.1f} ms")
+    if counts:
+        saturated = sum(code == 503 for code in codes) / max(len(codes), 1)
+        print(f"{label:<22} flood         200 {counts.get(200, 0):4d}  429 {counts.get(429, 0):4d}  "
+              f"503 {counts.get(503, 0):4d}  other {sum(v for k, v in counts.items() if k not in (200, 429, 503))}"
+              f"  ready 503 {saturated:5.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--symbols", type=int, default=40)
+    parser.add_argument("--days", type=int, default=90, help="lookback of every analysis (1h bars)")
+    parser.add_argument("--flood", type=int, default=32, help="concurrent clients posting analyses")
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds per measurement")
+    parser.add_argument("--capacity", type=float, default=100.0, help="ADMISSION_CAPACITY for the 'on' run")
+    args = parser.parse_args()
+    symbols = [f"SYM{i:03d}USDT" for i in range(args.symbols)]
+    body = {"pairs": symbols, "timeframe": "1h", "lookback_days": args.days}
+
+    with tempfile.TemporaryDirectory() as workdir:
+        database_url = f"sqlite:///{os.path.join(workdir, 'overload.db')}"
+        started = time.perf_counter()
+        seed(database_url, symbols, "1h", args.days + 2)
+        print(f"seeded {args.symbols} symbols x {args.days + 2} days of 1h bars in {time.perf_counter() - started:.1f}s; "
+              f"{os.cpu_count()} cores, {args.flood} flood clients, {args.duration:g}s per measurement")
+        base_env = dict(os.environ, DEBUG="false", LOG_LEVEL="WARNING", DATABASE_URL=database_url,
+                        SCHEMA_SETUP="none", SCHEDULER_ENABLED="false", UNIVERSE_REFRESH_SECONDS="0",
+                        BINANCE_BASE_URL=f"http://127.0.0.1:{free_port()}")
+        for admission in ("off", "on"):
+            env = dict(base_env, ADMISSION_ENABLED=str(admission == "on").lower(),
+                       ADMISSION_CAPACITY=str(args.capacity), ADMISSION_CLIENT_RATE="1e9",
+                       ADMISSION_CLIENT_BURST="1e9")
+            server, url = start_server(env)
+            try:
+                response = httpx.post(f"{url}/api/pairs-trading/analyze", json=body, timeout=120)
+                response.raise_for_status()
+                if admission == "off":
+                    print(f"one analysis: {response.json()['summary']['total_pairs']} pairs, "
+                          f"{response.elapsed.total_seconds() * 1000:.0f} ms")
+                idle = asyncio.run(measure(url, args.duration / 2, 0, body))
+                report(f"admission {admission}, idle", *idle)
+                loaded = asyncio.run(measure(url, args.duration, args.flood, body))
+                report(f"admission {admission}, flood", *loaded)
+            finally:
+                server.terminate()
+                try:
+                    server.wait(30)
+                except subprocess.TimeoutExpired:
+                    server.kill()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Pairs pruned and recall of clustered / nearest-neighbour pair selection against exhaustive search.
+
+    cd backend && python benchmarks/pair_selection.py --symbols 500 --bars 1000 --sectors 12
+
+The reference set is every pair the exhaustive search would consider
+tradable: return correlation >= --min-correlation, which is what
+/opportunities filters on. Recall is the share of those pairs each
+selection method keeps.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from app.pairs.analysis import pair_statistics
+from app.pairs.selection import pair_recall, select_pairs
+
+
+def sector_universe(bars: int, symbols: int, sectors: int, seed: int = 0) -> np.ndarray:
+    """Prices driven by a market factor, one of `sectors` sector factors and idiosyncratic noise"""
+    rng = np.random.default_rng(seed)
+    market = rng.normal(0, 0.01, bars)
+    sector_returns = rng.normal(0, 0.01, (bars, sectors))
+    sector = rng.integers(0, sectors, symbols)
+    loading = rng.uniform(0.5, 1.5, symbols)
+    returns = (market[:, None] * rng.uniform(0.3, 0.8, symbols)
+               + sector_returns[:, sector] * loading
+               + rng.normal(0, 0.01, (bars, symbols)) * rng.uniform(0.5, 1.5, symbols))
+    return 100 * np.exp(np.cumsum(returns, axis=0))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--symbols", type=int, default=500)
+    parser.add_argument("--bars", type=int, default=1000)
+    parser.add_argument("--sectors", type=int, default=12)
+    parser.add_argument("--clusters", type=int, default=None)
+    parser.add_argument("--neighbors", type=int, default=20)
+    parser.add_argument("--min-correlation", type=float, default=0.5)
+    args = parser.parse_args()
+
+    prices = sector_universe(args.bars, args.symbols, args.sectors)
+    started = time.perf_counter()
+    correlation = pair_statistics(prices)["correlation"]
+    exhaustive_seconds = time.perf_counter() - started
+    left, right = np.triu_indices(args.symbols, 1)
+    tradable = correlation[left, right] >= args.min_correlation
+    reference = left[tradable], right[tradable]
+    top = np.argsort(-correlation[left, right])[:args.symbols]
+    print(f"{args.symbols} symbols, {len(left)} pairs, {tradable.sum()} with correlation >= "
+          f"{args.min_correlation} (exhaustive statistics {exhaustive_seconds * 1000:.0f} ms)")
+
+    for method in ("hierarchical", "kmeans", "knn"):
+        started = time.perf_counter()
+        candidates = select_pairs(prices, method, clusters=args.clusters, neighbors=args.neighbors)
+        elapsed = time.perf_counter() - started
+        pruned = len(left) - len(candidates[0])
+        print(f"{method:>12}: {len(candidates[0]):>7} pairs kept, {pruned:>7} pruned ({pruned / len(left):.1%}), "
+              f"recall {pair_recall(*candidates, *reference):.3f} (top {len(top)}: "
+              f"{pair_recall(*candidates, left[top], right[top]):.3f}) in {elapsed * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""SQL statements and bytes sent for a polling workload, with and without conditional GETs and compression.
+
+    cd backend && python benchmarks/polling_cache.py --pollers 20 --rounds 100 --write-every 10
+
+Runs the app in-process (routers mounted, no background services) on a
+scratch SQLite database seeded with pair correlations, thresholds and
+optimization runs. Every round, each poller GETs the correlations,
+opportunities and optimization listings; every --write-every rounds a
+writer updates some correlations, and every third write also records an
+optimization run. Modes:
+
+* plain - no validators, no Accept-Encoding (what every poll cost before)
+* br - compression alone
+* etag - pollers send If-None-Match with the last ETag they saw
+* etag+gzip, etag+br - the same, accepting compressed bodies
+
+Statements are counted on the engine, excluding the writer's own.
+"""
+import argparse
+import asyncio
+import datetime
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+WORKDIR = tempfile.mkdtemp(prefix="polling_cache_")
+os.environ.update(DEBUG="false", LOG_LEVEL="WARNING", DATABASE_URL=f"sqlite:///{os.path.join(WORKDIR, 'polling.db')}")
+
+import httpx
+import numpy as np
+from sqlalchemy import event, insert
+
+from app import startup
+from app.database import Base, OptimizationRun, PairCorrelation, PairThreshold, SessionLocal, engine
+from main import app
+
+PATHS = [
+    "/api/pairs-trading/correlations?limit=100",
+    "/api/pairs-trading/opportunities?min_zscore=1.5",
+    "/api/optimization/?limit=50",
+]
+MODES = {
+    "plain": (False, "identity"),
+    "br": (False, "br"),
+    "etag": (True, "identity"),
+    "etag+gzip": (True, "gzip"),
+    "etag+br": (True, "br"),
+}
+
+
+def seed(rows):
+    Base.metadata.create_all(bind=engine)
+    rng = np.random.default_rng(0)
+    start = datetime.datetime(2024, 1, 1)
+    with engine.begin() as conn:
+        conn.execute(insert(PairCorrelation), [
+            {"pair1": f"S{i % 60}USDT", "pair2": f"S{i % 60 + 1 + i % 7}USDT", "timeframe": "1h",
+             "correlation": float(rng.uniform(0.3, 1.0)), "zscore": float(rng.normal(0, 1.5)),
+             "status": "neutral", "updated_at": start + datetime.timedelta(minutes=i)}
+            for i in range(rows)
+        ])
+        conn.execute(insert(PairThreshold), [
+            {"pair1": f"S{i}USDT", "pair2": f"S{i + 1}USDT", "timeframe": "1h", "entry_zscore": 1.8,
+             "exit_zscore": 0.3, "lookback": 100, "updated_at": start}
+            for i in range(50)
+        ])
+        conn.execute(insert(OptimizationRun), [
+            {"strategy_id": i % 10, "symbol": "BTCUSDT", "timeframe": "1h", "algorithm": "pso", "status": "completed",
+             "best_score": float(rng.normal()), "iterations": 100, "created_at": start + datetime.timedelta(hours=i)}
+            for i in range(500)
+        ])
+
+
+def write(step, rng):
+    db = SessionLocal()
+    try:
+        ids = [int(i) for i in rng.integers(1, 1000, 20)]
+        for row in db.query(PairCorrelation).filter(PairCorrelation.id.in_(ids)):
+            row.zscore = float(rng.normal(0, 1.5))
+            row.updated_at = datetime.datetime.utcnow()
+        if step % 3 == 0:
+            db.add(OptimizationRun(symbol="ETHUSDT", timeframe="1h", algorithm="pso", status="running"))
+        db.commit()
+    finally:
+        db.close()
+
+
+async def run(mode, pollers, rounds, write_every, counter):
+    conditional, encoding = MODES[mode]
+    rng = np.random.default_rng(1)
+    etags = [{} for _ in range(pollers)]
+    stats = {"requests": 0, "not_modified": 0, "bytes": 0}
+
+    async def poll(client, poller, path):
+        headers = {"Accept-Encoding": encoding}
+        if conditional and path in etags[poller]:
+            headers["If-None-Match"] = etags[poller][path]
+        response = await client.get(path, headers=headers)
+        assert response.status_code in (200, 304), response.text
+        if "etag" in response.headers:
+            etags[poller][path] = response.headers["etag"]
+        stats["requests"] += 1
+        stats["not_modified"] += response.status_code == 304
+        stats["bytes"] += response.num_bytes_downloaded + sum(len(k) + len(v) + 4 for k, v in response.headers.raw)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        counter["statements"] = 0
+        started = time.perf_counter()
+        for step in range(rounds):
+            if step % write_every == 0:
+                counter["writing"] = True
+                write(step // write_every, rng)
+                counter["writing"] = False
+            await asyncio.gather(*(poll(client, poller, path) for poller in range(pollers) for path in PATHS))
+        elapsed = time.perf_counter() - started
+    return stats, counter["statements"], elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pollers", type=int, default=20)
+    parser.add_argument("--rounds", type=int, default=100)
+    parser.add_argument("--write-every", type=int, default=10, help="rounds between writes")
+    parser.add_argument("--rows", type=int, default=5000, help="pair_correlations rows to seed")
+    args = parser.parse_args()
+
+    try:
+        seed(args.rows)
+        startup.mount_routers(app, startup.import_routers())
+        counter = {"statements": 0, "writing": False}
+
+        @event.listens_for(engine, "before_cursor_execute")
+        def count(conn, cursor, statement, parameters, context, executemany):
+            if not counter["writing"]:
+                counter["statements"] += 1
+
+        print(f"{args.pollers} pollers x {len(PATHS)} endpoints x {args.rounds} rounds, "
+              f"a write every {args.write_every} rounds")
+        baseline = None
+        for mode in MODES:
+            stats, statements, elapsed = asyncio.run(run(mode, args.pollers, args.rounds, args.write_every, counter))
+            baseline = baseline or (statements, stats["bytes"])
+            print(f"{mode:<10} {stats['requests']:6d} requests  {stats['not_modified'] / stats['requests']:6.1%} 304  "
+                  f"{statements:6d} statements ({statements / baseline[0]:6.1%})  "
+                  f"{stats['bytes'] / 1e6:8.2f} MB ({stats['bytes'] / baseline[1]:6.1%})  "
+                  f"{stats['requests'] / elapsed:7.0f} req/s")
+    finally:
+        engine.dispose()
+        shutil.rmtree(WORKDIR, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
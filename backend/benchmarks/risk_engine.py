@@ -0,0 +1,51 @@
+"""Latency of a risk engine evaluation (sizing + portfolio limit checks) per batch of signals.
+
+    cd backend && python benchmarks/risk_engine.py --symbols 100 --candidates 20 --positions 20
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from app.trading.risk import Candidates, RiskEngine, RiskModel
+from benchmarks.pairs_backtest_universe import synthetic_universe
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--symbols", type=int, default=100)
+    parser.add_argument("--bars", type=int, default=1000)
+    parser.add_argument("--candidates", type=int, default=20)
+    parser.add_argument("--positions", type=int, default=20, help="assets with an open position in the book")
+    parser.add_argument("--equity", type=float, default=50_000.0)
+    parser.add_argument("--repeats", type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    prices = synthetic_universe(args.bars, args.symbols)
+    model = RiskModel.from_prices([f"S{i}" for i in range(args.symbols)], prices)
+    left = rng.choice(args.symbols, args.candidates)
+    right = (left + 1 + rng.choice(args.symbols - 1, args.candidates)) % args.symbols
+    candidates = Candidates(left, right, rng.choice([-1.0, 1.0], args.candidates),
+                            rng.uniform(0.5, 1.5, args.candidates), rng.uniform(2, 4, args.candidates))
+    book = np.zeros(args.symbols)
+    book[rng.choice(args.symbols, args.positions, replace=False)] = rng.normal(0, 0.05 * args.equity, args.positions)
+    engine = RiskEngine(model)
+
+    timings = []
+    for _ in range(args.repeats):
+        started = time.perf_counter()
+        result = engine.evaluate(candidates, book, args.equity)
+        timings.append(time.perf_counter() - started)
+    timings = np.array(timings) * 1000
+    print(f"{args.candidates} candidates over {args.symbols} assets ({result['capital_phase']} phase, "
+          f"{result['accepted']} accepted): median {np.median(timings):.3f} ms, "
+          f"p99 {np.percentile(timings, 99):.3f} ms per evaluation")
+
+
+if __name__ == "__main__":
+    main()
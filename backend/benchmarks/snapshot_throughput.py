@@ -0,0 +1,102 @@
+"""Rows/sec of streaming trade snapshots out of and back into SQLite, and peak memory while doing it.
+
+    cd backend && python benchmarks/snapshot_throughput.py --rows 500000 --batch-size 10000
+
+With --memory, peak memory is measured per phase (Python allocations via
+tracemalloc plus the Arrow memory pool's high-water mark); it should track
+--batch-size, not --rows.
+"""
+import argparse
+import datetime
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pyarrow as pa
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base, Trade
+from app.snapshots import export_table, import_table
+
+
+def seed(factory, rows, chunk=50_000):
+    rng = np.random.default_rng(0)
+    start = datetime.datetime(2024, 1, 1)
+    db = factory()
+    try:
+        for offset in range(0, rows, chunk):
+            n = min(chunk, rows - offset)
+            db.execute(insert(Trade), [
+                {"strategy_id": int(rng.integers(1, 20)), "symbol": f"S{int(rng.integers(0, 100))}USDT",
+                 "side": "buy" if rng.random() < 0.5 else "sell", "quantity": float(rng.random()),
+                 "price": float(100 + rng.normal()), "pnl": float(rng.normal()) if i % 2 else None,
+                 "capital_phase": "small", "is_live": False,
+                 "executed_at": start + datetime.timedelta(seconds=offset + i)}
+                for i in range(n)
+            ])
+            db.commit()
+    finally:
+        db.close()
+
+
+def measure(label, rows, action, trace_memory):
+    pool = pa.default_memory_pool()
+    if trace_memory:
+        tracemalloc.start()
+    arrow_before = pool.max_memory()
+    started = time.perf_counter()
+    action()
+    elapsed = time.perf_counter() - started
+    line = f"{label:<16} {rows / elapsed:>12,.0f} rows/s  {elapsed:7.2f}s"
+    if trace_memory:
+        _, python_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        arrow_peak = max(pool.max_memory() - arrow_before, 0)
+        line += f"  python peak {python_peak / 2**20:7.1f} MiB  arrow peak {arrow_peak / 2**20:7.1f} MiB"
+    print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--batch-size", type=int, default=10_000)
+    parser.add_argument("--memory", action="store_true", help="trace peak memory (slows every phase down)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        factories = {}
+        for name in ("source", "parquet", "arrow"):
+            engine = create_engine(f"sqlite:///{os.path.join(workdir, name)}.db")
+            Base.metadata.create_all(bind=engine)
+            factories[name] = sessionmaker(bind=engine)
+        started = time.perf_counter()
+        seed(factories["source"], args.rows)
+        print(f"seeded {args.rows:,} trades in {time.perf_counter() - started:.1f}s, "
+              f"batch size {args.batch_size:,}")
+
+        for fmt in ("parquet", "arrow"):
+            path = os.path.join(workdir, f"trades.{fmt}")
+            db = factories["source"]()
+            try:
+                measure(f"export {fmt}", args.rows,
+                        lambda: export_table(db, Trade, path, fmt, args.batch_size), args.memory)
+            finally:
+                db.close()
+            print(f"{'':16} {os.path.getsize(path) / 2**20:.1f} MiB on disk")
+            db = factories[fmt]()
+            try:
+                with open(path, "rb") as source:
+                    measure(f"import {fmt}", args.rows,
+                            lambda: import_table(db, Trade, source, fmt, args.batch_size), args.memory)
+            finally:
+                db.close()
+
+
+if __name__ == "__main__":
+    main()
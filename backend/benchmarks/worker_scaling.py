@@ -0,0 +1,181 @@
+"""Throughput of the health and pairs endpoints with 1 to N gunicorn workers.
+
+    cd backend && python benchmarks/worker_scaling.py --workers 1 2 4 --duration 10 --concurrency 32
+
+Each run starts `gunicorn main:app -c gunicorn.conf.py` with WORKERS=N and
+SHARED_STATE_BACKEND=redis against a scratch SQLite database seeded with
+pair correlations. Redis comes from --redis-url, or a throwaway
+redis-server on a free port when one is on PATH. Load comes from --clients
+separate processes, each keeping --concurrency requests in flight on
+short-lived connections so that gunicorn spreads them over its workers.
+
+Scaling is bounded by the cores: on a machine with fewer cores than
+workers (plus the load generators) the extra workers only add contention.
+"""
+import argparse
+import asyncio
+import datetime
+import multiprocessing
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+import httpx
+import numpy as np
+from sqlalchemy import create_engine, insert
+
+from app.database import Base, PairCorrelation
+
+ENDPOINTS = {
+    "health": "/health/live",
+    "correlations": "/api/pairs-trading/correlations?limit=50",
+    "opportunities": "/api/pairs-trading/opportunities?min_zscore=1.5",
+}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def seed(url, rows):
+    engine = create_engine(url)
+    Base.metadata.create_all(bind=engine)
+    rng = np.random.default_rng(0)
+    start = datetime.datetime(2024, 1, 1)
+    with engine.begin() as conn:
+        conn.execute(insert(PairCorrelation), [
+            {"pair1": f"S{i % 60}USDT", "pair2": f"S{i % 60 + 1 + i % 7}USDT", "timeframe": "1h",
+             "correlation": float(rng.uniform(0.3, 1.0)), "zscore": float(rng.normal(0, 1.5)),
+             "status": "neutral", "updated_at": start + datetime.timedelta(minutes=i)}
+            for i in range(rows)
+        ])
+    engine.dispose()
+
+
+def start_redis():
+    port = free_port()
+    server = subprocess.Popen(["redis-server", "--port", str(port), "--save", "", "--appendonly", "no"],
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    time.sleep(0.3)
+    return server, f"redis://127.0.0.1:{port}/0"
+
+
+def start_gunicorn(workers, env, timeout=60):
+    port = free_port()
+    env = dict(env, WORKERS=str(workers), PORT=str(port))
+    server = subprocess.Popen([sys.executable, "-m", "gunicorn", "main:app", "-c", "gunicorn.conf.py"],
+                              cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + timeout
+    # Every worker must be warm: probe on fresh connections until `workers` distinct workers report ready
+    ready = set()
+    while len(ready) < workers:
+        if time.time() > deadline or server.poll() is not None:
+            server.terminate()
+            raise RuntimeError(f"gunicorn with {workers} workers did not become ready")
+        try:
+            response = httpx.get(f"{url}/health/ready", timeout=2)
+            if response.status_code == 200:
+                ready.add(response.json()["startup"]["leadership"]["worker"])
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.05)
+    return server, url
+
+
+async def _load(url, path, duration, concurrency):
+    latencies = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+
+    async def user(client):
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                response = await client.get(path)
+                if response.status_code != 200:
+                    errors += 1
+                    continue
+            except httpx.HTTPError:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - started)
+
+    # No keep-alive: a new connection per request, like independent clients behind a load balancer
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=0)
+    async with httpx.AsyncClient(base_url=url, timeout=10, limits=limits) as client:
+        await asyncio.gather(*(user(client) for _ in range(concurrency)))
+    return latencies, errors
+
+
+def _client(args):
+    return asyncio.run(_load(*args))
+
+
+def load(url, path, duration, concurrency, clients):
+    with multiprocessing.get_context("spawn").Pool(clients) as pool:
+        results = pool.map(_client, [(url, path, duration, concurrency)] * clients)
+    latencies = np.array([value for values, _ in results for value in values])
+    return latencies, sum(errors for _, errors in results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds of load per endpoint")
+    parser.add_argument("--concurrency", type=int, default=32, help="requests in flight per client process")
+    parser.add_argument("--clients", type=int, default=2, help="load generator processes")
+    parser.add_argument("--rows", type=int, default=5000, help="pair_correlations rows to seed")
+    parser.add_argument("--redis-url", help="default: start a throwaway redis-server")
+    args = parser.parse_args()
+
+    redis_server = None
+    redis_url = args.redis_url
+    if redis_url is None:
+        if shutil.which("redis-server") is None:
+            parser.exit(1, "error: pass --redis-url or put redis-server on PATH\n")
+        redis_server, redis_url = start_redis()
+
+    print(f"{os.cpu_count()} cores, {args.clients} client processes x {args.concurrency} in flight, "
+          f"{args.duration:g}s per endpoint")
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            database_url = f"sqlite:///{os.path.join(workdir, 'scaling.db')}"
+            seed(database_url, args.rows)
+            env = dict(os.environ, DEBUG="false", LOG_LEVEL="WARNING", DATABASE_URL=database_url,
+                       SCHEMA_SETUP="none", SHARED_STATE_BACKEND="redis", REDIS_URL=redis_url)
+            baseline = {}
+            for workers in args.workers:
+                server, url = start_gunicorn(workers, env)
+                try:
+                    for name, path in ENDPOINTS.items():
+                        latencies, errors = load(url, path, args.duration, args.concurrency, args.clients)
+                        throughput = len(latencies) / args.duration
+                        baseline.setdefault(name, throughput or 1.0)
+                        p50, p99 = np.percentile(latencies, [50, 99]) * 1000 if len(latencies) else (0, 0)
+                        print(f"{workers} worker(s) {name:<14} {throughput:9.1f} req/s "
+                              f"({throughput / baseline[name]:4.2f}x)  p50 {p50:7.1f} ms  p99 {p99:7.1f} ms  "
+                              f"errors {errors}")
+                finally:
+                    server.terminate()
+                    try:
+                        server.wait(30)
+                    except subprocess.TimeoutExpired:
+                        server.kill()
+    finally:
+        if redis_server is not None:
+            redis_server.terminate()
+
+
+if __name__ == "__main__":
+    main()
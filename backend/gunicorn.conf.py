@@ -0,0 +1,22 @@
+"""gunicorn settings, read from the same Settings as the app.
+
+    cd backend && gunicorn main:app -c gunicorn.conf.py
+
+WORKERS > 1 requires SHARED_STATE_BACKEND=redis; see app.shared_state.
+"""
+from app.config import settings
+
+# Only the settings are imported here: workers fork from this process, and must not inherit app state
+if settings.WORKERS > 1 and settings.SHARED_STATE_BACKEND == "memory":
+    raise SystemExit(f"WORKERS={settings.WORKERS} needs SHARED_STATE_BACKEND=redis (and REDIS_URL)")
+
+bind = f"0.0.0.0:{settings.PORT}"
+workers = settings.WORKERS
+worker_class = "uvicorn.workers.UvicornWorker"
+max_requests = settings.MAX_REQUESTS
+max_requests_jitter = settings.MAX_REQUESTS_JITTER
+timeout = settings.TIMEOUT
+graceful_timeout = settings.TIMEOUT
+# Each worker imports the app itself; warm-up runs per worker and picks one leader
+preload_app = False
+accesslog = None
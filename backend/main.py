@@ -4,32 +4,22 @@ from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 import uvicorn
 import structlog
 from app.config import settings
-from app.database import engine, Base
-from app.routers import health, optimization, pairs_trading, debug
+from app.routers import health
+from app.log_pipeline import configure_logging, flush_logging
+from app.http_cache import CompressionMiddleware
+from app import startup
 
-# Configure structured logging
-structlog.configure(
-    processors=[
-        structlog.stdlib.filter_by_level,
-        structlog.stdlib.add_logger_name,
-        structlog.stdlib.add_log_level,
-        structlog.stdlib.PositionalArgumentsFormatter(),
-        structlog.processors.TimeStamper(fmt="iso"),
-        structlog.processors.StackInfoRenderer(),
-        structlog.processors.format_exc_info,
-        structlog.processors.UnicodeDecoder(),
-        structlog.processors.JSONRenderer()
-    ],
-    context_class=dict,
-    logger_factory=structlog.stdlib.LoggerFactory(),
-    cache_logger_on_first_use=True,
+# Configure structured logging: events are queued here and serialized in batches by a writer thread
+configure_logging(
+    settings.LOG_LEVEL,
+    sampling=settings.LOG_SAMPLING,
+    rate_limits=settings.LOG_RATE_LIMITS,
+    queue_size=settings.LOG_QUEUE_SIZE,
+    batch_size=settings.LOG_BATCH_SIZE,
 )
 
 logger = structlog.get_logger()
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
-
 app = FastAPI(
     title="PSO+Zscore Trading API",
     description="Pine Script Optimizer + Z-Score Pairs Trading Application",
@@ -45,24 +35,31 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Link", "X-Next-Cursor", "ETag", "Last-Modified"],  # paging and revalidation
 )
 
+# brotli or gzip for complete bodies; streams pass through
+app.add_middleware(CompressionMiddleware, minimum_size=settings.COMPRESSION_MIN_BYTES)
+
 # Security
 security = HTTPBearer()
 
-# Include routers
+# Include routers: health now, the API routers (app.startup.ROUTERS) once warm-up has loaded them;
+# until then their prefixes answer 503 with Retry-After
 app.include_router(health.router, prefix="/health", tags=["health"])
-app.include_router(optimization.router, prefix="/api/optimization", tags=["optimization"])
-app.include_router(pairs_trading.router, prefix="/api/pairs-trading", tags=["pairs-trading"])
-app.include_router(debug.router, prefix="/debug", tags=["debug"])
+startup.hold_api_routes(app)
 
 @app.on_event("startup")
 async def startup_event():
     logger.info("PSO+Zscore Trading API starting up", version="1.0.0")
+    # Schema setup, heavy imports and background services; /health/ready turns 200 when done
+    await startup.start(app)
 
 @app.on_event("shutdown")
 async def shutdown_event():
     logger.info("PSO+Zscore Trading API shutting down")
+    await startup.stop()
+    flush_logging()
 
 @app.get("/")
 async def root():
@@ -74,10 +71,14 @@ async def root():
     }
 
 if __name__ == "__main__":
+    from app.shared_state import check_workers
+
+    check_workers(settings.WORKERS)
     uvicorn.run(
         "main:app",
         host="0.0.0.0",
         port=settings.PORT,
-        reload=settings.DEBUG,
+        workers=settings.WORKERS,
+        reload=settings.DEBUG and settings.WORKERS == 1,
         log_config=None  # Use structlog instead
-    )
\ No newline at end of file
+    )
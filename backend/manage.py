@@ -0,0 +1,118 @@
+"""Maintenance commands.
+
+    cd backend && python manage.py migrate
+    cd backend && python manage.py rebuild-metrics --chunk-size 5000
+    cd backend && python manage.py export trades trades.parquet
+    cd backend && python manage.py import trades trades.parquet --replace
+"""
+import argparse
+import os
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def alembic_config(url=None):
+    from alembic.config import Config
+
+    config = Config(os.path.join(BACKEND_DIR, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(BACKEND_DIR, "migrations"))
+    if url is not None:
+        config.set_main_option("sqlalchemy.url", url.replace("%", "%%"))
+    return config
+
+
+def migrate(args):
+    from alembic import command
+
+    command.upgrade(alembic_config(), args.revision)
+
+
+def rebuild_metrics(args):
+    from app.database import Base, engine
+    from app.trading.metrics import metrics_aggregator
+
+    Base.metadata.create_all(bind=engine)
+    started = time.perf_counter()
+    scanned = metrics_aggregator.rebuild(chunk_size=args.chunk_size)
+    elapsed = time.perf_counter() - started
+    totals = metrics_aggregator.metrics()
+    print(f"rebuilt metrics from {scanned} trades in {elapsed:.2f}s "
+          f"(last trade id {totals['last_trade_id']}, pnl {totals['current_pnl']:.2f}, "
+          f"win rate {totals['win_rate'] * 100:.1f}%)")
+
+
+def _snapshot_format(args):
+    return args.format or ("arrow" if args.path.endswith((".arrow", ".arrows")) else "parquet")
+
+
+def export_snapshot(args):
+    from app.database import SessionLocal
+    from app.snapshots import TABLES, export_table
+
+    db = SessionLocal()
+    try:
+        started = time.perf_counter()
+        rows = export_table(db, TABLES[args.table], args.path, _snapshot_format(args), args.batch_size)
+        elapsed = time.perf_counter() - started
+    finally:
+        db.close()
+    print(f"exported {rows} {args.table} rows to {args.path} in {elapsed:.2f}s "
+          f"({rows / elapsed if elapsed else 0:,.0f} rows/s)")
+
+
+def import_snapshot(args):
+    from app.database import Base, SessionLocal, engine
+    from app.snapshots import TABLES, import_table
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        started = time.perf_counter()
+        with open(args.path, "rb") as source:
+            rows = import_table(db, TABLES[args.table], source, _snapshot_format(args), args.batch_size,
+                                replace=args.replace)
+        elapsed = time.perf_counter() - started
+    finally:
+        db.close()
+    print(f"imported {rows} {args.table} rows from {args.path} in {elapsed:.2f}s "
+          f"({rows / elapsed if elapsed else 0:,.0f} rows/s)")
+    if args.table == "trades":
+        args.chunk_size = args.batch_size
+        rebuild_metrics(args)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    upgrade = commands.add_parser("migrate", help="upgrade the database schema with the Alembic migrations")
+    upgrade.add_argument("--revision", default="head")
+    upgrade.set_defaults(handler=migrate)
+
+    rebuild = commands.add_parser("rebuild-metrics", help="recompute performance metrics from the trades table")
+    rebuild.add_argument("--chunk-size", type=int, default=5000, help="trades read per query")
+    rebuild.set_defaults(handler=rebuild_metrics)
+
+    for name, handler, help_text in (("export", export_snapshot, "write a table snapshot as Parquet or Arrow IPC"),
+                                     ("import", import_snapshot, "seed an empty table from a snapshot")):
+        snapshot = commands.add_parser(name, help=help_text)
+        snapshot.add_argument("table", choices=["trades", "correlations", "optimization_runs"])
+        snapshot.add_argument("path")
+        snapshot.add_argument("--format", choices=["parquet", "arrow"],
+                              help="default: arrow for .arrow/.arrows files, parquet otherwise")
+        snapshot.add_argument("--batch-size", type=int, default=10_000, help="rows per record batch")
+        if name == "import":
+            snapshot.add_argument("--replace", action="store_true", help="delete the table's rows first")
+        snapshot.set_defaults(handler=handler)
+
+    args = parser.parse_args(argv)
+    try:
+        args.handler(args)
+    except (RuntimeError, ValueError) as e:
+        parser.exit(1, f"error: {e}\n")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
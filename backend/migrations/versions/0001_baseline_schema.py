@@ -0,0 +1,87 @@
+"""Baseline schema: strategies, optimization runs, trades and pair correlations
+
+Databases created by `Base.metadata.create_all` before migrations existed
+already have these tables; they are left as they are, so upgrading such a
+database is safe.
+
+Revision ID: 0001
+Revises:
+Create Date: 2024-06-01 00:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def _missing(table: str) -> bool:
+    return not sa.inspect(op.get_bind()).has_table(table)
+
+
+def upgrade():
+    if _missing("strategies"):
+        op.create_table(
+            "strategies",
+            sa.Column("id", sa.Integer, primary_key=True),
+            sa.Column("name", sa.String),
+            sa.Column("pine_script", sa.Text),
+            sa.Column("parameters", sa.JSON),
+            sa.Column("status", sa.String),
+            sa.Column("created_at", sa.DateTime),
+            sa.Column("updated_at", sa.DateTime),
+        )
+        op.create_index("ix_strategies_id", "strategies", ["id"])
+        op.create_index("ix_strategies_name", "strategies", ["name"], unique=True)
+    if _missing("optimization_runs"):
+        op.create_table(
+            "optimization_runs",
+            sa.Column("id", sa.Integer, primary_key=True),
+            sa.Column("strategy_id", sa.Integer),
+            sa.Column("algorithm", sa.String),
+            sa.Column("status", sa.String),
+            sa.Column("best_params", sa.JSON),
+            sa.Column("best_score", sa.Float),
+            sa.Column("iterations", sa.Integer),
+            sa.Column("created_at", sa.DateTime),
+            sa.Column("completed_at", sa.DateTime),
+        )
+        op.create_index("ix_optimization_runs_id", "optimization_runs", ["id"])
+        op.create_index("ix_optimization_runs_strategy_id", "optimization_runs", ["strategy_id"])
+    if _missing("trades"):
+        op.create_table(
+            "trades",
+            sa.Column("id", sa.Integer, primary_key=True),
+            sa.Column("strategy_id", sa.Integer),
+            sa.Column("symbol", sa.String),
+            sa.Column("side", sa.String),
+            sa.Column("quantity", sa.Float),
+            sa.Column("price", sa.Float),
+            sa.Column("capital_phase", sa.String),
+            sa.Column("is_live", sa.Boolean),
+            sa.Column("pnl", sa.Float),
+            sa.Column("executed_at", sa.DateTime),
+        )
+        op.create_index("ix_trades_id", "trades", ["id"])
+        op.create_index("ix_trades_strategy_id", "trades", ["strategy_id"])
+    if _missing("pair_correlations"):
+        op.create_table(
+            "pair_correlations",
+            sa.Column("id", sa.Integer, primary_key=True),
+            sa.Column("pair1", sa.String),
+            sa.Column("pair2", sa.String),
+            sa.Column("correlation", sa.Float),
+            sa.Column("zscore", sa.Float),
+            sa.Column("status", sa.String),
+            sa.Column("updated_at", sa.DateTime),
+        )
+        op.create_index("ix_pair_correlations_id", "pair_correlations", ["id"])
+        op.create_index("ix_pair_correlations_pair1", "pair_correlations", ["pair1"])
+        op.create_index("ix_pair_correlations_pair2", "pair_correlations", ["pair2"])
+
+
+def downgrade():
+    for table in ("pair_correlations", "trades", "optimization_runs", "strategies"):
+        op.drop_table(table)
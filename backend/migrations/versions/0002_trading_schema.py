@@ -0,0 +1,141 @@
+"""Optimization batches and telemetry, bars, tuned thresholds, universes and performance metrics
+
+Adds the columns and tables introduced since the baseline. Each step is
+skipped when `create_all` has already made it.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2024-09-01 00:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+NEW_COLUMNS = {
+    "optimization_runs": [
+        sa.Column("batch_id", sa.Integer),
+        sa.Column("symbol", sa.String),
+        sa.Column("timeframe", sa.String),
+        sa.Column("telemetry", sa.JSON),
+    ],
+    "pair_correlations": [
+        sa.Column("timeframe", sa.String),
+    ],
+}
+NEW_COLUMN_INDEXES = [
+    ("ix_optimization_runs_batch_id", "optimization_runs", "batch_id"),
+    ("ix_pair_correlations_timeframe", "pair_correlations", "timeframe"),
+]
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    for table, columns in NEW_COLUMNS.items():
+        existing = {column["name"] for column in inspector.get_columns(table)}
+        for column in columns:
+            if column.name not in existing:
+                op.add_column(table, column)
+    for name, table, column in NEW_COLUMN_INDEXES:
+        if name not in {index["name"] for index in inspector.get_indexes(table)}:
+            op.create_index(name, table, [column])
+
+    if not inspector.has_table("optimization_batches"):
+        op.create_table(
+            "optimization_batches",
+            sa.Column("id", sa.Integer, primary_key=True),
+            sa.Column("strategy_id", sa.Integer),
+            sa.Column("status", sa.String),
+            sa.Column("total_runs", sa.Integer),
+            sa.Column("completed_runs", sa.Integer),
+            sa.Column("failed_runs", sa.Integer),
+            sa.Column("created_at", sa.DateTime),
+            sa.Column("completed_at", sa.DateTime),
+        )
+        op.create_index("ix_optimization_batches_id", "optimization_batches", ["id"])
+        op.create_index("ix_optimization_batches_strategy_id", "optimization_batches", ["strategy_id"])
+    if not inspector.has_table("pareto_solutions"):
+        op.create_table(
+            "pareto_solutions",
+            sa.Column("id", sa.Integer, primary_key=True),
+            sa.Column("optimization_id", sa.Integer),
+            sa.Column("rank", sa.Integer),
+            sa.Column("params", sa.JSON),
+            sa.Column("objectives", sa.JSON),
+            sa.Column("created_at", sa.DateTime),
+        )
+        op.create_index("ix_pareto_solutions_id", "pareto_solutions", ["id"])
+        op.create_index("ix_pareto_solutions_optimization_id", "pareto_solutions", ["optimization_id"])
+    if not inspector.has_table("pair_thresholds"):
+        op.create_table(
+            "pair_thresholds",
+            sa.Column("id", sa.Integer, primary_key=True),
+            sa.Column("pair1", sa.String, nullable=False),
+            sa.Column("pair2", sa.String, nullable=False),
+            sa.Column("timeframe", sa.String, nullable=False),
+            sa.Column("entry_zscore", sa.Float),
+            sa.Column("exit_zscore", sa.Float),
+            sa.Column("lookback", sa.Integer),
+            sa.Column("objective", sa.String),
+            sa.Column("score", sa.Float),
+            sa.Column("sharpe", sa.Float),
+            sa.Column("trades", sa.Integer),
+            sa.Column("cluster", sa.Integer),
+            sa.Column("updated_at", sa.DateTime),
+            sa.UniqueConstraint("pair1", "pair2", "timeframe", name="uq_pair_thresholds_pair_timeframe"),
+        )
+        op.create_index("ix_pair_thresholds_id", "pair_thresholds", ["id"])
+    if not inspector.has_table("universes"):
+        op.create_table(
+            "universes",
+            sa.Column("id", sa.Integer, primary_key=True),
+            sa.Column("name", sa.String),
+            sa.Column("description", sa.Text),
+            sa.Column("symbols", sa.JSON),
+            sa.Column("timeframes", sa.JSON),
+            sa.Column("created_at", sa.DateTime),
+            sa.Column("updated_at", sa.DateTime),
+        )
+        op.create_index("ix_universes_id", "universes", ["id"])
+        op.create_index("ix_universes_name", "universes", ["name"], unique=True)
+    if not inspector.has_table("bars"):
+        op.create_table(
+            "bars",
+            sa.Column("id", sa.Integer, primary_key=True),
+            sa.Column("symbol", sa.String, nullable=False),
+            sa.Column("timeframe", sa.String, nullable=False),
+            sa.Column("open_time", sa.BigInteger, nullable=False),
+            sa.Column("open", sa.Float),
+            sa.Column("high", sa.Float),
+            sa.Column("low", sa.Float),
+            sa.Column("close", sa.Float),
+            sa.Column("volume", sa.Float),
+            sa.UniqueConstraint("symbol", "timeframe", "open_time", name="uq_bars_symbol_timeframe_open_time"),
+        )
+        op.create_index("ix_bars_id", "bars", ["id"])
+    if not inspector.has_table("performance_metrics"):
+        op.create_table(
+            "performance_metrics",
+            sa.Column("id", sa.Integer, primary_key=True),
+            sa.Column("scope", sa.String),
+            sa.Column("state", sa.JSON),
+            sa.Column("last_trade_id", sa.Integer),
+            sa.Column("updated_at", sa.DateTime),
+        )
+        op.create_index("ix_performance_metrics_id", "performance_metrics", ["id"])
+        op.create_index("ix_performance_metrics_scope", "performance_metrics", ["scope"], unique=True)
+
+
+def downgrade():
+    for table in ("performance_metrics", "bars", "universes", "pair_thresholds", "pareto_solutions",
+                  "optimization_batches"):
+        op.drop_table(table)
+    for name, table, _ in NEW_COLUMN_INDEXES:
+        op.drop_index(name, table_name=table)
+    for table, columns in NEW_COLUMNS.items():
+        with op.batch_alter_table(table) as batch:
+            for column in columns:
+                batch.drop_column(column.name)
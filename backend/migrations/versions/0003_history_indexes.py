@@ -0,0 +1,41 @@
+"""Composite indexes behind the keyset-paginated history listings
+
+Each listing pages newest first by (timestamp, id), optionally filtered by
+one equality column, so every filter gets a (column, timestamp, id) index
+and a page is a range scan rather than a sort of the whole table.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2024-10-01 00:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ("ix_trades_executed_at_id", "trades", ["executed_at", "id"]),
+    ("ix_trades_strategy_executed_at", "trades", ["strategy_id", "executed_at", "id"]),
+    ("ix_trades_symbol_executed_at", "trades", ["symbol", "executed_at", "id"]),
+    ("ix_optimization_runs_created_at_id", "optimization_runs", ["created_at", "id"]),
+    ("ix_optimization_runs_strategy_created_at", "optimization_runs", ["strategy_id", "created_at", "id"]),
+    ("ix_optimization_runs_status_created_at", "optimization_runs", ["status", "created_at", "id"]),
+    ("ix_pair_correlations_updated_at_id", "pair_correlations", ["updated_at", "id"]),
+    ("ix_pair_correlations_timeframe_updated_at", "pair_correlations", ["timeframe", "updated_at", "id"]),
+    ("ix_pair_correlations_status_updated_at", "pair_correlations", ["status", "updated_at", "id"]),
+]
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    for name, table, columns in INDEXES:
+        if name not in {index["name"] for index in inspector.get_indexes(table)}:
+            op.create_index(name, table, columns)
+
+
+def downgrade():
+    for name, table, _ in INDEXES:
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,35 @@
+"""Where each symbol's exchange history starts
+
+A backfill that finds no bars before a symbol's first one records that bar
+in bar_history, so later backfills treat the head of the range as covered
+instead of asking the exchange for it again. Skipped when `create_all` has
+already made the table.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2024-10-15 00:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if not sa.inspect(op.get_bind()).has_table("bar_history"):
+        op.create_table(
+            "bar_history",
+            sa.Column("id", sa.Integer, primary_key=True),
+            sa.Column("symbol", sa.String, nullable=False),
+            sa.Column("timeframe", sa.String, nullable=False),
+            sa.Column("first_open_time", sa.BigInteger, nullable=False),
+            sa.UniqueConstraint("symbol", "timeframe", name="uq_bar_history_symbol_timeframe"),
+        )
+        op.create_index("ix_bar_history_id", "bar_history", ["id"])
+
+
+def downgrade():
+    op.drop_table("bar_history")
@@ -0,0 +1,86 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+from app.admission import AdmissionController, client_key, estimate_cost, pair_count
+
+
+def test_cost_grows_with_pairs_bars_and_evaluations():
+    small = estimate_cost(pair_count(10), "4h", 30)
+    large = estimate_cost(pair_count(300), "4h", 30)
+    tuned = estimate_cost(pair_count(300), "4h", 30, evaluations=600)
+    assert small == 1.0  # 45 pairs x 180 bars is below one unit
+    assert large == pytest.approx(44850 * 180 / 100_000)
+    assert tuned == pytest.approx(large * 600)
+
+
+def test_client_over_its_rate_gets_429_with_retry_after():
+    async def main():
+        controller = AdmissionController(capacity=100, client_rate=1, client_burst=10, queue_size=4,
+                                         queue_timeout=1)
+        tickets = [await controller.admit("ip:a", 5) for _ in range(2)]
+        with pytest.raises(HTTPException) as error:
+            await controller.admit("ip:a", 5)
+        other = await controller.admit("ip:b", 5)  # other clients keep their own budget
+        return tickets, other, error.value
+
+    tickets, other, error = asyncio.run(main())
+    assert error.status_code == 429
+    assert int(error.headers["Retry-After"]) >= 1
+    assert other.cost == 5
+
+
+def test_over_capacity_queues_in_order_then_sheds():
+    async def main():
+        controller = AdmissionController(capacity=10, client_rate=1000, client_burst=1000, queue_size=1,
+                                         queue_timeout=0.2)
+        running = await controller.admit("ip:a", 500)  # clamped to the capacity, runs alone
+        saturated = controller.saturated
+        waiting = asyncio.create_task(controller.admit("ip:b", 4))
+        await asyncio.sleep(0)
+        with pytest.raises(HTTPException) as full:
+            await controller.admit("ip:c", 4)  # the queue holds one
+        running.release()
+        running.release()  # a second release is ignored
+        admitted = await waiting
+        in_flight = controller.in_flight
+        filler = await controller.admit("ip:a", 6)
+        with pytest.raises(HTTPException) as timed_out:
+            await controller.admit("ip:d", 8)
+        filler.release()
+        return saturated, full.value, admitted, in_flight, timed_out.value, controller.to_dict()
+
+    saturated, full, admitted, in_flight, timed_out, stats = asyncio.run(main())
+    assert saturated
+    assert full.status_code == 503 and timed_out.status_code == 503
+    assert admitted.cost == 4 and in_flight == 4
+    assert stats["shed"] == 2 and stats["queued"] == 0 and stats["in_flight"] == 4
+
+
+def test_clients_are_keyed_by_address_not_by_unchecked_headers():
+    def request(headers):
+        return Request({"type": "http", "headers": headers, "client": ("10.0.0.7", 5123)})
+
+    keys = {client_key(request([(b"x-api-key", f"made-up-{i}".encode())])) for i in range(3)}
+    keys.add(client_key(request([(b"authorization", b"Bearer anything")])))
+    assert keys == {"ip:10.0.0.7"}
+
+
+def test_background_reservations_wait_past_the_queue_timeout():
+    async def main():
+        controller = AdmissionController(capacity=10, client_rate=1000, client_burst=1000, queue_size=1,
+                                         queue_timeout=0.05)
+        first = await controller.reserve(6)
+        second = asyncio.create_task(controller.reserve(6))
+        await asyncio.sleep(0.2)  # well past the queue timeout, still waiting
+        waiting = not second.done()
+        first.release()
+        second = await second
+        second.release()
+        return waiting, second, controller.to_dict()
+
+    waiting, second, stats = asyncio.run(main())
+    assert waiting and second.waited
+    assert stats["in_flight"] == 0 and stats["shed"] == 0
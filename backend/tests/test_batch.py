@@ -0,0 +1,152 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import admission
+from app.database import Base, OptimizationRun, Strategy, get_db
+from app.engine import workers
+from app.engine.batch import group_by_dataset, run_grid
+from app.routers import optimization
+from tests.test_pine import SCRIPT, make_bars
+
+REQUEST = {"pine_script": SCRIPT, "iterations": 2, "parameters": None}
+
+
+def grid(symbols, timeframes, algorithms):
+    return [
+        {"id": i, "symbol": s, "timeframe": t, "algorithm": a}
+        for i, (s, t, a) in enumerate((s, t, a) for s in symbols for t in timeframes for a in algorithms)
+    ]
+
+
+def test_runs_are_grouped_by_dataset_in_request_order():
+    runs = grid(["BBB", "AAA"], ["4h", "1h"], ["pso", "genetic"])
+    groups = group_by_dataset(runs)
+    assert list(groups) == [("BBB", "4h"), ("BBB", "1h"), ("AAA", "4h"), ("AAA", "1h")]
+    assert [run["algorithm"] for run in groups[("AAA", "1h")]] == ["pso", "genetic"]
+    assert sum(map(len, groups.values())) == len(runs)
+
+
+def test_grid_loads_each_dataset_once_and_reports_every_run():
+    runs = grid(["AAA", "BBB", "MISSING"], ["1h"], ["pso", "genetic", "nope"])
+    loads, events = [], []
+
+    def load(symbol, timeframe):
+        loads.append((symbol, timeframe))
+        if symbol == "MISSING":
+            raise LookupError("no bars")
+        return make_bars(300)
+
+    async def on_start(run):
+        events.append(("start", run["id"]))
+
+    async def on_result(run, result):
+        assert set(result["best_params"]) == {"length", "oversold", "fast", "slow"}
+        events.append(("done", run["id"]))
+
+    async def on_error(run, error):
+        events.append(("error", run["id"]))
+
+    with ThreadPoolExecutor(1) as executor:
+        asyncio.run(run_grid(executor, 1, runs, REQUEST, load, on_result, on_error, on_start))
+
+    assert sorted(loads) == [("AAA", "1h"), ("BBB", "1h"), ("MISSING", "1h")]
+    outcome = {run_id: kind for kind, run_id in events if kind != "start"}
+    assert outcome == {0: "done", 1: "done", 2: "error", 3: "done", 4: "done", 5: "error",
+                       6: "error", 7: "error", 8: "error"}
+    # Only dispatched runs start, one at a time with a single worker, and never a run whose data failed to load
+    starts = [run_id for kind, run_id in events if kind == "start"]
+    assert starts == [0, 1, 2, 3, 4, 5]
+    for run_id in starts:
+        assert events.index(("start", run_id)) < events.index((outcome[run_id], run_id))
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'batch.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(bind=engine)
+    executor = ThreadPoolExecutor(1)
+    monkeypatch.setattr(optimization, "SessionLocal", factory)
+    monkeypatch.setattr(optimization, "get_worker_pool", lambda: executor)
+    monkeypatch.setattr(optimization, "worker_count", lambda: 1)
+    monkeypatch.setattr(optimization, "load_bars", lambda db, symbol, timeframe: make_bars(300))
+
+    def get_test_db():
+        db = factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app = FastAPI()
+    app.include_router(optimization.router, prefix="/api/optimization")
+    app.dependency_overrides[get_db] = get_test_db
+    yield TestClient(app)
+    executor.shutdown()
+    engine.dispose()
+
+
+def test_batch_endpoint_runs_the_grid_and_reports_progress(client, monkeypatch):
+    reserved = []
+
+    async def reserve_job(cost):
+        reserved.append(admission.jobs.in_flight)
+        return await admission.reserve_job(cost)
+
+    monkeypatch.setattr(optimization, "reserve_job", reserve_job)
+    body = {"name": "grid", "pine_script": SCRIPT, "symbols": ["AAA", "BBB", "AAA"], "timeframes": ["1h"],
+            "algorithms": ["pso", "genetic"], "iterations": 2}
+    started = client.post("/api/optimization/batch", json=body)
+    assert started.status_code == 200
+    assert started.json()["total_runs"] == 4
+
+    # TestClient runs the background task before returning, so the batch is done here
+    status = client.get(f"/api/optimization/batch/{started.json()['batch_id']}").json()
+    assert (status["status"], status["completed_runs"], status["failed_runs"]) == ("completed", 4, 0)
+    assert (status["queued_runs"], status["running_runs"], status["progress"]) == (0, 0, 1.0)
+    assert [(run["symbol"], run["algorithm"]) for run in status["runs"]] == [
+        ("AAA", "pso"), ("AAA", "genetic"), ("BBB", "pso"), ("BBB", "genetic")]
+    assert all(run["status"] == "completed" and run["best_params"] for run in status["runs"])
+    # Each sub-run reserved job capacity as it was dispatched, after the one before gave it back
+    assert reserved == [0, 0, 0, 0]
+    assert admission.jobs.in_flight == 0 and admission.admission.in_flight == 0
+
+
+def test_batch_endpoint_rejects_bad_grids(client):
+    body = {"name": "grid", "pine_script": SCRIPT, "symbols": ["AAA"]}
+    assert client.post("/api/optimization/batch", json=dict(body, algorithms=["nope"])).status_code == 400
+    assert client.post("/api/optimization/batch", json=dict(body, timeframes=["7x"])).status_code == 400
+    assert client.post("/api/optimization/batch", json=dict(body, symbols=[])).status_code == 400
+    assert client.post("/api/optimization/batch", json=dict(body, pine_script="plot(ta.vwap(close))")).status_code == 400
+    assert client.get("/api/optimization/batch/999").status_code == 404
+
+
+def test_start_rejects_an_unknown_timeframe_before_creating_records(client):
+    body = {"name": "single", "pine_script": SCRIPT, "timeframe": "7x", "iterations": 2}
+    for mode in ("single", "walk_forward"):
+        response = client.post("/api/optimization/start", json=dict(body, mode=mode))
+        assert response.status_code == 400 and "7x" in response.json()["detail"]
+    db = optimization.SessionLocal()
+    try:
+        assert db.query(Strategy).count() == 0 and db.query(OptimizationRun).count() == 0
+    finally:
+        db.close()
+
+
+def test_worker_processes_start_with_single_threaded_blas(monkeypatch):
+    for var in workers._THREAD_ENV_VARS:
+        monkeypatch.setenv(var, "")  # restored after the test
+        monkeypatch.delenv(var)
+    monkeypatch.setattr(workers.settings, "OPTIMIZATION_WORKERS", 1)
+    try:
+        pool = workers.get_worker_pool()
+        assert [pool.submit(os.getenv, var).result(timeout=60) for var in workers._THREAD_ENV_VARS] == ["1"] * 4
+    finally:
+        workers.shutdown_worker_pool()
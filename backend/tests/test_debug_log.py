@@ -0,0 +1,76 @@
+import asyncio
+
+from app.debug_log import MemoryLogBuffer, server_sent_events
+
+
+def entry(i, component=None, error_type=None):
+    return {"n": i, "component": component or f"c{i % 3}", "error_type": error_type or f"e{i % 2}"}
+
+
+def test_ring_buffer_keeps_the_newest_entries_and_bounded_indexes():
+    async def main():
+        buffer = MemoryLogBuffer(capacity=10)
+        for i in range(25):
+            await buffer.append(entry(i))
+        latest = await buffer.query(limit=100)
+        assert [e["n"] for e in latest] == list(range(15, 25))
+        assert [e["seq"] for e in latest] == list(range(16, 26))
+        assert sum(len(seqs) for seqs in buffer._indexes["component"].values()) == 10
+        assert [e["n"] for e in await buffer.query(limit=3)] == [22, 23, 24]
+        return buffer
+
+    buffer = asyncio.run(main())
+    assert asyncio.run(buffer.count()) == 10
+
+
+def test_filters_use_the_indexes_and_page_after_a_sequence():
+    async def main():
+        buffer = MemoryLogBuffer(capacity=50)
+        for i in range(60):
+            await buffer.append(entry(i))
+        component = await buffer.query(component="c1", limit=100)
+        both = await buffer.query(component="c1", error_type="e0", limit=100)
+        after = await buffer.query(component="c1", after=55, limit=100)
+        missing = await buffer.query(component="nope")
+        return component, both, after, missing
+
+    component, both, after, missing = asyncio.run(main())
+    assert [e["n"] for e in component] == [i for i in range(10, 60) if i % 3 == 1]
+    assert [e["n"] for e in both] == [i for i in range(10, 60) if i % 6 == 4]
+    assert [e["n"] for e in after] == [55, 58]
+    assert missing == []
+
+
+def test_clear_keeps_sequence_numbers_increasing():
+    async def main():
+        buffer = MemoryLogBuffer(capacity=5)
+        for i in range(3):
+            await buffer.append(entry(i))
+        assert await buffer.clear() == 3
+        assert await buffer.query() == [] and await buffer.count() == 0
+        appended = await buffer.append(entry(9))
+        return appended, await buffer.query(component="c0")
+
+    appended, found = asyncio.run(main())
+    assert appended["seq"] == 4 and [e["n"] for e in found] == [9]
+
+
+def test_tail_replays_after_a_sequence_then_follows_new_matching_entries():
+    async def main():
+        buffer = MemoryLogBuffer(capacity=100)
+        for i in range(5):
+            await buffer.append(entry(i, component="api" if i % 2 else "db"))
+        stream = server_sent_events(buffer.tail(component="api", after=2), heartbeat=0.05)
+        events = [await stream.__anext__()]  # seq 4 (n=3) from the backlog
+        await buffer.append(entry(5, component="db"))
+        await buffer.append(entry(6, component="api"))
+        events.append(await stream.__anext__())
+        events.append(await stream.__anext__())  # nothing new within the heartbeat
+        await stream.aclose()
+        return events, buffer._subscribers
+
+    events, subscribers = asyncio.run(main())
+    assert events[0].startswith("id: 4\nevent: log\n") and '"n": 3' in events[0]
+    assert events[1].startswith("id: 7\n") and '"n": 6' in events[1]
+    assert events[2].startswith(": keep-alive")
+    assert not subscribers
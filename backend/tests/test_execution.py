@@ -0,0 +1,157 @@
+import asyncio
+
+import httpx
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base, Trade
+from app.trading.execution import OrderGateway, PairExecutor, PairOrder, TradeWriter
+from app.trading.sim_exchange import MatchingEngine, create_sim_exchange
+
+PRICES = {"AAAUSDT": 100.0, "BBBUSDT": 20.0}
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'execution.db'}")
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine)
+
+
+def make_executor(session_factory, liquidity=None, reject=None, latency=0.0, lose=None, step_size=1e-8,
+                  tick_size=1e-8, **kwargs):
+    matching = MatchingEngine(prices=PRICES, liquidity=liquidity, step_size=step_size, tick_size=tick_size)
+    app = create_sim_exchange(matching, latency=latency, reject=reject)
+    transport = httpx.ASGITransport(app=app)
+    if lose is not None:
+        transport = LosingTransport(transport, lose)
+    gateway = OrderGateway("http://sim", transport=transport, lookup_retry_seconds=0.0)
+    return PairExecutor(gateway, TradeWriter(session_factory, batch_size=1000, flush_seconds=60), **kwargs)
+
+
+class LosingTransport(httpx.AsyncBaseTransport):
+    """Lets requests reach the exchange but times out reading the response for the given (method, symbol)s"""
+
+    def __init__(self, transport, lose):
+        self.transport = transport
+        self.lose = set(lose)
+
+    async def handle_async_request(self, request):
+        response = await self.transport.handle_async_request(request)
+        if (request.method, request.url.params.get("symbol")) in self.lose:
+            raise httpx.ReadTimeout("timed out", request=request)
+        return response
+
+
+def run(executor, *orders):
+    async def main():
+        results = [await executor.execute(order) for order in orders]
+        await executor.writer.flush()
+        await executor.gateway.close()
+        return results
+    return asyncio.run(main())
+
+
+def trades(session_factory):
+    db = session_factory()
+    try:
+        return [(t.symbol, t.side, round(t.quantity, 8)) for t in db.query(Trade).order_by(Trade.id).all()]
+    finally:
+        db.close()
+
+
+def test_both_legs_fill_and_trades_are_written_in_one_batch(session_factory):
+    executor = make_executor(session_factory)
+    orders = [PairOrder("AAAUSDT", "BBBUSDT", 1.0, -5.0, 100.0, 20.0, strategy_id=7) for _ in range(3)]
+    results = run(executor, *orders)
+    assert [r["status"] for r in results] == ["filled"] * 3
+    assert results[0]["fill_ratio"] == {"AAAUSDT": 1.0, "BBBUSDT": 1.0}
+    assert results[0]["legs"][0]["avg_price"] > 100.0 > results[0]["legs"][1]["avg_price"] * 5
+    assert trades(session_factory) == [("AAAUSDT", "buy", 1.0), ("BBBUSDT", "sell", 5.0)] * 3
+    assert executor.writer.stats()["batches"] == 1
+    stats = executor.stats()
+    assert stats["signal_to_submit"]["count"] == 3 and stats["outcomes"] == {"filled": 3}
+
+
+def test_thin_leg_is_chased_to_the_other_legs_fill(session_factory):
+    # BBB has 100 USDT per level, so the 20 bps IOC limit only reaches half of a 2000 USDT leg
+    executor = make_executor(session_factory, liquidity={"BBBUSDT": 0.02})
+    (result,) = run(executor, PairOrder("AAAUSDT", "BBBUSDT", 20.0, -100.0, 100.0, 20.0))
+    assert result["status"] == "filled"
+    bbb = [leg for leg in result["legs"] if leg["symbol"] == "BBBUSDT"]
+    assert bbb[0]["status"] == "PARTIALLY_FILLED" and len(bbb) == 2
+    assert result["fill_ratio"]["BBBUSDT"] == pytest.approx(1.0)
+
+
+def test_unfilled_excess_is_unwound_without_chasing(session_factory):
+    executor = make_executor(session_factory, liquidity={"BBBUSDT": 0.02}, chase_attempts=0)
+    (result,) = run(executor, PairOrder("AAAUSDT", "BBBUSDT", 20.0, -100.0, 100.0, 20.0))
+    assert result["status"] == "partial"
+    ratio = result["fill_ratio"]
+    assert ratio["AAAUSDT"] == pytest.approx(ratio["BBBUSDT"]) and 0 < ratio["BBBUSDT"] < 1
+    sides = [(symbol, side) for symbol, side, _ in trades(session_factory)]
+    assert sides == [("AAAUSDT", "buy"), ("AAAUSDT", "sell"), ("BBBUSDT", "sell")]
+
+
+def test_rejected_leg_unwinds_the_filled_one(session_factory):
+    executor = make_executor(session_factory, reject={"BBBUSDT"})
+    (result,) = run(executor, PairOrder("AAAUSDT", "BBBUSDT", 1.0, -5.0))
+    assert result["status"] == "unwound"
+    (bbb,) = [leg for leg in result["legs"] if leg["symbol"] == "BBBUSDT"]
+    assert bbb["status"] == "REJECTED" and "HTTP 400" in bbb["error"]
+    assert trades(session_factory) == [("AAAUSDT", "buy", 1.0), ("AAAUSDT", "sell", 1.0)]
+
+
+def test_legs_are_submitted_concurrently(session_factory):
+    executor = make_executor(session_factory, latency={"AAAUSDT": 0.05, "BBBUSDT": 0.05})
+    (result,) = run(executor, PairOrder("AAAUSDT", "BBBUSDT", 1.0, -5.0))
+    assert result["leg_skew_ms"] < 25
+    assert result["execution_ms"] < 95  # sequential legs would take at least 100 ms
+
+
+def test_writer_flushes_in_the_background(session_factory):
+    writer = TradeWriter(session_factory, batch_size=2, flush_seconds=60)
+    row = {"symbol": "AAAUSDT", "side": "buy", "quantity": 1.0, "price": 100.0, "is_live": False}
+
+    async def main():
+        writer.start()
+        writer.submit([row, row])
+        for _ in range(100):
+            if writer.rows_written:
+                break
+            await asyncio.sleep(0.01)
+        writer.submit([row])
+        await writer.stop()
+
+    asyncio.run(main())
+    assert writer.stats()["rows_written"] == 3 and writer.batches == 2
+
+
+def test_lost_order_response_is_looked_up_before_rebalancing(session_factory):
+    executor = make_executor(session_factory, lose={("POST", "AAAUSDT")})
+    (result,) = run(executor, PairOrder("AAAUSDT", "BBBUSDT", 1.0, -5.0, 100.0, 20.0))
+    # The AAA order executed although its response never arrived, so there is nothing to unwind
+    assert result["status"] == "filled"
+    aaa = result["legs"][0]
+    assert aaa["status"] == "FILLED" and "ReadTimeout" in aaa["error"] and aaa["client_order_id"]
+    assert trades(session_factory) == [("AAAUSDT", "buy", 1.0), ("BBBUSDT", "sell", 5.0)]
+
+
+def test_unknown_fill_stops_chasing_and_unwinding(session_factory):
+    executor = make_executor(session_factory, lose={("POST", "AAAUSDT"), ("GET", "AAAUSDT")})
+    (result,) = run(executor, PairOrder("AAAUSDT", "BBBUSDT", 1.0, -5.0, 100.0, 20.0))
+    assert result["status"] == "unknown"
+    assert [leg["status"] for leg in result["legs"]] == ["UNKNOWN", "FILLED"]
+    assert trades(session_factory) == [("BBBUSDT", "sell", 5.0)]
+
+
+def test_orders_are_rounded_to_the_symbol_filters(session_factory):
+    # Sized quantities, the chase for the thin leg and the slippage limits are all off-step;
+    # the exchange refuses such orders
+    executor = make_executor(session_factory, liquidity={"BBBUSDT": 0.02}, step_size=0.01, tick_size=0.01)
+    (result,) = run(executor, PairOrder("AAAUSDT", "BBBUSDT", 20.004, -100.005, 100.003, 20.003))
+    assert result["status"] == "filled"
+    assert all(leg["status"] != "REJECTED" for leg in result["legs"])
+    for _, _, quantity in trades(session_factory):
+        assert quantity == pytest.approx(round(quantity, 2))
@@ -0,0 +1,139 @@
+import asyncio
+import datetime
+
+import pytest
+from alembic import command
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base, OptimizationRun, Trade, get_db
+from app.routers import optimization
+from app.routers.trades import list_trades
+from manage import alembic_config
+
+START = datetime.datetime(2024, 1, 1)
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'history.db'}")
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(bind=engine)
+    db = factory()
+    # Several trades share a timestamp, so pages must break ties on id
+    db.add_all([
+        Trade(strategy_id=i % 3, symbol="AAA" if i % 2 else "BBB", side="buy", quantity=1.0, price=10.0,
+              executed_at=START + datetime.timedelta(minutes=i // 4))
+        for i in range(40)
+    ])
+    db.commit()
+    db.close()
+    return factory
+
+
+def pages(session_factory, limit, **filters):
+    db = session_factory()
+    try:
+        cursor, seen = None, []
+        while True:
+            page = asyncio.run(list_trades(cursor=cursor, limit=limit, db=db, **filters))
+            seen.append([trade["id"] for trade in page["items"]])
+            cursor = page["next_cursor"]
+            if cursor is None:
+                return seen
+    finally:
+        db.close()
+
+
+def test_keyset_pages_cover_every_trade_once_newest_first(session_factory):
+    seen = pages(session_factory, limit=7)
+    ids = [i for page in seen for i in page]
+    assert [len(page) for page in seen] == [7] * 5 + [5]
+    assert ids == sorted(range(1, 41), key=lambda i: ((i - 1) // 4, i), reverse=True)
+
+
+def test_filters_apply_before_paging(session_factory):
+    ids = [i for page in pages(session_factory, limit=3, strategy_id=1, symbol="AAA") for i in page]
+    assert ids and all((i - 1) % 3 == 1 and (i - 1) % 2 == 1 for i in ids)
+    window = [i for page in pages(session_factory, limit=50, since=START + datetime.timedelta(minutes=2),
+                                  until=START + datetime.timedelta(minutes=4)) for i in page]
+    assert sorted(window) == list(range(9, 17))
+
+
+def test_bad_cursor_and_limit_are_rejected(session_factory):
+    db = session_factory()
+    try:
+        for kwargs in ({"cursor": "not-a-cursor"}, {"limit": 0}, {"side": "hold"}):
+            with pytest.raises(HTTPException) as error:
+                asyncio.run(list_trades(db=db, **{"limit": 50, **kwargs}))
+            assert error.value.status_code == 400
+    finally:
+        db.close()
+
+
+def test_pages_are_index_range_scans(session_factory):
+    db = session_factory()
+    try:
+        plan = db.execute(text(
+            "EXPLAIN QUERY PLAN SELECT * FROM trades WHERE strategy_id = 1 AND (executed_at, id) < ('2024-01-01', 9) "
+            "ORDER BY executed_at DESC, id DESC LIMIT 51"
+        )).fetchall()
+    finally:
+        db.close()
+    detail = " ".join(row[-1] for row in plan)
+    assert "ix_trades_strategy_executed_at" in detail and "TEMP B-TREE" not in detail
+
+
+def test_migrations_upgrade_a_baseline_database_to_the_models(tmp_path):
+    url = f"sqlite:///{tmp_path / 'migrated.db'}"
+    config = alembic_config(url)
+    config.attributes["configure_logger"] = False
+    command.upgrade(config, "0001")
+    command.upgrade(config, "head")
+
+    migrated = inspect(create_engine(url))
+    for table in Base.metadata.sorted_tables:
+        assert {c["name"] for c in migrated.get_columns(table.name)} == set(table.columns.keys())
+        expected = {index.name for index in table.indexes}
+        assert expected <= {index["name"] for index in migrated.get_indexes(table.name)}
+
+    # A database made by create_all upgrades without recreating anything
+    created = f"sqlite:///{tmp_path / 'created.db'}"
+    Base.metadata.create_all(bind=create_engine(created))
+    config = alembic_config(created)
+    config.attributes["configure_logger"] = False
+    command.upgrade(config, "head")
+
+
+def test_legacy_listings_stay_lists_and_page_through_link_headers(session_factory):
+    db = session_factory()
+    db.add_all([OptimizationRun(symbol="AAA", timeframe="1h", algorithm="pso",
+                                created_at=START + datetime.timedelta(minutes=i // 2)) for i in range(7)])
+    db.commit()
+    db.close()
+
+    def get_test_db():
+        session = session_factory()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    app = FastAPI()
+    app.include_router(optimization.router, prefix="/api/optimization")
+    app.dependency_overrides[get_db] = get_test_db
+    client = TestClient(app)
+
+    response = client.get("/api/optimization/")
+    assert isinstance(response.json(), list) and len(response.json()) == 7
+    assert "link" not in response.headers
+    url, seen = "/api/optimization/?limit=3&symbol=AAA", []
+    while url:
+        response = client.get(url)
+        seen.append([run["optimization_id"] for run in response.json()])
+        url = response.links.get("next", {}).get("url")
+        if url:
+            assert "symbol=AAA" in url and response.headers["x-next-cursor"] in url
+    assert seen == [[7, 6, 5], [4, 3, 2], [1]]
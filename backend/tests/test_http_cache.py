@@ -0,0 +1,100 @@
+import datetime
+
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from app import http_cache
+from app.database import Base, OptimizationRun, PairCorrelation
+from app.http_cache import CompressionMiddleware, choose_encoding, conditional
+from app.table_versions import MemoryTableVersions, track_writes
+
+
+def test_committed_writes_bump_their_tables_and_rollbacks_do_not():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(bind=engine)
+    versions = MemoryTableVersions()
+    track_writes(factory, versions)
+    db = factory()
+    db.add(OptimizationRun(symbol="BTCUSDT", timeframe="1h", algorithm="pso"))
+    db.commit()
+    db.execute(insert(PairCorrelation), [{"pair1": "A", "pair2": "B", "timeframe": "1h",
+                                          "updated_at": datetime.datetime(2024, 1, 1)}])
+    db.commit()
+    db.query(PairCorrelation).update({"zscore": 2.0})
+    db.commit()
+    db.query(OptimizationRun).delete()
+    db.rollback()
+    db.commit()  # nothing written in this transaction
+    db.close()
+    assert versions._versions == {"optimization_runs": 1, "pair_correlations": 2}
+
+
+def test_conditional_get_answers_304_until_the_table_changes(monkeypatch):
+    versions = MemoryTableVersions()
+    monkeypatch.setattr(http_cache, "table_versions", versions)
+    calls = []
+    app = FastAPI()
+
+    @app.get("/rows", dependencies=[conditional("pair_correlations")])
+    async def rows():
+        calls.append(1)
+        return {"rows": list(range(10))}
+
+    client = TestClient(app)
+    first = client.get("/rows")
+    etag = first.headers["etag"]
+    again = client.get("/rows", headers={"If-None-Match": etag})
+    versions.bump(["optimization_runs"])  # another table
+    unrelated = client.get("/rows", headers={"If-None-Match": f'"other", {etag}'})
+    versions.bump(["pair_correlations"])
+    changed = client.get("/rows", headers={"If-None-Match": etag})
+    assert first.status_code == 200 and first.headers["cache-control"] == "no-cache"
+    assert (again.status_code, unrelated.status_code, changed.status_code) == (304, 304, 200)
+    assert again.content == b"" and again.headers["etag"] == etag
+    assert changed.headers["etag"] != etag
+    assert len(calls) == 2
+
+
+def compressing_app():
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=100)
+
+    @app.get("/big")
+    async def big():
+        return {"values": ["zscore"] * 500}
+
+    @app.get("/small")
+    async def small():
+        return {"ok": True}
+
+    @app.get("/stream")
+    async def stream():
+        return StreamingResponse(iter([b"data: 1\n\n"] * 200), media_type="text/event-stream")
+
+    return TestClient(app)
+
+
+def test_compression_follows_accept_encoding_and_skips_small_and_streamed_bodies():
+    client = compressing_app()
+    plain = client.get("/big", headers={"Accept-Encoding": "identity"})
+    gzipped = client.get("/big", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in plain.headers
+    assert gzipped.headers["content-encoding"] == "gzip" and gzipped.headers["vary"] == "Accept-Encoding"
+    assert gzipped.json() == plain.json()
+    assert int(gzipped.headers["content-length"]) < len(plain.content) // 10
+    assert "content-encoding" not in client.get("/small", headers={"Accept-Encoding": "gzip"}).headers
+    assert "content-encoding" not in client.get("/stream", headers={"Accept-Encoding": "gzip"}).headers
+    assert choose_encoding("gzip;q=0, br;q=0") is None
+
+
+def test_brotli_is_preferred_when_installed():
+    pytest.importorskip("brotli")
+    response = compressing_app().get("/big", headers={"Accept-Encoding": "gzip;q=0.5, br"})
+    assert response.headers["content-encoding"] == "br"
+    assert response.json() == {"values": ["zscore"] * 500}
+    assert choose_encoding("gzip, br") == "br"
@@ -0,0 +1,39 @@
+import numpy as np
+
+from app.engine.indicator_cache import IndicatorCache
+from app.engine.indicators import rsi
+
+
+def test_lru_eviction_respects_memory_bound():
+    cache = IndicatorCache(max_bytes=3 * 800)
+    for n in range(4):
+        cache.put(("ds", "sma", "close", n), np.zeros(100))
+    assert len(cache) == 3
+    assert cache.bytes_used <= cache.max_bytes
+    assert cache.get(("ds", "sma", "close", 0)) is None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_family_precompute_serves_later_lookups():
+    close = 100 + np.cumsum(np.random.default_rng(3).normal(size=400))
+    cache = IndicatorCache(max_bytes=10 * 1024 * 1024)
+    assert cache.precompute_family("ds", "rsi", "close", close, range(2, 51)) == 49
+    assert cache.precompute_family("ds", "rsi", "close", close, range(2, 51)) == 0
+
+    values, hit = cache.indicator("ds", "rsi", "close", close, 14)
+    assert hit
+    np.testing.assert_allclose(values, rsi(close, 14), equal_nan=True)
+    assert not values.flags.writeable
+    assert cache.stats()["hit_rate"] == 1.0
+
+
+def test_family_rows_own_their_memory():
+    close = 100 + np.cumsum(np.random.default_rng(3).normal(size=400))
+    cache = IndicatorCache(max_bytes=8 * close.nbytes)
+    cache.precompute_family("ds", "sma", "close", close, range(2, 6))
+    rows = [cache.get(("ds", "sma", "close", n)) for n in range(2, 6)]
+    assert all(row.base is None for row in rows)
+    # Evicting a row frees it even while its siblings stay cached
+    for n in range(10, 16):
+        cache.put(("ds", "ema", "close", n), np.zeros(400))
+    assert cache.bytes_used == sum(value.nbytes for value in cache._entries.values()) <= cache.max_bytes
@@ -0,0 +1,128 @@
+import io
+import json
+import logging
+
+import numpy as np
+import structlog
+
+from app.log_pipeline import BatchWriter, LogQueue, NonBlockingQueueHandler, QueueLogger, Sampler, processors
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def pipeline(name, sampler=None, queue_size=1000, batch_size=64):
+    log_queue = LogQueue(queue_size)
+    stdlib_logger = logging.getLogger(name)
+    stdlib_logger.handlers = [NonBlockingQueueHandler(log_queue)]
+    stdlib_logger.setLevel(logging.INFO)
+    stdlib_logger.propagate = False
+    stream = io.BytesIO()
+    writer = BatchWriter(log_queue, stream, batch_size)
+    logger = structlog.wrap_logger(QueueLogger(name, log_queue), processors=processors(sampler),
+                                   wrapper_class=structlog.make_filtering_bound_logger(logging.INFO))
+    return logger, stdlib_logger, log_queue, writer, stream
+
+
+def lines(stream):
+    return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+
+def test_events_are_serialized_by_the_writer_in_batches():
+    logger, stdlib_logger, _, writer, stream = pipeline("test.pipeline.batches", batch_size=64)
+    for i in range(150):
+        logger.info("Bar processed", symbol="BTCUSDT", i=i)
+    logger.debug("Below the level")
+    stdlib_logger.warning("plain %s record", "stdlib")
+    assert stream.getvalue() == b""  # nothing is written on the caller's thread
+    writer.start()
+    writer.stop()
+    events = lines(stream)
+    assert [e["i"] for e in events[:150]] == list(range(150))
+    assert events[0]["level"] == "info" and events[0]["logger"] == "test.pipeline.batches"
+    assert events[0]["timestamp"].endswith("Z")
+    assert events[-1] == {**events[-1], "event": "plain stdlib record", "level": "warning"}
+    assert writer.batches == 3 and writer.records == 151
+
+
+def test_sampling_and_rate_limits_drop_and_count_events():
+    clock = FakeClock()
+    sampler = Sampler(sampling={"Tick": 0.25}, rate_limits={"test.pipeline.sampling": 2}, clock=clock)
+    logger, _, _, writer, stream = pipeline("test.pipeline.sampling", sampler)
+    for i in range(5):
+        logger.info("Burst", i=i)  # only the bucket's two tokens pass
+    clock.now = 1.0
+    logger.info("After refill")
+    writer.start()
+    writer.stop()
+    events = lines(stream)
+    assert [e["event"] for e in events] == ["Burst", "Burst", "After refill"]
+    assert events[-1]["sampled_out"] == 3
+
+    ticks = Sampler(sampling={"Tick": 0.25})
+    kept = []
+    for i in range(12):
+        try:
+            kept.append(ticks(None, "info", {"event": "Tick", "i": i})["i"])
+        except structlog.DropEvent:
+            pass
+    assert kept == [0, 4, 8]
+
+
+def test_full_queue_drops_instead_of_blocking():
+    logger, _, log_queue, writer, stream = pipeline("test.pipeline.full", queue_size=10)
+    for i in range(25):
+        logger.info("Flood", i=i)
+    assert log_queue.dropped == 15
+    writer.start()
+    writer.stop()
+    assert [e["i"] for e in lines(stream)] == list(range(10))
+
+
+def test_stdlib_args_are_merged_on_the_calling_thread():
+    _, stdlib_logger, _, writer, stream = pipeline("test.pipeline.args")
+    pending = ["a"]
+    stdlib_logger.info("pending %s", pending)
+    pending.append("b")  # changed before the writer runs
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        stdlib_logger.exception("failed")
+    writer.start()
+    writer.stop()
+    first, second = lines(stream)
+    assert first["event"] == "pending ['a']"
+    assert second["event"] == "failed" and "ValueError: boom" in second["exception"]
+
+
+def test_flush_writes_queued_events_without_restarting_the_writer():
+    logger, _, _, writer, stream = pipeline("test.pipeline.flush", batch_size=4)
+    writer.start()
+    thread = writer._thread
+    for i in range(10):
+        logger.info("Queued", i=i)
+    assert writer.flush()
+    assert [e["i"] for e in lines(stream)] == list(range(10))
+    assert writer._thread is thread and thread.is_alive()
+    logger.info("After flush")
+    writer.stop()
+    assert lines(stream)[-1]["event"] == "After flush" and writer._thread is None
+
+
+def test_structlog_values_are_snapshotted_on_the_calling_thread():
+    logger, _, _, writer, stream = pipeline("test.pipeline.snapshot")
+    symbols, weights, prices = ["BTC"], {"BTC": 1.0}, np.array([1.0, 2.0])
+    logger.info("Rebalance", symbols=symbols, weights=weights, prices=prices)
+    # Changed before the writer runs; growing a dict mid-serialization used to fail the whole event
+    symbols.append("ETH")
+    weights["ETH"] = 0.5
+    prices[:] = 0
+    writer.start()
+    writer.stop()
+    (event,) = lines(stream)
+    assert event["symbols"] == ["BTC"] and event["weights"] == {"BTC": 1.0} and event["prices"] == [1.0, 2.0]
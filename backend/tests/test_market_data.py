@@ -0,0 +1,104 @@
+import asyncio
+
+import httpx
+import numpy as np
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.engine.data import timeframe_ms
+from app.market_data.bar_store import BarStore
+from app.market_data.client import MarketDataClient, ensure_history
+from app.market_data.rate_limit import TokenBucket
+from app.market_data.stub_exchange import create_stub_exchange
+from app.pairs.analysis import align_closes, pair_statistics
+
+HOUR = timeframe_ms("1h")
+START = 1_700_000_000_000 // HOUR * HOUR
+
+
+def make_client(**stub_kwargs) -> MarketDataClient:
+    transport = httpx.ASGITransport(app=create_stub_exchange(**stub_kwargs))
+    return MarketDataClient(base_url="http://stub", transport=transport)
+
+
+def make_store(tmp_path) -> BarStore:
+    engine = create_engine(f"sqlite:///{tmp_path / 'bars.db'}")
+    Base.metadata.create_all(bind=engine)
+    return BarStore(sessionmaker(bind=engine))
+
+
+def test_fetch_range_stitches_concurrent_pages():
+    async def run():
+        async with make_client() as client:
+            rows = await client.fetch_range("BTCUSDT", "1h", START, START + 2499 * HOUR)
+            return rows, client.requests
+
+    rows, requests = asyncio.run(run())
+    times = [row[0] for row in rows]
+    assert len(rows) == 2500
+    assert requests == 3
+    assert times == sorted(set(times))
+    assert times[0] == START and times[-1] == START + 2499 * HOUR
+
+
+def test_token_bucket_spaces_out_requests():
+    async def run():
+        bucket = TokenBucket(10, period=0.5)
+        started = asyncio.get_running_loop().time()
+        await asyncio.gather(*[bucket.acquire(5) for _ in range(4)])
+        return asyncio.get_running_loop().time() - started
+
+    # 20 weight against a 10-token bucket refilling at 20/s needs ~0.5 s
+    assert asyncio.run(run()) >= 0.45
+
+
+def test_backfill_writes_bars_and_skips_covered_history(tmp_path):
+    store = make_store(tmp_path)
+    end = START + 499 * HOUR
+
+    async def run():
+        async with make_client() as client:
+            first = await ensure_history(client, ["BTCUSDT", "ETHUSDT"], "1h", START, end, store)
+            second = await ensure_history(client, ["BTCUSDT", "ETHUSDT"], "1h", START, end, store)
+            return first, second
+
+    first, second = asyncio.run(run())
+    assert first == {"BTCUSDT": 500, "ETHUSDT": 500}
+    assert second == {}
+    assert store.coverage("BTCUSDT", "1h") == (START, end, 500)
+
+    times, prices = align_closes(store.closes(["BTCUSDT", "ETHUSDT"], "1h", START, end), ["BTCUSDT", "ETHUSDT"])
+    assert prices.shape == (500, 2)
+    stats = pair_statistics(prices)
+    assert -1.0 <= stats["correlation"][0, 1] <= 1.0
+    assert np.isfinite(stats["zscore"]).all()
+
+
+def test_backfill_fetches_only_missing_ranges_and_remembers_listings(tmp_path):
+    store = make_store(tmp_path)
+    listed = START + 300 * HOUR  # NEWUSDT has no bars before this
+    end = START + 499 * HOUR
+    store.upsert("BTCUSDT", "1h", [(START + i * HOUR, 1.0, 1.0, 1.0, 1.0, 1.0) for i in range(200, 400)])
+
+    async def run():
+        async with make_client(symbols=["BTCUSDT", "NEWUSDT"], listings={"NEWUSDT": listed}) as client:
+            first = await ensure_history(client, ["BTCUSDT", "NEWUSDT"], "1h", START, end, store)
+            requests = client.requests
+            second = await ensure_history(client, ["BTCUSDT", "NEWUSDT"], "1h", START, end, store)
+            return first, requests, second, client.requests - requests
+
+    first, requests, second, more_requests = asyncio.run(run())
+    # BTCUSDT: only the missing head and tail; NEWUSDT: everything, from its listing on
+    assert first == {"BTCUSDT": 200 + 100, "NEWUSDT": 200}
+    assert store.coverage("BTCUSDT", "1h") == (START, end, 500)
+    assert store.coverage("NEWUSDT", "1h") == (listed, end, 200)
+    assert store.history_start("NEWUSDT", "1h") == listed and store.history_start("BTCUSDT", "1h") is None
+    assert second == {} and more_requests == 0
+
+
+def test_align_closes_forward_fills_gaps():
+    rows = [("A", 1, 10.0), ("B", 1, 20.0), ("A", 2, 11.0), ("A", 3, 12.0), ("B", 3, 21.0), ("A", 0, 9.0)]
+    times, prices = align_closes(rows, ["A", "B"])
+    assert times.tolist() == [1, 2, 3]
+    assert prices.tolist() == [[10.0, 20.0], [11.0, 20.0], [12.0, 21.0]]
@@ -0,0 +1,136 @@
+import asyncio
+import datetime
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base, PerformanceMetrics, Trade
+from app.trading.execution import TradeWriter
+from app.trading.metrics import MetricsAggregator
+
+START = datetime.datetime(2024, 1, 1)
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'metrics.db'}")
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine)
+
+
+def fill(symbol, side, quantity, price, hours=0, is_live=False):
+    return {"symbol": symbol, "side": side, "quantity": quantity, "price": price, "is_live": is_live,
+            "executed_at": START + datetime.timedelta(hours=hours)}
+
+
+def round_trips():
+    # AAA: +20 then -10, BBB short: +15, AAA reversed through zero: -5; the live fill has its own book
+    return [
+        fill("AAA", "buy", 2.0, 100.0, 0), fill("AAA", "sell", 2.0, 110.0, 1),
+        fill("BBB", "sell", 3.0, 50.0, 2), fill("AAA", "buy", 1.0, 100.0, 3),
+        fill("AAA", "sell", 1.0, 90.0, 4), fill("BBB", "buy", 3.0, 45.0, 5),
+        fill("AAA", "buy", 1.0, 100.0, 30), fill("AAA", "sell", 2.0, 95.0, 31),
+        fill("AAA", "buy", 1.0, 87.0, 60, is_live=True),
+    ]
+
+
+def write(session_factory, metrics, batches):
+    writer = TradeWriter(session_factory, batch_size=1000, flush_seconds=60, metrics=metrics)
+
+    async def main():
+        for batch in batches:
+            writer.submit([dict(row) for row in batch])
+            await writer.flush()
+
+    asyncio.run(main())
+
+
+def test_realized_pnl_and_totals():
+    aggregator = MetricsAggregator(session_factory=None, initial_capital=1000.0)
+    rows = round_trips()[:8]
+    aggregator.fold(rows)
+    assert [row["pnl"] for row in rows] == [None, 20.0, None, None, -10.0, 15.0, None, -5.0]
+    assert aggregator.books["paper"] == {"AAA": [-1.0, 95.0]}
+    metrics = aggregator.metrics()
+    assert metrics["total_trades"] == 8 and metrics["closed_trades"] == 4
+    assert metrics["win_rate"] == 0.5
+    assert metrics["profit_factor"] == pytest.approx(35.0 / 15.0)
+    assert metrics["current_pnl"] == pytest.approx(20.0) and metrics["peak_equity"] == pytest.approx(1025.0)
+    assert metrics["current_drawdown"] == pytest.approx(5.0 / 1025.0)
+    assert metrics["max_drawdown"] == pytest.approx(10.0 / 1020.0)
+
+
+def test_incremental_writes_match_a_chunked_rebuild(session_factory):
+    rows = round_trips()
+    live = MetricsAggregator(session_factory, initial_capital=1000.0)
+    write(session_factory, live, [rows[:3], rows[3:4], rows[4:]])
+
+    rebuilt = MetricsAggregator(session_factory, initial_capital=1000.0)
+    assert rebuilt.rebuild(chunk_size=2) == len(rows)
+    for scope in ("all", "paper", "live"):
+        assert rebuilt.metrics(scope) == pytest.approx(live.metrics(scope))
+    assert live.metrics()["sharpe_ratio"] is not None
+    assert live.metrics("live")["total_trades"] == 1 and live.metrics("live")["closed_trades"] == 0
+
+    db = session_factory()
+    try:
+        stored = [t.pnl for t in db.query(Trade).order_by(Trade.id).all()]
+        saved = db.query(PerformanceMetrics).one()
+    finally:
+        db.close()
+    assert stored == [None, 20.0, None, None, -10.0, 15.0, None, -5.0, None]
+    assert saved.last_trade_id == len(rows)
+
+
+def test_load_catches_up_with_trades_written_elsewhere(session_factory):
+    rows = round_trips()
+    write(session_factory, MetricsAggregator(session_factory), [rows[:5]])
+    db = session_factory()
+    try:
+        db.add(Trade(**rows[5]))
+        db.commit()
+    finally:
+        db.close()
+
+    restarted = MetricsAggregator(session_factory)
+    assert restarted.load() == 1
+    assert restarted.metrics()["closed_trades"] == 3 and restarted.last_trade_id == 6
+    assert restarted.load() == 0
+
+
+def test_watermark_covers_trades_from_other_writers(session_factory):
+    aggregator = MetricsAggregator(session_factory)
+    write(session_factory, aggregator, [round_trips()[:2]])
+    db = session_factory()
+    try:
+        # Committed by another writer, e.g. a snapshot import, between two batches
+        db.add(Trade(**round_trips()[2]))
+        db.commit()
+        aggregator.insert_trades(db, round_trips()[3:6])
+    finally:
+        db.close()
+
+    rebuilt = MetricsAggregator(session_factory)
+    rebuilt.rebuild()
+    assert aggregator.last_trade_id == rebuilt.last_trade_id == 6
+    assert aggregator.metrics() == rebuilt.metrics() and aggregator.metrics()["closed_trades"] == 3
+
+
+def test_failed_commit_leaves_totals_untouched(session_factory, monkeypatch):
+    aggregator = MetricsAggregator(session_factory)
+    write(session_factory, aggregator, [round_trips()[:1]])
+    before = aggregator.state()
+    db = session_factory()
+
+    def fail():
+        raise RuntimeError("database is locked")
+
+    monkeypatch.setattr(db, "commit", fail)
+    try:
+        with pytest.raises(RuntimeError):
+            aggregator.insert_trades(db, [fill("AAA", "sell", 2.0, 110.0)])
+    finally:
+        db.close()
+    assert aggregator.state() == before and aggregator.last_trade_id == 1
+    assert MetricsAggregator(session_factory).load() == 0
@@ -0,0 +1,40 @@
+import numpy as np
+
+from app.pairs.analysis import pair_statistics
+from app.pairs.selection import (
+    cluster_symbols, nearest_neighbor_pairs, pair_recall, pairs_within_clusters, select_pairs
+)
+
+
+def sector_universe(bars, symbols, sectors, seed=0):
+    rng = np.random.default_rng(seed)
+    sector = rng.integers(0, sectors, symbols)
+    returns = (rng.normal(0, 0.01, (bars, 1)) * 0.5 + rng.normal(0, 0.01, (bars, sectors))[:, sector]
+               + rng.normal(0, 0.01, (bars, symbols)))
+    return 100 * np.exp(np.cumsum(returns, axis=0))
+
+
+def test_pairs_within_clusters_are_ordered_and_complete():
+    left, right = pairs_within_clusters(np.array([1, 0, 1, 2, 0, 1]))
+    assert sorted(zip(left.tolist(), right.tolist())) == [(0, 2), (0, 5), (1, 4), (2, 5)]
+    assert (left < right).all()
+
+
+def test_clustering_recovers_sectors_and_keeps_correlated_pairs():
+    prices = sector_universe(600, 60, sectors=4, seed=1)
+    correlation = pair_statistics(prices)["correlation"]
+    left, right = np.triu_indices(60, 1)
+    strong = correlation[left, right] >= 0.5
+    assert strong.any()
+
+    for method in ("hierarchical", "kmeans"):
+        labels = cluster_symbols(prices, method, clusters=4)
+        assert len(set(labels.tolist())) == 4
+        candidates = select_pairs(prices, method, clusters=4)
+        assert len(candidates[0]) < len(left) / 2
+        assert pair_recall(*candidates, left[strong], right[strong]) > 0.95
+
+    knn = nearest_neighbor_pairs(prices, neighbors=5)
+    assert (knn[0] < knn[1]).all() and len(set(zip(*knn))) == len(knn[0])
+    assert 60 * 5 / 2 <= len(knn[0]) <= 60 * 5
+    assert pair_recall(*select_pairs(prices, "all"), left[strong], right[strong]) == 1.0
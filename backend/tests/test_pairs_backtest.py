@@ -0,0 +1,76 @@
+import numpy as np
+
+from app.pairs.backtest import all_pairs, backtest_pairs, positions_from_zscore, rolling_spread
+
+
+def make_prices(bars=800, symbols=5, seed=3):
+    rng = np.random.default_rng(seed)
+    market = np.cumsum(rng.normal(0, 0.01, bars))
+    idio = np.cumsum(rng.normal(0, 0.004, (bars, symbols)), axis=0) * 0.3
+    noise = rng.normal(0, 0.006, (bars, symbols))
+    return 100 * np.exp(market[:, None] * rng.uniform(0.8, 1.2, symbols) + idio + noise)
+
+
+def reference_positions(z, entry, exit, stop=np.inf):
+    position, out = 0.0, []
+    for value in z:
+        if np.isnan(value):
+            position = 0.0
+        elif position == 0:
+            if entry < abs(value) < stop:
+                position = -np.sign(value)
+        elif abs(value) >= stop:
+            position = 0.0
+        elif position > 0:
+            position = -1.0 if entry < value < stop else (0.0 if value >= -exit else 1.0)
+        else:
+            position = 1.0 if -stop < value < -entry else (0.0 if value <= exit else -1.0)
+        out.append(position)
+    return np.array(out)
+
+
+def test_position_state_matches_a_bar_by_bar_state_machine():
+    rng = np.random.default_rng(0)
+    z = np.cumsum(rng.normal(0, 0.6, (6, 400)), axis=1) * 0.4
+    z[:, :10] = np.nan
+    entry = np.array([[1.0], [1.5], [2.0], [1.0], [0.8], [1.2]])
+    exit = np.array([[0.0], [0.5], [0.2], [0.9], [0.1], [0.0]])
+    stop = np.array([[np.inf], [3.0], [np.inf], [2.5], [np.inf], [1.8]])
+    positions = positions_from_zscore(z, entry, exit, stop)
+    for row in range(len(z)):
+        expected = reference_positions(z[row], entry[row, 0], exit[row, 0], stop[row, 0])
+        np.testing.assert_array_equal(positions[row], expected)
+
+
+def test_rolling_spread_matches_windowed_ols():
+    prices = make_prices()
+    logs = np.log(prices.T)
+    spread = rolling_spread(logs, np.array([0]), np.array([1]), np.array([50]))
+    x, y = logs[0, 200 - 49:201], logs[1, 200 - 49:201]
+    beta = np.cov(x, y)[0, 1] / np.var(y, ddof=1)
+    resid = (x - x.mean()) - beta * (y - y.mean())
+    assert np.isnan(spread["zscore"][0, 48]) and not np.isnan(spread["zscore"][0, 49])
+    np.testing.assert_allclose(spread["hedge_ratio"][0, 200], beta, rtol=1e-8)
+    np.testing.assert_allclose(spread["zscore"][0, 200], resid[-1] / resid.std(ddof=1), rtol=1e-6)
+
+
+def test_universe_backtest_is_consistent_across_chunks_and_costs(monkeypatch):
+    prices = make_prices(symbols=8)
+    left, right = all_pairs(8)
+    full = backtest_pairs(prices, left, right, lookback=60, entry=1.5, exit=0.3, fee=0.0, slippage=0.0)
+    assert len(full["sharpe"]) == 28
+    assert (full["trades"] > 0).all()
+
+    monkeypatch.setattr("app.pairs.backtest._CHUNK_ELEMENTS", 5 * len(prices))
+    chunked = backtest_pairs(prices, left, right, lookback=60, entry=1.5, exit=0.3, fee=0.0, slippage=0.0)
+    for key in full:
+        np.testing.assert_allclose(chunked[key], full[key])
+
+    costly = backtest_pairs(prices, left, right, lookback=60, entry=1.5, exit=0.3, fee=0.002, slippage=0.001)
+    assert (costly["total_return"] < full["total_return"]).all()
+
+    # Per-column parameters: the same pair with two lookbacks
+    mixed = backtest_pairs(prices, [0, 0], [1, 1], lookback=np.array([60, 120]), entry=1.5, exit=0.3,
+                           fee=0.0, slippage=0.0)
+    assert mixed["sharpe"][0] == full["sharpe"][0]
+    assert mixed["sharpe"][1] != full["sharpe"][0]
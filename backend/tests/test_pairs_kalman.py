@@ -0,0 +1,50 @@
+import numpy as np
+
+from app.market_data.events import BarClose
+from app.pairs.analysis import spread_statistics
+from app.pairs.backtest import all_pairs
+from app.pairs.engine import PairsSignalEngine
+from app.pairs.kalman import KalmanHedge, kalman_spread
+from tests.test_pairs_backtest import make_prices
+
+
+def test_kalman_tracks_a_drifting_hedge_ratio():
+    rng = np.random.default_rng(0)
+    y = np.cumsum(rng.normal(0, 0.01, 2000))
+    beta = np.linspace(0.5, 1.5, 2000)
+    x = beta * y + 0.02 + rng.normal(0, 0.002, 2000)
+    spread = kalman_spread(np.vstack([x, y]), [0], [1])
+    assert np.abs(spread["hedge_ratio"][0, 500:] - beta[500:]).mean() < 0.15
+    zscore = spread["zscore"][0]
+    assert np.isnan(zscore[:30]).all() and not np.isnan(zscore[30:]).any()
+    assert 0.7 < zscore[30:].std() < 1.3
+
+
+def test_incremental_updates_match_the_batch_run():
+    log_prices = np.log(make_prices(symbols=5).T)
+    left, right = all_pairs(5)
+    batch = kalman_spread(log_prices, left, right)
+
+    # Continue a filter across two halves of the history, then bar by bar
+    live = KalmanHedge(len(left))
+    head = kalman_spread(log_prices[:, :400], left, right, filter=live)
+    step = None
+    for t in range(400, log_prices.shape[1]):
+        step = live.update(log_prices[left, t], log_prices[right, t])
+    np.testing.assert_allclose(head["zscore"], batch["zscore"][:, :400])
+    np.testing.assert_allclose(step["zscore"], batch["zscore"][:, -1])
+    np.testing.assert_allclose(live.hedge_ratio, batch["hedge_ratio"][:, -1])
+
+
+def test_engine_and_analysis_share_the_kalman_spread():
+    prices = make_prices(bars=300, symbols=3)
+    engine = PairsSignalEngine(["A", "B", "C"], "1m", window=100, spread_method="kalman")
+    snapshot = None
+    for t, row in enumerate(prices):
+        for symbol, close in zip("ABC", row):
+            snapshot = engine.on_bar(BarClose(symbol, "1m", t, 0, 0, 0, float(close), 0)) or snapshot
+    # The filter runs over every bar even though the engine window holds only 100
+    stats = spread_statistics(prices, "kalman")
+    np.testing.assert_allclose(snapshot.zscore, stats["zscore"][engine._pairs])
+    np.testing.assert_allclose(snapshot.hedge_ratio, stats["hedge_ratio"][engine._pairs])
+    assert engine.stats()["spread_method"] == "kalman"
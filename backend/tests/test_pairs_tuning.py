@@ -0,0 +1,83 @@
+import asyncio
+
+import numpy as np
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base, PairCorrelation, PairThreshold
+from app.engine.optimizers import BatchedSwarmOptimizer
+from app.pairs.backtest import all_pairs, backtest_pairs, latest_spread
+from app.pairs.tuning import cluster_pairs, load_thresholds, save_thresholds, tune_pairs
+from app.routers.pairs_trading import get_arbitrage_opportunities
+from tests.test_pairs_backtest import make_prices
+
+
+def test_batched_swarms_converge_to_their_own_optimum():
+    targets = np.array([[0.2, 0.8], [0.7, 0.3], [0.5, 0.5]])
+    swarm = BatchedSwarmOptimizer(np.zeros(2), np.ones(2), swarms=3, population=15, seed=1)
+    for _ in range(60):
+        positions = swarm.ask()
+        swarm.tell(-((positions - targets[:, None, :]) ** 2).sum(axis=2))
+    np.testing.assert_allclose(swarm.best_position, targets, atol=1e-2)
+    assert swarm.best_score.shape == (3,)
+
+
+def test_tuning_beats_default_thresholds_and_clusters_share_parameters():
+    prices = make_prices(symbols=4)
+    left, right = all_pairs(4)
+    default = backtest_pairs(prices, left, right, lookback=100, entry=2.0, exit=0.5)
+    tuned = tune_pairs(prices, left, right, iterations=15, particles=12, seed=0)
+    assert (tuned["exit"] < tuned["entry"]).all()
+    assert (tuned["lookback"] % 5 == 0).all()
+    assert tuned["metrics"]["sharpe"].mean() > default["sharpe"].mean()
+    assert tuned["evaluations"] == 15 * 12 * len(left)
+
+    groups = cluster_pairs(np.linspace(0.1, 0.9, len(left)), 2)
+    assert sorted(set(groups.tolist())) == [0, 1]
+    clustered = tune_pairs(prices, left, right, groups=groups, iterations=5, particles=8, seed=0)
+    for key in ("entry", "exit", "lookback"):
+        for group in (0, 1):
+            assert len(set(clustered[key][groups == group].tolist())) == 1
+
+
+def test_thresholds_round_trip_and_drive_the_latest_zscore(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'thresholds.db'}")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    prices = make_prices(symbols=3)
+    left, right = all_pairs(3)
+    symbols = ["AAA", "BBB", "CCC"]
+    result = tune_pairs(prices, left, right, iterations=3, particles=4, seed=0)
+    assert save_thresholds(db, symbols, left, right, "1h", result, "sharpe") == 3
+    # Saving again updates in place rather than duplicating rows
+    save_thresholds(db, symbols, left, right, "1h", result, "sharpe")
+    saved = load_thresholds(db, "1h")
+    assert len(saved) == 3 and load_thresholds(db, "4h") == {}
+    row = saved[("AAA", "CCC")]
+    assert row.lookback == int(result["lookback"][1])
+    assert row.entry_zscore == round(float(result["entry"][1]), 4)
+
+    # The live z-score for tuned pairs is the backtester's final z-score
+    spread = latest_spread(prices, left, right, result["lookback"])
+    np.testing.assert_allclose(spread["zscore"], result["metrics"]["zscore"], rtol=1e-6)
+    db.close()
+
+
+def test_opportunities_apply_tuned_thresholds_before_the_limit(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'opportunities.db'}")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    # 250 untuned pairs rank above the tuned one but stay below the default entry z-score
+    db.add_all([PairCorrelation(pair1=f"A{i:03d}", pair2="BBB", timeframe="1h", correlation=0.9, zscore=1.5,
+                                status="neutral") for i in range(250)])
+    db.add_all([
+        PairCorrelation(pair1="TUN", pair2="ED", timeframe="1h", correlation=0.9, zscore=-1.2, status="long_pair1"),
+        PairCorrelation(pair1="BIG", pair2="ONE", timeframe="1h", correlation=0.9, zscore=2.5, status="long_pair2"),
+        PairThreshold(pair1="TUN", pair2="ED", timeframe="1h", entry_zscore=1.0),
+    ])
+    db.commit()
+    try:
+        found = asyncio.run(get_arbitrage_opportunities(min_zscore=2.0, min_correlation=0.5, timeframe="1h", db=db))
+    finally:
+        db.close()
+    assert [(o["pair1"], o["entry_zscore"], o["tuned"]) for o in found] == [("BIG", 2.0, False), ("TUN", 1.0, True)]
@@ -0,0 +1,67 @@
+import numpy as np
+
+from app.database import ParetoSolution
+from app.engine.backtest import OBJECTIVE_DIRECTIONS
+from app.engine.pareto import MultiObjectiveSwarm, ParetoArchive, crowding_distance, non_dominated
+from app.routers import optimization
+from tests.test_batch import client  # noqa: F401 - the optimization router on a scratch database
+from tests.test_pine import SCRIPT
+
+
+def test_non_dominated_mask():
+    points = np.array([[1.0, 1.0], [2.0, 0.5], [0.5, 0.5], [1.0, 1.0]])
+    assert non_dominated(points).tolist() == [True, True, False, True]
+
+
+def test_archive_keeps_only_the_front_within_capacity():
+    rng = np.random.default_rng(0)
+    archive = ParetoArchive(dims=2, objectives=2, capacity=10)
+    for _ in range(20):
+        angles = rng.random(50) * np.pi / 2
+        radius = rng.random(50)
+        objectives = np.column_stack([np.cos(angles), np.sin(angles)]) * radius[:, None]
+        archive.update(rng.random((50, 2)), objectives)
+    assert 0 < len(archive) <= 10
+    assert non_dominated(archive.objectives).all()
+    # Extremes of the front survive crowding truncation
+    assert np.isinf(crowding_distance(archive.objectives)).sum() >= 2
+
+
+def test_multi_objective_run_stores_and_serves_a_deduplicated_front(client, monkeypatch):
+    front_of = MultiObjectiveSwarm.front
+
+    def nudged_front(swarm):
+        # Each archived position again, moved halfway to its rounded value: it decodes to the same ints
+        positions, objectives = front_of(swarm)
+        nudged = (positions + np.round(positions)) / 2
+        return np.vstack([positions, nudged]), np.vstack([objectives, objectives])
+
+    monkeypatch.setattr(MultiObjectiveSwarm, "front", nudged_front)
+    objectives = ["sharpe", "max_drawdown", "trades"]
+    started = client.post("/api/optimization/start", json={
+        "name": "front", "pine_script": SCRIPT, "mode": "multi_objective", "objectives": objectives,
+        "iterations": 3,
+    })
+    assert started.status_code == 200
+    optimization_id = int(started.json()["optimization_id"])
+
+    # TestClient runs the background task before returning
+    response = client.get(f"/api/optimization/{optimization_id}/pareto")
+    assert response.status_code == 200
+    body = response.json()
+    assert body["status"] == "completed" and body["objectives"] == objectives
+    front = body["front"]
+    assert front and [point["rank"] for point in front] == list(range(len(front)))
+    params = [tuple(sorted(point["params"].items())) for point in front]
+    assert len(set(params)) == len(params)
+    assert all(isinstance(point["params"]["length"], int) for point in front)
+    # Stored as one row per point, mutually non-dominated once oriented for maximization
+    directions = np.array([OBJECTIVE_DIRECTIONS[o] for o in objectives])
+    oriented = np.array([[point["objectives"][o] for o in objectives] for point in front]) * directions
+    assert non_dominated(oriented).all()
+    db = optimization.SessionLocal()
+    try:
+        assert db.query(ParetoSolution).filter(ParetoSolution.optimization_id == optimization_id).count() == len(front)
+    finally:
+        db.close()
+    assert client.get("/api/optimization/999/pareto").status_code == 404
@@ -0,0 +1,101 @@
+import numpy as np
+import pytest
+
+from app.engine.backtest import evaluate_positions
+from app.engine.data import BarData
+from app.engine.indicators import FAMILIES, INDICATORS, rsi, sma
+from app.engine.pine import PineScriptError, compile_pine, get_compiled_strategy
+
+SCRIPT = """
+//@version=5
+strategy("RSI Cross", overlay=true, commission_type=strategy.commission.percent, commission_value=0.1)
+length = input.int(14, "RSI Length", minval=2, maxval=50)
+oversold = input.int(30, "Oversold", minval=5, maxval=45)
+fast = input(10, title="Fast MA")
+slow = input.int(30, "Slow MA", minval=20, maxval=100)
+r = ta.rsi(close, length)
+fastMA = ta.sma(close, fast)
+slowMA = ta.ema(close, slow)
+if ta.crossover(fastMA, slowMA) and r > oversold
+    strategy.entry("Long", strategy.long)
+if ta.crossunder(fastMA, slowMA)
+    strategy.close("Long")
+plot(r)
+"""
+
+
+def make_bars(n=500, seed=1):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    return BarData("TEST:1h", np.arange(n), close, close * 1.01, close * 0.99, close, np.ones(n))
+
+
+def test_inputs_become_typed_parameter_space():
+    plan = compile_pine(SCRIPT)
+    space = plan.parameter_space
+    assert space.names == ["length", "oversold", "fast", "slow"]
+    length = space.specs[0]
+    assert (length.type, length.default, length.min, length.max) == ("int", 14, 2, 50)
+    # Unbounded inputs get a range around their default
+    assert space.specs[2].min < 10 < space.specs[2].max
+    assert plan.commission == pytest.approx(0.001)
+
+
+def test_batched_run_matches_individual_runs():
+    plan = compile_pine(SCRIPT)
+    bars = make_bars()
+    params = {"length": [14, 7], "oversold": [30, 20], "fast": [10, 5], "slow": [30, 50]}
+    batched = plan.run(bars, params)
+    assert batched.shape == (2, len(bars))
+    for i in range(2):
+        single = plan.run(bars, {k: v[i] for k, v in params.items()})
+        np.testing.assert_array_equal(batched[i], single[0])
+    assert set(np.unique(batched)) <= {0.0, 1.0}
+
+
+def test_plan_cache_is_keyed_by_script_hash():
+    assert get_compiled_strategy(SCRIPT) is get_compiled_strategy(SCRIPT + "\n\n")
+
+
+def test_unsupported_syntax_is_rejected():
+    with pytest.raises(PineScriptError):
+        compile_pine(SCRIPT + "x := 1\n")
+    with pytest.raises(PineScriptError):
+        compile_pine("length = input(14)\nplot(ta.vwap(close))\n")
+
+
+def test_indicators_match_reference():
+    values = np.arange(1.0, 21.0)
+    assert sma(values, 5)[4] == pytest.approx(3.0)
+    assert np.isnan(sma(values, 5)[3])
+    # Monotonic rises have no losses, so RSI saturates at 100
+    assert rsi(values, 14)[-1] == pytest.approx(100.0)
+
+
+def test_nested_indicators_start_after_the_inner_warm_up():
+    close = make_bars(200).close
+    inner = rsi(close, 14)
+    for name in ("sma", "ema", "rma", "rsi"):
+        nested = INDICATORS[name](inner, 5)
+        assert np.isnan(nested[:14 + 4]).all() and not np.isnan(nested[14 + 5:]).any(), name
+        np.testing.assert_allclose(FAMILIES[name](inner, np.array([5]))[0], nested)
+    np.testing.assert_allclose(sma(inner, 5)[20:], sma(inner[14:], 5)[6:])
+
+    script = """
+length = input.int(14, "RSI Length")
+signal = ta.sma(ta.rsi(close, length), 5)
+smooth = ta.ema(ta.rsi(close, length), 9)
+if ta.crossover(signal, smooth)
+    strategy.entry("Long", strategy.long)
+if ta.crossunder(signal, smooth)
+    strategy.close("Long")
+"""
+    positions = compile_pine(script).run(make_bars(200), {"length": [14]})
+    assert positions.sum() > 0
+
+
+def test_positions_pay_commission_on_turnover():
+    close = np.array([100.0, 110.0, 121.0])
+    metrics = evaluate_positions(np.array([[1.0, 1.0, 0.0]]), close, commission=0.01)
+    assert metrics["trades"][0] == 1
+    assert metrics["total_return"][0] == pytest.approx((1 - 0.01) * 1.1 * (1.1 - 0.01) - 1)
@@ -0,0 +1,121 @@
+import numpy as np
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.config import settings
+from app.database import Base, Trade
+from app.trading.risk import (
+    Candidates, RiskEngine, RiskModel, book_notional, capital_phase, net_quantities, phase_limits
+)
+
+SYMBOLS = ["AAA", "BBB", "CCC", "DDD"]
+
+
+def make_model(volatility=0.01, correlation=0.6):
+    n = len(SYMBOLS)
+    corr = np.full((n, n), correlation)
+    np.fill_diagonal(corr, 1.0)
+    covariance = corr * volatility ** 2
+    return RiskModel(SYMBOLS, covariance, last_prices=np.array([100.0, 50.0, 20.0, 10.0]))
+
+
+def candidates(*pairs):
+    left = np.array([p[0] for p in pairs])
+    right = np.array([p[1] for p in pairs])
+    return Candidates(left, right, np.array([p[2] for p in pairs], dtype=float),
+                      np.ones(len(pairs)), np.arange(len(pairs), 0, -1, dtype=float))
+
+
+def test_capital_phase_bands():
+    assert capital_phase(50) == "micro"
+    assert capital_phase(settings.MICRO_CAPITAL_MAX - 1) == "micro"
+    assert capital_phase(settings.MICRO_CAPITAL_MAX) == "small"
+    assert capital_phase(settings.MEDIUM_CAPITAL_MAX * 10) == "full"
+    assert phase_limits("full").to_dict()["max_capital"] is None
+
+
+def test_unconstrained_trade_risks_the_phase_budget():
+    model = make_model(volatility=0.05)
+    result = RiskEngine(model, stop_sigmas=2.0).evaluate(candidates((0, 1, 1.0)), np.zeros(4), 50_000)
+    decision = result["decisions"][0]
+    assert result["capital_phase"] == "medium" and decision["scale"] == 1.0
+    loss_at_stop = decision["requested_notional"] * decision["spread_volatility"] * 2.0
+    expected = settings.MAX_RISK_PER_TRADE * phase_limits("medium").risk_scale * 50_000
+    np.testing.assert_allclose(loss_at_stop, expected)
+    assert decision["notional"]["AAA"] > 0 > decision["notional"]["BBB"]
+
+
+def test_limits_scale_trades_down_and_hold_after_the_batch():
+    model = make_model(volatility=0.003, correlation=0.3)
+    batch = candidates((0, 1, 1.0), (0, 2, 1.0), (3, 1, -1.0), (2, 3, 1.0))
+    result = RiskEngine(model).evaluate(batch, np.zeros(4), 20_000)
+    limits = phase_limits(result["capital_phase"])
+    after = result["after"]
+    assert any(d["limited_by"] for d in result["decisions"])
+    assert max(abs(v) for v in after["exposure"].values()) <= limits.max_asset_exposure * 20_000 + 1e-6
+    assert after["gross_exposure"] <= limits.max_gross_leverage * 20_000 + 1e-6
+    assert abs(after["net_exposure"]) <= limits.max_net_exposure * 20_000 + 1e-6
+    assert after["risk"] <= limits.max_portfolio_risk * 20_000 + 1e-6
+
+
+def test_incremental_risk_matches_the_full_quadratic_form():
+    rng = np.random.default_rng(5)
+    prices = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, (500, 4)), axis=0))
+    model = RiskModel.from_prices(SYMBOLS, prices)
+    book = np.array([300.0, -200.0, 0.0, 50.0])
+    engine = RiskEngine(model)
+    result = engine.evaluate(candidates((0, 1, 1.0), (2, 3, -1.0), (1, 3, 1.0)), book, 5_000)
+    position = book.copy()
+    for decision in result["decisions"]:
+        for symbol, notional in decision["notional"].items():
+            position[model.index[symbol]] += notional
+    np.testing.assert_allclose(result["after"]["risk"], np.sqrt(position @ model.covariance @ position))
+    assert result["after"]["diversification_ratio"] >= 1.0
+
+
+def test_portfolio_risk_limit_binds_for_volatile_assets():
+    model = make_model(volatility=0.2, correlation=0.0)
+    # A tight stop sizes the trade at 2.5x the phase's portfolio risk budget
+    result = RiskEngine(model, stop_sigmas=0.2).evaluate(candidates((0, 1, 1.0)), np.zeros(4), 50_000)
+    decision = result["decisions"][0]
+    assert decision["limited_by"] == "portfolio_risk"
+    np.testing.assert_allclose(result["after"]["risk"], phase_limits("medium").max_portfolio_risk * 50_000)
+
+
+def test_trades_reducing_an_oversized_book_are_allowed():
+    model = make_model()
+    book = np.array([20_000.0, 0.0, 0.0, 0.0])
+    result = RiskEngine(model).evaluate(candidates((1, 0, 1.0), (2, 0, 1.0)), book, 5_000)
+    first = result["decisions"][0]
+    assert first["accepted"] and first["notional"]["AAA"] < 0
+    assert result["after"]["gross_exposure"] <= result["before"]["gross_exposure"]
+
+
+def test_max_pairs_and_minimum_capital():
+    model = make_model(volatility=0.05)
+    batch = candidates((0, 1, 1.0), (2, 3, 1.0), (0, 3, -1.0))
+    result = RiskEngine(model).evaluate(batch, np.zeros(4), 500)
+    assert result["accepted"] == phase_limits("micro").max_pairs
+    assert result["decisions"][2]["limited_by"] == "max_pairs"
+    broke = RiskEngine(model).evaluate(batch, np.zeros(4), settings.MICRO_CAPITAL_MIN / 2)
+    assert broke["accepted"] == 0
+
+
+def test_book_from_trades(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'risk.db'}")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    try:
+        db.add_all([
+            Trade(symbol="AAA", side="buy", quantity=3.0, price=90.0, is_live=True),
+            Trade(symbol="AAA", side="sell", quantity=1.0, price=95.0, is_live=True),
+            Trade(symbol="BBB", side="sell", quantity=4.0, price=50.0, is_live=False),
+            Trade(symbol="ZZZ", side="buy", quantity=1.0, price=1.0, is_live=True),
+        ])
+        db.commit()
+        assert net_quantities(db, is_live=True) == {"AAA": 2.0, "ZZZ": 1.0}
+        notional, unmodelled = book_notional(make_model(), net_quantities(db))
+    finally:
+        db.close()
+    np.testing.assert_allclose(notional, [200.0, -200.0, 0.0, 0.0])
+    assert unmodelled == ["ZZZ"]
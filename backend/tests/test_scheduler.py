@@ -0,0 +1,167 @@
+import asyncio
+
+import numpy as np
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base, PairCorrelation
+from app.pairs.correlations import refresh_correlations
+from app.scheduler import BarCloseScheduler
+
+HOUR = 3600
+
+
+class FakeClock:
+    def __init__(self, now: float):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+    async def sleep(self, seconds: float):
+        self.now += seconds
+        await asyncio.sleep(0)
+
+
+def make_scheduler(clock, **kwargs):
+    return BarCloseScheduler(clock=clock, sleep=clock.sleep, seed=1, **kwargs)
+
+
+def test_runs_on_start_then_after_each_close_with_settle_and_jitter():
+    clock = FakeClock(100 * HOUR + 600)
+    scheduler = make_scheduler(clock, settle_seconds=3.0, jitter_seconds=5.0)
+    runs = []
+
+    async def main():
+        done = asyncio.Event()
+
+        async def job(close):
+            runs.append((close, clock.now))
+            if len(runs) == 4:
+                done.set()
+
+        scheduler.add_job("refresh", "1h", job)
+        scheduler.start()
+        await asyncio.wait_for(done.wait(), 5)
+        await scheduler.stop()
+
+    asyncio.run(main())
+    # Catch-up for the latest close right away, then one run per close
+    assert runs[0] == (100 * HOUR * 1000, 100 * HOUR + 600)
+    for k, (close, ran_at) in enumerate(runs[1:], start=1):
+        assert close == (100 + k) * HOUR * 1000
+        assert 3.0 <= ran_at - close / 1000 <= 8.0
+    metrics = scheduler.stats()["jobs"]["refresh"]
+    assert metrics["runs"] == len(runs) and metrics["missed"] == 0
+    assert 3000 <= metrics["max_lag_ms"] <= 600_000
+
+
+def test_overrunning_job_catches_up_once_and_counts_missed_closes():
+    clock = FakeClock(100 * HOUR + 10)
+    scheduler = make_scheduler(clock, settle_seconds=0.0, jitter_seconds=0.0)
+    closes = []
+
+    async def main():
+        done = asyncio.Event()
+
+        async def job(close):
+            closes.append(close)
+            if len(closes) == 1:
+                clock.now += 2.5 * HOUR
+            if len(closes) == 2:
+                done.set()
+
+        scheduler.add_job("slow", "1h", job)
+        scheduler.start()
+        await asyncio.wait_for(done.wait(), 5)
+        await scheduler.stop()
+
+    asyncio.run(main())
+    assert closes[:2] == [100 * HOUR * 1000, 102 * HOUR * 1000]
+    metrics = scheduler.stats()["jobs"]["slow"]
+    assert metrics["missed"] == 1
+    assert metrics["max_duration_ms"] == 2.5 * HOUR * 1000
+
+
+def test_overlapping_trigger_is_skipped():
+    clock = FakeClock(100 * HOUR)
+    scheduler = make_scheduler(clock)
+
+    async def main():
+        release = asyncio.Event()
+
+        async def job(close):
+            await release.wait()
+
+        scheduler.add_job("refresh", "1h", job)
+        first = asyncio.create_task(scheduler.run_now("refresh"))
+        await asyncio.sleep(0)
+        second = await scheduler.run_now("refresh")
+        release.set()
+        return await first, second
+
+    assert asyncio.run(main()) == (True, False)
+    metrics = scheduler.stats()["jobs"]["refresh"]
+    assert metrics["runs"] == 1 and metrics["skipped"] == 1
+
+
+def test_concurrency_is_capped():
+    clock = FakeClock(100 * HOUR)
+    scheduler = make_scheduler(clock, max_concurrency=2)
+    active, peak = 0, 0
+
+    async def job(close):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        for _ in range(5):
+            await asyncio.sleep(0)
+        active -= 1
+
+    for timeframe in ("1m", "5m", "15m", "1h", "4h"):
+        scheduler.add_job(timeframe, timeframe, job)
+
+    async def main():
+        scheduler.start()
+        await asyncio.gather(*[scheduler.run_now(name) for name in scheduler.jobs()])
+        await scheduler.stop()
+
+    asyncio.run(main())
+    assert peak == 2
+
+
+def test_failures_are_recorded_and_the_job_keeps_running():
+    clock = FakeClock(100 * HOUR)
+    scheduler = make_scheduler(clock)
+
+    async def job(close):
+        raise RuntimeError("exchange down")
+
+    scheduler.add_job("refresh", "1h", job)
+    assert asyncio.run(scheduler.run_now("refresh"))
+    metrics = scheduler.stats()["jobs"]["refresh"]
+    assert metrics["failures"] == 1 and metrics["runs"] == 1
+    assert metrics["last_error"] == "exchange down"
+
+
+def test_refresh_correlations_upserts_per_timeframe(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'refresh.db'}")
+    Base.metadata.create_all(bind=engine)
+    session_factory = sessionmaker(bind=engine)
+    rng = np.random.default_rng(3)
+    prices = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, (300, 4)), axis=0))
+    symbols = ["AAA", "BBB", "CCC", "DDD"]
+
+    first = refresh_correlations(session_factory, symbols, "1h", prices)
+    refresh_correlations(session_factory, symbols, "1h", prices[::-1].copy())
+    refresh_correlations(session_factory, symbols, "4h", prices)
+    assert first["pairs"] == 6 and first["tuned_pairs"] == 0
+
+    db = session_factory()
+    try:
+        rows = db.query(PairCorrelation).all()
+        assert len(rows) == 12
+        assert sorted({row.timeframe for row in rows}) == ["1h", "4h"]
+        assert all(row.pair1 < row.pair2 for row in rows)
+    finally:
+        db.close()
@@ -0,0 +1,51 @@
+import asyncio
+
+import pytest
+
+from app.shared_state import Leadership, MemorySharedState, check_workers
+
+
+def test_memory_state_keys_expire_and_counters_add_up():
+    async def main():
+        state = MemorySharedState()
+        await state.set("progress", {"done": 3, "total": 10})
+        await state.set("short", 1, ttl=0.01)
+        first = await state.incr("runs")
+        second = await state.incr("runs", 5)
+        await asyncio.sleep(0.02)
+        return await state.get("progress"), await state.get("short", "gone"), first, second
+
+    assert asyncio.run(main()) == ({"done": 3, "total": 10}, "gone", 1, 6)
+
+
+def test_one_leader_at_a_time_and_handover_on_stop():
+    events = []
+
+    def leader(name, state):
+        async def elected():
+            events.append(("elected", name))
+
+        async def lost():
+            events.append(("lost", name))
+        return Leadership(state, ttl=5), elected, lost
+
+    async def main():
+        state = MemorySharedState()
+        first, first_elected, first_lost = leader("first", state)
+        second, second_elected, second_lost = leader("second", state)
+        await first.start(first_elected, first_lost)
+        await second.start(second_elected, second_lost)
+        leaders = (first.is_leader, second.is_leader)
+        await first.stop()
+        await second.campaign()
+        return leaders, second.is_leader
+
+    assert asyncio.run(main()) == ((True, False), True)
+    assert events == [("elected", "first"), ("lost", "first"), ("elected", "second")]
+
+
+def test_multiple_workers_need_a_shared_backend():
+    check_workers(1, "memory")
+    check_workers(4, "redis")
+    with pytest.raises(ValueError):
+        check_workers(4, "memory")
@@ -0,0 +1,121 @@
+import datetime
+import io
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base, OptimizationRun, Trade
+from app.routers import snapshots
+from app.snapshots import export_table, import_table, iter_batches, stream_export
+
+pytest.importorskip("pyarrow")
+
+START = datetime.datetime(2024, 1, 1)
+
+
+def make_factory(path):
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine)
+
+
+@pytest.fixture
+def source(tmp_path):
+    factory = make_factory(tmp_path / "source.db")
+    db = factory()
+    db.add_all([
+        Trade(strategy_id=i % 4, symbol=f"S{i % 7}", side="buy" if i % 2 else "sell", quantity=i / 10,
+              price=100.0 + i, pnl=None if i % 3 else float(i), is_live=bool(i % 5 == 0),
+              executed_at=START + datetime.timedelta(minutes=i))
+        for i in range(1, 251)
+    ])
+    db.add(OptimizationRun(strategy_id=1, algorithm="pso", status="completed", best_params={"length": 14},
+                           telemetry={"evaluations": 10, "timings": [0.1, 0.2]}, created_at=START))
+    db.commit()
+    db.close()
+    return factory
+
+
+def rows(factory, model):
+    db = factory()
+    try:
+        return [{c.name: getattr(r, c.name) for c in model.__table__.columns}
+                for r in db.query(model).order_by(model.id).all()]
+    finally:
+        db.close()
+
+
+@pytest.mark.parametrize("fmt", ["parquet", "arrow"])
+def test_round_trip_preserves_rows_and_ids(source, tmp_path, fmt):
+    target = make_factory(tmp_path / "target.db")
+    for model in (Trade, OptimizationRun):
+        buffer = io.BytesIO()
+        db = source()
+        try:
+            assert export_table(db, model, buffer, fmt, batch_size=64) == len(rows(source, model))
+        finally:
+            db.close()
+        buffer.seek(0)
+        db = target()
+        try:
+            import_table(db, model, buffer, fmt, batch_size=50)
+        finally:
+            db.close()
+        assert rows(target, model) == rows(source, model)
+
+
+def test_export_reads_in_batches(source):
+    db = source()
+    try:
+        sizes = [batch.num_rows for batch in iter_batches(db, Trade, batch_size=100)]
+        window = sum(batch.num_rows for batch in iter_batches(
+            db, Trade, since=START + datetime.timedelta(minutes=10), until=START + datetime.timedelta(minutes=20)))
+    finally:
+        db.close()
+    assert sizes == [100, 100, 50] and window == 10
+
+
+def test_streamed_export_is_a_valid_parquet_file(source):
+    import pyarrow.parquet as pq
+
+    chunks = list(stream_export(source, Trade, "parquet", batch_size=100))
+    assert len(chunks) == 4  # one per batch, then the footer
+    table = pq.read_table(io.BytesIO(b"".join(chunks)))
+    assert table.num_rows == 250 and pq.ParquetFile(io.BytesIO(b"".join(chunks))).num_row_groups == 3
+
+
+def test_import_refuses_a_non_empty_table_unless_replacing(source, tmp_path):
+    buffer = io.BytesIO()
+    db = source()
+    try:
+        export_table(db, Trade, buffer, "arrow")
+        buffer.seek(0)
+        with pytest.raises(ValueError, match="not empty"):
+            import_table(db, Trade, buffer, "arrow")
+        buffer.seek(0)
+        assert import_table(db, Trade, buffer, "arrow", replace=True) == 250
+    finally:
+        db.close()
+
+
+def test_http_import_is_disabled_by_default_and_never_replaces(source, monkeypatch):
+    buffer = io.BytesIO()
+    db = source()
+    try:
+        export_table(db, Trade, buffer, "arrow")
+    finally:
+        db.close()
+    monkeypatch.setattr(snapshots, "SessionLocal", source)
+    app = FastAPI()
+    app.include_router(snapshots.router, prefix="/api/snapshots")
+    client = TestClient(app)
+
+    assert client.post("/api/snapshots/trades?format=arrow", content=buffer.getvalue()).status_code == 403
+    monkeypatch.setattr(snapshots.settings, "SNAPSHOT_IMPORT_ENABLED", True)
+    # replace is not a parameter of the route: the populated table is left alone
+    response = client.post("/api/snapshots/trades?format=arrow&replace=true", content=buffer.getvalue())
+    assert response.status_code == 400 and "not empty" in response.json()["detail"]
+    assert len(rows(source, Trade)) == 250
@@ -0,0 +1,68 @@
+import asyncio
+import os
+import subprocess
+import sys
+
+import pytest
+from fastapi import APIRouter, FastAPI
+from fastapi.testclient import TestClient
+
+from app import startup
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_importing_main_leaves_heavy_modules_and_schema_for_warm_up(tmp_path):
+    database = tmp_path / "cold.db"
+    probe = ("import sys, main; from app import startup; "
+             "print([m for m in ('numpy', 'scipy', 'psutil', 'sqlalchemy', 'app.routers.optimization') "
+             "if m in sys.modules]); "
+             "print([r.path for r in main.app.routes "
+             "if r.path.startswith('/api') and r.name != startup.UNAVAILABLE_ROUTE])")
+    env = dict(os.environ, DEBUG="false", DATABASE_URL=f"sqlite:///{database}", PYTHONPATH=BACKEND_DIR)
+    result = subprocess.run([sys.executable, "-c", probe], cwd=BACKEND_DIR, env=env,
+                            capture_output=True, text=True, check=True)
+    assert result.stdout.splitlines()[-2:] == ["[]", "[]"]
+    assert not database.exists()
+
+
+def test_warm_up_records_failure_and_keeps_api_unmounted(monkeypatch):
+    monkeypatch.setattr(startup.settings, "SCHEMA_SETUP", "bogus")
+    monkeypatch.setattr(startup.settings, "BACKGROUND_WARM_UP", True)
+    monkeypatch.setattr(startup, "state", startup.StartupState())
+    app = FastAPI()
+    startup.hold_api_routes(app)
+    asyncio.run(startup.warm_up(app))
+    assert not startup.state.ready
+    assert "SCHEMA_SETUP" in startup.state.error
+    assert all(route.name == startup.UNAVAILABLE_ROUTE for route in app.routes if route.path.startswith("/api"))
+    failed = TestClient(app).get("/api/optimization/")
+    assert failed.status_code == 503 and "retry-after" not in failed.headers
+    with pytest.raises(ValueError):
+        startup.setup_schema("bogus")
+
+
+def test_api_answers_503_until_the_routers_are_mounted(monkeypatch):
+    router = APIRouter()
+
+    @router.get("/ping")
+    async def ping():
+        return {"pong": True}
+
+    async def elected(**callbacks):
+        pass
+
+    monkeypatch.setattr(startup.settings, "SCHEMA_SETUP", "none")
+    monkeypatch.setattr(startup, "state", startup.StartupState())
+    monkeypatch.setattr(startup, "import_routers", lambda: [(router, "/api/demo", "demo")])
+    monkeypatch.setattr(startup.leadership, "start", elected)
+    app = FastAPI()
+    startup.hold_api_routes(app)
+    client = TestClient(app)
+
+    warming = client.post("/api/demo/ping")
+    assert warming.status_code == 503 and warming.headers["retry-after"] == "5"
+    assert client.get("/debug/logs").status_code == 503
+    asyncio.run(startup.warm_up(app))
+    assert client.get("/api/demo/ping").json() == {"pong": True}
+    assert client.get("/api/unknown").status_code == 404
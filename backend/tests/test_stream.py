@@ -0,0 +1,106 @@
+import asyncio
+import json
+
+import numpy as np
+import websockets
+
+from app.engine.data import timeframe_ms
+from app.market_data.events import BarClose, EventBus
+from app.market_data.replay_server import ReplayExchange
+from app.market_data.ring_buffer import BarRingBuffer
+from app.market_data.stream import KlineStreamService
+from app.pairs.engine import PairsSignalEngine
+from tests.test_market_data import make_client, make_store
+
+SYMBOLS = ["BTCUSDT", "ETHUSDT", "SOLUSDT"]
+
+
+def test_ring_buffer_keeps_the_latest_bars_in_order():
+    buffer = BarRingBuffer(4)
+    for t in range(6):
+        buffer.append((t, 1.0, 1.0, 1.0, float(t), 1.0))
+    assert len(buffer) == 4
+    assert buffer.last_open_time == 5
+    assert buffer.closes().tolist() == [2.0, 3.0, 4.0, 5.0]
+    assert buffer.array(2)[:, 0].tolist() == [4.0, 5.0]
+
+
+def test_engine_completes_bars_and_forward_fills_missing_symbols():
+    engine = PairsSignalEngine(["A", "B"], "1m", window=10, min_bars=3)
+    snapshots = []
+    for t in range(5):
+        snapshots.append(engine.on_bar(BarClose("A", "1m", t, 0, 0, 0, 100.0 + t, 0)))
+        if t != 3:  # B misses bar 3 and carries its previous close
+            snapshots.append(engine.on_bar(BarClose("B", "1m", t, 0, 0, 0, 50.0 + t * t, 0)))
+    completed = [s for s in snapshots if s is not None]
+    assert [s.open_time for s in completed] == [2, 4]  # bar 3 completes when bar 4 does
+    assert engine.prices()[:, 1].tolist() == [50.0, 51.0, 54.0, 54.0, 66.0]
+    assert completed[-1].records()[0]["pair1"] == "A"
+
+
+def test_stream_service_reconnects_and_backfills_gaps(tmp_path):
+    step = timeframe_ms("1m")
+    store = make_store(tmp_path)
+    bus = EventBus()
+
+    async def run():
+        exchange = ReplayExchange(SYMBOLS, "1m", start=1_700_000_000_000, bar_seconds=0.02, drop_every=10)
+        async with exchange.serve(port=0) as server:
+            port = server.sockets[0].getsockname()[1]
+            async with make_client() as client:
+                service = KlineStreamService(SYMBOLS, "1m", ws_url=f"ws://127.0.0.1:{port}", client=client,
+                                             store=store, bus=bus, flush_seconds=0.1, warmup_bars=20)
+                engine = PairsSignalEngine(SYMBOLS, "1m", window=100, min_bars=10)
+                queue = bus.subscribe()
+                consumer = asyncio.create_task(engine.run(queue))
+                await service.start()
+                await asyncio.sleep(1.5)
+                await service.stop()
+                consumer.cancel()
+                await asyncio.gather(consumer, return_exceptions=True)
+        return service, engine
+
+    service, engine = asyncio.run(run())
+    assert service.reconnects >= 1
+    assert service.bars_backfilled > 0
+    for symbol in SYMBOLS:
+        times = service.buffers[symbol].array()[:, 0]
+        assert np.all(np.diff(times) == step)
+        first, last, count = store.coverage(symbol, "1m")
+        assert count == len(times) and last == times[-1]
+    assert service.bars_flushed == service.bars_received
+    assert engine.evaluations > 0
+    streams = service.stats()["streams"]
+    assert set(streams) == {f"{s.lower()}@kline_1m" for s in SYMBOLS}
+    assert all(m["lag_ms_max"] >= 0 for m in streams.values())
+
+
+def test_bad_frames_are_counted_and_the_connection_keeps_going(tmp_path):
+    kline = {"t": 1_700_000_000_000, "o": "1", "h": "2", "l": "0.5", "c": "1.5", "v": "10", "x": True}
+    frames = [
+        "not json",
+        json.dumps({"stream": "btcusdt@kline_1m", "data": {"e": "kline", "s": "BTCUSDT"}}),  # no "k"
+        json.dumps({"stream": "btcusdt@kline_1m", "data": {"e": "kline", "s": "BTCUSDT", "k": kline}}),
+    ]
+
+    async def handler(websocket):
+        for frame in frames:
+            await websocket.send(frame)
+        await websocket.wait_closed()
+
+    async def run():
+        async with websockets.serve(handler, "127.0.0.1", 0) as server:
+            port = server.sockets[0].getsockname()[1]
+            service = KlineStreamService(["BTCUSDT"], "1m", ws_url=f"ws://127.0.0.1:{port}",
+                                         store=make_store(tmp_path), bus=EventBus(), flush_seconds=60)
+            await service.start()
+            for _ in range(100):
+                if service.bars_received:
+                    break
+                await asyncio.sleep(0.02)
+            await service.stop()
+        return service
+
+    service = asyncio.run(run())
+    assert (service.messages_failed, service.bars_received, service.reconnects) == (2, 1, 0)
+    assert service.stats()["messages_failed"] == 2
@@ -0,0 +1,50 @@
+import numpy as np
+
+from app.pairs.analysis import align_closes
+from app.pairs.universe import UniverseCache, UniverseMatrix
+from tests.test_market_data import HOUR, START, make_store
+
+SYMBOLS = ["AAA", "BBB", "CCC"]
+
+
+def write_bars(store, first, count, skip=()):
+    rng = np.random.default_rng(first)
+    for k, symbol in enumerate(SYMBOLS):
+        rows = [
+            (START + t * HOUR, 1, 1, 1, 100.0 + k + t + rng.random(), 1)
+            for t in range(first, first + count)
+            if (symbol, t) not in skip
+        ]
+        store.upsert(symbol, "1h", rows)
+
+
+def test_incremental_refresh_matches_a_full_alignment(tmp_path):
+    store = make_store(tmp_path)
+    write_bars(store, 0, 50, skip={("BBB", 20)})
+    matrix = UniverseMatrix(SYMBOLS, "1h", window_bars=60, store=store)
+    end = START + 200 * HOUR
+    matrix.refresh(end=START + 49 * HOUR)
+    first = matrix.snapshot
+    assert first.prices.shape == (50, 3) and not first.prices.flags.writeable
+
+    # New bars, a gap for one symbol, and a rewrite of the last bar already held
+    write_bars(store, 49, 30, skip={("CCC", 60), ("CCC", 61)})
+    assert matrix.refresh(end=end) == 30
+    snapshot = matrix.snapshot
+    times, prices = align_closes(store.closes(SYMBOLS, "1h", START, end), SYMBOLS)
+    np.testing.assert_array_equal(snapshot.times, times[-60:])
+    np.testing.assert_array_equal(snapshot.prices, prices[-60:])
+    np.testing.assert_allclose(snapshot.log_returns, np.diff(np.log(prices[-60:]), axis=0))
+    assert snapshot.version == first.version + 1
+    assert snapshot.covers(START + 20 * HOUR) and not snapshot.covers(START)
+    assert len(snapshot.since(START + 70 * HOUR)) == 9
+    assert matrix.refresh(end=end) == 1  # only the last bar is re-read
+
+
+def test_cache_rebuilds_matrices_when_symbols_change(tmp_path):
+    cache = UniverseCache(window_bars=10, store=make_store(tmp_path))
+    matrix = cache.matrix(1, SYMBOLS, "1h")
+    assert cache.matrix(1, SYMBOLS, "1h") is matrix
+    assert cache.matrix(1, SYMBOLS[:2], "1h") is not matrix
+    cache.drop(1)
+    assert cache.stats() == []
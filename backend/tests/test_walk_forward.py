@@ -0,0 +1,51 @@
+import numpy as np
+
+from app.engine.backtest import position_returns
+from app.engine.data import SharedBars
+from app.engine.pine import get_compiled_strategy
+from app.engine.walk_forward import make_windows, optimize_window
+from tests.test_pine import SCRIPT, make_bars
+
+
+def test_rolling_and_anchored_windows():
+    assert make_windows(1000, 400, 200) == [(0, 400, 400, 600), (200, 600, 600, 800), (400, 800, 800, 1000)]
+    assert [w[0] for w in make_windows(1000, 400, 200, anchored=True)] == [0, 0, 0]
+    assert make_windows(500, 400, 200) == []
+
+
+def test_views_share_memory_with_the_full_history():
+    bars = make_bars(300)
+    window = bars.view(100, 200)
+    assert np.shares_memory(window.close, bars.close)
+    assert window.dataset_id != bars.dataset_id
+    assert len(window) == 100
+
+
+def test_window_optimization_reads_shared_bars():
+    bars = make_bars(600)
+    request = {"pine_script": SCRIPT, "timeframe": "1h", "algorithm": "pso", "iterations": 3}
+    with SharedBars(bars) as shared:
+        result = optimize_window(shared.handle, (0, 400, 400, 600), request, seed=0)
+    assert result["test"] == [400, 600]
+    assert len(result["test_returns"]) == 200
+    assert set(result["best_params"]) == {"length", "oversold", "fast", "slow"}
+
+
+def test_out_of_sample_indicators_are_warmed_up_on_the_train_bars():
+    # SMA(150) over a 200-bar test window alone would be NaN for most of it
+    script = """
+fast = input.int(10, "Fast", minval=5, maxval=20)
+slow = input.int(150, "Slow", minval=150, maxval=150)
+if ta.crossover(ta.sma(close, fast), ta.sma(close, slow))
+    strategy.entry("Long", strategy.long)
+if ta.crossunder(ta.sma(close, fast), ta.sma(close, slow))
+    strategy.close("Long")
+"""
+    bars = make_bars(600)
+    request = {"pine_script": script, "timeframe": "1h", "algorithm": "pso", "iterations": 2}
+    with SharedBars(bars) as shared:
+        result = optimize_window(shared.handle, (0, 400, 400, 600), request, seed=0)
+    plan = get_compiled_strategy(script)
+    positions = plan.run(bars, result["best_params"])
+    expected = position_returns(positions, bars.close, plan.commission)[1][0, 400:600]
+    np.testing.assert_allclose(result["test_returns"], expected)
@@ -83,9 +83,9 @@ class TradingMonitor:
         if metrics:
             print(f"  Total Trades: {metrics.get('total_trades', 0)}")
             print(f"  Win Rate: {metrics.get('win_rate', 0)*100:.1f}%")
-            print(f"  Profit Factor: {metrics.get('profit_factor', 0):.2f}")
+            print(f"  Profit Factor: {metrics.get('profit_factor') or 0:.2f}")
             print(f"  Current Drawdown: {metrics.get('current_drawdown', 0)*100:.1f}%")
-            print(f"  Sharpe Ratio: {metrics.get('sharpe_ratio', 0):.2f}")
+            print(f"  Sharpe Ratio: {metrics.get('sharpe_ratio') or 0:.2f}")
         
         # Warnings
         if not testnet: